@@ -0,0 +1,102 @@
+# benchmarks/common.py
+
+import json
+import os
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_commit():
+    """
+    Возвращает короткий хеш текущего коммита или 'unknown', если git недоступен.
+
+    Returns:
+        str: Хеш коммита.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def latency_summary(samples_s):
+    """
+    Сводка по задержкам: среднее и перцентили в миллисекундах.
+
+    Args:
+        samples_s (list): Задержки в секундах.
+
+    Returns:
+        dict: count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms.
+    """
+    if not samples_s:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    values = np.asarray(samples_s, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max()),
+    }
+
+
+def save_results(name, results, results_dir=RESULTS_DIR):
+    """
+    Сохраняет результаты прогона в JSON с хешем коммита и временем в имени файла.
+
+    Args:
+        name (str): Имя набора бенчмарков.
+        results (dict): Результаты.
+        results_dir (str, optional): Каталог результатов. Defaults to RESULTS_DIR.
+
+    Returns:
+        str: Путь к сохранённому файлу.
+    """
+    commit = git_commit()
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    payload = {'benchmark': name, 'commit': commit, 'timestamp': timestamp, **results}
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{name}-{commit}-{timestamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=4)
+    return path
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_untrained_stack(encoder_backend, embedding_model_name, data_file, encoder_dim=768):
+    """
+    Собирает стек с необученной MLP: стоимость вычислений та же, что у рабочей модели.
+
+    Args:
+        encoder_backend (str): Бэкенд кодировщика.
+        embedding_model_name (str): Имя модели эмбеддингов.
+        data_file (str): Файл с размеченными утверждениями для подгонки скейлера.
+        encoder_dim (int, optional): Размерность офлайн-кодировщика. Defaults to 768.
+
+    Returns:
+        tuple: (embedding_model, model, scaler).
+    """
+    from sklearn.preprocessing import MinMaxScaler
+    from neural_network.encoders import load_encoder
+    from neural_network.evaluation import FUNCTIONS, correlations_to_array
+    from neural_network.model import create_multi_output_model
+    from neural_network.utils import load_labeled_statements
+
+    embedding_model = load_encoder(encoder_backend, embedding_model_name, encoder_dim)
+    model = create_multi_output_model(embedding_model.get_sentence_embedding_dimension(), FUNCTIONS)
+    _, correlations = load_labeled_statements(data_file)
+    scaler = MinMaxScaler(feature_range=(-1, 1)).fit(correlations_to_array(correlations, FUNCTIONS))
+    return embedding_model, model, scaler
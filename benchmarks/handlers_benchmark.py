@@ -0,0 +1,326 @@
+# benchmarks/handlers_benchmark.py
+"""
+Сквозной бенчмарк обработчиков бота на поддельных Telegram-обновлениях.
+
+Обработчики из bot/handlers.py вызываются как есть: им передаются собранные вручную
+Update/Context и бот-заглушка, которая записывает ответы вместо отправки в Telegram.
+Кодировщик и модель оборачиваются прокси с замером времени, функции оценки признаков
+и типов подменяются в пространстве имён bot.handlers, поэтому каждое обращение
+раскладывается по стадиям: поиск в файлах, кодирование, предсказание, оценка, ответ.
+
+Пример запуска из корня репозитория:
+    python -m benchmarks.handlers_benchmark --requests 200 --concurrency 8
+    python -m benchmarks.handlers_benchmark --encoder-backend hashing --untrained-model  # без сети
+    python -m benchmarks.handlers_benchmark --compare benchmarks/results/handlers-<старый>.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+# Заглушка для обязательной настройки, чтобы config.settings импортировался без .env
+os.environ.setdefault('DEVELOPER_CHAT_ID', '0')
+
+from benchmarks.common import build_untrained_stack, latency_summary, load_results, save_results
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    MODEL_PATH,
+    SCALER_PATH,
+    TALANOV_STATEMENTS_FILE
+)
+import bot.handlers as handlers
+from neural_network.encoders import ENCODER_BACKENDS
+
+SCENARIOS = ['general_text', 'neurotype', 'oprosnik']
+
+# Функции bot.handlers, время которых относится к стадиям
+STAGE_PATCHES = {
+    'predict_statements_correlations': 'pipeline',
+    'predict_statement_uncertainty': 'pipeline',
+    'predict_description_uncertainty': 'pipeline',
+    'calculate_traits': 'scoring',
+    'predict_socionics_types': 'scoring',
+    'get_agree_disagree_types': 'scoring',
+}
+
+_request_stages = contextvars.ContextVar('request_stages')
+
+
+def _record_stage(stage, elapsed):
+    stages = _request_stages.get(None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+def _timed(stage, func):
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record_stage(stage, time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record_stage(stage, time.perf_counter() - start)
+    return wrapper
+
+
+class TimedProxy:
+    """Прокси, замеряющий время одного метода обёрнутого объекта."""
+
+    def __init__(self, target, method, stage):
+        self._target = target
+        setattr(self, method, _timed(stage, getattr(target, method)))
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+class RecordingBot:
+    """Бот-заглушка: записывает исходящие сообщения вместо отправки."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(chat_id=chat_id, text=text)
+
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        start = time.perf_counter()
+        result = await self._bot.send_message(self.chat_id, text, **kwargs)
+        _record_stage('reply', time.perf_counter() - start)
+        return result
+
+
+def make_update(bot, user_id, text):
+    user = SimpleNamespace(id=user_id, username=f"bench_{user_id}", first_name='Bench')
+    chat = SimpleNamespace(id=user_id)
+    return SimpleNamespace(
+        effective_user=user,
+        effective_chat=chat,
+        message=FakeMessage(bot, user_id, text),
+        callback_query=None
+    )
+
+
+def make_context(bot, bot_data, user_data):
+    return SimpleNamespace(bot=bot, bot_data=bot_data, user_data=user_data, error=None)
+
+
+async def run_general_text(bot, bot_data, user_id, statements):
+    update = make_update(bot, user_id, random.choice(statements))
+    await handlers.handle_general_text(update, make_context(bot, bot_data, {}))
+
+
+async def run_neurotype(bot, bot_data, user_id, statements):
+    description = ' '.join(random.sample(statements, min(5, len(statements))))
+    update = make_update(bot, user_id, description)
+    await handlers.process_neurotype_description(update, make_context(bot, bot_data, {}), description)
+
+
+async def run_oprosnik(bot, bot_data, user_id, statements):
+    user_data = {}
+    context = make_context(bot, bot_data, user_data)
+    await handlers.oprosnik_start(make_update(bot, user_id, '/oprosnik'), context)
+    # Последний ответ запускает подсчёт результатов опросника и удаляет его состояние;
+    # адаптивный опросник может закончиться раньше
+    while 'oprosnik' in user_data:
+        await handlers.handle_oprosnik_answer(make_update(bot, user_id, str(random.randint(1, 5))), context)
+
+
+SCENARIO_RUNNERS = {
+    'general_text': run_general_text,
+    'neurotype': run_neurotype,
+    'oprosnik': run_oprosnik,
+}
+
+
+async def run_scenario(name, bot_data, statements, requests, concurrency):
+    """
+    Прогоняет сценарий заданное число раз с ограниченной параллельностью.
+
+    Args:
+        name (str): Имя сценария из SCENARIOS.
+        bot_data (dict): Общие объекты бота (модели).
+        statements (list): Пул утверждений для запросов.
+        requests (int): Количество запросов.
+        concurrency (int): Максимальное число одновременных запросов.
+
+    Returns:
+        dict: Сводка задержек, пропускной способности и стадий.
+    """
+    runner = SCENARIO_RUNNERS[name]
+    bot = RecordingBot()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    stage_samples = {}
+    errors = 0
+
+    async def one_request(user_id):
+        nonlocal errors
+        async with semaphore:
+            stages = {}
+            _request_stages.set(stages)
+            start = time.perf_counter()
+            try:
+                await runner(bot, bot_data, user_id, statements)
+            except Exception:
+                errors += 1
+                return
+            total = time.perf_counter() - start
+
+        latencies.append(total)
+        # Поиск в файлах — это время поиска и предсказания корреляций за вычетом кодирования и предсказания
+        pipeline = stages.pop('pipeline', 0.0)
+        stages['lookup'] = max(0.0, pipeline - stages.get('encode', 0.0) - stages.get('predict', 0.0))
+        stages['other'] = max(0.0, total - pipeline - stages.get('scoring', 0.0) - stages.get('reply', 0.0))
+        for stage, elapsed in stages.items():
+            stage_samples.setdefault(stage, []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(user_id) for user_id in range(1, requests + 1)))
+    wall_time = time.perf_counter() - start
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'wall_time_s': wall_time,
+        'throughput_rps': len(latencies) / wall_time if wall_time > 0 else 0.0,
+        'latency': latency_summary(latencies),
+        'stages': {stage: latency_summary(samples) for stage, samples in sorted(stage_samples.items())},
+        'messages_sent': len(bot.sent),
+    }
+
+
+def install_stage_patches():
+    for name, stage in STAGE_PATCHES.items():
+        setattr(handlers, name, _timed(stage, getattr(handlers, name)))
+
+
+def print_report(results):
+    for name, result in results['scenarios'].items():
+        latency = result['latency']
+        print(f"\n== {name}: {result['throughput_rps']:.2f} запр/с, ошибок {result['errors']}")
+        print(f"   p50 {latency['p50_ms']:.1f} мс, p95 {latency['p95_ms']:.1f} мс, p99 {latency['p99_ms']:.1f} мс")
+        for stage, summary in result['stages'].items():
+            print(f"   {stage:<10} p50 {summary['p50_ms']:9.2f} мс  p95 {summary['p95_ms']:9.2f} мс  "
+                  f"p99 {summary['p99_ms']:9.2f} мс")
+
+
+def print_comparison(old, new):
+    print(f"Сравнение {old.get('commit')} -> {new.get('commit')}")
+    for name, result in new['scenarios'].items():
+        previous = old.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        print(f"\n== {name}")
+        rows = [('total', previous['latency'], result['latency'])]
+        rows += [(stage, previous['stages'].get(stage), summary) for stage, summary in result['stages'].items()]
+        for stage, before, after in rows:
+            if not before:
+                continue
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                delta = after[key] - before[key]
+                ratio = (after[key] / before[key] - 1) * 100 if before[key] else 0.0
+                print(f"   {stage:<10} {key:<7} {before[key]:9.2f} -> {after[key]:9.2f} мс ({delta:+.2f}, {ratio:+.1f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк обработчиков бота.")
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=100, help="Запросов на сценарий.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1],
+                        help="Уровни параллельности; сценарии прогоняются для каждого.")
+    parser.add_argument('--data', default=TALANOV_STATEMENTS_FILE, help="Источник утверждений для запросов.")
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--scaler-path', default=SCALER_PATH)
+    parser.add_argument('--encoder-backend', default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME)
+    parser.add_argument('--untrained-model', action='store_true',
+                        help="Не загружать сохранённую модель, а создать необученную MLP той же архитектуры.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compare', metavar='RESULTS_JSON',
+                        help="Сравнить текущий прогон с сохранённым результатом.")
+    parser.add_argument('--no-save', action='store_true', help="Не сохранять результаты.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+
+    from neural_network.inference import load_serving_stack
+    with open(args.data, 'r', encoding='utf-8') as f:
+        statements = [entry['statement'] for entry in json.load(f)]
+
+    if args.untrained_model:
+        embedding_model, model, scaler = build_untrained_stack(
+            args.encoder_backend, args.embedding_model, args.data, STUB_ENCODER_DIM)
+    else:
+        embedding_model, model, scaler = load_serving_stack(
+            args.embedding_model, args.model_path, args.scaler_path, args.encoder_backend, STUB_ENCODER_DIM
+        )
+    from neural_network.inference import LocalPredictor
+    from socionics.question_bank import QuestionBank
+    timed_embedding_model = TimedProxy(embedding_model, 'encode', 'encode')
+    timed_model = TimedProxy(model, 'predict', 'predict')
+    bot_data = {
+        'embedding_model': timed_embedding_model,
+        'model': timed_model,
+        'scaler': scaler,
+        'predictor': LocalPredictor(timed_embedding_model, timed_model, scaler),
+        'question_bank': QuestionBank(args.data),
+    }
+    install_stage_patches()
+
+    scenarios = {}
+    for concurrency in args.concurrency:
+        for name in args.scenarios:
+            key = name if len(args.concurrency) == 1 else f"{name}@{concurrency}"
+            scenarios[key] = asyncio.run(run_scenario(name, bot_data, statements, args.requests, concurrency))
+
+    results = {
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'encoder_backend': args.encoder_backend,
+            'embedding_model': args.embedding_model,
+            'model_path': None if args.untrained_model else args.model_path,
+        },
+        'scenarios': scenarios,
+    }
+    print_report(results)
+    if not args.no_save:
+        print(f"\nРезультаты сохранены в {save_results('handlers', results)}")
+    if args.compare:
+        print()
+        print_comparison(load_results(args.compare), results)
+
+
+if __name__ == '__main__':
+    main()
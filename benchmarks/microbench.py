@@ -0,0 +1,301 @@
+# benchmarks/microbench.py
+"""
+Микробенчмарки горячих функций соционики и хранилища с сохранёнными базовыми значениями.
+
+Функции, которые выполняются на каждом запросе, прогоняются на синтетических данных
+растущего размера (файлы обратной связи на 1k/100k/1M строк, большой user_db).
+Результаты сравниваются с базовыми значениями из benchmarks/baselines/microbench.json.
+Чтобы сравнение было переносимо между машинами, все времена нормируются на время
+фиксированного калибровочного цикла на чистом Python.
+
+Пример запуска из корня репозитория:
+    python -m benchmarks.microbench --check            # упасть, если что-то стало медленнее
+    python -m benchmarks.microbench --update-baseline  # перезаписать базовые значения
+    python -m benchmarks.microbench --check --sizes 1000 100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import git_commit
+from socionics.calculations import (
+    calculate_traits,
+    predict_socionics_types,
+    get_agree_disagree_types,
+    FUNCTIONS
+)
+from socionics.data_processing import save_feedback, load_feedback_data
+from socionics.utils import parse_corrected_correlations
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'microbench.json')
+
+DEFAULT_FEEDBACK_SIZES = [1000, 100000, 1000000]
+DEFAULT_USER_DB_SIZES = [1000, 20000]
+
+# Допустимое относительное замедление и минимальная абсолютная разница, ниже которой различие считается шумом
+DEFAULT_TOLERANCE = 0.25
+MIN_ABSOLUTE_DIFF_S = 20e-6
+
+TRAITS = ['Квестимность', 'Интуиция', 'Демократизм', 'Веселость', 'Логика',
+          'Экстраверсия', 'Иррациональность', 'Рассудительность', 'Статика']
+TYPE_NAMES = ['ИЛЭ', 'СЭИ', 'ЭСЭ', 'ЛИИ', 'ЭИЭ', 'ЛСИ', 'СЛЭ', 'ИЭИ',
+              'СЭЭ', 'ИЛИ', 'ЛИЭ', 'ЭСИ', 'ЛСЭ', 'ЭИИ', 'ИЭЭ', 'СЛИ']
+
+
+def calibrate():
+    """
+    Время фиксированного цикла на чистом Python — единица нормировки результатов.
+
+    Returns:
+        float: Медианное время цикла в секундах.
+    """
+    def workload():
+        total = 0
+        data = {}
+        for i in range(200000):
+            data[i & 1023] = total
+            total += i * 3 % 7
+        return total
+
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        workload()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def measure(func, repeat=5, number=1):
+    """
+    Медианное время одного вызова функции.
+
+    Args:
+        func (callable): Функция без аргументов.
+        repeat (int, optional): Количество повторов. Defaults to 5.
+        number (int, optional): Вызовов в одном повторе. Defaults to 1.
+
+    Returns:
+        float: Время одного вызова в секундах.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples)
+
+
+def random_correlations(rng):
+    return {func: round(rng.uniform(-1, 1), 2) for func in FUNCTIONS}
+
+
+def synthetic_socionics_types(rng):
+    return {name: {trait: rng.choice([-1, 1]) for trait in TRAITS} for name in TYPE_NAMES}
+
+
+def write_feedback_file(path, lines, rng):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            entry = {
+                "timestamp": "2024-01-01T00:00:00",
+                "user_id": i,
+                "username": f"user{i}",
+                "statement": f"Синтетическое утверждение номер {i} для бенчмарка",
+                "function_correlation": random_correlations(rng),
+                "positive_feedback": bool(i % 2)
+            }
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def write_user_db(path, entries, rng):
+    data = [
+        {"statement": f"Пользовательское утверждение {i}", "function_correlation": random_correlations(rng)}
+        for i in range(entries)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def run_benchmarks(feedback_sizes, user_db_sizes, workdir, seed=42):
+    """
+    Прогоняет все микробенчмарки.
+
+    Args:
+        feedback_sizes (list): Размеры файлов обратной связи (строк).
+        user_db_sizes (list): Размеры user_db (записей).
+        workdir (str): Временный каталог для синтетических файлов.
+        seed (int, optional): Зерно генератора. Defaults to 42.
+
+    Returns:
+        dict: {имя бенчмарка: время одного вызова в секундах}.
+    """
+    rng = random.Random(seed)
+    results = {}
+
+    correlations = random_correlations(rng)
+    traits = calculate_traits(correlations)
+    socionics_types = synthetic_socionics_types(rng)
+    probabilities = predict_socionics_types(traits, socionics_types)
+
+    results['calculate_traits'] = measure(lambda: calculate_traits(correlations), number=2000)
+    results['predict_socionics_types'] = measure(
+        lambda: predict_socionics_types(traits, socionics_types), number=2000)
+    results['get_agree_disagree_types'] = measure(lambda: get_agree_disagree_types(probabilities), number=2000)
+    results['parse_corrected_correlations/simplified'] = measure(
+        lambda: parse_corrected_correlations('+БС, +БИ, -ЧС, -ЧЛ'), number=2000)
+    detailed = '\n'.join(f"{func}: {value}" for func, value in correlations.items())
+    results['parse_corrected_correlations/detailed'] = measure(
+        lambda: parse_corrected_correlations(detailed), number=2000)
+
+    for size in feedback_sizes:
+        path = os.path.join(workdir, f"feedback_{size}.jsonl")
+        write_feedback_file(path, size, rng)
+        repeat = 5 if size <= 100000 else 3
+        results[f"load_feedback_data/{size}"] = measure(lambda: load_feedback_data(path), repeat=repeat)
+        os.remove(path)
+
+    for size in user_db_sizes:
+        feedback_path = os.path.join(workdir, 'feedback_save.jsonl')
+        user_db_path = os.path.join(workdir, f"user_db_{size}.json")
+        write_user_db(user_db_path, size, rng)
+        counter = iter(range(10 ** 9))
+
+        # Новое утверждение каждый раз: проверка дубликатов проходит весь файл и файл перезаписывается
+        def save_new_statement():
+            save_feedback(
+                user_id=1,
+                username='bench',
+                statement=f"Новое утверждение {next(counter)}",
+                corrected_correlations=correlations,
+                positive_feedback=False,
+                feedback_data_file=feedback_path,
+                user_statements_file=user_db_path
+            )
+
+        results[f"save_feedback/user_db_{size}"] = measure(save_new_statement, repeat=5)
+        os.remove(user_db_path)
+        os.remove(feedback_path)
+
+    # Положительная обратная связь только дописывает строку в JSONL
+    feedback_path = os.path.join(workdir, 'feedback_positive.jsonl')
+    results['save_feedback/positive'] = measure(lambda: save_feedback(
+        user_id=1,
+        username='bench',
+        statement='Утверждение',
+        corrected_correlations=correlations,
+        positive_feedback=True,
+        feedback_data_file=feedback_path,
+        user_statements_file=os.path.join(workdir, 'user_db_unused.json')
+    ), number=200)
+    os.remove(feedback_path)
+
+    return results
+
+
+def compare(results, calibration, baseline, tolerance):
+    """
+    Сравнивает нормированные результаты с базовыми значениями.
+
+    Args:
+        results (dict): Текущие времена в секундах.
+        calibration (float): Текущее калибровочное время.
+        baseline (dict): Содержимое файла базовых значений.
+        tolerance (float): Допустимое относительное замедление.
+
+    Returns:
+        tuple: (строки отчёта, список регрессий).
+    """
+    scale = baseline['calibration_s'] / calibration
+    lines = [f"{'бенчмарк':<45} {'база':>12} {'сейчас':>12} {'изменение':>10}"]
+    regressions = []
+    for name, current in sorted(results.items()):
+        expected = baseline['results'].get(name)
+        # Переводим текущее время в «скорость машины базовых значений»
+        adjusted = current * scale
+        if expected is None:
+            lines.append(f"{name:<45} {'—':>12} {_format_time(adjusted):>12} {'новый':>10}")
+            continue
+        change = adjusted / expected - 1
+        marker = ''
+        if change > tolerance and adjusted - expected > MIN_ABSOLUTE_DIFF_S:
+            marker = '  <-- медленнее'
+            regressions.append(name)
+        lines.append(f"{name:<45} {_format_time(expected):>12} {_format_time(adjusted):>12} "
+                     f"{change * 100:>+9.1f}%{marker}")
+    return lines, regressions
+
+
+def _format_time(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f} с"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} мс"
+    return f"{seconds * 1e6:.2f} мкс"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих функций с базовыми значениями.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_FEEDBACK_SIZES,
+                        help="Размеры файлов обратной связи (строк).")
+    parser.add_argument('--user-db-sizes', type=int, nargs='+', default=DEFAULT_USER_DB_SIZES,
+                        help="Размеры user_db (записей).")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Допустимое относительное замедление (0.25 = 25%%).")
+    parser.add_argument('--check', action='store_true', help="Сравнить с базовыми значениями и упасть при регрессии.")
+    parser.add_argument('--update-baseline', action='store_true', help="Записать результаты как базовые.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # save_feedback и load_feedback_data пишут в лог на каждый вызов
+    logging.disable(logging.CRITICAL)
+
+    calibration = calibrate()
+    workdir = tempfile.mkdtemp(prefix='microbench-')
+    try:
+        results = run_benchmarks(args.sizes, args.user_db_sizes, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': git_commit(),
+                'calibration_s': calibration,
+                'results': results,
+            }, f, ensure_ascii=False, indent=4, sort_keys=True)
+        print(f"Базовые значения записаны в {args.baseline}")
+
+    if not os.path.exists(args.baseline):
+        for name, value in sorted(results.items()):
+            print(f"{name:<45} {_format_time(value):>12}")
+        print(f"\nФайл базовых значений {args.baseline} не найден.")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    lines, regressions = compare(results, calibration, baseline, args.tolerance)
+    print(f"База: коммит {baseline.get('commit')}, калибровка {_format_time(baseline['calibration_s'])}; "
+          f"сейчас {_format_time(calibration)}")
+    print('\n'.join(lines))
+
+    if args.check and regressions:
+        print(f"\nЗамедление больше {args.tolerance * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# benchmarks/replica_sweep.py
+"""
+Перебор конфигураций пула реплик: количество реплик × потоков на реплику.
+
+Для каждой пары запускается ReplicaPool, на него подаётся одинаковая нагрузка
+(параллельные запросы с батчами утверждений), и печатаются пропускная способность и
+задержки. Лучшую конфигурацию переносят в INFERENCE_REPLICAS и INFERENCE_INTRA_OP_THREADS.
+
+Пример запуска из корня репозитория:
+    python -m benchmarks.replica_sweep --replicas 1 2 4 --threads 1 2 4
+    python -m benchmarks.replica_sweep --encoder-backend hashing --untrained-model --replicas 1 2 --threads 1 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.common import build_untrained_stack, latency_summary, save_results
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    MODEL_PATH,
+    SCALER_PATH,
+    TALANOV_STATEMENTS_FILE,
+    INFERENCE_INTER_OP_THREADS
+)
+from neural_network.encoders import ENCODER_BACKENDS
+from neural_network.inference import load_serving_stack
+from neural_network.replicas import ReplicaPool
+
+
+async def run_load(pool, statements, requests, batch, concurrency):
+    """
+    Подаёт нагрузку на пул и меряет задержки.
+
+    Args:
+        pool (ReplicaPool): Запущенный пул.
+        statements (list): Источник утверждений.
+        requests (int): Количество запросов.
+        batch (int): Утверждений в одном запросе.
+        concurrency (int): Одновременных запросов.
+
+    Returns:
+        dict: Пропускная способность и сводка задержек.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(request_statements):
+        async with semaphore:
+            start = time.perf_counter()
+            await pool.predict(request_statements)
+            latencies.append(time.perf_counter() - start)
+
+    payloads = [random.sample(statements, min(batch, len(statements))) for _ in range(requests)]
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(payload) for payload in payloads))
+    wall_time = time.perf_counter() - start
+    return {
+        'wall_time_s': wall_time,
+        'requests_per_s': requests / wall_time,
+        'statements_per_s': sum(len(payload) for payload in payloads) / wall_time,
+        'latency': latency_summary(latencies),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Перебор реплик × потоков для пула моделей.")
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help="Intra-op потоков на реплику.")
+    parser.add_argument('--inter-op-threads', type=int, default=INFERENCE_INTER_OP_THREADS or 1)
+    parser.add_argument('--pin-cpus', action='store_true', help="Привязать реплики к своим ядрам.")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1, help="Утверждений в одном запросе.")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--data', default=TALANOV_STATEMENTS_FILE)
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--scaler-path', default=SCALER_PATH)
+    parser.add_argument('--encoder-backend', default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME)
+    parser.add_argument('--untrained-model', action='store_true',
+                        help="Не загружать сохранённую модель, а создать необученную MLP той же архитектуры.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-save', action='store_true', help="Не сохранять результаты.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    with open(args.data, 'r', encoding='utf-8') as f:
+        statements = [entry['statement'] for entry in json.load(f)]
+
+    if args.untrained_model:
+        loader, loader_args = build_untrained_stack, (args.encoder_backend, args.embedding_model, args.data,
+                                                      STUB_ENCODER_DIM)
+    else:
+        loader, loader_args = load_serving_stack, (args.embedding_model, args.model_path, args.scaler_path,
+                                                   args.encoder_backend, STUB_ENCODER_DIM)
+
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    runs = []
+    print(f"{'реплик':>6} {'потоков':>7} {'старт, с':>9} {'утв/с':>9} {'p50, мс':>9} {'p95, мс':>9}")
+    for replicas in args.replicas:
+        for threads in args.threads:
+            pool = ReplicaPool(replicas, threads, args.inter_op_threads, args.pin_cpus, loader, loader_args)
+            startup = pool.start()
+            try:
+                result = asyncio.run(run_load(pool, statements, args.requests, args.batch, args.concurrency))
+            finally:
+                pool.close_sync()
+            result.update({'replicas': replicas, 'intra_op_threads': threads, 'startup_s': startup,
+                           'oversubscribed': replicas * threads > cpu_count})
+            runs.append(result)
+            marker = '  (больше потоков, чем ядер)' if result['oversubscribed'] else ''
+            print(f"{replicas:>6} {threads:>7} {startup:>9.2f} {result['statements_per_s']:>9.1f} "
+                  f"{result['latency']['p50_ms']:>9.1f} {result['latency']['p95_ms']:>9.1f}{marker}")
+
+    best = max(runs, key=lambda run: run['statements_per_s'])
+    print(f"\nЛучшая пропускная способность: {best['replicas']} реплик × {best['intra_op_threads']} потоков "
+          f"({best['statements_per_s']:.1f} утв/с на {cpu_count} ядрах).")
+
+    if not args.no_save:
+        path = save_results('replica_sweep', {
+            'config': {
+                'requests': args.requests,
+                'batch': args.batch,
+                'concurrency': args.concurrency,
+                'inter_op_threads': args.inter_op_threads,
+                'pin_cpus': args.pin_cpus,
+                'cpu_count': cpu_count,
+                'encoder_backend': args.encoder_backend,
+                'untrained_model': args.untrained_model,
+            },
+            'runs': runs,
+            'best': {'replicas': best['replicas'], 'intra_op_threads': best['intra_op_threads']},
+        })
+        print(f"Результаты сохранены в {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# bot/admin.py
+
+import logging
+import time
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config.settings import DEVELOPER_CHAT_ID
+from monitoring.metrics import (
+    PROCESS_START_TIME,
+    STAGE_SECONDS,
+    HANDLER_SECONDS,
+    HANDLER_ERRORS,
+    CACHE_REQUESTS,
+    PERSISTENCE_FLUSHES,
+    STATEMENTS_PREDICTED,
+    DELIVERY_SECONDS,
+    DELIVERY_RETRIES,
+    DELIVERY_COALESCED,
+    DELIVERY_PENDING,
+    USER_DATA_ENTRIES,
+    USER_DATA_BYTES,
+    USER_DATA_EVICTED,
+    OPROSNIK_QUESTIONS
+)
+
+
+def is_admin(update: Update):
+    """Команды администратора доступны только из чата разработчика."""
+    return update.effective_chat is not None and update.effective_chat.id == DEVELOPER_CHAT_ID
+
+
+def _ms(seconds):
+    return '—' if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def format_stats():
+    """
+    Краткая сводка метрик процесса для /stats.
+
+    Returns:
+        str: Текст сводки.
+    """
+    uptime = time.time() - PROCESS_START_TIME.value()
+    lines = [f"Аптайм: {uptime / 3600:.1f} ч, предсказано утверждений: {int(STATEMENTS_PREDICTED.value())}", ""]
+
+    lines.append("Обработчики (кол-во, p50/p95 мс, ошибки):")
+    for (handler,) in HANDLER_SECONDS.label_values():
+        snapshot = HANDLER_SECONDS.snapshot(handler=handler)
+        lines.append(f"  {handler}: {snapshot['count']}, {_ms(HANDLER_SECONDS.quantile(0.5, handler=handler))}/"
+                     f"{_ms(HANDLER_SECONDS.quantile(0.95, handler=handler))}, "
+                     f"{int(HANDLER_ERRORS.value(handler=handler))}")
+
+    lines.append("")
+    lines.append("Стадии (кол-во, p50/p95 мс):")
+    for (stage,) in STAGE_SECONDS.label_values():
+        snapshot = STAGE_SECONDS.snapshot(stage=stage)
+        lines.append(f"  {stage}: {snapshot['count']}, {_ms(STAGE_SECONDS.quantile(0.5, stage=stage))}/"
+                     f"{_ms(STAGE_SECONDS.quantile(0.95, stage=stage))}")
+
+    caches = {}
+    for (cache, result), value in CACHE_REQUESTS.samples().items():
+        caches.setdefault(cache, {})[result] = value
+    if caches:
+        lines.append("")
+        lines.append("Кэши (попадания):")
+        for cache, results in sorted(caches.items()):
+            total = sum(results.values())
+            hits = results.get('hit', 0)
+            lines.append(f"  {cache}: {hits}/{total} ({hits / total * 100:.0f}%)")
+
+    flushes = PERSISTENCE_FLUSHES.samples()
+    if flushes:
+        lines.append("")
+        lines.append("Записи на диск: " + ', '.join(f"{target}: {count}" for (target,), count in sorted(flushes.items())))
+
+    modes = OPROSNIK_QUESTIONS.label_values()
+    if modes:
+        lines.append("")
+        lines.append("Опросники (завершено, вопросов в среднем): " + ', '.join(
+            f"{mode}: {snapshot['count']}, {snapshot['sum'] / snapshot['count']:.1f}"
+            for mode, snapshot in ((mode, OPROSNIK_QUESTIONS.snapshot(mode=mode)) for (mode,) in modes)))
+
+    lines.append("")
+    lines.append(f"user_data (на последнем проходе): записей {int(USER_DATA_ENTRIES.value())}, "
+                 f"{USER_DATA_BYTES.value() / 1024:.1f} КБ, удалено неактивных: {int(USER_DATA_EVICTED.value())}")
+
+    priorities = DELIVERY_SECONDS.label_values()
+    if priorities:
+        lines.append("")
+        lines.append("Доставка сообщений (кол-во, p50/p95 мс):")
+        for (priority,) in priorities:
+            snapshot = DELIVERY_SECONDS.snapshot(priority=priority)
+            lines.append(f"  {priority}: {snapshot['count']}, {_ms(DELIVERY_SECONDS.quantile(0.5, priority=priority))}/"
+                         f"{_ms(DELIVERY_SECONDS.quantile(0.95, priority=priority))}")
+        lines.append(f"  повторов после RetryAfter: {int(sum(DELIVERY_RETRIES.samples().values()))}, "
+                     f"склеено: {int(DELIVERY_COALESCED.value())}, в очереди: {int(DELIVERY_PENDING.value())}")
+    return '\n'.join(lines)
+
+
+# Обработчик команды /stats (только для разработчика)
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update):
+        logging.warning(f"Пользователь ID {update.effective_user.id} запросил /stats без прав администратора.")
+        return
+    await update.message.reply_text(format_stats())
+
+
+# Обработчик команды /profiler [on [доля]|off] (только для разработчика)
+async def profiler_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update):
+        logging.warning(f"Пользователь ID {update.effective_user.id} запросил /profiler без прав администратора.")
+        return
+    profiler = context.bot_data['profiler']
+    args = context.args or []
+    if args and args[0] == 'on':
+        try:
+            rate = float(args[1]) if len(args) > 1 else None
+        except ValueError:
+            await update.message.reply_text("❗️ Доля должна быть числом от 0 до 1, например /profiler on 0.1")
+            return
+        if rate is not None and not 0 < rate <= 1:
+            await update.message.reply_text("❗️ Доля должна быть числом от 0 до 1, например /profiler on 0.1")
+            return
+        profiler.enable(rate)
+    elif args and args[0] == 'off':
+        profiler.disable()
+    await update.message.reply_text(profiler.status())
@@ -3,12 +3,14 @@
 import logging
 
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    TypeHandler,
     filters, ContextTypes
 )
 from bot.handlers import (
@@ -26,10 +28,28 @@ from bot.handlers import (
     process_neurotype_description,
     button_handler,
     error_handler,
-    handle_general_text  # Импортируем новый обработчик
+    conversation_timeout,
+    handle_general_text,  # Импортируем новый обработчик
+    profile_command
 )
 from bot.states import BotStates
-from config.settings import TELEGRAM_BOT_TOKEN
+from bot.admin import stats_command, profiler_command
+from bot.chat_export import chat_export_start, chat_export_expect_file, chat_export_receive
+from bot.review import review_command, review_callback, review_digest_job
+from bot.cancellation import UserWork, PerUserUpdateProcessor
+from bot.delivery import FloodLimiter, COALESCE
+from bot.conversation_state import touch_user_data, sweep_user_data
+from config.settings import TELEGRAM_BOT_TOKEN, PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_ENABLED
+from config.settings import CONCURRENT_UPDATES, ADD_CONVERSATION_TIMEOUT, OPROSNIK_CONVERSATION_TIMEOUT, \
+    NEUROTYPE_CONVERSATION_TIMEOUT, CHAT_EXPORT_CONVERSATION_TIMEOUT, USER_DATA_SWEEP_INTERVAL
+from config.settings import DELIVERY_GLOBAL_RATE, DELIVERY_CHAT_RATE, DELIVERY_CHAT_BURST, DELIVERY_GROUP_RATE_PER_MINUTE, \
+    DELIVERY_MAX_RETRIES
+from config.settings import USER_PROFILES_FILE, USER_PROFILE_HALF_LIFE_DAYS, USER_PROFILE_WINDOW, USER_PROFILE_FLUSH_INTERVAL
+from config.settings import USER_STATEMENTS_FILE, REVIEW_QUEUE_ENABLED, REVIEW_QUEUE_FILE, REVIEW_DIGEST_INTERVAL
+from monitoring.telegram import InstrumentedRequest, instrument_handler
+from monitoring.profiling import SamplingProfiler, install_signal_toggle
+from socionics.profiles import ProfileStore
+from socionics.review_queue import ReviewQueue
 from bot.commands import start_command, info_command, cancel_command
 from bot.states import BotStates
 from bot.utils import inline_buttons, main_menu_keyboard
@@ -42,57 +62,131 @@ import os
 
 
 def setup_bot():
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    # Обновления разных пользователей обрабатываются параллельно, одного — по очереди;
+    # /cancel и таймаут диалога отменяют работу пользователя через user_work
+    user_work = UserWork()
+    # Накопительные профили пользователей; изменения дописываются на диск при остановке
+    profile_store = ProfileStore(USER_PROFILES_FILE, USER_PROFILE_HALF_LIFE_DAYS, USER_PROFILE_WINDOW,
+                                 USER_PROFILE_FLUSH_INTERVAL)
+    # Исходящие сообщения ждут лимитов Telegram в очередях с приоритетами, повторяются после RetryAfter
+    flood_limiter = FloodLimiter(DELIVERY_GLOBAL_RATE, DELIVERY_CHAT_RATE, DELIVERY_CHAT_BURST,
+                                 DELIVERY_GROUP_RATE_PER_MINUTE / 60, DELIVERY_MAX_RETRIES)
+    # Запросы к Bot API (ответы пользователям) меряются; getUpdates идёт через отдельный клиент
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(InstrumentedRequest())
+        .rate_limiter(flood_limiter)
+        .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES, user_work))
+        .post_shutdown(flush_profiles)
+        .build()
+    )
+    application.bot_data['user_work'] = user_work
+    application.bot_data['profile_store'] = profile_store
+    timeout_handlers = [TypeHandler(Update, instrument_handler(conversation_timeout))]
+
+    # Время активности пользователя для удаления user_data неактивных пользователей
+    application.add_handler(TypeHandler(Update, touch_user_data), group=-1)
+    if USER_DATA_SWEEP_INTERVAL > 0 and application.job_queue is not None:
+        application.job_queue.run_repeating(sweep_user_data, interval=USER_DATA_SWEEP_INTERVAL,
+                                            first=USER_DATA_SWEEP_INTERVAL)
+    elif USER_DATA_SWEEP_INTERVAL > 0:
+        logging.warning("JobQueue недоступна (нужен python-telegram-bot[job-queue]): user_data неактивных "
+                        "пользователей не удаляется.")
 
     # Регистрация команд
-    application.add_handler(CommandHandler('start', start))
-    application.add_handler(CommandHandler('info', info_command))
-    application.add_handler(CommandHandler('cancel', cancel_command))
+    application.add_handler(CommandHandler('start', instrument_handler(start)))
+    application.add_handler(CommandHandler('info', instrument_handler(info_command)))
+    application.add_handler(CommandHandler('stats', stats_command))
+    application.add_handler(CommandHandler('profiler', profiler_command))
+    application.add_handler(CommandHandler('profile', instrument_handler(profile_command)))
+
+    # Очередь проверки утверждений /add: дайджест разработчику вместо сообщения на каждое утверждение
+    if REVIEW_QUEUE_ENABLED:
+        application.bot_data['review_queue'] = ReviewQueue(REVIEW_QUEUE_FILE, USER_STATEMENTS_FILE)
+        application.add_handler(CommandHandler('review', review_command))
+        application.add_handler(CallbackQueryHandler(review_callback, pattern=r'^review:'))
+        if REVIEW_DIGEST_INTERVAL > 0 and application.job_queue is not None:
+            application.job_queue.run_repeating(review_digest_job, interval=REVIEW_DIGEST_INTERVAL,
+                                                first=REVIEW_DIGEST_INTERVAL)
+        elif REVIEW_DIGEST_INTERVAL > 0:
+            logging.warning("JobQueue недоступна (нужен python-telegram-bot[job-queue]): дайджест очереди "
+                            "проверки отправляется только по команде /review.")
+
+    # Профайлер обновлений: /profiler on|off или kill -USR1 <pid> без перезапуска бота
+    profiler = SamplingProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_ENABLED)
+    application.bot_data['profiler'] = profiler
+    install_signal_toggle(profiler)
 
     # ConversationHandler для добавления утверждения
     add_conversation = ConversationHandler(
-        entry_points=[CommandHandler('add', add_statement_start)],
+        entry_points=[CommandHandler('add', instrument_handler(add_statement_start))],
         states={
             BotStates.WAITING_FOR_STATEMENT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_statement_receive)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(add_statement_receive))
             ],
             BotStates.WAITING_FOR_CORRELATIONS_INPUT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_correlations_receive)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(add_correlations_receive))
             ],
+            ConversationHandler.TIMEOUT: timeout_handlers,
         },
-        fallbacks=[CommandHandler('cancel', cancel_command)]
+        fallbacks=[CommandHandler('cancel', instrument_handler(cancel_command))],
+        conversation_timeout=ADD_CONVERSATION_TIMEOUT or None
     )
     application.add_handler(add_conversation)
 
     # ConversationHandler для опросника
     oprosnik_conversation = ConversationHandler(
-        entry_points=[CommandHandler('oprosnik', oprosnik_start)],
+        entry_points=[CommandHandler('oprosnik', instrument_handler(oprosnik_start))],
         states={
             BotStates.OPROSNIK_PROCESSING: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_oprosnik_answer)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(handle_oprosnik_answer))
             ],
+            ConversationHandler.TIMEOUT: timeout_handlers,
         },
-        fallbacks=[CommandHandler('cancel', cancel_command)]
+        fallbacks=[CommandHandler('cancel', instrument_handler(cancel_command))],
+        conversation_timeout=OPROSNIK_CONVERSATION_TIMEOUT or None
     )
     application.add_handler(oprosnik_conversation)
 
     # ConversationHandler для нейротипирования
     neurotype_conversation = ConversationHandler(
-        entry_points=[CommandHandler('neurotype', neurotype_start)],
+        entry_points=[CommandHandler('neurotype', instrument_handler(neurotype_start))],
         states={
             BotStates.WAITING_FOR_NEUROTYPE_DESCRIPTION: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, neurotype_receive_description)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(neurotype_receive_description))
             ],
+            ConversationHandler.TIMEOUT: timeout_handlers,
         },
-        fallbacks=[CommandHandler('cancel', cancel_command)]
+        fallbacks=[CommandHandler('cancel', instrument_handler(cancel_command))],
+        conversation_timeout=NEUROTYPE_CONVERSATION_TIMEOUT or None
     )
     application.add_handler(neurotype_conversation)
 
+    # ConversationHandler для типирования экспорта чата
+    chat_export_conversation = ConversationHandler(
+        entry_points=[CommandHandler('chat', instrument_handler(chat_export_start))],
+        states={
+            BotStates.WAITING_FOR_CHAT_EXPORT: [
+                MessageHandler(filters.Document.ALL, instrument_handler(chat_export_receive)),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(chat_export_expect_file))
+            ],
+            ConversationHandler.TIMEOUT: timeout_handlers,
+        },
+        fallbacks=[CommandHandler('cancel', instrument_handler(cancel_command))],
+        conversation_timeout=CHAT_EXPORT_CONVERSATION_TIMEOUT or None
+    )
+    application.add_handler(chat_export_conversation)
+
+    # /cancel вне диалогов. В группе срабатывает только первый подходящий обработчик, поэтому
+    # он регистрируется после диалогов: иначе их fallback /cancel не завершает диалог и его таймаут
+    application.add_handler(CommandHandler('cancel', instrument_handler(cancel_command)))
+
     # Обработчик инлайн-кнопок
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(CallbackQueryHandler(instrument_handler(button_handler)))
 
     # Обработчик общих текстовых сообщений
-    general_text_handler = MessageHandler(filters.TEXT & ~filters.COMMAND, handle_general_text)
+    general_text_handler = MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(handle_general_text))
     application.add_handler(general_text_handler)
 
     # Обработчик ошибок
@@ -101,6 +195,13 @@ def setup_bot():
     return application
 
 
+async def flush_profiles(application):
+    """
+    Дописывает изменённые профили пользователей на диск при остановке бота.
+    """
+    application.bot_data['profile_store'].flush()
+
+
 async def button_handler(update, context):
     """
     Обработчик нажатий на инлайн-кнопки.
@@ -125,12 +226,17 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     Глобальный обработчик ошибок.
     """
     logging.error(f"Update {update} caused error {context.error}")
+    # Чат уже упёрся в лимит Telegram: ещё одно сообщение об ошибке только продлит ограничение
+    if isinstance(context.error, RetryAfter):
+        return
     # Опционально: отправить сообщение пользователю о возникшей ошибке
     try:
         if isinstance(update, Update) and update.effective_chat:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
-                text="❗️ Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте позже."
+                text="❗️ Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте позже.",
+                # Несколько ошибок подряд приходят одним сообщением
+                rate_limit_args=COALESCE
             )
     except Exception as e:
         logging.error(f"Не удалось отправить сообщение об ошибке пользователю: {e}")
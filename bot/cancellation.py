@@ -0,0 +1,125 @@
+# bot/cancellation.py
+"""
+Отмена работы пользователя.
+
+Обновления одного пользователя обрабатываются по очереди (как при последовательной
+обработке), а разных пользователей — параллельно. Каждое обновление выполняется в
+отдельной задаче, зарегистрированной за пользователем; /cancel обходит очередь
+пользователя, а cancel_command и таймаут диалога отменяют его ждущие и выполняющиеся
+задачи вместе с их запросами инференса.
+"""
+
+import asyncio
+import logging
+import weakref
+
+from telegram.ext import BaseUpdateProcessor
+
+from monitoring.metrics import UPDATES_CANCELLED
+
+
+class UserWork:
+    """Задачи обновлений по пользователям и очередь обновлений каждого пользователя."""
+
+    def __init__(self):
+        self._tasks = {}
+        self._locks = {}
+        self._cancelled = weakref.WeakSet()
+
+    def lock(self, user_id):
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def track(self, user_id, task):
+        self._tasks.setdefault(user_id, set()).add(task)
+
+    def untrack(self, user_id, task):
+        tasks = self._tasks.get(user_id)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            # Нет ни ждущих, ни выполняющихся обновлений: очередь пользователя больше не нужна
+            del self._tasks[user_id]
+            self._locks.pop(user_id, None)
+
+    def pending(self, user_id):
+        return len(self._tasks.get(user_id, ()))
+
+    def cancel(self, user_id, reason):
+        """
+        Отменяет ждущие и выполняющиеся обновления пользователя.
+
+        Args:
+            user_id (int): ID пользователя.
+            reason (str): Причина (cancel, timeout) для метрики.
+
+        Returns:
+            int: Сколько задач отменено.
+        """
+        current = asyncio.current_task()
+        cancelled = 0
+        for task in list(self._tasks.get(user_id, ())):
+            if task is current or task.done():
+                continue
+            self._cancelled.add(task)
+            task.cancel()
+            cancelled += 1
+        if cancelled:
+            UPDATES_CANCELLED.inc(cancelled, reason=reason)
+            logging.info(f"Отменено {cancelled} обновлений пользователя ID {user_id} ({reason}).")
+        return cancelled
+
+    def was_cancelled(self, task):
+        return task in self._cancelled
+
+
+def is_cancel_update(update):
+    message = getattr(update, 'effective_message', None)
+    text = getattr(message, 'text', None) or ''
+    return text.split('@', 1)[0].split(maxsplit=1)[:1] == ['/cancel']
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обработчик обновлений для ApplicationBuilder.concurrent_updates().
+
+    Args:
+        max_concurrent_updates (int): Сколько обновлений обрабатывается одновременно.
+        work (UserWork): Реестр задач пользователей.
+    """
+
+    def __init__(self, max_concurrent_updates, work):
+        super().__init__(max_concurrent_updates)
+        self.work = work
+
+    async def do_process_update(self, update, coroutine):
+        user = getattr(update, 'effective_user', None)
+        if user is None or is_cancel_update(update):
+            # /cancel не ждёт в очереди пользователя, иначе отменять было бы нечего
+            await coroutine
+            return
+
+        task = asyncio.ensure_future(self._run_in_order(user.id, coroutine))
+        # Если задачу отменили до старта, корутина обновления закрывается без предупреждения
+        task.add_done_callback(lambda _: coroutine.close())
+        self.work.track(user.id, task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not self.work.was_cancelled(task):
+                raise
+        finally:
+            self.work.untrack(user.id, task)
+
+    async def _run_in_order(self, user_id, coroutine):
+        async with self.work.lock(user_id):
+            await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
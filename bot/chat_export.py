@@ -0,0 +1,253 @@
+# bot/chat_export.py
+"""
+Типирование участников экспорта чата Telegram Desktop (/chat).
+
+Файл result.json скачивается на диск и читается потоково в отдельном потоке
+(socionics/chat_export.py). Выборка сообщений каждого автора делится на фрагменты,
+все фрагменты предсказываются большими батчами, отсортированными по длине, а их
+корреляции объединяются по авторам и переводятся в признаки и вероятности типов.
+Память ограничена бюджетом текста, время — CHAT_EXPORT_TIMEOUT на задачу.
+"""
+
+import asyncio
+import contextvars
+import functools
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes, ConversationHandler
+
+from bot.prediction import predict_chunks_in_batches
+from bot.states import BotStates
+from bot.utils import main_menu_keyboard
+from config.settings import (
+    SOCIONICS_TYPES,
+    NEUROTYPE_CHUNK_MAX_WORDS,
+    NEUROTYPE_CHUNK_OVERLAP,
+    NEUROTYPE_CHUNK_WEIGHTING,
+    CHAT_EXPORT_MAX_BYTES,
+    CHAT_EXPORT_MAX_JOBS,
+    CHAT_EXPORT_TIMEOUT,
+    CHAT_EXPORT_MAX_CHARS,
+    CHAT_EXPORT_MAX_MESSAGES_PER_AUTHOR,
+    CHAT_EXPORT_MIN_MESSAGES,
+    CHAT_EXPORT_MAX_CHUNKS_PER_AUTHOR,
+    CHAT_EXPORT_BATCH_SIZE
+)
+from monitoring.metrics import observe_stage
+from neural_network.chunking import aggregate_chunk_correlations, chunk_text
+from socionics.calculations import FUNCTIONS, TRAITS, calculate_traits_batch, predict_socionics_types_batch
+from socionics.chat_export import ChatExportError, iter_chat_messages, sample_authors
+
+# Как часто обновляется сообщение о ходе работы (Telegram ограничивает частоту правок)
+PROGRESS_INTERVAL = 3.0
+# Сколько участников показывается в ответе; полный результат — в приложенном JSON
+SHOWN_AUTHORS = 20
+
+
+def read_authors(path, deadline, stop_event):
+    """
+    Читает экспорт и собирает выборки сообщений по авторам (выполняется в потоке).
+
+    Args:
+        path (str): Путь к result.json.
+        deadline (float): Срок по time.monotonic().
+        stop_event (threading.Event): Установлен, если задачу отменили.
+
+    Returns:
+        dict: {from_id: AuthorSample}.
+    """
+    return sample_authors(
+        iter_chat_messages(path),
+        max_messages_per_author=CHAT_EXPORT_MAX_MESSAGES_PER_AUTHOR,
+        max_total_chars=CHAT_EXPORT_MAX_CHARS,
+        deadline=deadline,
+        should_stop=stop_event.is_set
+    )
+
+
+def format_chat_results(results, skipped):
+    """
+    Текст ответа с вероятными типами участников.
+
+    Args:
+        results (list): Словари {'name', 'messages', 'sampled', 'types'} по убыванию числа сообщений.
+        skipped (int): Сколько участников пропущено из-за малого числа сообщений.
+
+    Returns:
+        str: Текст ответа.
+    """
+    lines = [f"📊 Типирование чата: участников {len(results)}", ""]
+    for result in results[:SHOWN_AUTHORS]:
+        top = ', '.join(f"{name} {prob:.1f}%" for name, prob in list(result['types'].items())[:3])
+        lines.append(f"👤 {result['name']} — сообщений: {result['messages']} (в выборке {result['sampled']})")
+        lines.append(f"    {top or 'нет данных о типах'}")
+    if len(results) > SHOWN_AUTHORS:
+        lines.append(f"\n…и ещё {len(results) - SHOWN_AUTHORS} участников — в файле с результатами.")
+    if skipped:
+        lines.append(f"\nПропущено участников с менее чем {CHAT_EXPORT_MIN_MESSAGES} сообщениями: {skipped}.")
+    return '\n'.join(lines)
+
+
+async def type_chat_export(context: ContextTypes.DEFAULT_TYPE, path, deadline, progress):
+    """
+    Типирует участников экспорта чата.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        path (str): Путь к скачанному result.json.
+        deadline (float): Срок задачи по time.monotonic().
+        progress (callable): async progress(text) для сообщений о ходе работы.
+
+    Returns:
+        tuple: (результаты по участникам, число пропущенных участников).
+    """
+    loop = asyncio.get_running_loop()
+    stop_event = threading.Event()
+    call = functools.partial(contextvars.copy_context().run, read_authors, path, deadline, stop_event)
+    try:
+        with observe_stage('chat_parse'):
+            authors = await loop.run_in_executor(None, call)
+    except asyncio.CancelledError:
+        # Поток разбора нельзя прервать извне; он проверяет флаг и завершается сам
+        stop_event.set()
+        raise
+
+    selected = [sample for sample in authors.values() if len(sample.messages) >= CHAT_EXPORT_MIN_MESSAGES]
+    selected.sort(key=lambda sample: sample.total, reverse=True)
+    chunks = []
+    spans = []
+    for sample in selected:
+        author_chunks = chunk_text('\n'.join(sample.messages), NEUROTYPE_CHUNK_MAX_WORDS, NEUROTYPE_CHUNK_OVERLAP,
+                                   CHAT_EXPORT_MAX_CHUNKS_PER_AUTHOR)
+        spans.append((len(chunks), len(chunks) + len(author_chunks)))
+        chunks.extend(author_chunks)
+    await progress(f"⏳ Участников: {len(selected)}, фрагментов текста: {len(chunks)}. Анализирую…")
+
+    async def batch_progress(done, total):
+        await progress(f"⏳ Проанализировано фрагментов: {done} из {total}.")
+
+    predictions = await predict_chunks_in_batches(context, chunks, CHAT_EXPORT_BATCH_SIZE, deadline, batch_progress)
+
+    names = []
+    rows = []
+    typed = []
+    for sample, (start, end) in zip(selected, spans):
+        author_predictions = predictions[start:end]
+        done = ~np.isnan(author_predictions).any(axis=1)
+        if not done.any():
+            continue
+        rows.append(aggregate_chunk_correlations([chunk for chunk, ok in zip(chunks[start:end], done) if ok],
+                                                 author_predictions[done], NEUROTYPE_CHUNK_WEIGHTING))
+        typed.append(sample)
+    results = []
+    if rows:
+        with observe_stage('scoring'):
+            correlations = np.stack(rows)
+            traits = calculate_traits_batch(correlations)
+            names, probabilities = predict_socionics_types_batch(traits, SOCIONICS_TYPES)
+        for i, sample in enumerate(typed):
+            order = np.argsort(-probabilities[i], kind='stable')
+            results.append({
+                'name': sample.name,
+                'messages': sample.total,
+                'sampled': len(sample.messages),
+                'correlations': {func: float(correlations[i, j]) for j, func in enumerate(FUNCTIONS)},
+                'traits': {trait: float(traits[i, j]) for j, trait in enumerate(TRAITS)},
+                'types': {names[j]: float(probabilities[i, j]) for j in order},
+            })
+    return results, len(authors) - len(selected)
+
+
+# Обработчик команды /chat
+async def chat_export_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(
+        "📥 Отправьте файл result.json — экспорт чата из Telegram Desktop (формат JSON, "
+        f"до {CHAT_EXPORT_MAX_BYTES // (1024 * 1024)} МБ). Я определю вероятные типы участников.\n"
+        "Для отмены используйте /cancel."
+    )
+    return BotStates.WAITING_FOR_CHAT_EXPORT
+
+
+# Обработчик текста вместо файла в диалоге /chat
+async def chat_export_expect_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text("❗️ Отправьте файл result.json документом или /cancel для отмены.")
+    return BotStates.WAITING_FOR_CHAT_EXPORT
+
+
+# Обработчик полученного файла экспорта
+async def chat_export_receive(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    document = update.message.document
+    deadline = time.monotonic() + CHAT_EXPORT_TIMEOUT
+
+    if not (document.file_name or '').lower().endswith('.json'):
+        await update.message.reply_text("❗️ Нужен файл .json из экспорта чата Telegram Desktop.")
+        return BotStates.WAITING_FOR_CHAT_EXPORT
+    if document.file_size and document.file_size > CHAT_EXPORT_MAX_BYTES:
+        await update.message.reply_text(
+            f"❗️ Файл больше {CHAT_EXPORT_MAX_BYTES // (1024 * 1024)} МБ. Экспортируйте чат за меньший период.",
+            reply_markup=main_menu_keyboard()
+        )
+        return ConversationHandler.END
+    if context.bot_data.get('chat_export_jobs', 0) >= CHAT_EXPORT_MAX_JOBS:
+        await update.message.reply_text("⌛️ Сейчас уже анализируется другой чат. Попробуйте через несколько минут.",
+                                        reply_markup=main_menu_keyboard())
+        return ConversationHandler.END
+
+    context.bot_data['chat_export_jobs'] = context.bot_data.get('chat_export_jobs', 0) + 1
+    # Сообщение о ходе работы потом редактируется, поэтому его нельзя склеивать с соседними
+    progress_message = await update.message.reply_text("⏳ Скачиваю и читаю файл…")
+    last_progress = [time.monotonic()]
+
+    async def progress(text):
+        if time.monotonic() - last_progress[0] < PROGRESS_INTERVAL:
+            return
+        last_progress[0] = time.monotonic()
+        try:
+            await progress_message.edit_text(text)
+        except TelegramError as e:
+            logging.debug(f"Не удалось обновить сообщение о ходе работы: {e}")
+
+    fd, path = tempfile.mkstemp(prefix='chat_export_', suffix='.json')
+    os.close(fd)
+    try:
+        telegram_file = await document.get_file()
+        await telegram_file.download_to_drive(path)
+        results, skipped = await type_chat_export(context, path, deadline, progress)
+    except TelegramError as e:
+        # Файл больше лимита скачивания Bot API или сбой сети: диалог не должен ждать до таймаута
+        await update.message.reply_text("❗️ Не удалось скачать файл. Попробуйте отправить его ещё раз.",
+                                        reply_markup=main_menu_keyboard())
+        logging.warning(f"Экспорт чата от пользователя ID {user.id} не скачан: {e}")
+        return ConversationHandler.END
+    except ChatExportError as e:
+        await update.message.reply_text(f"❗️ Не удалось разобрать файл: {e}", reply_markup=main_menu_keyboard())
+        logging.warning(f"Экспорт чата от пользователя ID {user.id} не разобран: {e}")
+        return ConversationHandler.END
+    finally:
+        context.bot_data['chat_export_jobs'] -= 1
+        os.remove(path)
+
+    if not results:
+        await update.message.reply_text(
+            f"😕 Не нашлось участников хотя бы с {CHAT_EXPORT_MIN_MESSAGES} текстовыми сообщениями "
+            "или анализ не уложился во время.",
+            reply_markup=main_menu_keyboard()
+        )
+        return ConversationHandler.END
+
+    await update.message.reply_text(format_chat_results(results, skipped), reply_markup=main_menu_keyboard())
+    report = json.dumps(results, ensure_ascii=False, indent=2).encode('utf-8')
+    await update.message.reply_document(document=io.BytesIO(report), filename='chat_types.json')
+    logging.info(f"Пользователь ID {user.id} получил типирование чата: участников {len(results)}, "
+                 f"пропущено {skipped}.")
+    return ConversationHandler.END
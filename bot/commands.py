@@ -1,7 +1,7 @@
 # bot/commands.py
 
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, ConversationHandler
 from bot.states import BotStates
 from bot.utils import main_menu_keyboard, inline_buttons
 from neural_network.inference import predict_correlations
@@ -35,6 +35,8 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🔹 /add - Добавить новое утверждение в базу данных.\n"
         "🔹 /oprosnik - Пройти опросник для определения социотипа.\n"
         "🔹 /neurotype - Провести нейротипирование по вашему описанию.\n"
+        "🔹 /profile - Сводный профиль по всем вашим проанализированным утверждениям.\n"
+        "🔹 /chat - Определить типы участников по экспорту чата Telegram Desktop.\n"
         "🔹 /update_model - Обновить модель на основе новой обратной связи.\n"
         "🔹 /info - Показать информацию о боте и доступных командах.\n"
         "🔹 /cancel - Отменить текущий процесс."
@@ -46,11 +48,16 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Обработчик команды /cancel. Отменяет текущий процесс и возвращает в главное меню.
     """
     user = update.effective_user
+    # Ждущие и выполняющиеся обновления пользователя отменяются вместе с их запросами инференса
+    user_work = context.bot_data.get('user_work')
+    if user_work is not None:
+        user_work.cancel(user.id, 'cancel')
     context.user_data.clear()
     await update.message.reply_text(
         "❌ Действие отменено. Вы можете начать сначала.",
         reply_markup=main_menu_keyboard()
     )
     logging.info(f"Пользователь {user.username} отменил текущий процесс.")
+    return ConversationHandler.END
 
 # Добавьте другие команды здесь, такие как /add, /oprosnik, /neurotype и т.д.
@@ -0,0 +1,149 @@
+# bot/conversation_state.py
+"""
+Состояние диалогов пользователей в user_data.
+
+Опросник хранит не тексты вопросов, а их номера в общем банке вопросов
+(socionics/question_bank.py) и ответы байтами. Диалоги, в которых пользователь
+молчит дольше таймаута, завершает ConversationHandler (conversation_timeout), а
+user_data пользователей, неактивных дольше USER_DATA_IDLE_TTL, периодически
+удаляется целиком, поэтому память растёт с числом активных пользователей, а не со
+всеми, кто когда-либо начинал диалог. Размер user_data измеряется при каждом
+проходе и попадает в метрики и /stats.
+"""
+
+import logging
+import sys
+import time
+from array import array
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config.settings import USER_DATA_IDLE_TTL
+from monitoring.metrics import USER_DATA_ENTRIES, USER_DATA_BYTES, USER_DATA_EVICTED
+
+# Ключ user_data со временем последнего обновления пользователя (time.monotonic())
+LAST_ACTIVE_KEY = 'last_active'
+
+
+class OprosnikState:
+    """
+    Состояние опросника: номера вопросов в банке и ответы 1–5 (0 — ответа ещё нет).
+
+    Args:
+        question_ids (list): Номера вопросов в банке вопросов.
+        adaptive (bool, optional): Вопросы выбираются по ходу опросника (socionics/adaptive.py),
+            а не заранее. Defaults to False.
+    """
+
+    __slots__ = ('question_ids', 'answers', 'current', 'adaptive')
+
+    def __init__(self, question_ids, adaptive=False):
+        self.question_ids = array('i', question_ids)
+        self.answers = bytearray(len(self.question_ids))
+        # Сколько вопросов уже задано
+        self.current = 0
+        self.adaptive = adaptive
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def add_question(self, question_id):
+        """Добавляет вопрос, выбранный адаптивным опросником."""
+        self.question_ids.append(question_id)
+        self.answers.append(0)
+
+    def answered(self, question_bank):
+        """
+        Пары (утверждение, ответ) для отвеченных вопросов, которые ещё есть в банке.
+
+        Args:
+            question_bank (QuestionBank): Банк вопросов.
+
+        Returns:
+            list: Пары (str, int).
+        """
+        pairs = []
+        for question_id, answer in zip(self.question_ids, self.answers):
+            text = question_bank.text(question_id)
+            if answer and text is not None:
+                pairs.append((text, answer))
+        return pairs
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Приблизительный размер объекта вместе со всем, на что он ссылается.
+
+    Args:
+        obj: Объект.
+        seen (set, optional): id уже учтённых объектов. Defaults to None.
+
+    Returns:
+        int: Размер в байтах.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def measure_user_data(user_data):
+    """
+    Число записей user_data и их общий размер.
+
+    Args:
+        user_data (Mapping): application.user_data.
+
+    Returns:
+        tuple: (записей, байт).
+    """
+    seen = set()
+    return len(user_data), sum(deep_sizeof(data, seen) for data in user_data.values())
+
+
+# Обработчик группы -1: время активности пользователя, у которого уже есть user_data
+async def touch_user_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    # Проверка через application.user_data не создаёт пустую запись для новых пользователей
+    if user is not None and user.id in context.application.user_data:
+        context.application.user_data[user.id][LAST_ACTIVE_KEY] = time.monotonic()
+
+
+# Периодическая задача JobQueue: удаляет user_data неактивных пользователей и измеряет остальные
+async def sweep_user_data(context: ContextTypes.DEFAULT_TYPE):
+    application = context.application
+    user_work = application.bot_data.get('user_work')
+    now = time.monotonic()
+    evicted = 0
+    for user_id, data in list(application.user_data.items()):
+        if user_work is not None and user_work.pending(user_id):
+            continue
+        if not any(key != LAST_ACTIVE_KEY for key in data):
+            # Состояния диалогов нет — запись не нужна
+            application.drop_user_data(user_id)
+            continue
+        # Запись без отметки появилась в текущем обновлении: срок отсчитывается с этого прохода
+        last_active = data.setdefault(LAST_ACTIVE_KEY, now)
+        if USER_DATA_IDLE_TTL > 0 and now - last_active > USER_DATA_IDLE_TTL:
+            application.drop_user_data(user_id)
+            evicted += 1
+
+    entries, size = measure_user_data(application.user_data)
+    USER_DATA_ENTRIES.set(entries)
+    USER_DATA_BYTES.set(size)
+    if evicted:
+        USER_DATA_EVICTED.inc(evicted)
+        logging.info(f"Удалены данные {evicted} неактивных пользователей; осталось {entries} записей, "
+                     f"{size / 1024:.1f} КБ.")
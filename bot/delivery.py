@@ -0,0 +1,358 @@
+# bot/delivery.py
+"""
+Доставка исходящих сообщений с учётом лимитов Telegram.
+
+FloodLimiter подключается через ApplicationBuilder().rate_limiter() и получает все
+запросы Bot API, кроме getUpdates. Запросы в чат (с chat_id) встают в очередь
+своего чата, а один диспетчер выдаёт им токены из двух вёдер: общего (около 30
+сообщений в секунду на бота) и ведра чата (личный чат — около сообщения в секунду с
+небольшим запасом, группа — 20 в минуту). Из готовых к отправке чатов первым
+уходит запрос с наивысшим приоритетом, поэтому ответы пользователям обгоняют
+массовые рассылки (rate_limit_args=BULK). Сообщения одного чата уходят по порядку.
+Несколько ждущих sendMessage с одинаковыми параметрами, отправленных с
+rate_limit_args=COALESCE, склеиваются в одно сообщение; остальные ответы всегда
+соответствуют своим сообщениям один к одному, и их можно редактировать. На
+RetryAfter чат ставится на паузу с небольшой случайной добавкой, и запрос
+повторяется до max_retries раз.
+
+Запросы без чата (answerCallbackQuery, getFile и т. п.) лимитами не задерживаются.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from datetime import timedelta
+
+from telegram.error import NetworkError, RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from monitoring.metrics import (
+    DELIVERY_SECONDS,
+    DELIVERY_RETRIES,
+    DELIVERY_COALESCED,
+    DELIVERY_PENDING,
+    record_stage
+)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# rate_limit_args для массовых сообщений (дайджесты): уступают ответам пользователям
+BULK = {'priority': PRIORITY_BULK}
+# rate_limit_args для уведомлений, которые не редактируются и не удаляются: их можно склеивать с соседними.
+# Все склеенные отправители получают один и тот же Message
+COALESCE = {'coalesce': True}
+
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = '\n\n'
+# Сколько вёдер чатов хранится, прежде чем полные (простаивающие) удаляются
+MAX_IDLE_BUCKETS = 4096
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """Через сколько секунд в ведре будет целый токен."""
+        self._refill(now)
+        return max(self.updated - now, (1.0 - self.tokens) / self.rate, 0.0)
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def pause(self, until):
+        """Запрещает отправку до момента until; сразу после паузы доступен один токен."""
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, until)
+
+    def idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Request:
+    __slots__ = ('callback', 'args', 'kwargs', 'endpoint', 'data', 'priority', 'coalesce', 'future', 'context',
+                 'enqueued', 'attempts', 'seq')
+
+    def __init__(self, callback, args, kwargs, endpoint, data, priority, coalesce, seq):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.data = data
+        self.priority = priority
+        self.coalesce = coalesce
+        self.future = asyncio.get_running_loop().create_future()
+        # Контекст обработчика: время ожидания и отправки попадает в его стадии
+        self.context = contextvars.copy_context()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        self.seq = seq
+
+    def mergeable(self, other):
+        """Можно ли дописать текст other к этому sendMessage."""
+        if not (self.coalesce and other.coalesce and self.endpoint == other.endpoint == 'sendMessage'):
+            return False
+        if self.data.get('entities') or other.data.get('entities'):
+            return False
+        return ({key: value for key, value in self.data.items() if key != 'text'}
+                == {key: value for key, value in other.data.items() if key != 'text'})
+
+
+def retry_after_seconds(error):
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class FloodLimiter(BaseRateLimiter):
+    """
+    Очередь исходящих запросов с вёдрами токенов, приоритетами и склейкой сообщений.
+
+    rate_limit_args запроса — словарь с ключами 'priority' (меньше — раньше, по умолчанию
+    PRIORITY_INTERACTIVE) и 'coalesce' (True разрешает склейку, по умолчанию False).
+
+    Args:
+        global_rate (float, optional): Запросов в чаты в секунду на бота. Defaults to 30.
+        chat_rate (float, optional): Сообщений в секунду в личный чат. Defaults to 1.
+        chat_burst (int, optional): Запас ведра чата (сколько сообщений подряд уходит сразу). Defaults to 3.
+        group_rate (float, optional): Сообщений в секунду в группу. Defaults to 20 / 60.
+        max_retries (int, optional): Повторов после RetryAfter. Defaults to 3.
+    """
+
+    def __init__(self, global_rate=30.0, chat_rate=1.0, chat_burst=3, group_rate=20 / 60, max_retries=3):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._queues = {}
+        self._buckets = {}
+        # Чаты с запросом в полёте: следующий запрос чата ждёт ответа на предыдущий
+        self._busy = set()
+        self._seq = itertools.count()
+        self._tasks = set()
+        self._global = None
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def initialize(self):
+        self._global = TokenBucket(self.global_rate, self.global_rate, time.monotonic())
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for queue in self._queues.values():
+            for request in queue:
+                self._fail(request, NetworkError("Бот останавливается, сообщение не отправлено."))
+        self._queues.clear()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        options = rate_limit_args or {}
+        chat_id = data.get('chat_id')
+        if chat_id is None or self._dispatcher is None:
+            return await self._call_with_retries(callback, args, kwargs, endpoint)
+
+        request = _Request(callback, args, kwargs, endpoint, data, options.get('priority', PRIORITY_INTERACTIVE),
+                           options.get('coalesce', False), next(self._seq))
+        self._queues.setdefault(chat_id, deque()).append(request)
+        DELIVERY_PENDING.inc()
+        self._wakeup.set()
+        # Если обработчик отменён (/cancel), будущее отменяется и диспетчер пропускает запрос
+        return await request.future
+
+    async def _call_with_retries(self, callback, args, kwargs, endpoint):
+        attempt = 0
+        while True:
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                DELIVERY_RETRIES.inc(endpoint=endpoint)
+                delay = self._backoff(retry_after_seconds(e), attempt)
+                logging.warning(f"Telegram попросил подождать {delay:.1f} с перед {endpoint} (попытка {attempt}).")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(retry_after, attempt):
+        # Случайная добавка растёт с попыткой, чтобы повторы разных запросов не совпадали
+        return retry_after + random.uniform(0, min(2 ** (attempt - 1), 30))
+
+    def _bucket(self, chat_id, now):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_IDLE_BUCKETS:
+                for key in [key for key, value in self._buckets.items()
+                            if key not in self._queues and key not in self._busy and value.idle(now)]:
+                    del self._buckets[key]
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self._buckets[chat_id] = TokenBucket(self.group_rate if group else self.chat_rate,
+                                                          self.chat_burst, now)
+        return bucket
+
+    def _fail(self, request, error):
+        if not request.future.done():
+            request.future.set_exception(error)
+        DELIVERY_PENDING.dec()
+
+    def _select(self, now):
+        """
+        Выбирает чат, чей первый запрос уходит следующим.
+
+        Returns:
+            tuple: (chat_id или None, через сколько секунд освободится ближайший чат или None).
+        """
+        best = None
+        best_key = None
+        wait = None
+        for chat_id in list(self._queues):
+            if chat_id in self._busy:
+                continue
+            queue = self._queues[chat_id]
+            while queue and queue[0].future.done():
+                queue.popleft()
+                DELIVERY_PENDING.dec()
+            if not queue:
+                del self._queues[chat_id]
+                continue
+            chat_wait = self._bucket(chat_id, now).wait_time(now)
+            if chat_wait > 0:
+                wait = chat_wait if wait is None else min(wait, chat_wait)
+                continue
+            key = (queue[0].priority, queue[0].seq)
+            if best_key is None or key < best_key:
+                best, best_key = chat_id, key
+        return best, wait
+
+    def _take_batch(self, chat_id):
+        queue = self._queues[chat_id]
+        batch = [queue.popleft()]
+        length = len(batch[0].data.get('text', ''))
+        while queue:
+            following = queue[0]
+            if following.future.done():
+                queue.popleft()
+                DELIVERY_PENDING.dec()
+                continue
+            extra = len(COALESCE_SEPARATOR) + len(following.data.get('text', ''))
+            if not batch[0].mergeable(following) or length + extra > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(queue.popleft())
+            length += extra
+        if not queue:
+            del self._queues[chat_id]
+        return batch
+
+    async def _wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch(self):
+        while True:
+            try:
+                await self._dispatch_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Ошибка диспетчера не должна навсегда оставить запросы без ответа
+                logging.exception("Ошибка диспетчера исходящих сообщений.")
+                await asyncio.sleep(1.0)
+
+    async def _dispatch_next(self):
+        self._wakeup.clear()
+        now = time.monotonic()
+        chat_id, wait = self._select(now)
+        if chat_id is None:
+            await self._wait(wait)
+            return
+        global_wait = self._global.wait_time(now)
+        if global_wait > 0:
+            # За время ожидания может прийти запрос с большим приоритетом — выбор повторяется
+            await self._wait(global_wait)
+            return
+        self._global.take(now)
+        self._bucket(chat_id, now).take(now)
+        batch = self._take_batch(chat_id)
+        self._busy.add(chat_id)
+        # Отправка идёт в контексте обработчика первого запроса
+        task = batch[0].context.run(asyncio.ensure_future, self._send(chat_id, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, chat_id, batch):
+        head = batch[0]
+        started = time.monotonic()
+        for request in batch:
+            request.context.run(record_stage, 'send_wait', started - request.enqueued)
+        if len(batch) == 1:
+            args = head.args
+        else:
+            args = (head.endpoint, dict(head.data, text=COALESCE_SEPARATOR.join(r.data['text'] for r in batch)))
+        try:
+            result = await head.callback(*args, **head.kwargs)
+        except RetryAfter as e:
+            DELIVERY_RETRIES.inc(endpoint=head.endpoint)
+            attempts = max(request.attempts for request in batch) + 1
+            delay = self._backoff(retry_after_seconds(e), attempts)
+            self._bucket(chat_id, time.monotonic()).pause(time.monotonic() + delay)
+            logging.warning(f"Telegram попросил подождать {delay:.1f} с перед {head.endpoint} в чат {chat_id} "
+                            f"(попытка {attempts}).")
+            retry = [request for request in batch if not request.future.done()]
+            for request in batch:
+                if request.future.done():
+                    DELIVERY_PENDING.dec()
+            if attempts > self.max_retries:
+                for request in retry:
+                    self._fail(request, e)
+            else:
+                for request in retry:
+                    request.attempts = attempts
+                # Повтор встаёт в начало очереди чата, порядок сообщений сохраняется
+                self._queues.setdefault(chat_id, deque()).extendleft(reversed(retry))
+        except Exception as e:
+            for request in batch:
+                self._fail(request, e)
+        else:
+            finished = time.monotonic()
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(result)
+                DELIVERY_PENDING.dec()
+                DELIVERY_SECONDS.observe(finished - request.enqueued,
+                                         priority='bulk' if request.priority >= PRIORITY_BULK else 'interactive')
+            if len(batch) > 1:
+                DELIVERY_COALESCED.inc(len(batch) - 1)
+        finally:
+            self._busy.discard(chat_id)
+            self._wakeup.set()
@@ -5,6 +5,7 @@ import os
 import json
 import random
 from telegram import Update, ReplyKeyboardMarkup
+from telegram.error import RetryAfter
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -15,7 +16,13 @@ from telegram.ext import (
 )
 from bot.states import BotStates
 from bot.utils import main_menu_keyboard, confirmation_keyboard, inline_buttons
-from neural_network.inference import predict_correlations
+from bot.conversation_state import OprosnikState
+from bot.delivery import COALESCE
+from bot.prediction import (
+    predict_statements_correlations,
+    predict_statement_uncertainty,
+    predict_description_uncertainty
+)
 from socionics.calculations import (
     calculate_traits,
     predict_socionics_types,
@@ -24,9 +31,13 @@ from socionics.calculations import (
     modify_coefficients_based_on_answer
 )
 from socionics.utils import parse_corrected_correlations
+from monitoring.metrics import observe_stage, OPROSNIK_QUESTIONS
 from socionics.data_processing import save_feedback
+from socionics.adaptive import AdaptiveQuestionnaire
 from config.settings import SOCIONICS_TYPES, TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE, FEEDBACK_DATA_FILE, \
-    DEVELOPER_CHAT_ID
+    DEVELOPER_CHAT_ID, SOCIONICS_TYPES_FILE
+from config.settings import OPROSNIK_ADAPTIVE, OPROSNIK_MAX_QUESTIONS, OPROSNIK_MIN_QUESTIONS, OPROSNIK_CONFIDENCE, \
+    OPROSNIK_ANSWER_SHARPNESS
 
 
 # Обработчик команды /start
@@ -58,7 +69,7 @@ import numpy as np
 
 
 # Предполагается, что следующие функции и переменные определены где-то в вашем коде:
-# - predict_correlations
+# - predict_statement_correlations
 # - calculate_traits
 # - predict_socionics_types
 # - get_agree_disagree_types
@@ -82,18 +93,13 @@ async def handle_general_text(update: Update, context: ContextTypes.DEFAULT_TYPE
         logging.warning(f"Пользователь {username} (ID: {user_id}) отправил пустое сообщение.")
         return
 
-    logging.info(f"Пользователь {username} (ID: {user_id}) отправил утверждение для анализа: {text}")
-
-    # Предсказание корреляций
-    correlations = predict_correlations(
-        statement=text,
-        embedding_model=context.bot_data['embedding_model'],
-        model=context.bot_data['model'],
-        scaler=context.bot_data['scaler'],
-        talanov_data_file=TALANOV_STATEMENTS_FILE,
-        user_data_file=FEEDBACK_DATA_FILE,
-        user_statements_file=USER_STATEMENTS_FILE
-    )
+    # Полный текст пользователя пишется только на уровне DEBUG
+    logging.info(f"Пользователь {username} (ID: {user_id}) отправил утверждение для анализа ({len(text)} символов).",
+                 extra={'sample': True})
+    logging.debug(f"Утверждение пользователя {user_id}: {text}")
+
+    # Предсказание корреляций (с оценкой неопределённости, если она включена)
+    correlations, uncertainty = await predict_statement_uncertainty(context, text)
 
     if not correlations:
         await update.message.reply_text(
@@ -103,14 +109,17 @@ async def handle_general_text(update: Update, context: ContextTypes.DEFAULT_TYPE
         logging.error(f"Не удалось получить корреляции для утверждения от пользователя {username} (ID: {user_id}).")
         return
 
-    # Вычисляем признаки на основе корреляций
-    traits = calculate_traits(correlations)
+    update_user_profile(context, user_id, correlations)
 
-    # Нейротипирование
-    probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+    with observe_stage('scoring'):
+        # Вычисляем признаки на основе корреляций
+        traits = calculate_traits(correlations)
 
-    # Определение типов, которые согласились и не согласились бы
-    agree_disagree = get_agree_disagree_types(probabilities)
+        # Нейротипирование
+        probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+
+        # Определение типов, которые согласились и не согласились бы
+        agree_disagree = get_agree_disagree_types(probabilities)
 
     # Определение самых сильных корреляций (по модулю)
     # Сортируем корреляции по абсолютному значению в порядке убывания
@@ -123,9 +132,12 @@ async def handle_general_text(update: Update, context: ContextTypes.DEFAULT_TYPE
     reply_text = "📊 *Результаты анализа утверждения*:\n\n"
 
     # 1. Вывод всех корреляций
-    reply_text += "*Корреляции:*\n"
+    reply_text += "*Корреляции:*\n" if not uncertainty else "*Корреляции* (± разброс):\n"
     for func, value in correlations.items():
-        reply_text += f"{func}: {value:.4f}\n"
+        if uncertainty:
+            reply_text += f"{func}: {value:.4f} ± {uncertainty['std'][func]:.4f}\n"
+        else:
+            reply_text += f"{func}: {value:.4f}\n"
 
     reply_text += "\n*Характеристики:*\n"
     for trait, value in traits.items():
@@ -142,6 +154,7 @@ async def handle_general_text(update: Update, context: ContextTypes.DEFAULT_TYPE
     reply_text += "\n📈 *Вероятности соционических типов*:\n"
     for type_name, prob in probabilities.items():
         reply_text += f"{type_name}: {prob:.2f}%\n"
+    reply_text += format_type_confidence(probabilities, uncertainty)
 
     # 4. Вывод согласных и несогласных типов
     reply_text += f"\n👍 *Положительные типы*: {', '.join(agree_disagree['agree'])}\n"
@@ -167,6 +180,8 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🔹 /add - Добавить новое утверждение в базу данных.\n"
         "🔹 /oprosnik - Пройти опросник для определения социотипа.\n"
         "🔹 /neurotype - Провести нейротипирование по вашему описанию.\n"
+        "🔹 /profile - Сводный профиль по всем вашим проанализированным утверждениям.\n"
+        "🔹 /chat - Определить типы участников по экспорту чата Telegram Desktop.\n"
         "🔹 /update_model - Обновить модель на основе новой обратной связи.\n"
         "🔹 /info - Показать информацию о боте и доступных командах.\n"
         "🔹 /cancel - Отменить текущий процесс."
@@ -181,9 +196,32 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = user.id
     username = user.username if user.username else user.first_name
 
+    # Ждущие и выполняющиеся обновления пользователя отменяются вместе с их запросами инференса
+    user_work = context.bot_data.get('user_work')
+    if user_work is not None:
+        user_work.cancel(user_id, 'cancel')
     context.user_data.clear()
     await update.message.reply_text("❌ Действие отменено. Вы можете начать сначала.", reply_markup=main_menu_keyboard())
     logging.info(f"Пользователь {username} (ID: {user_id}) отменил текущий процесс.")
+    return ConversationHandler.END
+
+
+# Обработчик таймаута диалога (CONVERSATION_TIMEOUT)
+async def conversation_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user is None:
+        return
+    user_work = context.bot_data.get('user_work')
+    if user_work is not None:
+        user_work.cancel(user.id, 'timeout')
+    context.user_data.clear()
+    if update.effective_chat is not None:
+        await context.bot.send_message(
+            update.effective_chat.id,
+            "⌛️ Время ожидания истекло, действие отменено. Вы можете начать сначала.",
+            reply_markup=main_menu_keyboard()
+        )
+    logging.info(f"Диалог пользователя ID {user.id} завершён по таймауту.")
 
 
 # Обработчик начала добавления утверждения (/add)
@@ -227,7 +265,8 @@ async def add_statement_receive(update: Update, context: ContextTypes.DEFAULT_TY
         parse_mode='Markdown',
         reply_markup=ReplyKeyboardMarkup([['/cancel']], resize_keyboard=True, one_time_keyboard=True)
     )
-    logging.info(f"Пользователь {username} (ID: {user_id}) ввёл утверждение: {statement}")
+    logging.info(f"Пользователь {username} (ID: {user_id}) ввёл утверждение ({len(statement)} символов).")
+    logging.debug(f"Утверждение пользователя {user_id}: {statement}")
     return BotStates.WAITING_FOR_CORRELATIONS_INPUT
 
 
@@ -247,17 +286,21 @@ async def add_correlations_receive(update: Update, context: ContextTypes.DEFAULT
             logging.error(f"Пользователь {username} (ID: {user_id}) не предоставил утверждение после корреляций.")
             return ConversationHandler.END
 
-        # Сохраняем обратную связь как отрицательную (пользователь предлагает коррекции)
+        # Сохраняем обратную связь как отрицательную (пользователь предлагает коррекции).
+        # С очередью проверки утверждение попадает в USER_STATEMENTS_FILE только после одобрения разработчиком
+        review_queue = context.bot_data.get('review_queue')
         save_feedback(
             user_id=user_id,
             username=username,
             statement=statement,
             corrected_correlations=corrected_correlations,
-            positive_feedback=False
+            positive_feedback=False,
+            user_statements_file=USER_STATEMENTS_FILE,
+            store_statement=review_queue is None
         )
-
-        # Отправляем корреляции разработчику (опционально)
-        # await send_correlations_to_developer(context.bot, user_id, username, statement, corrected_correlations)
+        if review_queue is not None:
+            review_queue.add(user_id, username, statement, corrected_correlations)
+        context.user_data.pop('new_statement', None)
 
         await update.message.reply_text(
             "✅ Спасибо! Ваше утверждение и корреляции сохранены и будут рассмотрены разработчиком.",
@@ -288,43 +331,21 @@ async def oprosnik_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = user.id
     username = user.username if user.username else user.first_name
 
-    # Загрузка утверждений
-    talanov_data_file = TALANOV_STATEMENTS_FILE
-    user_statements_file = USER_STATEMENTS_FILE
-
-    talanov_statements = []
-    if os.path.exists(talanov_data_file):
-        with open(talanov_data_file, 'r', encoding='utf-8') as f:
-            talanov_data = json.load(f)
-            talanov_statements.extend([entry['statement'] for entry in talanov_data])
-
-    user_statements = []
-    if os.path.exists(user_statements_file):
-        with open(user_statements_file, 'r', encoding='utf-8') as f:
-            user_data = json.load(f)
-            user_statements.extend([entry['statement'] for entry in user_data])
-
-    all_statements = talanov_statements + user_statements
-    total_statements = len(all_statements)
-
-    if total_statements == 0:
+    # Банк вопросов загружается при старте бота и перечитывается только при изменении файлов
+    question_bank = context.bot_data['question_bank']
+    if len(question_bank) == 0:
         await update.message.reply_text("Извините, нет доступных вопросов для опросника.")
         logging.warning(f"Пользователь {username} (ID: {user_id}) попытался пройти опросник без доступных вопросов.")
         return ConversationHandler.END
 
     num_questions = 10  # Можно сделать настраиваемым через config/settings.py
-    if num_questions > total_statements:
-        num_questions = total_statements
-
-    # Выбираем случайные утверждения
-    random_statements = random.sample(all_statements, num_questions)
 
-    # Сохраняем состояние пользователя
-    context.user_data['oprosnik'] = {
-        'statements': random_statements,
-        'answers': [],
-        'current_question': 0
-    }
+    # В user_data хранятся только номера утверждений в банке и ответы. Адаптивный опросник выбирает
+    # вопросы по ходу, иначе выбираем случайные утверждения сразу
+    if get_adaptive_questionnaire(context) is not None:
+        context.user_data['oprosnik'] = OprosnikState([], adaptive=True)
+    else:
+        context.user_data['oprosnik'] = OprosnikState(question_bank.sample_ids(num_questions))
 
     await update.message.reply_text(
         "📋 *Начинаем опросник.*\nПожалуйста, отвечайте цифрой от 1 до 5, где:\n"
@@ -344,32 +365,43 @@ async def oprosnik_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Функция для отправки следующего вопроса в опроснике
 async def send_next_oprosnik_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
     oprosnik_data = context.user_data.get('oprosnik')
-    if not oprosnik_data:
+    if oprosnik_data is None:
         await update.message.reply_text("❗️ Произошла ошибка. Пожалуйста, начните опросник заново.")
         logging.error("Данные опросника отсутствуют в user_data.")
         return ConversationHandler.END
 
-    current_question = oprosnik_data['current_question']
-    statements = oprosnik_data['statements']
-
-    if current_question < len(statements):
-        question = statements[current_question]
-        await update.message.reply_text(
-            f"❓ *Вопрос {current_question + 1} из {len(statements)}*:\n\n{question}",
-            parse_mode='Markdown'
-        )
-        oprosnik_data['current_question'] += 1
+    question_bank = context.bot_data['question_bank']
+    if oprosnik_data.adaptive and oprosnik_data.current == len(oprosnik_data):
+        # Следующий вопрос — самый информативный при текущих ответах; None — опросник закончен
+        questionnaire = get_adaptive_questionnaire(context)
+        question_id = questionnaire.next_question(
+            oprosnik_data.question_ids, oprosnik_data.answers, OPROSNIK_MAX_QUESTIONS, OPROSNIK_MIN_QUESTIONS,
+            OPROSNIK_CONFIDENCE
+        ) if questionnaire is not None else None
+        if question_id is not None:
+            oprosnik_data.add_question(question_id)
+    # Утверждения, удалённые из банка после начала опросника, пропускаются
+    while oprosnik_data.current < len(oprosnik_data):
+        question = question_bank.text(oprosnik_data.question_ids[oprosnik_data.current])
+        oprosnik_data.current += 1
+        if question is None:
+            continue
+        if oprosnik_data.adaptive:
+            header = f"❓ *Вопрос {oprosnik_data.current}* (не больше {OPROSNIK_MAX_QUESTIONS})"
+        else:
+            header = f"❓ *Вопрос {oprosnik_data.current} из {len(oprosnik_data)}*"
+        await update.message.reply_text(f"{header}:\n\n{question}", parse_mode='Markdown')
         return BotStates.OPROSNIK_PROCESSING
-    else:
-        # Опросник завершен
-        await process_oprosnik_results(update, context)
-        return ConversationHandler.END
+
+    # Опросник завершен
+    await process_oprosnik_results(update, context)
+    return ConversationHandler.END
 
 
 # Обработчик ответа на вопрос опросника
 async def handle_oprosnik_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     oprosnik_data = context.user_data.get('oprosnik')
-    if not oprosnik_data:
+    if oprosnik_data is None:
         await update.message.reply_text("❗️ Произошла ошибка. Пожалуйста, начните опросник заново.")
         logging.error("Данные опросника отсутствуют в user_data.")
         return ConversationHandler.END
@@ -380,42 +412,41 @@ async def handle_oprosnik_answer(update: Update, context: ContextTypes.DEFAULT_T
         logging.warning(f"Пользователь {update.effective_user.username} ввёл некорректный ответ: {answer}")
         return BotStates.OPROSNIK_PROCESSING
 
-    oprosnik_data['answers'].append(int(answer))
-    logging.info(f"Пользователь {update.effective_user.username} ответил: {answer}")
+    oprosnik_data.answers[oprosnik_data.current - 1] = int(answer)
+    logging.info(f"Пользователь {update.effective_user.username} ответил: {answer}", extra={'sample': True})
     return await send_next_oprosnik_question(update, context)
 
 
 # Обработка результатов опросника
 async def process_oprosnik_results(update: Update, context: ContextTypes.DEFAULT_TYPE):
     oprosnik_data = context.user_data.get('oprosnik')
-    if not oprosnik_data:
+    if oprosnik_data is None:
         await update.message.reply_text("❗️ Произошла ошибка при обработке результатов опросника.")
         logging.error("Данные опросника отсутствуют при обработке результатов.")
         return
 
-    statements = oprosnik_data['statements']
-    answers = oprosnik_data['answers']
-
-    if len(statements) != len(answers):
-        await update.message.reply_text("❗️ Количество ответов не совпадает с количеством вопросов.")
-        logging.error("Количество ответов не совпадает с количеством вопросов.")
+    # Опросник завершён, состояние больше не нужно
+    context.user_data.pop('oprosnik', None)
+    answered = oprosnik_data.answered(context.bot_data['question_bank'])
+    if not answered:
+        await update.message.reply_text("❗️ Нет ответов для обработки. Пожалуйста, пройдите опросник заново.",
+                                        reply_markup=main_menu_keyboard())
+        logging.error("Нет ответов на вопросы, оставшиеся в банке вопросов.")
+        return
+    OPROSNIK_QUESTIONS.observe(len(answered), mode='adaptive' if oprosnik_data.adaptive else 'random')
+    if oprosnik_data.adaptive:
+        await process_adaptive_oprosnik_results(update, context, oprosnik_data)
         return
+    statements = [statement for statement, _ in answered]
+    answers = [answer for _, answer in answered]
 
     # Инициализируем словарь для накопления коэффициентов функций
     accumulated_correlations = {func: 0.0 for func in FUNCTIONS}
 
-    for statement, answer in zip(statements, answers):
-        # Получаем исходные корреляции для утверждения
-        correlations = predict_correlations(
-            statement=statement,
-            embedding_model=context.bot_data['embedding_model'],
-            model=context.bot_data['model'],
-            scaler=context.bot_data['scaler'],
-            talanov_data_file=TALANOV_STATEMENTS_FILE,
-            user_data_file=FEEDBACK_DATA_FILE,
-            user_statements_file=USER_STATEMENTS_FILE
-        )
+    # Получаем исходные корреляции для всех утверждений одним батчем
+    all_correlations = await predict_statements_correlations(context, statements)
 
+    for statement, answer, correlations in zip(statements, answers, all_correlations):
         if not correlations:
             logging.warning(f"Не удалось получить корреляции для утверждения: {statement}")
             continue
@@ -436,14 +467,15 @@ async def process_oprosnik_results(update: Update, context: ContextTypes.DEFAULT
     for func in accumulated_correlations:
         accumulated_correlations[func] /= num_questions
 
-    # Вычисляем признаки на основе накопленных коэффициентов
-    traits = calculate_traits(accumulated_correlations)
+    with observe_stage('scoring'):
+        # Вычисляем признаки на основе накопленных коэффициентов
+        traits = calculate_traits(accumulated_correlations)
 
-    # Нейротипирование
-    probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+        # Нейротипирование
+        probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
 
-    # Определение типов, которые согласились и не согласились бы
-    agree_disagree = get_agree_disagree_types(probabilities)
+        # Определение типов, которые согласились и не согласились бы
+        agree_disagree = get_agree_disagree_types(probabilities)
 
     # Формирование ответа
     reply_text = "📊 *Результаты опросника*:\n\n"
@@ -463,6 +495,65 @@ async def process_oprosnik_results(update: Update, context: ContextTypes.DEFAULT
     logging.info(f"Пользователь {update.effective_user.username} завершил опросник и получил результаты.")
 
 
+def get_adaptive_questionnaire(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Адаптивный опросник по текущей матрице банка вопросов.
+
+    Пересоздаётся, только когда банк перечитал файлы.
+
+    Returns:
+        AdaptiveQuestionnaire or None: None — случайные вопросы: адаптивный режим выключен,
+            в матрице меньше OPROSNIK_MIN_QUESTIONS утверждений или корреляции с типами
+            выведены не для всех утверждений (например, нет socionic_types.json).
+    """
+    if not OPROSNIK_ADAPTIVE:
+        return None
+    question_bank = context.bot_data['question_bank']
+    type_names, question_ids, type_correlations = question_bank.type_correlations(SOCIONICS_TYPES)
+    cached = context.bot_data.get('adaptive_questionnaire')
+    if cached is not None and cached[0] is question_ids:
+        return cached[1]
+
+    questionnaire = None
+    untyped = question_bank.untyped_count(SOCIONICS_TYPES)
+    if len(question_ids) < max(OPROSNIK_MIN_QUESTIONS, 1) or untyped:
+        logging.warning(f"Адаптивный опросник недоступен: корреляции с типами есть у {len(question_ids)} "
+                        f"утверждений, не выведены для {untyped} (нужен {SOCIONICS_TYPES_FILE}). "
+                        f"Используются случайные вопросы.")
+    else:
+        questionnaire = AdaptiveQuestionnaire(type_names, question_ids, type_correlations, OPROSNIK_ANSWER_SHARPNESS)
+    context.bot_data['adaptive_questionnaire'] = (question_ids, questionnaire)
+    return questionnaire
+
+
+# Результаты адаптивного опросника: апостериорные вероятности типов, модель не нужна
+async def process_adaptive_oprosnik_results(update: Update, context: ContextTypes.DEFAULT_TYPE, oprosnik_data):
+    questionnaire = get_adaptive_questionnaire(context)
+    if questionnaire is None:
+        await update.message.reply_text("❗️ Произошла ошибка при обработке результатов опросника.",
+                                        reply_markup=main_menu_keyboard())
+        logging.error("Адаптивный опросник недоступен при обработке результатов.")
+        return
+
+    with observe_stage('scoring'):
+        probabilities = questionnaire.probabilities(oprosnik_data.question_ids, oprosnik_data.answers)
+        agree_disagree = get_agree_disagree_types(probabilities)
+
+    best_type = max(probabilities, key=probabilities.get)
+    reply_text = "📊 *Результаты опросника*:\n\n"
+    for type_name, prob in sorted(probabilities.items(), key=lambda item: item[1], reverse=True):
+        reply_text += f"{type_name}: {prob:.2f}%\n"
+
+    reply_text += f"\n🎯 *Самый вероятный тип*: {best_type} ({probabilities[best_type]:.0f}%), " \
+                  f"вопросов: {oprosnik_data.current}\n"
+    reply_text += f"👍 *Положительные типы*: {', '.join(agree_disagree['agree'])}\n"
+    reply_text += f"👎 *Отрицательные типы*: {', '.join(agree_disagree['disagree'])}\n"
+
+    await update.message.reply_text(reply_text, parse_mode='Markdown', reply_markup=main_menu_keyboard())
+    logging.info(f"Пользователь {update.effective_user.username} завершил адаптивный опросник за "
+                 f"{oprosnik_data.current} вопросов: {best_type} ({probabilities[best_type]:.0f}%).")
+
+
 # Обработчик команды /neurotype
 async def neurotype_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -512,16 +603,8 @@ async def process_neurotype_description(update: Update, context: ContextTypes.DE
     user_id = user.id
     username = user.username if user.username else user.first_name
 
-    # Предсказание корреляций
-    correlations = predict_correlations(
-        statement=description,
-        embedding_model=context.bot_data['embedding_model'],
-        model=context.bot_data['model'],
-        scaler=context.bot_data['scaler'],
-        talanov_data_file=TALANOV_STATEMENTS_FILE,
-        user_data_file=FEEDBACK_DATA_FILE,
-        user_statements_file=USER_STATEMENTS_FILE
-    )
+    # Предсказание корреляций (с оценкой неопределённости, если она включена)
+    correlations, uncertainty = await predict_description_uncertainty(context, description)
 
     if not correlations:
         await update.message.reply_text(
@@ -531,19 +614,23 @@ async def process_neurotype_description(update: Update, context: ContextTypes.DE
         logging.error(f"Не удалось получить корреляции для описания от пользователя {username} (ID: {user_id}).")
         return
 
-    # Вычисляем признаки на основе корреляций
-    traits = calculate_traits(correlations)
+    update_user_profile(context, user_id, correlations)
 
-    # Нейротипирование
-    probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+    with observe_stage('scoring'):
+        # Вычисляем признаки на основе корреляций
+        traits = calculate_traits(correlations)
 
-    # Определение типов, которые согласились и не согласились бы
-    agree_disagree = get_agree_disagree_types(probabilities)
+        # Нейротипирование
+        probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+
+        # Определение типов, которые согласились и не согласились бы
+        agree_disagree = get_agree_disagree_types(probabilities)
 
     # Формирование ответа
     reply_text = "📊 *Результаты нейротипирования*:\n\n"
     for type_name, prob in probabilities.items():
         reply_text += f"{type_name}: {prob:.2f}%\n"
+    reply_text += format_type_confidence(probabilities, uncertainty)
 
     reply_text += f"\n👍 *Положительные типы*: {', '.join(agree_disagree['agree'])}\n"
     reply_text += f"👎 *Отрицательные типы*: {', '.join(agree_disagree['disagree'])}\n"
@@ -556,6 +643,71 @@ async def process_neurotype_description(update: Update, context: ContextTypes.DE
     logging.info(f"Пользователь {username} (ID: {user_id}) завершил нейротипирование и получил результаты.")
 
 
+# Строка ответа об уверенности в самом вероятном типе по проходам MC-dropout
+def format_type_confidence(probabilities, uncertainty):
+    if not uncertainty or not probabilities:
+        return ""
+    top_type = next(iter(probabilities))
+    share = uncertainty['type_confidence'].get(top_type, 0.0)
+    level = "высокая" if share >= 0.8 else "средняя" if share >= 0.5 else "низкая"
+    return f"\n🎯 *Уверенность*: {level} — {top_type} самый вероятный в {share * 100:.0f}% проходов модели\n"
+
+
+# Добавление проанализированного утверждения в накопительный профиль пользователя
+def update_user_profile(context: ContextTypes.DEFAULT_TYPE, user_id, correlations):
+    profile_store = context.bot_data.get('profile_store')
+    if profile_store is not None:
+        profile_store.update(user_id, correlations)
+
+
+# Обработчик команды /profile [reset]: сводка по всем проанализированным утверждениям пользователя
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    user_id = user.id
+    username = user.username if user.username else user.first_name
+    profile_store = context.bot_data['profile_store']
+
+    if context.args and context.args[0] == 'reset':
+        profile_store.reset(user_id)
+        await update.message.reply_text("🗑 Профиль очищен.", reply_markup=main_menu_keyboard())
+        logging.info(f"Пользователь {username} (ID: {user_id}) очистил профиль.")
+        return
+
+    profile = profile_store.summary(user_id)
+    if profile is None:
+        await update.message.reply_text(
+            "📭 Профиль пока пуст. Отправьте утверждение для анализа или пройдите /neurotype.",
+            reply_markup=main_menu_keyboard()
+        )
+        return
+
+    correlations = profile['correlations']
+    with observe_stage('scoring'):
+        traits = calculate_traits(correlations)
+        probabilities = predict_socionics_types(traits, SOCIONICS_TYPES)
+        agree_disagree = get_agree_disagree_types(probabilities)
+
+    reply_text = f"🗂 *Ваш профиль* (утверждений: {profile['count']}):\n\n"
+    reply_text += "*Средние корреляции* (± разброс):\n"
+    for func, value in correlations.items():
+        reply_text += f"{func}: {value:.4f} ± {profile['spread'][func]:.4f}\n"
+
+    reply_text += "\n*Характеристики:*\n"
+    for trait, value in traits.items():
+        reply_text += f"{trait}: {value:.4f}\n"
+
+    reply_text += "\n📈 *Вероятности соционических типов*:\n"
+    for type_name, prob in list(probabilities.items())[:5]:
+        reply_text += f"{type_name}: {prob:.2f}%\n"
+
+    reply_text += f"\n👍 *Положительные типы*: {', '.join(agree_disagree['agree'])}\n"
+    reply_text += f"👎 *Отрицательные типы*: {', '.join(agree_disagree['disagree'])}\n"
+    reply_text += "\nОчистить профиль: /profile reset"
+
+    await update.message.reply_text(reply_text, parse_mode='Markdown', reply_markup=main_menu_keyboard())
+    logging.info(f"Пользователь {username} (ID: {user_id}) запросил профиль ({profile['count']} утверждений).")
+
+
 # Обработчик нажатий на инлайн-кнопки
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -577,31 +729,17 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Обработчик ошибок
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logging.error(f"Update {update} вызвал ошибку {context.error}")
+    # Чат уже упёрся в лимит Telegram: ещё одно сообщение об ошибке только продлит ограничение
+    if isinstance(context.error, RetryAfter):
+        return
     # Опционально: отправить сообщение пользователю о возникшей ошибке
     try:
         if isinstance(update, Update) and update.effective_chat:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
-                text="❗️ Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте позже."
+                text="❗️ Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте позже.",
+                # Несколько ошибок подряд приходят одним сообщением
+                rate_limit_args=COALESCE
             )
     except Exception as e:
         logging.error(f"Не удалось отправить сообщение об ошибке пользователю: {e}")
-
-# Функция для отправки корреляций разработчику
-async def send_correlations_to_developer(bot, user_id, username, statement, correlations):
-#Отправляет корреляции разработчику с информацией о пользователе.
-    message = (
-       f"🔄 *Новые корреляции от пользователя*:\n\n"
-       f"👤 Ник: @{username}\n"
-        f"🆔 Telegram ID: {user_id}\n\n"
-        f"📝 *Утверждение*:\n{statement}\n\n"
-         f"📊 *Корреляции*:\n"
-    )
-    for func, corr in correlations.items():
-         message += f"{func}: {corr:.4f}\n"
-
-    try:
-        await bot.send_message(chat_id=DEVELOPER_CHAT_ID, text=message, parse_mode='Markdown')
-        logging.info(f"Сообщение разработчику от пользователя {username} (ID: {user_id}) отправлено.")
-    except Exception as e:
-        logging.error(f"Не удалось отправить сообщение разработчику: {e}")
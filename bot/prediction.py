@@ -0,0 +1,227 @@
+# bot/prediction.py
+
+import logging
+import time
+
+import numpy as np
+from telegram.ext import ContextTypes
+from neural_network.inference import FUNCTIONS, find_known_correlations, correlations_from_array
+from monitoring.metrics import observe_stage, record_cache
+from neural_network.chunking import chunk_text, chunk_weights, length_sorted, aggregate_chunk_correlations
+from neural_network.deadlines import DeadlineExceeded, deadline_scope
+from neural_network.uncertainty import aggregate_draws, summarize_uncertainty
+from config.settings import (
+    USER_STATEMENTS_FILE,
+    FEEDBACK_DATA_FILE,
+    NEUROTYPE_CHUNK_MAX_WORDS,
+    NEUROTYPE_CHUNK_OVERLAP,
+    NEUROTYPE_MAX_CHUNKS,
+    NEUROTYPE_CHUNK_WEIGHTING,
+    INFERENCE_DEADLINE,
+    UNCERTAINTY_SAMPLES,
+    SOCIONICS_TYPES
+)
+
+
+async def predict_statements_correlations(context: ContextTypes.DEFAULT_TYPE, statements):
+    """
+    Возвращает корреляции для списка утверждений.
+
+    Сначала утверждения ищутся среди сохранённых пользовательских данных, оставшиеся
+    отправляются одним батчем предсказателю из bot_data['predictor'] (модель в процессе
+    бота или клиент сервера инференса) со сроком INFERENCE_DEADLINE.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        statements (list): Утверждения.
+
+    Returns:
+        list: Словари корреляций в порядке утверждений; None для утверждений, которые не удалось предсказать.
+    """
+    with observe_stage('lookup'):
+        results = [find_known_correlations(statement, FEEDBACK_DATA_FILE, USER_STATEMENTS_FILE)
+                   for statement in statements]
+    missing = [i for i, correlations in enumerate(results) if correlations is None]
+    for correlations in results:
+        record_cache('known_statements', correlations is not None)
+    if not missing:
+        return results
+
+    try:
+        with deadline_scope(INFERENCE_DEADLINE):
+            predictions = await context.bot_data['predictor'].predict([statements[i] for i in missing])
+    except DeadlineExceeded as e:
+        logging.warning(f"Предсказание {len(missing)} утверждений отброшено: {e}")
+        return results
+    except Exception as e:
+        logging.error(f"Ошибка предсказания корреляций для {len(missing)} утверждений: {e}")
+        return results
+
+    for i, row in zip(missing, predictions):
+        results[i] = correlations_from_array(row)
+    return results
+
+
+async def predict_statement_correlations(context: ContextTypes.DEFAULT_TYPE, statement):
+    """
+    Возвращает корреляции для одного утверждения.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        statement (str): Утверждение.
+
+    Returns:
+        dict or None: Корреляции функций или None, если предсказание не удалось.
+    """
+    return (await predict_statements_correlations(context, [statement]))[0]
+
+
+def uncertainty_enabled(context: ContextTypes.DEFAULT_TYPE):
+    # InferenceClient и ReplicaPool не умеют стохастические проходы; для них остаётся точечная оценка
+    return UNCERTAINTY_SAMPLES > 0 and hasattr(context.bot_data['predictor'], 'predict_uncertainty')
+
+
+async def _predict_uncertainty(context: ContextTypes.DEFAULT_TYPE, statements):
+    try:
+        with deadline_scope(INFERENCE_DEADLINE):
+            return await context.bot_data['predictor'].predict_uncertainty(statements, UNCERTAINTY_SAMPLES)
+    except DeadlineExceeded as e:
+        logging.warning(f"Предсказание {len(statements)} утверждений с оценкой неопределённости отброшено: {e}")
+    except Exception as e:
+        logging.error(f"Ошибка предсказания с оценкой неопределённости для {len(statements)} утверждений: {e}")
+    return None
+
+
+async def predict_statement_uncertainty(context: ContextTypes.DEFAULT_TYPE, statement):
+    """
+    Возвращает корреляции утверждения и оценку их неопределённости (UNCERTAINTY_SAMPLES проходов MC-dropout).
+
+    Для известных утверждений и предсказателей без стохастических проходов оценки нет.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        statement (str): Утверждение.
+
+    Returns:
+        tuple: (корреляции или None, оценка неопределённости из summarize_uncertainty или None).
+    """
+    if not uncertainty_enabled(context):
+        return await predict_statement_correlations(context, statement), None
+    with observe_stage('lookup'):
+        known = find_known_correlations(statement, FEEDBACK_DATA_FILE, USER_STATEMENTS_FILE)
+    record_cache('known_statements', known is not None)
+    if known is not None:
+        return known, None
+
+    result = await _predict_uncertainty(context, [statement])
+    if result is None:
+        return None, None
+    point, draws = result
+    return correlations_from_array(point[0]), summarize_uncertainty(draws, SOCIONICS_TYPES)[0]
+
+
+async def predict_description_correlations(context: ContextTypes.DEFAULT_TYPE, description):
+    """
+    Возвращает корреляции для длинного свободного описания (/neurotype).
+
+    Описание делится на фрагменты (neural_network/chunking.py), все фрагменты
+    предсказываются одним батчем, отсортированным по длине, а их корреляции
+    объединяются с весами NEUROTYPE_CHUNK_WEIGHTING.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        description (str): Описание.
+
+    Returns:
+        dict or None: Корреляции функций или None, если предсказание не удалось.
+    """
+    chunks = chunk_text(description, NEUROTYPE_CHUNK_MAX_WORDS, NEUROTYPE_CHUNK_OVERLAP, NEUROTYPE_MAX_CHUNKS)
+    if len(chunks) <= 1:
+        return await predict_statement_correlations(context, description)
+
+    sorted_chunks, restore = length_sorted(chunks)
+    try:
+        with deadline_scope(INFERENCE_DEADLINE):
+            predictions = await context.bot_data['predictor'].predict(sorted_chunks)
+    except DeadlineExceeded as e:
+        logging.warning(f"Предсказание описания из {len(chunks)} фрагментов отброшено: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Ошибка предсказания корреляций для описания из {len(chunks)} фрагментов: {e}")
+        return None
+
+    logging.info(f"Описание разбито на {len(chunks)} фрагментов.")
+    return correlations_from_array(
+        aggregate_chunk_correlations(chunks, predictions[restore], NEUROTYPE_CHUNK_WEIGHTING)
+    )
+
+
+async def predict_description_uncertainty(context: ContextTypes.DEFAULT_TYPE, description):
+    """
+    Возвращает корреляции описания (/neurotype) и оценку их неопределённости.
+
+    Проходы MC-dropout фрагментов объединяются с теми же весами, что и их корреляции.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        description (str): Описание.
+
+    Returns:
+        tuple: (корреляции или None, оценка неопределённости из summarize_uncertainty или None).
+    """
+    if not uncertainty_enabled(context):
+        return await predict_description_correlations(context, description), None
+    chunks = chunk_text(description, NEUROTYPE_CHUNK_MAX_WORDS, NEUROTYPE_CHUNK_OVERLAP, NEUROTYPE_MAX_CHUNKS)
+    if len(chunks) <= 1:
+        return await predict_statement_uncertainty(context, description)
+
+    sorted_chunks, restore = length_sorted(chunks)
+    result = await _predict_uncertainty(context, sorted_chunks)
+    if result is None:
+        return None, None
+    predictions, draws = result[0][restore], result[1][restore]
+    logging.info(f"Описание разбито на {len(chunks)} фрагментов.")
+    weights = chunk_weights(chunks, predictions, NEUROTYPE_CHUNK_WEIGHTING)
+    correlations = correlations_from_array(
+        aggregate_chunk_correlations(chunks, predictions, NEUROTYPE_CHUNK_WEIGHTING)
+    )
+    return correlations, summarize_uncertainty(aggregate_draws(weights, draws), SOCIONICS_TYPES)[0]
+
+
+async def predict_chunks_in_batches(context: ContextTypes.DEFAULT_TYPE, chunks, batch_size=256, deadline=None,
+                                    progress=None):
+    """
+    Предсказывает корреляции большого числа фрагментов батчами, отсортированными по длине.
+
+    Если срок истёк или предсказатель вернул ошибку, оставшиеся фрагменты не предсказываются.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика.
+        chunks (list): Фрагменты текста.
+        batch_size (int, optional): Фрагментов в батче. Defaults to 256.
+        deadline (float, optional): Срок всей работы по time.monotonic(). Defaults to None.
+        progress (callable, optional): async progress(done, total) после каждого батча. Defaults to None.
+
+    Returns:
+        numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)) в исходном порядке; NaN для непредсказанных фрагментов.
+    """
+    sorted_chunks, restore = length_sorted(chunks)
+    predictions = np.full((len(chunks), len(FUNCTIONS)), np.nan, dtype=np.float32)
+    for start in range(0, len(sorted_chunks), batch_size):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            logging.warning(f"Срок истёк: предсказано {start} из {len(chunks)} фрагментов.")
+            break
+        batch = sorted_chunks[start:start + batch_size]
+        try:
+            with deadline_scope(remaining):
+                predictions[start:start + len(batch)] = await context.bot_data['predictor'].predict(batch)
+        except DeadlineExceeded as e:
+            logging.warning(f"Предсказание фрагментов {start}-{start + len(batch)} отброшено: {e}")
+            break
+        except Exception as e:
+            logging.error(f"Ошибка предсказания фрагментов {start}-{start + len(batch)}: {e}")
+            break
+        if progress is not None:
+            await progress(start + len(batch), len(sorted_chunks))
+    return predictions[restore]
@@ -0,0 +1,208 @@
+# bot/review.py
+"""
+Проверка утверждений /add разработчиком.
+
+Вместо сообщения на каждое утверждение в чат разработчика раз в
+REVIEW_DIGEST_INTERVAL секунд приходит один дайджест очереди: страница
+утверждений с инлайн-кнопками (одобрить или отклонить одно утверждение или всю
+страницу, листать страницы), а при большой очереди ещё и CSV со всеми
+утверждениями. По номерам из CSV очередь разбирается командой
+/review approve|reject 12-40 45. Дайджесты отправляются с низким приоритетом и
+уступают очередь ответам пользователям (bot/delivery.py).
+"""
+
+import csv
+import io
+import logging
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import ContextTypes
+
+from bot.admin import is_admin
+from bot.delivery import BULK
+from config.settings import DEVELOPER_CHAT_ID, REVIEW_PAGE_SIZE, REVIEW_DOCUMENT_THRESHOLD
+from socionics.data_processing import FUNCTIONS
+
+# Утверждение в дайджесте обрезается, чтобы страница уложилась в лимит сообщения Telegram
+STATEMENT_PREVIEW_CHARS = 300
+
+
+def format_review_page(queue, offset):
+    """
+    Текст и клавиатура страницы очереди.
+
+    Кнопки ссылаются на диапазон номеров, а не на позиции: номера растут, поэтому
+    диапазон страницы не захватит утверждения, поступившие после отправки дайджеста.
+
+    Args:
+        queue (ReviewQueue): Очередь.
+        offset (int): Смещение страницы.
+
+    Returns:
+        tuple: (текст, InlineKeyboardMarkup или None).
+    """
+    total = len(queue)
+    if total == 0:
+        return "✅ Очередь проверки пуста.", None
+    offset = min(max(offset, 0), (total - 1) // REVIEW_PAGE_SIZE * REVIEW_PAGE_SIZE)
+    entries = queue.page(offset, REVIEW_PAGE_SIZE)
+    pages = (total + REVIEW_PAGE_SIZE - 1) // REVIEW_PAGE_SIZE
+
+    lines = [f"🗂 Утверждения на проверке: {total}, страница {offset // REVIEW_PAGE_SIZE + 1} из {pages}", ""]
+    rows = []
+    for entry in entries:
+        statement = entry['statement']
+        if len(statement) > STATEMENT_PREVIEW_CHARS:
+            statement = statement[:STATEMENT_PREVIEW_CHARS] + '…'
+        correlations = ', '.join(f"{func} {value:+.2f}" for func, value in entry['function_correlation'].items()
+                                 if value)
+        lines.append(f"#{entry['id']} от @{entry['username']} (ID {entry['user_id']})")
+        lines.append(statement)
+        lines.append(f"📊 {correlations or 'все корреляции нулевые'}")
+        lines.append("")
+        rows.append([
+            InlineKeyboardButton(f"✅ #{entry['id']}", callback_data=f"review:a:{entry['id']}:{entry['id']}:{offset}"),
+            InlineKeyboardButton(f"❌ #{entry['id']}", callback_data=f"review:r:{entry['id']}:{entry['id']}:{offset}")
+        ])
+
+    first, last = entries[0]['id'], entries[-1]['id']
+    navigation = []
+    if offset > 0:
+        navigation.append(InlineKeyboardButton("◀️", callback_data=f"review:p:0:0:{offset - REVIEW_PAGE_SIZE}"))
+    navigation.append(InlineKeyboardButton("✅ Все", callback_data=f"review:a:{first}:{last}:{offset}"))
+    navigation.append(InlineKeyboardButton("❌ Все", callback_data=f"review:r:{first}:{last}:{offset}"))
+    if offset + REVIEW_PAGE_SIZE < total:
+        navigation.append(InlineKeyboardButton("▶️", callback_data=f"review:p:0:0:{offset + REVIEW_PAGE_SIZE}"))
+    rows.append(navigation)
+    return '\n'.join(lines).rstrip(), InlineKeyboardMarkup(rows)
+
+
+def review_csv(entries):
+    """
+    CSV со всеми ожидающими утверждениями (номер, автор, утверждение, корреляции).
+
+    Args:
+        entries (list): Записи очереди.
+
+    Returns:
+        bytes: CSV в UTF-8 с BOM, чтобы Excel открывал кириллицу без настройки.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'timestamp', 'user_id', 'username', 'statement'] + FUNCTIONS)
+    for entry in entries:
+        writer.writerow([entry['id'], entry['timestamp'], entry['user_id'], entry['username'], entry['statement']]
+                        + [entry['function_correlation'].get(func, 0.0) for func in FUNCTIONS])
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def parse_review_ids(args):
+    """
+    Диапазоны номеров утверждений из аргументов вида 12 15-20 31.
+
+    Args:
+        args (list): Аргументы команды.
+
+    Returns:
+        list or None: Объекты range или None, если аргумент не разобран.
+    """
+    ranges = []
+    for arg in args:
+        first, _, last = arg.partition('-')
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        ranges.append(range(int(first), int(last or first) + 1))
+    return ranges
+
+
+async def send_review_digest(bot, queue, force=False):
+    """
+    Отправляет дайджест очереди в чат разработчика.
+
+    Args:
+        bot (telegram.Bot): Бот.
+        queue (ReviewQueue): Очередь.
+        force (bool, optional): Отправить, даже если новых утверждений нет. Defaults to False.
+    """
+    new = queue.new_since_digest()
+    if not new and not force:
+        return
+    text, keyboard = format_review_page(queue, 0)
+    if new:
+        text = f"🔔 Новых утверждений: {new}\n{text}"
+    # Запрошенный командой дайджест — ответ разработчику, периодический — массовая рассылка
+    priority = None if force else BULK
+    await bot.send_message(chat_id=DEVELOPER_CHAT_ID, text=text, reply_markup=keyboard, rate_limit_args=priority)
+    if len(queue) > REVIEW_DOCUMENT_THRESHOLD:
+        await bot.send_document(
+            chat_id=DEVELOPER_CHAT_ID,
+            document=io.BytesIO(review_csv(queue.entries())),
+            filename='review_queue.csv',
+            caption="Вся очередь. Пакетное решение: /review approve 12-40 45 или /review reject 41-50",
+            rate_limit_args=priority
+        )
+    queue.mark_digested()
+    logging.info(f"Дайджест очереди проверки отправлен: в очереди {len(queue)}, новых {new}.")
+
+
+# Периодическая задача JobQueue: дайджест, если появились новые утверждения
+async def review_digest_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await send_review_digest(context.bot, context.bot_data['review_queue'])
+    except TelegramError as e:
+        logging.error(f"Не удалось отправить дайджест очереди проверки: {e}")
+
+
+# Обработчик команды /review [approve|reject <номера>] (только для разработчика)
+async def review_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update):
+        logging.warning(f"Пользователь ID {update.effective_user.id} запросил /review без прав администратора.")
+        return
+    queue = context.bot_data['review_queue']
+    args = context.args or []
+    if not args:
+        await send_review_digest(context.bot, queue, force=True)
+        return
+
+    ranges = parse_review_ids(args[1:]) if args[0] in ('approve', 'reject') else None
+    if not ranges:
+        await update.message.reply_text("❗️ Использование: /review, /review approve 12-40 45 или /review reject 41")
+        return
+    ids = [entry['id'] for entry in queue.entries() if any(entry['id'] in ids_range for ids_range in ranges)]
+    try:
+        resolved = queue.resolve(ids, approve=args[0] == 'approve')
+    except OSError as e:
+        logging.error(f"Не удалось сохранить одобренные утверждения: {e}")
+        await update.message.reply_text(f"❗️ Не удалось сохранить утверждения: {e}")
+        return
+    action = "Одобрено" if args[0] == 'approve' else "Отклонено"
+    await update.message.reply_text(f"{action} утверждений: {resolved}. В очереди осталось: {len(queue)}.")
+
+
+# Обработчик кнопок дайджеста (callback_data review:<действие>:<первый>:<последний>:<смещение>)
+async def review_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if not is_admin(update):
+        await query.answer()
+        logging.warning(f"Пользователь ID {update.effective_user.id} нажал кнопку проверки без прав администратора.")
+        return
+    queue = context.bot_data['review_queue']
+    action, first, last, offset = query.data.split(':')[1:]
+    notice = None
+    if action in ('a', 'r'):
+        try:
+            resolved = queue.resolve(range(int(first), int(last) + 1), approve=action == 'a')
+        except OSError as e:
+            logging.error(f"Не удалось сохранить одобренные утверждения: {e}")
+            await query.answer(f"Не удалось сохранить: {e}", show_alert=True)
+            return
+        notice = f"{'Одобрено' if action == 'a' else 'Отклонено'}: {resolved}"
+    await query.answer(notice)
+
+    text, keyboard = format_review_page(queue, int(offset))
+    try:
+        await query.edit_message_text(text=text, reply_markup=keyboard)
+    except BadRequest as e:
+        # Страница не изменилась (например, кнопку нажали дважды)
+        logging.debug(f"Страница очереди не обновлена: {e}")
@@ -12,3 +12,4 @@ class BotStates(Enum):
     OPROSNIK_PROCESSING = 5
     ADD_STATEMENT = 6
     ADD_CORRELATIONS = 7
+    WAITING_FOR_CHAT_EXPORT = 8
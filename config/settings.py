@@ -16,14 +16,138 @@ DEVELOPER_CHAT_ID = int(os.getenv('DEVELOPER_CHAT_ID', 'ваш_chat_id_здес
 # Пути к файлам данных
 MODEL_PATH = os.getenv('MODEL_PATH', 'models/talanovCorrelations.keras')
 SCALER_PATH = os.getenv('SCALER_PATH', 'models/label_scaler.pkl')
+# Версионированные бандлы модели (python -m neural_network.bundle): если MODEL_BUNDLE_DIR задан, модель и скейлер
+# загружаются из бандла версии MODEL_BUNDLE_VERSION (пусто — активная версия) вместо MODEL_PATH и SCALER_PATH
+MODEL_BUNDLE_DIR = os.getenv('MODEL_BUNDLE_DIR', '')
+MODEL_BUNDLE_VERSION = os.getenv('MODEL_BUNDLE_VERSION', '')
 USER_STATEMENTS_FILE = os.getenv('USER_STATEMENTS_FILE', 'data/user_db.json')
 FEEDBACK_DATA_FILE = os.getenv('FEEDBACK_DATA_FILE', 'data/feedback_data.jsonl')
 TALANOV_STATEMENTS_FILE = os.getenv('TALANOV_STATEMENTS_FILE', 'data/talanovstatements.json')
 SOCIONICS_TYPES_FILE = os.getenv('SOCIONICS_TYPES_FILE', 'data/socionic_types.json')
 
+# Накопительные профили пользователей (/profile): файл, затухание вклада утверждений (период полураспада
+# в днях, 0 — без затухания), эффективное окно в утверждениях (0 — без окна) и интервал записи на диск
+USER_PROFILES_FILE = os.getenv('USER_PROFILES_FILE', 'data/user_profiles.npz')
+USER_PROFILE_HALF_LIFE_DAYS = float(os.getenv('USER_PROFILE_HALF_LIFE_DAYS', '0'))
+USER_PROFILE_WINDOW = int(os.getenv('USER_PROFILE_WINDOW', '0'))
+USER_PROFILE_FLUSH_INTERVAL = float(os.getenv('USER_PROFILE_FLUSH_INTERVAL', '30'))
+
+# Проверка утверждений /add разработчиком: утверждения ждут в очереди и попадают в USER_STATEMENTS_FILE
+# только после одобрения (0 — сохранять сразу, как раньше). Дайджест очереди отправляется в DEVELOPER_CHAT_ID
+# раз в REVIEW_DIGEST_INTERVAL секунд, если появились новые утверждения (0 — только по команде /review);
+# при очереди больше REVIEW_DOCUMENT_THRESHOLD к дайджесту прикладывается CSV со всеми утверждениями
+REVIEW_QUEUE_ENABLED = os.getenv('REVIEW_QUEUE_ENABLED', '1') == '1'
+REVIEW_QUEUE_FILE = os.getenv('REVIEW_QUEUE_FILE', 'data/review_queue.jsonl')
+REVIEW_DIGEST_INTERVAL = float(os.getenv('REVIEW_DIGEST_INTERVAL', '3600'))
+REVIEW_PAGE_SIZE = int(os.getenv('REVIEW_PAGE_SIZE', '8'))
+REVIEW_DOCUMENT_THRESHOLD = int(os.getenv('REVIEW_DOCUMENT_THRESHOLD', '40'))
+
+# Модель эмбеддингов и кэш закодированных утверждений
+# ENCODER_BACKEND: 'sentence-transformers' (модель Hugging Face) или 'hashing' (офлайн-заглушка для тестов и бенчмарков)
+ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'sentence-transformers')
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'DeepPavlov/rubert-base-cased-sentence')
+STUB_ENCODER_DIM = int(os.getenv('STUB_ENCODER_DIM', '768'))
+EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'models/embeddings_cache')
+
+# Сервер инференса: пустой адрес — модель работает в процессе бота.
+# Формат адреса: 'unix:/tmp/socionics-inference.sock' или 'tcp://127.0.0.1:8765'
+INFERENCE_SERVER_ADDRESS = os.getenv('INFERENCE_SERVER_ADDRESS', '')
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '64'))
+INFERENCE_CLIENT_POOL_SIZE = int(os.getenv('INFERENCE_CLIENT_POOL_SIZE', '4'))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '10'))
+INFERENCE_RETRIES = int(os.getenv('INFERENCE_RETRIES', '2'))
+# Срок запроса инференса из обработчика бота в секундах: просроченные запросы отбрасываются из очередей (0 — без срока)
+INFERENCE_DEADLINE = float(os.getenv('INFERENCE_DEADLINE', '30'))
+# Сколько обновлений обрабатывается одновременно (обновления одного пользователя — всегда по очереди)
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '32'))
+# Лимиты исходящих сообщений (bot/delivery.py): запросов в чаты в секунду на бота, сообщений в секунду
+# в личный чат и запас подряд идущих сообщений, сообщений в минуту в группу, повторов после RetryAfter
+DELIVERY_GLOBAL_RATE = float(os.getenv('DELIVERY_GLOBAL_RATE', '30'))
+DELIVERY_CHAT_RATE = float(os.getenv('DELIVERY_CHAT_RATE', '1'))
+DELIVERY_CHAT_BURST = int(os.getenv('DELIVERY_CHAT_BURST', '3'))
+DELIVERY_GROUP_RATE_PER_MINUTE = float(os.getenv('DELIVERY_GROUP_RATE_PER_MINUTE', '20'))
+DELIVERY_MAX_RETRIES = int(os.getenv('DELIVERY_MAX_RETRIES', '3'))
+# Таймаут простаивающих диалогов в секундах (0 — без таймаута; нужен python-telegram-bot[job-queue]):
+# общий и для отдельных диалогов /add, /oprosnik, /neurotype, /chat
+CONVERSATION_TIMEOUT = float(os.getenv('CONVERSATION_TIMEOUT', '900'))
+ADD_CONVERSATION_TIMEOUT = float(os.getenv('ADD_CONVERSATION_TIMEOUT', str(CONVERSATION_TIMEOUT)))
+OPROSNIK_CONVERSATION_TIMEOUT = float(os.getenv('OPROSNIK_CONVERSATION_TIMEOUT', str(CONVERSATION_TIMEOUT)))
+NEUROTYPE_CONVERSATION_TIMEOUT = float(os.getenv('NEUROTYPE_CONVERSATION_TIMEOUT', str(CONVERSATION_TIMEOUT)))
+CHAT_EXPORT_CONVERSATION_TIMEOUT = float(os.getenv('CHAT_EXPORT_CONVERSATION_TIMEOUT', str(CONVERSATION_TIMEOUT)))
+# user_data пользователей, неактивных дольше USER_DATA_IDLE_TTL секунд (0 — не удалять), удаляется задачей,
+# которая запускается раз в USER_DATA_SWEEP_INTERVAL секунд (0 — выключена) и заодно измеряет размер user_data
+USER_DATA_IDLE_TTL = float(os.getenv('USER_DATA_IDLE_TTL', '3600'))
+USER_DATA_SWEEP_INTERVAL = float(os.getenv('USER_DATA_SWEEP_INTERVAL', '300'))
+
+# Пул реплик модели: INFERENCE_REPLICAS процессов (0 — модель в процессе бота), у каждой свой бюджет
+# потоков TensorFlow/PyTorch (0 — умолчание библиотеки). Подбирается через python -m benchmarks.replica_sweep
+INFERENCE_REPLICAS = int(os.getenv('INFERENCE_REPLICAS', '0'))
+INFERENCE_INTRA_OP_THREADS = int(os.getenv('INFERENCE_INTRA_OP_THREADS', '0'))
+INFERENCE_INTER_OP_THREADS = int(os.getenv('INFERENCE_INTER_OP_THREADS', '0'))
+INFERENCE_PIN_CPUS = os.getenv('INFERENCE_PIN_CPUS', 'false').lower() in ('1', 'true', 'yes')
+
+# Разбиение длинных описаний /neurotype на фрагменты
+# NEUROTYPE_CHUNK_WEIGHTING: 'mean', 'length' (по числу слов) или 'confidence' (по величине корреляций)
+NEUROTYPE_CHUNK_MAX_WORDS = int(os.getenv('NEUROTYPE_CHUNK_MAX_WORDS', '64'))
+NEUROTYPE_CHUNK_OVERLAP = int(os.getenv('NEUROTYPE_CHUNK_OVERLAP', '8'))
+NEUROTYPE_MAX_CHUNKS = int(os.getenv('NEUROTYPE_MAX_CHUNKS', '64'))
+NEUROTYPE_CHUNK_WEIGHTING = os.getenv('NEUROTYPE_CHUNK_WEIGHTING', 'length')
+
+# Типирование участников экспорта чата Telegram Desktop (/chat). Bot API отдаёт боту файлы до 20 МБ
+# (больше — только с локальным сервером Bot API); одновременно выполняется не больше CHAT_EXPORT_MAX_JOBS задач
+CHAT_EXPORT_MAX_BYTES = int(os.getenv('CHAT_EXPORT_MAX_BYTES', str(20 * 1024 * 1024)))
+CHAT_EXPORT_MAX_JOBS = int(os.getenv('CHAT_EXPORT_MAX_JOBS', '1'))
+CHAT_EXPORT_TIMEOUT = float(os.getenv('CHAT_EXPORT_TIMEOUT', '300'))
+# Бюджет текста в памяти на задачу (символов) и выборка сообщений каждого автора
+CHAT_EXPORT_MAX_CHARS = int(os.getenv('CHAT_EXPORT_MAX_CHARS', '5000000'))
+CHAT_EXPORT_MAX_MESSAGES_PER_AUTHOR = int(os.getenv('CHAT_EXPORT_MAX_MESSAGES_PER_AUTHOR', '500'))
+CHAT_EXPORT_MIN_MESSAGES = int(os.getenv('CHAT_EXPORT_MIN_MESSAGES', '5'))
+CHAT_EXPORT_MAX_CHUNKS_PER_AUTHOR = int(os.getenv('CHAT_EXPORT_MAX_CHUNKS_PER_AUTHOR', '128'))
+CHAT_EXPORT_BATCH_SIZE = int(os.getenv('CHAT_EXPORT_BATCH_SIZE', '256'))
+
+# Оценка неопределённости MC-dropout: число стохастических проходов MLP на утверждение (0 — выключено).
+# Работает с моделью в процессе бота; с сервером инференса и репликами ответы остаются без оценки
+UNCERTAINTY_SAMPLES = int(os.getenv('UNCERTAINTY_SAMPLES', '0'))
+
+# Адаптивный /oprosnik (socionics/adaptive.py): следующий вопрос выбирается по ожидаемому приросту информации
+# о типе, опросник заканчивается, когда самый вероятный тип набирает OPROSNIK_CONFIDENCE (но не раньше
+# OPROSNIK_MIN_QUESTIONS вопросов), или после OPROSNIK_MAX_QUESTIONS. OPROSNIK_ANSWER_SHARPNESS — насколько
+# уверенно тип отвечает в сторону знака корреляции утверждения. 0 — случайные вопросы, как раньше
+OPROSNIK_ADAPTIVE = os.getenv('OPROSNIK_ADAPTIVE', '1') == '1'
+OPROSNIK_MAX_QUESTIONS = int(os.getenv('OPROSNIK_MAX_QUESTIONS', '20'))
+OPROSNIK_MIN_QUESTIONS = int(os.getenv('OPROSNIK_MIN_QUESTIONS', '5'))
+OPROSNIK_CONFIDENCE = float(os.getenv('OPROSNIK_CONFIDENCE', '0.9'))
+OPROSNIK_ANSWER_SHARPNESS = float(os.getenv('OPROSNIK_ANSWER_SHARPNESS', '0.75'))
+
+# Объединять одинаковые одновременные предсказания в одно (neural_network/singleflight.py)
+SINGLEFLIGHT_ENABLED = os.getenv('SINGLEFLIGHT_ENABLED', '1') == '1'
+
+# Пре-форк режим: мастер загружает модели один раз и запускает PREFORK_WORKERS воркеров инференса
+# (0 — выключено). Воркеры слушают INFERENCE_SERVER_ADDRESS или unix:/tmp/socionics-inference.sock
+PREFORK_WORKERS = int(os.getenv('PREFORK_WORKERS', '0'))
+PREFORK_REPORT_TIMEOUT = float(os.getenv('PREFORK_REPORT_TIMEOUT', '120'))
+
+# Эндпоинт метрик Prometheus: http://<хост>:METRICS_PORT/metrics (0 — выключено)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '80'))
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+
+# Выборочное профилирование обновлений (переключается /profiler или сигналом SIGUSR1)
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', '0') == '1'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.05'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('reports', 'profiles'))
+
 # Настройки логирования
 LOGGING_LEVEL = os.getenv('LOGGING_LEVEL', 'INFO')
-LOGGING_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# text — строки по шаблону LOGGING_TEXT_FORMAT, json — одна запись JSON на строку
+LOGGING_FORMAT = os.getenv('LOGGING_FORMAT', 'text')
+LOGGING_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FILE = os.getenv('LOG_FILE', os.path.join('logs', 'bot.log'))
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# Ротация по времени ('midnight', 'H', ...) вместо ротации по размеру; пусто — по размеру
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')
+# Доля записываемых строк «на каждое сообщение» (время обработчиков, ответы в опроснике)
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
 
 # Параметры модели
 FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
@@ -0,0 +1,62 @@
+# monitoring/exporter.py
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import REGISTRY
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body = self.registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+        elif path == '/healthz':
+            body = b'ok\n'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        else:
+            body = b'not found\n'
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Опросы Prometheus каждые несколько секунд не должны засорять лог бота
+        pass
+
+
+def start_metrics_server(port, host='0.0.0.0', registry=REGISTRY):
+    """
+    Запускает HTTP-эндпоинт /metrics в фоновом потоке.
+
+    Args:
+        port (int): Порт; 0 — не запускать.
+        host (str, optional): Адрес для прослушивания. Defaults to '0.0.0.0'.
+        registry (Registry, optional): Реестр метрик. Defaults to REGISTRY.
+
+    Returns:
+        ThreadingHTTPServer or None: Сервер (для shutdown()) или None, если экспортёр выключен.
+    """
+    if not port:
+        return None
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logging.error(f"Не удалось открыть порт {port} для метрик: {e}")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True)
+    thread.start()
+    logging.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,167 @@
+# monitoring/log_setup.py
+"""
+Неблокирующее логирование бота.
+
+Записи из цикла событий попадают в очередь (QueueHandler), а на диск и в консоль их
+пишет отдельный поток QueueListener. Файл лога ротируется по размеру или по времени.
+В формате json к каждой записи добавляются id пользователя, имя обработчика и времена
+стадий. Частые строки «на каждое сообщение» помечаются extra={'sample': True} и
+пишутся с вероятностью LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+# Контекст текущего обновления бота: {'user_id': ..., 'handler': ...}; вне обработчика — None
+LOG_CONTEXT = contextvars.ContextVar('log_context', default=None)
+
+# Поля записи, которые есть у любого LogRecord и не относятся к extra
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+# Формат консоли дочернего процесса после fork и признак того, что хуки процесса уже зарегистрированы
+_child_formatter = None
+_hooks_registered = False
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись user_id и handler из контекста текущего обновления."""
+
+    def filter(self, record):
+        context = LOG_CONTEXT.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает лишь долю записей, помеченных extra={'sample': True}.
+
+    Предупреждения и ошибки не отбрасываются никогда.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or record.levelno >= logging.WARNING:
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON со стандартными полями и всеми extra."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key != 'sample':
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _file_handler(log_file, max_bytes, backup_count, rotate_when):
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(log_file, when=rotate_when, backupCount=backup_count,
+                                                         encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding='utf-8')
+
+
+def setup_logging(level='INFO', log_format='text', log_file='logs/bot.log', max_bytes=10 * 1024 * 1024,
+                  backup_count=5, rotate_when='', sample_rate=1.0,
+                  text_format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'):
+    """
+    Настраивает корневой логгер: очередь в цикле событий, запись в фоновом потоке.
+
+    Args:
+        level (str, optional): Уровень логирования. Defaults to 'INFO'.
+        log_format (str, optional): 'text' или 'json'. Defaults to 'text'.
+        log_file (str, optional): Файл лога; пустая строка — только консоль. Defaults to 'logs/bot.log'.
+        max_bytes (int, optional): Размер файла для ротации по размеру. Defaults to 10 МБ.
+        backup_count (int, optional): Сколько старых файлов хранить. Defaults to 5.
+        rotate_when (str, optional): Интервал ротации по времени ('midnight', 'H', ...);
+            пустая строка — ротация по размеру. Defaults to ''.
+        sample_rate (float, optional): Доля записываемых строк с extra={'sample': True}. Defaults to 1.0.
+        text_format (str, optional): Шаблон текстового формата.
+
+    Returns:
+        logging.handlers.QueueListener: Запущенный слушатель очереди (останавливается при выходе).
+    """
+    global _listener, _child_formatter, _hooks_registered
+    if log_format not in ('text', 'json'):
+        raise ValueError(f"Неизвестный формат логов '{log_format}'. Доступны: text, json.")
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(text_format)
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(_file_handler(log_file, max_bytes, backup_count, rotate_when))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Фильтры стоят на QueueHandler: контекст читается в потоке, который пишет запись,
+    # а отброшенные записи не попадают в очередь
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _child_formatter = formatter
+
+    # Хуки не снимаются, поэтому при повторной настройке регистрируются только один раз
+    if not _hooks_registered:
+        _hooks_registered = True
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            # В дочернем процессе (пре-форк воркеры) нет потока-слушателя: пишем только в консоль,
+            # а файл ротирует мастер
+            os.register_at_fork(after_in_child=_reset_in_child)
+    return _listener
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _reset_in_child():
+    global _listener
+    _listener = None
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(_child_formatter)
+    root.addHandler(handler)
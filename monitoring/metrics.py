@@ -0,0 +1,286 @@
+# monitoring/metrics.py
+"""
+Счётчики и гистограммы в памяти процесса с выводом в текстовом формате Prometheus.
+
+Метрики потокобезопасны: их обновляют цикл событий бота, поток инференса и
+поток HTTP-экспортёра. Каждый процесс (бот, сервер инференса) держит свой реестр.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Границы корзин задержек в секундах: от долей миллисекунды до десятков секунд
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Ожидались метки {labelnames}, получены {sorted(labels)}.")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонно растущий счётчик с метками."""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = []
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться."""
+
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, суммой и количеством наблюдений."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Счётчики по корзинам (последняя — +Inf), сумма, количество
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """
+        Копия серии для одного набора меток.
+
+        Returns:
+            dict or None: counts (по корзинам, без накопления), sum, count.
+        """
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            if series is None:
+                return None
+            return {'counts': list(series[0]), 'sum': series[1], 'count': series[2]}
+
+    def label_values(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def quantile(self, q, **labels):
+        """
+        Оценка квантиля по корзинам с линейной интерполяцией внутри корзины.
+
+        Args:
+            q (float): Квантиль от 0 до 1.
+
+        Returns:
+            float or None: Оценка в единицах наблюдений или None, если наблюдений нет.
+        """
+        snapshot = self.snapshot(**labels)
+        if not snapshot or snapshot['count'] == 0:
+            return None
+        rank = q * snapshot['count']
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float('inf'),), snapshot['counts']):
+            if cumulative + count >= rank and count > 0:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound if bound != float('inf') else lower
+        return lower
+
+    def render(self):
+        lines = []
+        with self._lock:
+            series = {key: (list(value[0]), value[1], value[2]) for key, value in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Текст для эндпоинта /metrics.
+
+        Returns:
+            str: Метрики в текстовом формате Prometheus 0.0.4.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PROCESS_START_TIME = REGISTRY.gauge('socionics_process_start_time_seconds', "Время запуска процесса (Unix time).")
+PROCESS_START_TIME.set(time.time())
+
+# Стадии: lookup, encode, predict, scoring, reply, send_wait, queue_wait, persistence
+STAGE_SECONDS = REGISTRY.histogram('socionics_stage_seconds', "Время стадий обработки запроса.", ['stage'])
+HANDLER_SECONDS = REGISTRY.histogram('socionics_handler_seconds', "Полное время обработчиков бота.", ['handler'])
+HANDLER_ERRORS = REGISTRY.counter('socionics_handler_errors_total', "Исключения в обработчиках бота.", ['handler'])
+STATEMENTS_PREDICTED = REGISTRY.counter('socionics_statements_predicted_total',
+                                        "Утверждений, прошедших через модель.")
+CACHE_REQUESTS = REGISTRY.counter('socionics_cache_requests_total', "Обращения к кэшам по результату.",
+                                  ['cache', 'result'])
+PERSISTENCE_FLUSHES = REGISTRY.counter('socionics_persistence_flushes_total', "Записи данных на диск.", ['target'])
+INFERENCE_DROPPED = REGISTRY.counter('socionics_inference_dropped_total',
+                                     "Запросы инференса, отброшенные из-за истёкшего срока.", ['queue'])
+UPDATES_CANCELLED = REGISTRY.counter('socionics_updates_cancelled_total',
+                                     "Обновления пользователей, обработка которых отменена.", ['reason'])
+DELIVERY_SECONDS = REGISTRY.histogram('socionics_delivery_seconds',
+                                     "Время доставки исходящих запросов в чаты вместе с ожиданием лимитов.",
+                                     ['priority'])
+DELIVERY_RETRIES = REGISTRY.counter('socionics_delivery_retries_total', "Повторы запросов после RetryAfter.",
+                                    ['endpoint'])
+DELIVERY_COALESCED = REGISTRY.counter('socionics_delivery_coalesced_total',
+                                      "Сообщения, объединённые с соседними в один запрос.")
+DELIVERY_PENDING = REGISTRY.gauge('socionics_delivery_pending', "Исходящие запросы, ждущие отправки.")
+OPROSNIK_QUESTIONS = REGISTRY.histogram('socionics_oprosnik_questions', "Вопросов в завершённых опросниках.",
+                                        ['mode'], buckets=(3, 5, 8, 10, 12, 15, 20, 30))
+USER_DATA_ENTRIES = REGISTRY.gauge('socionics_user_data_entries', "Записи user_data в памяти бота.")
+USER_DATA_BYTES = REGISTRY.gauge('socionics_user_data_bytes', "Приблизительный размер user_data в байтах.")
+USER_DATA_EVICTED = REGISTRY.counter('socionics_user_data_evicted_total',
+                                     "Записи user_data, удалённые из-за неактивности пользователей.")
+
+
+# Времена стадий текущего обновления бота для структурных логов; вне обработчика — None
+CURRENT_STAGES = contextvars.ContextVar('current_stages', default=None)
+
+
+def record_stage(stage, seconds):
+    """
+    Записывает время стадии в STAGE_SECONDS и во времена текущего обновления.
+
+    Args:
+        stage (str): Имя стадии.
+        seconds (float): Длительность в секундах.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = CURRENT_STAGES.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def observe_stage(stage):
+    """
+    Контекстный менеджер, записывающий время блока как стадию stage.
+
+    Args:
+        stage (str): Имя стадии.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
@@ -0,0 +1,222 @@
+# monitoring/profiling.py
+"""
+Выборочное профилирование обновлений бота на живом трафике.
+
+Включённый профайлер запускает cProfile для доли обновлений и сохраняет профиль каждого
+обработчика в отдельный файл. Работа в потоке инференса (токенизация, TensorFlow)
+профилируется отдельным cProfile и объединяется с профилем цикла событий.
+В цикле событий одновременно профилируется не больше одного обновления; вызовы
+других задач, выполнявшихся в это время, тоже попадают в его профиль.
+
+Агрегация сохранённых профилей:
+    python -m monitoring.profiling --dir reports/profiles --top 25
+"""
+
+import argparse
+import contextvars
+import cProfile
+import glob
+import logging
+import os
+import pstats
+import random
+import signal
+import threading
+import time
+from collections import defaultdict
+
+# Профиль текущего обновления; None, если обновление не профилируется
+PROFILE_SESSION = contextvars.ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """Профили одного обновления: цикл событий и потоки, куда ушла его работа."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def new_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def dump(self, output_dir):
+        """
+        Сохраняет объединённый профиль в output_dir/<handler>-<время>-<pid>.prof.
+
+        Returns:
+            str: Путь к файлу.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"{self.handler}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                        f"{int(time.time() * 1000) % 1000:03d}-{os.getpid()}.prof")
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        return path
+
+
+class SamplingProfiler:
+    """
+    Переключаемый профайлер обновлений.
+
+    Args:
+        output_dir (str): Каталог для профилей.
+        rate (float, optional): Доля профилируемых обновлений. Defaults to 0.05.
+        enabled (bool, optional): Включён ли сразу. Defaults to False.
+    """
+
+    def __init__(self, output_dir, rate=0.05, enabled=False):
+        self.output_dir = output_dir
+        self.rate = rate
+        self.enabled = enabled
+        self.dumped = 0
+        self._busy = False
+
+    def enable(self, rate=None):
+        if rate is not None:
+            self.rate = rate
+        self.enabled = True
+        logging.info(f"Профилирование включено для {self.rate:.0%} обновлений, профили в {self.output_dir}.")
+
+    def disable(self):
+        self.enabled = False
+        logging.info("Профилирование выключено.")
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def start(self, handler):
+        """
+        Решает, профилировать ли обновление, и запускает профайлер цикла событий.
+
+        Args:
+            handler (str): Имя обработчика.
+
+        Returns:
+            tuple or None: (сессия, профиль цикла событий) или None, если обновление не профилируется.
+        """
+        if not self.enabled or self._busy or random.random() >= self.rate:
+            return None
+        session = ProfileSession(handler)
+        profile = session.new_profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Другой профайлер уже активен (например, запущенный вручную)
+            return None
+        self._busy = True
+        return session, profile
+
+    def finish(self, started):
+        """
+        Останавливает профайлер цикла событий и сохраняет профиль обновления.
+
+        Args:
+            started (tuple): Результат start().
+        """
+        session, profile = started
+        profile.disable()
+        self._busy = False
+        try:
+            path = session.dump(self.output_dir)
+        except OSError as e:
+            logging.error(f"Не удалось сохранить профиль {session.handler}: {e}")
+            return
+        self.dumped += 1
+        logging.debug(f"Профиль {session.handler} сохранён в {path}.")
+
+    def status(self):
+        state = f"включено, доля {self.rate:.0%}" if self.enabled else "выключено"
+        return f"Профилирование {state}. Сохранено профилей: {self.dumped}, каталог: {self.output_dir}."
+
+
+def run_profiled(func, *args, **kwargs):
+    """
+    Вызывает func в текущем потоке, профилируя его, если обновление профилируется.
+
+    Используется в потоке инференса: профиль цикла событий не видит работу других потоков.
+    """
+    session = PROFILE_SESSION.get()
+    if session is None:
+        return func(*args, **kwargs)
+    profile = session.new_profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # В Python 3.12+ cProfile общий для всех потоков, и работа уже попадает в профиль
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+
+
+def install_signal_toggle(profiler, signum=getattr(signal, 'SIGUSR1', None)):
+    """
+    Переключает профайлер по сигналу (по умолчанию SIGUSR1): kill -USR1 <pid>.
+
+    Args:
+        profiler (SamplingProfiler): Профайлер.
+        signum (int, optional): Номер сигнала.
+    """
+    if signum is None:
+        return
+    signal.signal(signum, lambda received, frame: profiler.toggle())
+
+
+def aggregate_profiles(paths):
+    """
+    Объединяет профили по обработчикам.
+
+    Args:
+        paths (list): Файлы .prof (имя начинается с имени обработчика).
+
+    Returns:
+        dict: Имя обработчика -> (pstats.Stats, количество профилей).
+    """
+    grouped = defaultdict(list)
+    for path in paths:
+        handler = os.path.basename(path).split('-', 1)[0]
+        grouped[handler].append(path)
+    result = {}
+    for handler, handler_paths in sorted(grouped.items()):
+        stats = pstats.Stats(handler_paths[0])
+        for path in handler_paths[1:]:
+            stats.add(path)
+        result[handler] = (stats, len(handler_paths))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Горячие точки по сохранённым профилям обработчиков.")
+    parser.add_argument('--dir', default=os.path.join('reports', 'profiles'), help="Каталог с профилями.")
+    parser.add_argument('--handler', default=None, help="Только этот обработчик.")
+    parser.add_argument('--top', type=int, default=20, help="Сколько функций показать.")
+    parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+                        help="Сортировка.")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.dir, '*.prof')))
+    if args.handler:
+        paths = [path for path in paths if os.path.basename(path).startswith(f"{args.handler}-")]
+    if not paths:
+        print(f"Профили не найдены в {args.dir}.")
+        return
+
+    for handler, (stats, count) in aggregate_profiles(paths).items():
+        print(f"\n=== {handler}: {count} профилей ===")
+        stats.strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# monitoring/telegram.py
+
+import functools
+import logging
+import time
+
+from telegram.request import HTTPXRequest
+
+from .log_setup import LOG_CONTEXT
+from .metrics import REGISTRY, HANDLER_SECONDS, HANDLER_ERRORS, CURRENT_STAGES, record_stage
+from .profiling import PROFILE_SESSION
+
+TELEGRAM_API_SECONDS = REGISTRY.histogram('socionics_telegram_api_seconds', "Время запросов к Bot API.", ['method'])
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    HTTP-клиент Bot API, который меряет каждый запрос.
+
+    Используется для отправки ответов (getUpdates идёт через отдельный клиент), поэтому
+    всё его время относится к стадии reply.
+    """
+
+    async def do_request(self, url, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            TELEGRAM_API_SECONDS.observe(elapsed, method=url.rsplit('/', 1)[-1])
+            record_stage('reply', elapsed)
+
+
+def instrument_handler(callback, name=None):
+    """
+    Оборачивает асинхронный обработчик бота: время и исключения попадают в метрики,
+    а id пользователя, имя обработчика и времена стадий — в записи лога. Если в bot_data
+    есть включённый профайлер ('profiler'), часть обновлений профилируется.
+
+    Args:
+        callback (callable): Обработчик (update, context).
+        name (str, optional): Имя в метриках. По умолчанию имя функции.
+
+    Returns:
+        callable: Обработчик с тем же результатом.
+    """
+    handler_name = name or callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        user = getattr(update, 'effective_user', None)
+        context_token = LOG_CONTEXT.set({'user_id': user.id if user else None, 'handler': handler_name})
+        stages = {}
+        stages_token = CURRENT_STAGES.set(stages)
+        profiler = (getattr(context, 'bot_data', None) or {}).get('profiler')
+        profiling = profiler.start(handler_name) if profiler is not None else None
+        session_token = PROFILE_SESSION.set(profiling[0]) if profiling else None
+        start = time.perf_counter()
+        try:
+            return await callback(update, context, *args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=handler_name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            HANDLER_SECONDS.observe(elapsed, handler=handler_name)
+            if profiling:
+                PROFILE_SESSION.reset(session_token)
+                profiler.finish(profiling)
+            logging.getLogger('bot.requests').info(
+                f"{handler_name} обработан за {elapsed * 1000:.1f} мс",
+                extra={
+                    'sample': True,
+                    'duration_ms': round(elapsed * 1000, 2),
+                    'stages': {stage: round(seconds * 1000, 2) for stage, seconds in stages.items()}
+                }
+            )
+            CURRENT_STAGES.reset(stages_token)
+            LOG_CONTEXT.reset(context_token)
+
+    return wrapper
@@ -0,0 +1,107 @@
+# neural_network/bulk_encoding.py
+"""
+Массовое кодирование утверждений с батчами по длине.
+
+Утверждения сортируются по длине в токенах, и подряд идущие утверждения близкой длины
+собираются в батч, пока «батч × самое длинное утверждение» укладывается в бюджет
+токенов. Короткие утверждения не дополняются паддингом до длинных, а батчи коротких
+утверждений получаются крупнее. Результаты пишутся в заранее выделенный массив float32
+на места исходного порядка.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+
+def token_lengths(embedding_model, statements):
+    """
+    Длины утверждений в токенах кодировщика с учётом обрезки по max_seq_length.
+
+    Если у кодировщика нет токенизатора (офлайн-кодировщик), длина оценивается по символам.
+
+    Args:
+        embedding_model (SentenceTransformer): Кодировщик.
+        statements (list): Утверждения.
+
+    Returns:
+        numpy.ndarray: Длины формы (N,).
+    """
+    max_length = getattr(embedding_model, 'max_seq_length', None) or 512
+    tokenizer = getattr(embedding_model, 'tokenizer', None)
+    if tokenizer is not None:
+        encoded = tokenizer(list(statements), add_special_tokens=True, truncation=True, max_length=max_length)
+        lengths = [len(ids) for ids in encoded['input_ids']]
+    else:
+        # Около четырёх символов на токен для русского текста в WordPiece
+        lengths = [len(statement) // 4 + 2 for statement in statements]
+    return np.minimum(np.asarray(lengths, dtype=np.int64), max_length)
+
+
+def length_buckets(lengths, token_budget=16384, max_batch_size=256):
+    """
+    Делит утверждения на батчи близкой длины под бюджет токенов.
+
+    Args:
+        lengths (numpy.ndarray): Длины в токенах.
+        token_budget (int, optional): Максимум «размер батча × самая длинная строка». Defaults to 16384.
+        max_batch_size (int, optional): Максимальный размер батча. Defaults to 256.
+
+    Returns:
+        list: Массивы индексов утверждений для каждого батча, от длинных к коротким.
+    """
+    # От длинных к коротким: первый батч самый тяжёлый, нехватка памяти видна сразу
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = int(min(max_batch_size, max(1, token_budget // longest), len(order) - start))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def encode_bulk(embedding_model, statements, token_budget=16384, max_batch_size=256, normalize_embeddings=False,
+                show_progress=True):
+    """
+    Кодирует большой список утверждений батчами по длине.
+
+    Args:
+        embedding_model (SentenceTransformer): Кодировщик.
+        statements (list): Утверждения.
+        token_budget (int, optional): Бюджет токенов на батч. Defaults to 16384.
+        max_batch_size (int, optional): Максимальный размер батча. Defaults to 256.
+        normalize_embeddings (bool, optional): Нормализовать эмбеддинги. Defaults to False.
+        show_progress (bool, optional): Писать прогресс в лог. Defaults to True.
+
+    Returns:
+        numpy.ndarray: Эмбеддинги формы (N, D) float32 в исходном порядке утверждений.
+    """
+    dim = embedding_model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(statements), dim), dtype=np.float32)
+    if not statements:
+        return embeddings
+
+    start = time.perf_counter()
+    batches = length_buckets(token_lengths(embedding_model, statements), token_budget, max_batch_size)
+    report_every = max(1, len(batches) // 10)
+    done = 0
+    for number, indices in enumerate(batches, start=1):
+        embeddings[indices] = embedding_model.encode(
+            [statements[i] for i in indices],
+            batch_size=len(indices),
+            show_progress_bar=False,
+            normalize_embeddings=normalize_embeddings,
+            convert_to_numpy=True
+        )
+        done += len(indices)
+        if show_progress and (number % report_every == 0 or number == len(batches)):
+            elapsed = time.perf_counter() - start
+            logging.info(f"Закодировано {done}/{len(statements)} утверждений ({done / elapsed:.1f} утв/с).")
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Кодирование {len(statements)} утверждений в {len(batches)} батчах заняло {elapsed:.2f} с "
+                 f"({len(statements) / elapsed:.1f} утв/с).")
+    return embeddings
@@ -0,0 +1,322 @@
+# neural_network/bulk_scoring.py
+"""
+Массовая оценка утверждений из файла.
+
+Входной JSONL или CSV читается потоком по фрагментам; фрагменты кодируются батчами по
+длине и предсказываются в нескольких процессах, при этом в работе одновременно не
+больше 2 × workers фрагментов. Для каждой строки пишутся корреляции, признаки и
+вероятные социотипы: потоковым JSONL или компактным .npy (float32, столбцы описаны в
+<выход>.columns.json). После каждого записанного фрагмента обновляется контрольная
+точка <выход>.checkpoint.json, и прерванный запуск продолжается с --resume.
+
+Пример запуска из корня репозитория:
+    python -m neural_network.bulk_scoring --input survey.jsonl --output scores.jsonl --workers 4
+    python -m neural_network.bulk_scoring --input survey.csv --text-field text --output scores.npy --resume
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    MODEL_PATH,
+    SCALER_PATH,
+    MODEL_BUNDLE_DIR,
+    MODEL_BUNDLE_VERSION,
+    SOCIONICS_TYPES,
+    FUNCTIONS
+)
+from socionics.calculations import TRAITS, calculate_traits_batch, predict_socionics_types_batch
+from .bulk_encoding import encode_bulk
+from .inference import load_serving_stack, predict_from_embeddings
+from .replicas import configure_threads
+
+# Стек модели процесса-воркера: (кодировщик, модель, скейлер)
+_stack = None
+
+
+def read_statements(path, text_field='statement', skip=0):
+    """
+    Потоково читает утверждения из JSONL или CSV (по расширению файла).
+
+    Args:
+        path (str): Входной файл.
+        text_field (str, optional): Поле с текстом утверждения. Defaults to 'statement'.
+        skip (int, optional): Сколько первых строк пропустить (продолжение с контрольной точки). Defaults to 0.
+
+    Yields:
+        str: Утверждения в порядке файла; пустые строки и строки без поля дают ''.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            rows = (row.get(text_field) or '' for row in csv.DictReader(file))
+        else:
+            rows = (_jsonl_text(line, text_field) for line in file)
+        for index, statement in enumerate(rows):
+            if index >= skip:
+                yield statement
+
+
+def _jsonl_text(line, text_field):
+    if not line.strip():
+        return ''
+    row = json.loads(line)
+    # Строка JSONL — объект с полем text_field или просто строка
+    return row if isinstance(row, str) else (row.get(text_field) or '')
+
+
+def count_rows(path):
+    """Число строк данных во входном файле (нужно для размера .npy)."""
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            return sum(1 for _ in csv.DictReader(file))
+        return sum(1 for _ in file)
+
+
+def chunked(statements, chunk_size):
+    chunk = []
+    for statement in statements:
+        chunk.append(statement)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(loader, loader_args, intra_op_threads):
+    global _stack
+    configure_threads(intra_op_threads)
+    _stack = loader(*loader_args)
+
+
+def _score_chunk(statements, token_budget, batch_size):
+    embedding_model, model, scaler = _stack
+    correlations = np.zeros((len(statements), len(FUNCTIONS)), dtype=np.float32)
+    present = [i for i, statement in enumerate(statements) if statement.strip()]
+    if present:
+        embeddings = encode_bulk(embedding_model, [statements[i] for i in present], token_budget=token_budget,
+                                 show_progress=False)
+        correlations[present] = predict_from_embeddings(embeddings, model, scaler, batch_size=batch_size)
+    return correlations
+
+
+class JsonlWriter:
+    """Построчный JSONL: корреляции, признаки и top_types вероятных социотипов."""
+
+    def __init__(self, path, resume_bytes=None, top_types=3):
+        self.file = open(path, 'r+b' if resume_bytes is not None else 'wb')
+        if resume_bytes is not None:
+            # Обрезаем строки, записанные после последней контрольной точки
+            self.file.truncate(resume_bytes)
+            self.file.seek(resume_bytes)
+        self.top_types = top_types
+
+    def write(self, start, statements, correlations, traits, type_names, probabilities):
+        lines = []
+        for offset, statement in enumerate(statements):
+            row = {
+                'index': start + offset,
+                'statement': statement,
+                'correlations': {func: round(float(value), 4) for func, value in zip(FUNCTIONS, correlations[offset])},
+                'traits': {trait: round(float(value), 4) for trait, value in zip(TRAITS, traits[offset])}
+            }
+            if type_names:
+                order = np.argsort(-probabilities[offset])[:self.top_types]
+                row['top_types'] = [[type_names[i], round(float(probabilities[offset, i]), 2)] for i in order]
+            lines.append(json.dumps(row, ensure_ascii=False))
+        self.file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        self.file.flush()
+
+    def position(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class NpyWriter:
+    """Массив float32 формы (N, корреляции + признаки + вероятности типов) в .npy через memory-map."""
+
+    def __init__(self, path, rows, type_names, resume=False):
+        self.columns = list(FUNCTIONS) + list(TRAITS) + list(type_names)
+        if resume:
+            self.array = np.lib.format.open_memmap(path, mode='r+')
+        else:
+            self.array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                   shape=(rows, len(self.columns)))
+            with open(f"{path}.columns.json", 'w', encoding='utf-8') as file:
+                json.dump(self.columns, file, ensure_ascii=False, indent=2)
+
+    def write(self, start, statements, correlations, traits, type_names, probabilities):
+        end = start + len(statements)
+        self.array[start:end] = np.hstack([correlations, traits, probabilities])
+        self.array.flush()
+
+    def position(self):
+        return None
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _save_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(tmp_path, path)
+
+
+def score_file(input_path, output_path, text_field='statement', workers=2, chunk_size=1024, intra_op_threads=1,
+               token_budget=16384, batch_size=256, resume=False, top_types=3, loader=load_serving_stack,
+               loader_args=(EMBEDDING_MODEL_NAME, MODEL_PATH, SCALER_PATH, ENCODER_BACKEND, STUB_ENCODER_DIM,
+                            MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION),
+               socionics_types=SOCIONICS_TYPES):
+    """
+    Оценивает все утверждения входного файла.
+
+    Args:
+        input_path (str): Входной JSONL или CSV.
+        output_path (str): Выходной .jsonl или .npy.
+        text_field (str, optional): Поле с текстом утверждения. Defaults to 'statement'.
+        workers (int, optional): Процессы-воркеры; 0 — в текущем процессе. Defaults to 2.
+        chunk_size (int, optional): Утверждений во фрагменте. Defaults to 1024.
+        intra_op_threads (int, optional): Потоки библиотек на воркер. Defaults to 1.
+        token_budget (int, optional): Бюджет токенов на батч кодировщика. Defaults to 16384.
+        batch_size (int, optional): Батч модели. Defaults to 256.
+        resume (bool, optional): Продолжить с контрольной точки. Defaults to False.
+        top_types (int, optional): Сколько вероятных социотипов писать в JSONL. Defaults to 3.
+        loader (callable, optional): Загрузчик стека модели в воркере (должен сериализоваться pickle).
+        loader_args (tuple, optional): Аргументы загрузчика.
+        socionics_types (dict, optional): Социотипы для вероятностей. Defaults to SOCIONICS_TYPES.
+
+    Returns:
+        int: Число оценённых в этом запуске утверждений.
+    """
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    checkpoint = _load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and checkpoint.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"Контрольная точка {checkpoint_path} относится к другому входному файлу "
+                         f"{checkpoint.get('input')}.")
+    done = checkpoint['rows_done'] if checkpoint else 0
+
+    is_npy = output_path.endswith('.npy')
+    type_names, _ = predict_socionics_types_batch(np.zeros((0, len(TRAITS))), socionics_types)
+    if is_npy:
+        writer = NpyWriter(output_path, None if checkpoint else count_rows(input_path), type_names,
+                           resume=checkpoint is not None)
+    else:
+        writer = JsonlWriter(output_path, checkpoint['output_bytes'] if checkpoint else None, top_types)
+    if checkpoint:
+        logging.info(f"Продолжение с контрольной точки: уже оценено {done} утверждений.")
+
+    chunks = chunked(read_statements(input_path, text_field, skip=done), chunk_size)
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker,
+                                       initargs=(loader, loader_args, intra_op_threads))
+        submit = lambda chunk: executor.submit(_score_chunk, chunk, token_budget, batch_size)
+    else:
+        executor = None
+        _init_worker(loader, loader_args, 0)
+        submit = lambda chunk: _score_chunk(chunk, token_budget, batch_size)
+
+    started = time.perf_counter()
+    scored = 0
+    # Фрагменты в работе: память ограничена 2 × workers фрагментами, порядок вывода сохраняется
+    in_flight = deque()
+    max_in_flight = max(1, 2 * workers)
+    try:
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.append((chunk, submit(chunk)))
+            if not in_flight:
+                break
+            chunk, result = in_flight.popleft()
+            correlations = result.result() if executor is not None else result
+            traits = calculate_traits_batch(correlations)
+            _, probabilities = predict_socionics_types_batch(traits, socionics_types)
+            writer.write(done, chunk, correlations, traits, type_names, probabilities)
+            done += len(chunk)
+            scored += len(chunk)
+            _save_checkpoint(checkpoint_path, {
+                'input': os.path.abspath(input_path),
+                'rows_done': done,
+                'output_bytes': writer.position()
+            })
+            elapsed = time.perf_counter() - started
+            logging.info(f"Оценено {done} утверждений ({scored / elapsed:.1f} утв/с).")
+    finally:
+        writer.close()
+        if executor is not None:
+            for _, result in in_flight:
+                result.cancel()
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Готово: {scored} утверждений за {elapsed:.2f} с ({scored / max(elapsed, 1e-9):.1f} утв/с), "
+                 f"результат в {output_path}.")
+    return scored
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Массовая оценка утверждений из JSONL или CSV.")
+    parser.add_argument('--input', required=True, help="Входной .jsonl или .csv.")
+    parser.add_argument('--output', required=True, help="Выходной .jsonl или .npy.")
+    parser.add_argument('--text-field', default='statement', help="Поле с текстом утверждения.")
+    parser.add_argument('--workers', type=int, default=2, help="Процессы-воркеры (0 — в текущем процессе).")
+    parser.add_argument('--chunk-size', type=int, default=1024, help="Утверждений во фрагменте.")
+    parser.add_argument('--intra-op-threads', type=int, default=1, help="Потоки библиотек на воркер.")
+    parser.add_argument('--token-budget', type=int, default=16384, help="Бюджет токенов на батч кодировщика.")
+    parser.add_argument('--batch-size', type=int, default=256, help="Батч модели.")
+    parser.add_argument('--top-types', type=int, default=3, help="Сколько вероятных социотипов писать в JSONL.")
+    parser.add_argument('--resume', action='store_true', help="Продолжить с контрольной точки.")
+    parser.add_argument('--encoder-backend', default=ENCODER_BACKEND)
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME)
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--scaler-path', default=SCALER_PATH)
+    parser.add_argument('--bundle-dir', default=MODEL_BUNDLE_DIR,
+                        help="Каталог бандлов модели (вместо --model-path и --scaler-path).")
+    parser.add_argument('--bundle-version', default=MODEL_BUNDLE_VERSION, help="Версия бандла (пусто — активная).")
+    args = parser.parse_args()
+
+    score_file(
+        args.input, args.output,
+        text_field=args.text_field,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        intra_op_threads=args.intra_op_threads,
+        token_budget=args.token_budget,
+        batch_size=args.batch_size,
+        resume=args.resume,
+        top_types=args.top_types,
+        loader_args=(args.embedding_model, args.model_path, args.scaler_path, args.encoder_backend, STUB_ENCODER_DIM,
+                     args.bundle_dir, args.bundle_version)
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,519 @@
+# neural_network/bundle.py
+"""
+Версионированные бандлы модели.
+
+Бандл — каталог с manifest.json и weights.bin. Манифест описывает порядок FUNCTIONS,
+кодировщик и размерность эмбеддингов, параметры скейлера и слои MLP, а веса лежат в
+weights.bin сырыми массивами float32 с выравниванием по 64 байта. При загрузке веса
+отображаются в память (mmap) без распаковки pickle и сборки объектов Keras, поэтому
+старт быстрый, а процессы пре-форка и реплик делят одни и те же страницы. Контрольные
+суммы проверяются при загрузке; бандл другого кодировщика или порядка функций
+не загружается.
+
+Несколько версий лежат рядом в одном корневом каталоге, активная записана в файле
+CURRENT:
+
+    models/bundles/
+        CURRENT
+        <версия>/manifest.json
+        <версия>/weights.bin
+
+Экспорт обученной модели и переключение версий:
+    python -m neural_network.bundle export --activate
+    python -m neural_network.bundle list
+    python -m neural_network.bundle activate <версия>
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from .inference import FUNCTIONS
+
+BUNDLE_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+WEIGHTS_FILE = 'weights.bin'
+CURRENT_FILE = 'CURRENT'
+# Выравнивание массивов в weights.bin: каждый массив начинается на границе кэш-линии
+ALIGNMENT = 64
+WEIGHTS_DTYPE = '<f4'
+ACTIVATIONS = {
+    'linear': None,
+    'relu': lambda x: np.maximum(x, 0.0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'sigmoid': lambda x: np.divide(1.0, 1.0 + np.exp(-x, out=x), out=x),
+}
+
+
+class BundleError(Exception):
+    """Бандл повреждён, не найден или не подходит к кодировщику."""
+
+
+class BundleModel:
+    """
+    MLP из бандла на numpy с интерфейсом многовыходной модели Keras.
+
+    Веса — представления над отображённым в память weights.bin; головы функций
+    объединены в один выходной слой.
+    """
+
+    def __init__(self, layers, version='', dropout=None):
+        """
+        Args:
+            layers (list): Кортежи (kernel, bias, activation) от входа к выходу; activation — ключ ACTIVATIONS.
+            version (str, optional): Версия бандла. Defaults to ''.
+            dropout (list, optional): Доля dropout после каждого слоя (для MC-dropout). Defaults to None (нули).
+        """
+        self.layers = layers
+        self.version = version
+        self.dropout = list(dropout) if dropout is not None else [0.0] * len(layers)
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    def predict(self, x, batch_size=64, verbose=0):
+        """
+        Прямой проход без dropout.
+
+        Args:
+            x (numpy.ndarray): Эмбеддинги формы (N, D).
+            batch_size (int, optional): Не используется, оставлен для совместимости с Keras. Defaults to 64.
+            verbose (int, optional): Не используется. Defaults to 0.
+
+        Returns:
+            list: len(FUNCTIONS) массивов формы (N, 1), как у многовыходной модели Keras.
+        """
+        out = self._forward(x)
+        return [out[:, i:i + 1] for i in range(out.shape[1])]
+
+    def predict_stochastic(self, x, seed=None):
+        """
+        Прямой проход с dropout, как Keras при training=True (MC-dropout).
+
+        Args:
+            x (numpy.ndarray): Эмбеддинги формы (N, D).
+            seed (int, optional): Зерно масок dropout. Defaults to None.
+
+        Returns:
+            numpy.ndarray: Выходы формы (N, len(FUNCTIONS)).
+        """
+        return self._forward(x, np.random.default_rng(seed))
+
+    def _forward(self, x, rng=None):
+        out = np.asarray(x, dtype=np.float32)
+        for (kernel, bias, activation), rate in zip(self.layers, self.dropout):
+            out = out @ kernel
+            out += bias
+            if ACTIVATIONS[activation] is not None:
+                out = ACTIVATIONS[activation](out)
+            if rng is not None and rate > 0:
+                # Inverted dropout: сохранённые нейроны масштабируются на 1 / (1 - rate)
+                out *= (rng.random(out.shape, dtype=np.float32) >= rate) / np.float32(1.0 - rate)
+        return out
+
+
+class BundleScaler:
+    """Обратное преобразование MinMaxScaler по параметрам из манифеста."""
+
+    def __init__(self, min_, scale_):
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+def _sha256_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _content_hash(manifest):
+    # Версия содержимого: веса, скейлер, кодировщик и порядок функций, без даты и источника
+    content = {key: manifest[key] for key in ('functions', 'encoder', 'scaler', 'layers', 'weights_sha256')}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def keras_layers(model, functions=FUNCTIONS):
+    """
+    Извлекает слои MLP из многовыходной модели create_multi_output_model.
+
+    Args:
+        model (tensorflow.keras.Model): Обученная модель.
+        functions (list, optional): Порядок функций. Defaults to FUNCTIONS.
+
+    Returns:
+        list: Словари {kernel, bias, activation, dropout} от входа к объединённому выходному слою.
+
+    Raises:
+        BundleError: Архитектура не сводится к цепочке Dense-слоёв с головами функций.
+    """
+    # model.py импортирует TensorFlow; загрузке бандла он не нужен
+    from .model import FUNCTION_NAME_MAPPING
+
+    head_names = {FUNCTION_NAME_MAPPING.get(func, func): func for func in functions}
+    hidden = []
+    heads = {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dense':
+            kernel, bias = layer.get_weights()
+            activation = layer.get_config().get('activation', 'linear')
+            if activation not in ACTIVATIONS:
+                raise BundleError(f"Активация {activation} слоя {layer.name} не поддерживается бандлом.")
+            entry = {'kernel': kernel, 'bias': bias, 'activation': activation, 'dropout': 0.0}
+            if layer.name in head_names:
+                heads[head_names[layer.name]] = entry
+            else:
+                hidden.append(entry)
+        elif kind == 'Dropout' and hidden:
+            hidden[-1]['dropout'] = float(layer.rate)
+        elif kind not in ('InputLayer', 'Dropout'):
+            raise BundleError(f"Слой {layer.name} ({kind}) не поддерживается бандлом.")
+
+    missing = [func for func in functions if func not in heads]
+    if missing:
+        raise BundleError(f"В модели нет голов функций: {', '.join(missing)}.")
+    activations = {heads[func]['activation'] for func in functions}
+    if len(activations) != 1:
+        raise BundleError("Головы функций с разными активациями не объединяются в один слой.")
+
+    output = {
+        'kernel': np.hstack([heads[func]['kernel'] for func in functions]),
+        'bias': np.concatenate([heads[func]['bias'] for func in functions]),
+        'activation': activations.pop(),
+        'dropout': 0.0,
+    }
+    layers = hidden + [output]
+    for previous, layer in zip(layers, layers[1:]):
+        if previous['kernel'].shape[1] != layer['kernel'].shape[0]:
+            raise BundleError("Слои модели не образуют последовательную цепочку.")
+    return layers
+
+
+def export_bundle(model, scaler, root, encoder, version=None, functions=FUNCTIONS, source=None, overwrite=False):
+    """
+    Сохраняет модель и скейлер как новую версию бандла.
+
+    Args:
+        model (tensorflow.keras.Model): Обученная модель.
+        scaler (MinMaxScaler): Обученный скейлер.
+        root (str): Корневой каталог бандлов.
+        encoder (str): Имя кодировщика (encoder_name), на эмбеддингах которого обучена модель.
+        version (str, optional): Имя версии; по умолчанию начало хеша содержимого. Defaults to None.
+        functions (list, optional): Порядок функций. Defaults to FUNCTIONS.
+        source (dict, optional): Откуда взята модель (для справки в манифесте). Defaults to None.
+        overwrite (bool, optional): Заменить существующую версию. Defaults to False.
+
+    Returns:
+        str: Путь к каталогу версии.
+    """
+    layers = keras_layers(model, functions)
+    os.makedirs(root, exist_ok=True)
+    staging = os.path.join(root, f".staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest_layers = []
+    offset = 0
+    with open(os.path.join(staging, WEIGHTS_FILE), 'wb') as f:
+        for layer in layers:
+            entry = {'activation': layer['activation'], 'dropout': layer['dropout']}
+            for key in ('kernel', 'bias'):
+                array = np.ascontiguousarray(layer[key], dtype=WEIGHTS_DTYPE)
+                padding = -offset % ALIGNMENT
+                f.write(b'\0' * padding)
+                offset += padding
+                f.write(array.tobytes())
+                entry[key] = {'offset': offset, 'shape': list(array.shape),
+                              'sha256': hashlib.sha256(array.tobytes()).hexdigest()}
+                offset += array.nbytes
+            manifest_layers.append(entry)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'functions': list(functions),
+        'encoder': {'name': encoder, 'dim': int(layers[0]['kernel'].shape[0])},
+        'scaler': {'min': [float(v) for v in scaler.min_], 'scale': [float(v) for v in scaler.scale_],
+                   'feature_range': [float(v) for v in getattr(scaler, 'feature_range', (-1, 1))]},
+        'dtype': WEIGHTS_DTYPE,
+        'alignment': ALIGNMENT,
+        'layers': manifest_layers,
+        'weights_sha256': _sha256_file(os.path.join(staging, WEIGHTS_FILE)),
+    }
+    manifest['content_hash'] = _content_hash(manifest)
+    manifest['version'] = version or manifest['content_hash'][:12]
+    manifest['created_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    manifest['source'] = source or {}
+    with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    target = os.path.join(root, manifest['version'])
+    if os.path.exists(target):
+        if not overwrite:
+            shutil.rmtree(staging)
+            raise BundleError(f"Версия {manifest['version']} уже есть в {root}.")
+        shutil.rmtree(target)
+    os.replace(staging, target)
+    logging.info(f"Бандл версии {manifest['version']} сохранён в {target} ({offset / 1024:.1f} КБ весов).")
+    return target
+
+
+def active_version(root):
+    """
+    Активная версия из файла CURRENT.
+
+    Args:
+        root (str): Корневой каталог бандлов.
+
+    Returns:
+        str or None: Версия или None, если активная версия не задана.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate_version(root, version):
+    """
+    Делает версию активной. Запись атомарна: процессы видят старую или новую версию.
+
+    Args:
+        root (str): Корневой каталог бандлов.
+        version (str): Версия.
+    """
+    if not os.path.exists(os.path.join(root, version, MANIFEST_FILE)):
+        raise BundleError(f"Версии {version} нет в {root}.")
+    temp_path = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(temp_path, os.path.join(root, CURRENT_FILE))
+    logging.info(f"Активная версия бандла: {version}.")
+
+
+def bundle_path(root, version=''):
+    """
+    Каталог версии: заданной, активной или сам root, если это каталог одной версии.
+
+    Args:
+        root (str): Корневой каталог бандлов или каталог версии.
+        version (str, optional): Версия; пусто — активная. Defaults to ''.
+
+    Returns:
+        str: Путь к каталогу версии.
+    """
+    if not version and os.path.exists(os.path.join(root, MANIFEST_FILE)):
+        return root
+    version = version or active_version(root)
+    if not version:
+        raise BundleError(f"В {root} не задана активная версия бандла (файл {CURRENT_FILE}).")
+    path = os.path.join(root, version)
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        raise BundleError(f"Версии {version} нет в {root}.")
+    return path
+
+
+def read_manifest(root, version=''):
+    """
+    Читает манифест версии.
+
+    Args:
+        root (str): Корневой каталог бандлов или каталог версии.
+        version (str, optional): Версия; пусто — активная. Defaults to ''.
+
+    Returns:
+        dict: Манифест.
+    """
+    with open(os.path.join(bundle_path(root, version), MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise BundleError(f"Неподдерживаемый формат бандла {manifest.get('format')} (ожидается {BUNDLE_FORMAT}).")
+    return manifest
+
+
+def list_versions(root):
+    """
+    Версии бандлов в корневом каталоге.
+
+    Args:
+        root (str): Корневой каталог бандлов.
+
+    Returns:
+        list: Манифесты, от старых к новым.
+    """
+    manifests = []
+    if not os.path.isdir(root):
+        return manifests
+    for name in os.listdir(root):
+        if name.startswith('.') or not os.path.exists(os.path.join(root, name, MANIFEST_FILE)):
+            continue
+        try:
+            manifests.append(read_manifest(root, name))
+        except (BundleError, ValueError) as e:
+            logging.warning(f"Бандл {name} пропущен: {e}")
+    return sorted(manifests, key=lambda manifest: manifest.get('created_at', ''))
+
+
+def check_compatible(manifest, encoder=None, embedding_dim=None, functions=FUNCTIONS):
+    """
+    Проверяет, что бандл подходит к кодировщику и порядку функций.
+
+    Args:
+        manifest (dict): Манифест.
+        encoder (str, optional): Имя текущего кодировщика. Defaults to None (не проверяется).
+        embedding_dim (int, optional): Размерность эмбеддингов кодировщика. Defaults to None.
+        functions (list, optional): Ожидаемый порядок функций. Defaults to FUNCTIONS.
+
+    Raises:
+        BundleError: Бандл не подходит.
+    """
+    if manifest['functions'] != list(functions):
+        raise BundleError(f"Порядок функций бандла {manifest['functions']} не совпадает с {list(functions)}.")
+    if encoder is not None and manifest['encoder']['name'] != encoder:
+        raise BundleError(f"Бандл {manifest['version']} обучен на кодировщике {manifest['encoder']['name']}, "
+                          f"а используется {encoder}.")
+    if embedding_dim is not None and manifest['encoder']['dim'] != embedding_dim:
+        raise BundleError(f"Бандл {manifest['version']} ждёт эмбеддинги размерности {manifest['encoder']['dim']}, "
+                          f"а кодировщик выдаёт {embedding_dim}.")
+
+
+def load_bundle(root, version='', encoder=None, embedding_dim=None, verify=True):
+    """
+    Загружает модель и скейлер из бандла, отображая веса в память.
+
+    Args:
+        root (str): Корневой каталог бандлов или каталог версии.
+        version (str, optional): Версия; пусто — активная. Defaults to ''.
+        encoder (str, optional): Имя текущего кодировщика для проверки. Defaults to None.
+        embedding_dim (int, optional): Размерность эмбеддингов кодировщика для проверки. Defaults to None.
+        verify (bool, optional): Проверить контрольные суммы весов. Defaults to True.
+
+    Returns:
+        tuple: (BundleModel, BundleScaler).
+
+    Raises:
+        BundleError: Бандл не найден, повреждён или не подходит к кодировщику.
+    """
+    path = bundle_path(root, version)
+    manifest = read_manifest(path)
+    check_compatible(manifest, encoder, embedding_dim)
+
+    weights_path = os.path.join(path, WEIGHTS_FILE)
+    if verify and _sha256_file(weights_path) != manifest['weights_sha256']:
+        raise BundleError(f"Контрольная сумма {weights_path} не совпадает с манифестом.")
+    if verify and _content_hash(manifest) != manifest['content_hash']:
+        raise BundleError(f"Манифест бандла {manifest['version']} изменён после экспорта.")
+
+    weights = np.memmap(weights_path, dtype=np.uint8, mode='r')
+    dtype = np.dtype(manifest['dtype'])
+    layers = []
+    for entry in manifest['layers']:
+        if entry['activation'] not in ACTIVATIONS:
+            raise BundleError(f"Неизвестная активация {entry['activation']} в манифесте.")
+        arrays = []
+        for key in ('kernel', 'bias'):
+            spec = entry[key]
+            size = int(np.prod(spec['shape'])) * dtype.itemsize
+            if spec['offset'] + size > weights.size:
+                raise BundleError(f"Массив {key} выходит за пределы {weights_path}.")
+            arrays.append(np.ndarray(tuple(spec['shape']), dtype=dtype, buffer=weights, offset=spec['offset']))
+        layers.append((arrays[0], arrays[1], entry['activation']))
+
+    scaler = BundleScaler(manifest['scaler']['min'], manifest['scaler']['scale'])
+    logging.info(f"Загружен бандл модели версии {manifest['version']} из {path}.")
+    dropout = [entry.get('dropout', 0.0) for entry in manifest['layers']]
+    return BundleModel(layers, manifest['version'], dropout), scaler
+
+
+def parse_args(argv=None):
+    from config.settings import (
+        ENCODER_BACKEND,
+        EMBEDDING_MODEL_NAME,
+        STUB_ENCODER_DIM,
+        MODEL_PATH,
+        SCALER_PATH,
+        MODEL_BUNDLE_DIR
+    )
+    from .encoders import ENCODER_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Версионированные бандлы модели и скейлера.")
+    parser.add_argument('--bundle-dir', default=MODEL_BUNDLE_DIR or os.path.join('models', 'bundles'),
+                        help="Корневой каталог бандлов.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="Сохранить модель Keras и скейлер как новую версию.")
+    export.add_argument('--model-path', default=MODEL_PATH)
+    export.add_argument('--scaler-path', default=SCALER_PATH)
+    export.add_argument('--encoder-backend', default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    export.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME)
+    export.add_argument('--encoder-dim', type=int, default=STUB_ENCODER_DIM)
+    export.add_argument('--version', help="Имя версии (по умолчанию — начало хеша содержимого).")
+    export.add_argument('--activate', action='store_true', help="Сразу сделать версию активной.")
+    export.add_argument('--overwrite', action='store_true', help="Заменить версию с тем же именем.")
+
+    commands.add_parser('list', help="Показать версии.")
+
+    activate = commands.add_parser('activate', help="Сделать версию активной.")
+    activate.add_argument('version')
+
+    verify = commands.add_parser('verify', help="Проверить контрольные суммы версии.")
+    verify.add_argument('version', nargs='?', default='')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    if args.command == 'export':
+        import joblib
+        import tensorflow as tf
+        from .encoders import encoder_name
+
+        model = tf.keras.models.load_model(args.model_path)
+        scaler = joblib.load(args.scaler_path)
+        path = export_bundle(
+            model, scaler, args.bundle_dir,
+            encoder=encoder_name(args.encoder_backend, args.embedding_model, args.encoder_dim),
+            version=args.version,
+            source={'model_path': args.model_path, 'scaler_path': args.scaler_path},
+            overwrite=args.overwrite
+        )
+        # Бандл должен предсказывать то же, что исходная модель
+        bundle_model, bundle_scaler = load_bundle(path)
+        sample = np.random.RandomState(0).normal(size=(16, bundle_model.input_dim)).astype(np.float32)
+        expected = scaler.inverse_transform(np.hstack(model.predict(sample, verbose=0)))
+        actual = bundle_scaler.inverse_transform(np.hstack(bundle_model.predict(sample)))
+        logging.info(f"Максимальное расхождение с моделью Keras: {np.abs(expected - actual).max():.2e}.")
+        if args.activate:
+            activate_version(args.bundle_dir, os.path.basename(path))
+    elif args.command == 'list':
+        current = active_version(args.bundle_dir)
+        for manifest in list_versions(args.bundle_dir):
+            marker = '*' if manifest['version'] == current else ' '
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {manifest['encoder']['name']} "
+                  f"({manifest['encoder']['dim']})  {manifest['content_hash'][:12]}")
+    elif args.command == 'activate':
+        activate_version(args.bundle_dir, args.version)
+    elif args.command == 'verify':
+        load_bundle(args.bundle_dir, args.version, verify=True)
+        print("Контрольные суммы совпадают.")
+
+
+if __name__ == '__main__':
+    main()
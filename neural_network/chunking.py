@@ -0,0 +1,146 @@
+# neural_network/chunking.py
+"""
+Разбиение длинных описаний на фрагменты и объединение корреляций фрагментов.
+
+Кодировщик обрезает текст по max_seq_length, а стоимость внимания растёт квадратично
+с длиной, поэтому длинное описание для /neurotype делится на фрагменты из целых
+предложений (слишком длинные предложения — на окна слов с перекрытием). Фрагменты
+кодируются одним батчем, отсортированным по длине, а корреляции фрагментов
+усредняются с весами.
+"""
+
+import re
+
+import numpy as np
+
+CHUNK_WEIGHTINGS = ['mean', 'length', 'confidence']
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+def split_sentences(text):
+    """
+    Делит текст на предложения по концу предложения и переводам строк.
+
+    Args:
+        text (str): Текст.
+
+    Returns:
+        list: Непустые предложения.
+    """
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def _word_windows(words, max_words, overlap):
+    step = max(1, max_words - overlap)
+    windows = []
+    for start in range(0, len(words), step):
+        windows.append(words[start:start + max_words])
+        if start + max_words >= len(words):
+            break
+    return windows
+
+
+def chunk_text(text, max_words=64, overlap=8, max_chunks=64):
+    """
+    Делит текст на фрагменты не длиннее max_words слов.
+
+    Предложения собираются во фрагменты целиком; предложение длиннее max_words
+    делится на окна слов с перекрытием overlap. Если фрагментов больше max_chunks,
+    берутся равномерно распределённые по тексту фрагменты.
+
+    Args:
+        text (str): Текст.
+        max_words (int, optional): Максимум слов во фрагменте. Defaults to 64.
+        overlap (int, optional): Перекрытие окон внутри длинного предложения. Defaults to 8.
+        max_chunks (int, optional): Максимум фрагментов. Defaults to 64.
+
+    Returns:
+        list: Фрагменты текста; для короткого текста — сам текст.
+    """
+    words_total = len(text.split())
+    if words_total <= max_words:
+        return [text.strip()] if text.strip() else []
+
+    chunks = []
+    current = []
+    for sentence in split_sentences(text):
+        words = sentence.split()
+        if len(words) > max_words:
+            if current:
+                chunks.append(' '.join(current))
+                current = []
+            chunks.extend(' '.join(window) for window in _word_windows(words, max_words, overlap))
+            continue
+        if len(current) + len(words) > max_words:
+            chunks.append(' '.join(current))
+            current = []
+        current.extend(words)
+    if current:
+        chunks.append(' '.join(current))
+
+    if len(chunks) > max_chunks:
+        positions = np.linspace(0, len(chunks) - 1, max_chunks).round().astype(int)
+        chunks = [chunks[i] for i in positions]
+    return chunks
+
+
+def chunk_weights(chunks, correlations, weighting='length'):
+    """
+    Веса фрагментов для объединения корреляций.
+
+    Args:
+        chunks (list): Фрагменты текста.
+        correlations (numpy.ndarray): Корреляции фрагментов формы (N, F).
+        weighting (str, optional): 'mean' — поровну, 'length' — по числу слов,
+            'confidence' — по средней величине |корреляции| фрагмента. Defaults to 'length'.
+
+    Returns:
+        numpy.ndarray: Нормированные веса формы (N,).
+    """
+    if weighting == 'mean':
+        weights = np.ones(len(chunks), dtype=np.float64)
+    elif weighting == 'length':
+        weights = np.array([len(chunk.split()) for chunk in chunks], dtype=np.float64)
+    elif weighting == 'confidence':
+        # Фрагменты без выраженного сигнала (корреляции около нуля) почти не влияют на итог
+        weights = np.abs(np.asarray(correlations, dtype=np.float64)).mean(axis=1)
+    else:
+        raise ValueError(f"Неизвестный способ взвешивания: {weighting}. Доступны: {', '.join(CHUNK_WEIGHTINGS)}")
+    total = weights.sum()
+    if total <= 0:
+        return np.full(len(chunks), 1.0 / len(chunks))
+    return weights / total
+
+
+def aggregate_chunk_correlations(chunks, correlations, weighting='length'):
+    """
+    Объединяет корреляции фрагментов во взвешенное среднее.
+
+    Args:
+        chunks (list): Фрагменты текста.
+        correlations (numpy.ndarray): Корреляции фрагментов формы (N, F).
+        weighting (str, optional): Способ взвешивания из CHUNK_WEIGHTINGS. Defaults to 'length'.
+
+    Returns:
+        numpy.ndarray: Корреляции формы (F,) в диапазоне [-1, 1].
+    """
+    correlations = np.asarray(correlations, dtype=np.float32)
+    weights = chunk_weights(chunks, correlations, weighting)
+    return np.clip(weights @ correlations, -1.0, 1.0).astype(np.float32)
+
+
+def length_sorted(chunks):
+    """
+    Порядок фрагментов по длине: батч из похожих по длине текстов меньше дополняется паддингом.
+
+    Args:
+        chunks (list): Фрагменты текста.
+
+    Returns:
+        tuple: (отсортированные фрагменты, индексы для возврата в исходный порядок).
+    """
+    order = np.argsort([len(chunk) for chunk in chunks], kind='stable')
+    restore = np.empty_like(order)
+    restore[order] = np.arange(len(order))
+    return [chunks[i] for i in order], restore
@@ -0,0 +1,127 @@
+# neural_network/client.py
+
+import asyncio
+import itertools
+import logging
+
+from .deadlines import DeadlineExceeded, check_deadline, remaining_time
+from .protocol import ProtocolError, encode_frame, parse_address, read_frame, unpack_array
+
+
+class InferenceError(Exception):
+    """Сервер инференса вернул ошибку или недоступен после всех повторов."""
+
+
+class InferenceClient:
+    """
+    Асинхронный клиент сервера инференса с пулом соединений, таймаутами и повторами.
+
+    Каждое соединение обслуживает один запрос за раз; свободные соединения возвращаются
+    в пул, сломанные закрываются и пересоздаются при следующем запросе. Интерфейс
+    совпадает с LocalPredictor: await client.predict(statements).
+    """
+
+    def __init__(self, address, pool_size=4, timeout=10.0, retries=2, backoff=0.1):
+        """
+        Args:
+            address (str): 'unix:/путь' или 'tcp://хост:порт'.
+            pool_size (int, optional): Максимум одновременных соединений. Defaults to 4.
+            timeout (float, optional): Таймаут одной попытки в секундах. Defaults to 10.0.
+            retries (int, optional): Количество повторов после неудачной попытки. Defaults to 2.
+            backoff (float, optional): Начальная пауза между повторами, удваивается. Defaults to 0.1.
+        """
+        self.address = address
+        self._parsed = parse_address(address)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._idle = []
+        self._semaphore = None
+        self._ids = itertools.count(1)
+
+    async def _connect(self):
+        if self._parsed[0] == 'unix':
+            return await asyncio.open_unix_connection(self._parsed[1])
+        return await asyncio.open_connection(self._parsed[1], self._parsed[2])
+
+    async def _request(self, message):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+        async with self._semaphore:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            reader, writer = connection
+            try:
+                writer.write(encode_frame(message))
+                await writer.drain()
+                response = await read_frame(reader)
+            except BaseException:
+                # Состояние соединения после ошибки или отмены неизвестно — не возвращаем его в пул
+                writer.close()
+                raise
+            self._idle.append(connection)
+
+        if response.get('id') != message['id']:
+            raise ProtocolError(f"Ответ на запрос {response.get('id')} вместо {message['id']}.")
+        return response
+
+    async def call(self, message):
+        """
+        Отправляет сообщение с таймаутом и повторами.
+
+        Args:
+            message (dict): Сообщение без поля id.
+
+        Returns:
+            dict: Ответ сервера.
+
+        Raises:
+            InferenceError: Сервер вернул ошибку или недоступен.
+            DeadlineExceeded: Срок запроса истёк до ответа сервера.
+        """
+        delay = self.backoff
+        last_error = None
+        for attempt in range(self.retries + 1):
+            # Повтор после сбоя не отправляется, если срок запроса уже истёк
+            check_deadline('client')
+            request = dict(message, id=next(self._ids))
+            remaining = remaining_time()
+            if remaining is not None and 'statements' in message:
+                request['timeout'] = remaining
+            try:
+                response = await asyncio.wait_for(self._request(request), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ProtocolError) as e:
+                last_error = e
+                logging.warning(f"Попытка {attempt + 1} запроса к серверу инференса {self.address} "
+                                f"не удалась: {e!r}")
+                if attempt < self.retries:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                continue
+            if response.get('expired'):
+                raise DeadlineExceeded(response['error'])
+            if 'error' in response:
+                raise InferenceError(response['error'])
+            return response
+        raise InferenceError(f"Сервер инференса {self.address} недоступен: {last_error!r}")
+
+    async def predict(self, statements):
+        """
+        Предсказывает корреляции для списка утверждений на сервере.
+
+        Args:
+            statements (list): Утверждения.
+
+        Returns:
+            numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)).
+        """
+        response = await self.call({'op': 'predict', 'statements': list(statements)})
+        return unpack_array(response)
+
+    async def ping(self):
+        return await self.call({'op': 'ping'})
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
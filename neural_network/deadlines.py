@@ -0,0 +1,78 @@
+# neural_network/deadlines.py
+"""
+Сроки запросов инференса.
+
+Обработчик бота задаёт срок через deadline_scope(); он передаётся через contextvars
+во все предсказатели, в том числе в поток инференса, и в виде оставшегося времени — на
+сервер инференса. Очереди предсказателей проверяют срок перед кодированием и
+отбрасывают просроченные запросы с DeadlineExceeded, не тратя на них время модели.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+from monitoring.metrics import INFERENCE_DROPPED
+
+# Срок текущего запроса по time.monotonic(); None — без срока
+CURRENT_DEADLINE = contextvars.ContextVar('inference_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Срок запроса истёк до начала инференса."""
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Задаёт срок для предсказаний внутри блока.
+
+    Вложенный блок не продлевает уже заданный срок.
+
+    Args:
+        seconds (float): Сколько секунд отводится на запрос; 0 или None — без срока.
+    """
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = CURRENT_DEADLINE.get()
+    token = CURRENT_DEADLINE.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        CURRENT_DEADLINE.reset(token)
+
+
+def remaining_time(deadline=None):
+    """
+    Оставшееся до срока время.
+
+    Args:
+        deadline (float, optional): Срок по time.monotonic(); по умолчанию срок текущего запроса.
+
+    Returns:
+        float or None: Секунды (могут быть отрицательными) или None, если срока нет.
+    """
+    if deadline is None:
+        deadline = CURRENT_DEADLINE.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(where, deadline=None):
+    """
+    Отбрасывает запрос, если его срок истёк.
+
+    Args:
+        where (str): Очередь, в которой проверяется срок (метка метрики).
+        deadline (float, optional): Срок; по умолчанию срок текущего запроса.
+
+    Raises:
+        DeadlineExceeded: Срок истёк.
+    """
+    remaining = remaining_time(deadline)
+    if remaining is not None and remaining <= 0:
+        INFERENCE_DROPPED.inc(queue=where)
+        raise DeadlineExceeded(f"Срок запроса истёк {-remaining:.2f} с назад, запрос отброшен ({where}).")
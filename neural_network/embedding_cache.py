@@ -0,0 +1,153 @@
+# neural_network/embedding_cache.py
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from .bulk_encoding import encode_bulk
+
+
+def embeddings_cache_path(statements, model_name, cache_dir, normalize_embeddings=False):
+    """
+    Возвращает путь к файлу кэша эмбеддингов для набора утверждений.
+
+    Ключ кэша зависит от имени модели и от точного содержимого и порядка утверждений,
+    поэтому любое изменение корпуса приводит к новому файлу.
+
+    Args:
+        statements (list): Список утверждений.
+        model_name (str): Имя модели эмбеддингов.
+        cache_dir (str): Каталог кэша.
+        normalize_embeddings (bool, optional): Нормализуются ли эмбеддинги. Defaults to False.
+
+    Returns:
+        str: Путь к .npy файлу.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'normalized' if normalize_embeddings else b'raw')
+    for statement in statements:
+        digest.update(b'\0')
+        digest.update(statement.encode('utf-8'))
+    safe_model_name = model_name.replace('/', '__')
+    return os.path.join(cache_dir, f"{safe_model_name}-{digest.hexdigest()[:16]}.npy")
+
+
+def cached_encode(embedding_model, statements, model_name, cache_dir, normalize_embeddings=False, mmap=True):
+    """
+    Кодирует утверждения, переиспользуя ранее сохранённые эмбеддинги.
+
+    Args:
+        embedding_model (SentenceTransformer): Модель для генерации эмбеддингов.
+        statements (list): Список утверждений.
+        model_name (str): Имя модели эмбеддингов (часть ключа кэша).
+        cache_dir (str): Каталог кэша.
+        normalize_embeddings (bool, optional): Нормализовать эмбеддинги. Defaults to False.
+        mmap (bool, optional): Открывать кэш через memory-map. Defaults to True.
+
+    Returns:
+        tuple: (numpy.ndarray эмбеддингов формы (N, D) float32, путь к файлу кэша).
+    """
+    path = embeddings_cache_path(statements, model_name, cache_dir, normalize_embeddings)
+    if os.path.exists(path):
+        logging.info(f"Эмбеддинги загружены из кэша {path}.")
+        return np.load(path, mmap_mode='r' if mmap else None), path
+
+    embeddings = encode_bulk(embedding_model, statements, normalize_embeddings=normalize_embeddings)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Пишем во временный файл и переименовываем, чтобы параллельные процессы не прочитали неполный кэш
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, embeddings)
+    os.replace(tmp_path, path)
+    logging.info(f"Эмбеддинги сохранены в кэш {path}.")
+
+    if mmap:
+        return np.load(path, mmap_mode='r'), path
+    return embeddings, path
+
+
+class EmbeddingIndex:
+    """
+    Готовые эмбеддинги известных утверждений (например, банка вопросов).
+
+    Массив обычно открыт через memory-map, поэтому после fork его страницы делятся
+    между процессами и не копируются.
+    """
+
+    def __init__(self, statements, embeddings):
+        """
+        Args:
+            statements (list): Утверждения в порядке строк массива.
+            embeddings (numpy.ndarray): Эмбеддинги формы (N, D).
+        """
+        self.embeddings = embeddings
+        self._rows = {statement: i for i, statement in enumerate(statements)}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def encode(self, embedding_model, statements, batch_size=64):
+        """
+        Возвращает эмбеддинги утверждений, кодируя только отсутствующие в индексе.
+
+        Args:
+            embedding_model (SentenceTransformer): Модель для утверждений вне индекса.
+            statements (list): Утверждения.
+            batch_size (int, optional): Размер батча кодировщика. Defaults to 64.
+
+        Returns:
+            numpy.ndarray: Эмбеддинги формы (N, D) float32.
+        """
+        rows = [self._rows.get(statement) for statement in statements]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        result = np.empty((len(statements), self.embeddings.shape[1]), dtype=np.float32)
+        known = [i for i, row in enumerate(rows) if row is not None]
+        if known:
+            result[known] = self.embeddings[[rows[i] for i in known]]
+        if missing:
+            result[missing] = embedding_model.encode([statements[i] for i in missing], batch_size=batch_size)
+        return result
+
+
+def _encode_to_cache(statements, encoder_backend, model_name, encoder_dim, cache_dir):
+    from .encoders import encoder_name, load_encoder
+    embedding_model = load_encoder(encoder_backend, model_name, encoder_dim)
+    cached_encode(embedding_model, statements, encoder_name(encoder_backend, model_name, encoder_dim), cache_dir)
+
+
+def load_embedding_index(statements, encoder_backend, model_name, encoder_dim, cache_dir):
+    """
+    Открывает индекс эмбеддингов утверждений из кэша через memory-map.
+
+    Если кэша нет, он строится в отдельном процессе (spawn): так вызывающий процесс
+    ни разу не запускает кодировщик и может безопасно делать fork.
+
+    Args:
+        statements (list): Утверждения.
+        encoder_backend (str): Бэкенд кодировщика.
+        model_name (str): Имя модели эмбеддингов.
+        encoder_dim (int): Размерность офлайн-кодировщика.
+        cache_dir (str): Каталог кэша.
+
+    Returns:
+        EmbeddingIndex or None: Индекс с массивом, открытым только для чтения; None для пустого списка.
+    """
+    import multiprocessing
+    from .encoders import encoder_name
+
+    if not statements:
+        return None
+    path = embeddings_cache_path(statements, encoder_name(encoder_backend, model_name, encoder_dim), cache_dir)
+    if not os.path.exists(path):
+        logging.info(f"Кэш эмбеддингов банка вопросов не найден, кодирование {len(statements)} утверждений...")
+        process = multiprocessing.get_context('spawn').Process(
+            target=_encode_to_cache, args=(statements, encoder_backend, model_name, encoder_dim, cache_dir))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Не удалось построить кэш эмбеддингов (код выхода {process.exitcode}).")
+    return EmbeddingIndex(statements, np.load(path, mmap_mode='r'))
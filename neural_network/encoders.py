@@ -0,0 +1,126 @@
+# neural_network/encoders.py
+"""
+Кодировщики утверждений.
+
+Весь код проекта обращается к кодировщику через подмножество интерфейса
+SentenceTransformer: encode(sentences, batch_size=..., show_progress_bar=...,
+normalize_embeddings=...) и get_sentence_embedding_dimension(). Помимо модели
+Hugging Face доступен детерминированный офлайн-кодировщик на хешировании
+символьных n-грамм: он не требует сети и подходит для тестов и бенчмарков
+хранения, батчинга и оценки на реалистичной размерности эмбеддингов.
+"""
+
+import logging
+import zlib
+
+import numpy as np
+
+ENCODER_BACKENDS = ['sentence-transformers', 'hashing']
+
+
+class HashingEncoder:
+    """
+    Детерминированный кодировщик: хеширование символьных n-грамм в вектор фиксированной размерности.
+
+    Каждая n-грамма нормализованного текста отображается через CRC32 в координату и знак,
+    вклад n-граммы сублинейно масштабируется. Результат не зависит от запуска, процесса
+    и PYTHONHASHSEED.
+    """
+
+    def __init__(self, dim=768, ngram_range=(2, 4), max_seq_length=512):
+        """
+        Args:
+            dim (int, optional): Размерность эмбеддингов. Defaults to 768.
+            ngram_range (tuple, optional): Минимальная и максимальная длина n-грамм. Defaults to (2, 4).
+            max_seq_length (int, optional): Максимальная длина текста в символах. Defaults to 512.
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.max_seq_length = max_seq_length
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _encode_one(self, text):
+        text = f" {' '.join(text.lower().split())[:self.max_seq_length]} "
+        counts = {}
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(text) - n + 1):
+                digest = zlib.crc32(text[i:i + n].encode('utf-8'))
+                counts[digest] = counts.get(digest, 0) + 1
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not counts:
+            return vector
+        digests = np.fromiter(counts.keys(), dtype=np.uint32, count=len(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        # Старший бит хеша задаёт знак, чтобы коллизии в среднем гасили друг друга
+        signs = np.where(digests & np.uint32(0x80000000), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (digests % np.uint32(self.dim)).astype(np.intp), signs * weights)
+        return vector / np.sqrt(len(counts))
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, normalize_embeddings=False,
+               convert_to_numpy=True, **kwargs):
+        """
+        Кодирует утверждения. Совместим по сигнатуре с SentenceTransformer.encode.
+
+        Args:
+            sentences (str or list): Утверждение или список утверждений.
+            batch_size (int, optional): Не используется, оставлен для совместимости. Defaults to 32.
+            show_progress_bar (bool, optional): Не используется. Defaults to False.
+            normalize_embeddings (bool, optional): Нормализовать векторы до единичной длины. Defaults to False.
+            convert_to_numpy (bool, optional): Не используется, всегда возвращается numpy. Defaults to True.
+
+        Returns:
+            numpy.ndarray: Эмбеддинги формы (N, dim) float32 или (dim,) для одной строки.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            embeddings[i] = self._encode_one(text)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings[0] if single else embeddings
+
+
+def encoder_name(backend, model_name, dim=768):
+    """
+    Возвращает имя кодировщика, используемое в ключах кэша и отчётах.
+
+    Args:
+        backend (str): Бэкенд из ENCODER_BACKENDS.
+        model_name (str): Имя модели Hugging Face.
+        dim (int, optional): Размерность офлайн-кодировщика. Defaults to 768.
+
+    Returns:
+        str: Имя кодировщика.
+    """
+    if backend == 'hashing':
+        return f"hashing-{dim}"
+    return model_name
+
+
+def load_encoder(backend, model_name, dim=768):
+    """
+    Создаёт кодировщик выбранного бэкенда.
+
+    Args:
+        backend (str): 'sentence-transformers' или 'hashing'.
+        model_name (str): Имя модели Hugging Face (для 'sentence-transformers').
+        dim (int, optional): Размерность офлайн-кодировщика. Defaults to 768.
+
+    Returns:
+        object: Кодировщик с интерфейсом SentenceTransformer.encode.
+    """
+    if backend == 'hashing':
+        logging.info(f"Используется офлайн-кодировщик на хешировании n-грамм (размерность {dim}).")
+        return HashingEncoder(dim=dim)
+    if backend == 'sentence-transformers':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    raise ValueError(f"Неизвестный бэкенд кодировщика: {backend}. Доступны: {', '.join(ENCODER_BACKENDS)}")
@@ -0,0 +1,190 @@
+# neural_network/evaluate.py
+"""
+Пакетная оценка обслуживающей модели без дисплея.
+
+Загружает модель эмбеддингов, нейронную сеть и скейлер один раз, предсказывает весь
+набор утверждений батчами и записывает метрики точности вместе с задержками в JSON.
+Графики ошибок (PNG) строятся по желанию через безголовый backend matplotlib.
+
+Пример запуска из корня репозитория:
+    python -m neural_network.evaluate --data data/talanovstatements.json --plots
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    MODEL_PATH,
+    SCALER_PATH,
+    MODEL_BUNDLE_DIR,
+    MODEL_BUNDLE_VERSION,
+    TALANOV_STATEMENTS_FILE,
+    FUNCTIONS
+)
+from .encoders import ENCODER_BACKENDS, encoder_name
+from .evaluation import correlations_to_array, evaluate_predictions
+from .inference import load_serving_stack, predict_from_embeddings
+from .utils import load_labeled_statements
+
+
+def get_x_ticks(num_statements_count):
+    """
+    Определяет позиции меток на оси X в зависимости от количества утверждений.
+
+    Args:
+        num_statements_count (int): Общее количество утверждений.
+
+    Returns:
+        list: Позиции меток оси X.
+    """
+    if num_statements_count <= 10:
+        return list(range(1, num_statements_count + 1))
+    elif num_statements_count <= 20:
+        return list(range(1, num_statements_count + 1, 2))
+    elif num_statements_count <= 30:
+        return list(range(1, num_statements_count + 1, 3))
+    else:
+        step = max(1, num_statements_count // 10)
+        return list(range(1, num_statements_count + 1, step))
+
+
+def plot_errors(errors, title, output_file):
+    """
+    Строит и сохраняет график ошибки по каждому утверждению без вывода на экран.
+
+    Args:
+        errors (numpy.ndarray): Ошибка по каждому утверждению.
+        title (str): Заголовок графика.
+        output_file (str): Путь к PNG файлу.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    num_statements = np.arange(1, len(errors) + 1)
+    fig = plt.figure(figsize=(12, 6))
+    plt.plot(num_statements, errors, marker='o', linestyle='-', color='blue')
+    plt.title(title)
+    plt.xlabel('Номер утверждения')
+    plt.ylabel('Ошибка предсказания')
+    plt.xticks(get_x_ticks(len(errors)))
+    plt.grid(True)
+    plt.tight_layout()
+    fig.savefig(output_file)
+    plt.close(fig)
+
+
+def run_evaluation(statements, actual, embedding_model, model, scaler, batch_size=64):
+    """
+    Предсказывает корреляции для всего набора батчами и считает метрики.
+
+    Args:
+        statements (list): Утверждения.
+        actual (numpy.ndarray): Истинные корреляции формы (N, F).
+        embedding_model (SentenceTransformer): Модель для генерации эмбеддингов.
+        model (tensorflow.keras.Model): Нейронная сеть.
+        scaler (MinMaxScaler): Скейлер меток.
+        batch_size (int, optional): Размер батча. Defaults to 64.
+
+    Returns:
+        tuple: (словарь метрик, ошибки по утверждениям).
+    """
+    start = time.perf_counter()
+    embeddings = embedding_model.encode(statements, batch_size=batch_size)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = predict_from_embeddings(embeddings, model, scaler, batch_size=batch_size)
+    predict_time = time.perf_counter() - start
+
+    metrics = evaluate_predictions(actual, predicted, FUNCTIONS)
+    statement_errors = metrics.pop('statement_errors')
+
+    total_time = encode_time + predict_time
+    count = max(len(statements), 1)
+    metrics['statements'] = len(statements)
+    metrics['batch_size'] = batch_size
+    metrics['latency'] = {
+        'encode_s': encode_time,
+        'predict_s': predict_time,
+        'total_s': total_time,
+        'per_statement_ms': total_time / count * 1000,
+        'statements_per_s': len(statements) / total_time if total_time > 0 else 0.0,
+    }
+    return metrics, statement_errors
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная оценка модели предсказания корреляций.")
+    parser.add_argument('--data', default=TALANOV_STATEMENTS_FILE, help="Файл с размеченными утверждениями.")
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--scaler-path', default=SCALER_PATH)
+    parser.add_argument('--bundle-dir', default=MODEL_BUNDLE_DIR,
+                        help="Каталог бандлов модели (вместо --model-path и --scaler-path).")
+    parser.add_argument('--bundle-version', default=MODEL_BUNDLE_VERSION, help="Версия бандла (пусто — активная).")
+    parser.add_argument('--encoder-backend', default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--output-dir', default='test', help="Каталог для метрик и графиков.")
+    parser.add_argument('--plots', action='store_true', help="Сохранить PNG графики ошибок.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    statements, correlations = load_labeled_statements(args.data)
+    actual = correlations_to_array(correlations, FUNCTIONS)
+
+    start = time.perf_counter()
+    embedding_model, model, scaler = load_serving_stack(
+        args.embedding_model, args.model_path, args.scaler_path, args.encoder_backend, STUB_ENCODER_DIM,
+        args.bundle_dir, args.bundle_version
+    )
+    load_time = time.perf_counter() - start
+
+    metrics, statement_errors = run_evaluation(
+        statements, actual, embedding_model, model, scaler, batch_size=args.batch_size
+    )
+    metrics['latency']['load_s'] = load_time
+    metrics['data'] = args.data
+    metrics['model_path'] = args.model_path
+    if args.bundle_dir:
+        metrics['model_bundle'] = os.path.join(args.bundle_dir, args.bundle_version)
+    metrics['embedding_model'] = encoder_name(args.encoder_backend, args.embedding_model, STUB_ENCODER_DIM)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    metrics_path = os.path.join(args.output_dir, 'evaluation_metrics.json')
+    with open(metrics_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=4)
+
+    if args.plots:
+        plot_errors(
+            statement_errors,
+            'Ошибка предсказания модели по каждому утверждению',
+            os.path.join(args.output_dir, 'prediction_error_individual.png')
+        )
+
+    print(f"Предсказательная точность модели: {metrics['accuracy']:.2f}%")
+    print(f"Задержка: {metrics['latency']['total_s']:.2f} с всего, "
+          f"{metrics['latency']['per_statement_ms']:.2f} мс на утверждение")
+    print("\nЛучшие предсказываемые функции:")
+    for func, error in metrics['best_functions']:
+        print(f"{func}: Средняя ошибка = {error:.4f}")
+    print("\nХудшие предсказываемые функции:")
+    for func, error in metrics['worst_functions']:
+        print(f"{func}: Средняя ошибка = {error:.4f}")
+    print(f"\nМетрики сохранены в {metrics_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# neural_network/evaluation.py
+
+import numpy as np
+
+FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
+
+
+def correlations_to_array(correlations, functions=FUNCTIONS):
+    """
+    Преобразует список словарей корреляций в двумерный numpy массив.
+
+    Args:
+        correlations (list): Список словарей с корреляциями.
+        functions (list, optional): Порядок функций. Defaults to FUNCTIONS.
+
+    Returns:
+        numpy.ndarray: Массив формы (N, len(functions)) float32.
+    """
+    return np.array([[entry.get(func, 0.0) for func in functions] for entry in correlations], dtype=np.float32)
+
+
+def calculate_accuracy(total_error, max_possible_error):
+    """
+    Рассчитывает предсказательную точность модели в процентах.
+
+    Args:
+        total_error (float): Суммарная ошибка модели.
+        max_possible_error (float): Максимально возможная ошибка.
+
+    Returns:
+        float: Точность в процентах.
+    """
+    if max_possible_error == 0:
+        return 100.0
+    return max(0.0, 100 - (total_error / max_possible_error) * 100)
+
+
+def correlation_errors(actual, predicted):
+    """
+    Вычисляет ошибку как разницу модулей корреляций для каждой пары (утверждение, функция).
+
+    Args:
+        actual (numpy.ndarray): Истинные корреляции формы (N, F).
+        predicted (numpy.ndarray): Предсказанные корреляции формы (N, F).
+
+    Returns:
+        numpy.ndarray: Ошибки формы (N, F).
+    """
+    return np.abs(np.abs(actual) - np.abs(predicted))
+
+
+def evaluate_predictions(actual, predicted, functions=FUNCTIONS, top_n=3):
+    """
+    Считает метрики качества предсказаний векторно по всему набору.
+
+    Точность определяется так же, как в исторических скриптах проверки: максимальная
+    ошибка на одно утверждение равна 2 * количество функций.
+
+    Args:
+        actual (numpy.ndarray): Истинные корреляции формы (N, F).
+        predicted (numpy.ndarray): Предсказанные корреляции формы (N, F).
+        functions (list, optional): Порядок функций. Defaults to FUNCTIONS.
+        top_n (int, optional): Количество лучших и худших функций в отчёте. Defaults to 3.
+
+    Returns:
+        dict: Точность, MAE, ошибки по функциям и по утверждениям.
+    """
+    errors = correlation_errors(actual, predicted)
+    statement_errors = errors.sum(axis=1)
+    max_possible_error = len(actual) * len(functions) * 2
+    function_errors = dict(zip(functions, errors.mean(axis=0).tolist())) if len(actual) else {}
+    sorted_functions = sorted(function_errors.items(), key=lambda item: item[1])
+
+    return {
+        'accuracy': calculate_accuracy(float(statement_errors.sum()), max_possible_error),
+        'mae': float(np.abs(actual - predicted).mean()) if len(actual) else 0.0,
+        'function_errors': function_errors,
+        'best_functions': sorted_functions[:top_n],
+        'worst_functions': list(reversed(sorted_functions[-top_n:])),
+        'statement_errors': statement_errors,
+    }
@@ -1,23 +1,26 @@
 # experimentals.py
+# Запуск из корня репозитория: python -m neural_network.experimental
 
 import json
 import numpy as np
 import joblib
 import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
-from sklearn.multioutput import MultiOutputRegressor
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
-from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import StandardScaler
+from neural_network.embedding_cache import cached_encode
+from neural_network.encoders import encoder_name, load_encoder
+from config.settings import ENCODER_BACKEND, STUB_ENCODER_DIM
 
 # Параметры
 MODEL_NAME = "deepvk/USER-bge-m3"
-TRAIN_DATA_PATH = "../data/talanovstatements.json"  # Путь к обучающей выборке
-TEST_DATA_PATH = "../data/talanovtestingstatements.json"    # Путь к тестовой выборке
-SCALER_PATH = "../models/new_label_scaler.pkl"  # Путь к скейлеру
-OUTPUT_PLOT_TRAIN = "experimentals_train_error_plot.png"  # Имя файла для графика обучения
-OUTPUT_PLOT_TEST = "experimentals_test_error_plot.png"  # Имя файла для графика тестирования
+TRAIN_DATA_PATH = "data/talanovstatements.json"  # Путь к обучающей выборке
+TEST_DATA_PATH = "data/talanovtestingstatements.json"    # Путь к тестовой выборке
+SCALER_PATH = "models/new_label_scaler.pkl"  # Путь к скейлеру
+EMBEDDING_CACHE_DIR = "models/embeddings_cache"  # Каталог кэша эмбеддингов
+OUTPUT_PLOT_TRAIN = "neural_network/experimentals_train_error_plot.png"  # Имя файла для графика обучения
+OUTPUT_PLOT_TEST = "neural_network/experimentals_test_error_plot.png"  # Имя файла для графика тестирования
 
 FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
 
@@ -43,17 +46,18 @@ def correlations_to_array(correlations, functions):
 
 
 def encode_statements(model, statements):
-    """Преобразует утверждения в эмбеддинги с помощью модели."""
-    embeddings = model.encode(statements, normalize_embeddings=True)
+    """Преобразует утверждения в эмбеддинги с помощью модели, переиспользуя кэш с прошлых запусков."""
+    name = encoder_name(ENCODER_BACKEND, MODEL_NAME, STUB_ENCODER_DIM)
+    embeddings, _ = cached_encode(model, statements, name, EMBEDDING_CACHE_DIR, normalize_embeddings=True)
     return embeddings
 
 
 def train_regressor(X_train, y_train):
     """Обучает многовыходную регрессионную модель."""
-    base_regressor = RandomForestRegressor(n_estimators=100, random_state=42)
-    multi_regressor = MultiOutputRegressor(base_regressor)
-    multi_regressor.fit(X_train, y_train)
-    return multi_regressor
+    # RandomForest поддерживает несколько выходов нативно: один лес на все функции, деревья строятся на всех ядрах
+    regressor = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    regressor.fit(X_train, y_train)
+    return regressor
 
 
 def calculate_accuracy(total_error, max_possible_error):
@@ -138,7 +142,7 @@ def main():
 
     # Загрузка модели эмбеддингов
     print(f"Загрузка модели эмбеддингов: {MODEL_NAME}...")
-    embedding_model = SentenceTransformer(MODEL_NAME)
+    embedding_model = load_encoder(ENCODER_BACKEND, MODEL_NAME, STUB_ENCODER_DIM)
 
     # Извлечение эмбеддингов для обучающих данных
     print("Извлечение эмбеддингов для обучающих данных...")
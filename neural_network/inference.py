@@ -1,9 +1,18 @@
 # neural_network/inference.py
 
+import asyncio
+import contextvars
+import functools
 import json
 import numpy as np
 import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from monitoring.metrics import STATEMENTS_PREDICTED, observe_stage, record_stage
+from monitoring.profiling import run_profiled
+from .deadlines import check_deadline
+from .encoders import encoder_name
 from socionics.data_processing import load_feedback_data
 from .utils import preprocess_statement, postprocess_predictions
 
@@ -27,6 +36,34 @@ def predict_correlations(statement, embedding_model, model, scaler, talanov_data
     Returns:
         dict: Словарь с корреляциями функций.
     """
+    known = find_known_correlations(statement, user_data_file, user_statements_file)
+    if known is not None:
+        return known
+
+    # Если не найдено, предсказываем
+    correlations = correlations_from_array(
+        predict_correlations_batch([statement], embedding_model, model, scaler)[0]
+    )
+
+    # Текст пользователя — только на уровне DEBUG
+    logging.info(f"Корреляции предсказаны для утверждения ({len(statement)} символов).")
+    logging.debug(f"Корреляции предсказаны для утверждения: {statement}")
+
+    return correlations
+
+
+def find_known_correlations(statement, user_data_file, user_statements_file):
+    """
+    Ищет утверждение среди пользовательских утверждений и обратной связи.
+
+    Args:
+        statement (str): Утверждение для поиска.
+        user_data_file (str): Путь к файлу с обратной связью пользователей.
+        user_statements_file (str): Путь к файлу с пользовательскими утверждениями.
+
+    Returns:
+        dict or None: Сохранённые корреляции или None, если утверждение не найдено.
+    """
     statement_clean = statement.strip().lower()
 
     # Проверка в пользовательских утверждениях
@@ -48,21 +85,177 @@ def predict_correlations(statement, embedding_model, model, scaler, talanov_data
             logging.info("Утверждение найдено в обратной связи.")
             return entry.get('function_correlation', entry.get('correlations', {}))
 
-    # Если не найдено, предсказываем
-    emb = embedding_model.encode([statement])
-    predictions = model.predict(emb)
+    return None
 
-    # Формируем словарь предсказаний
-    prediction_dict = {}
-    for i, func in enumerate(FUNCTIONS):
-        prediction_dict[func] = predictions[i][0][0]  # Предполагается, что predictions[i] имеет форму (1,1)
 
-    # Обратное масштабирование и ограничение значений
-    prediction_array = np.array([prediction_dict[func] for func in FUNCTIONS]).reshape(1, -1)
-    prediction_scaled = scaler.inverse_transform(prediction_array)[0]
+def predict_correlations_batch(statements, embedding_model, model, scaler, batch_size=64, embedding_index=None):
+    """
+    Предсказывает корреляции для списка утверждений за один проход кодировщика и модели.
 
-    correlations = {func: max(-1.0, min(1.0, prediction_scaled[i])) for i, func in enumerate(FUNCTIONS)}
+    Args:
+        statements (list): Список утверждений.
+        embedding_model (SentenceTransformer): Модель для генерации эмбеддингов.
+        model (tensorflow.keras.Model): Загруженная модель нейронной сети.
+        scaler (MinMaxScaler): Скейлер для обратного преобразования предсказаний.
+        batch_size (int, optional): Размер батча кодировщика и модели. Defaults to 64.
+        embedding_index (EmbeddingIndex, optional): Готовые эмбеддинги известных утверждений. Defaults to None.
 
-    logging.info(f"Корреляции предсказаны для утверждения: {statement}")
+    Returns:
+        numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)) в диапазоне [-1, 1].
+    """
+    if not statements:
+        return np.zeros((0, len(FUNCTIONS)), dtype=np.float32)
+    with observe_stage('encode'):
+        if embedding_index is not None:
+            embeddings = embedding_index.encode(embedding_model, statements, batch_size=batch_size)
+        else:
+            embeddings = embedding_model.encode(statements, batch_size=batch_size)
+    return predict_from_embeddings(embeddings, model, scaler, batch_size=batch_size)
 
-    return correlations
+
+def predict_from_embeddings(embeddings, model, scaler, batch_size=64):
+    """
+    Предсказывает корреляции по готовым эмбеддингам.
+
+    Args:
+        embeddings (numpy.ndarray): Эмбеддинги формы (N, D).
+        model (tensorflow.keras.Model): Загруженная модель нейронной сети.
+        scaler (MinMaxScaler): Скейлер для обратного преобразования предсказаний.
+        batch_size (int, optional): Размер батча модели. Defaults to 64.
+
+    Returns:
+        numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)) в диапазоне [-1, 1].
+    """
+    # Многовыходная модель возвращает список из len(FUNCTIONS) массивов формы (N, 1)
+    with observe_stage('predict'):
+        predictions = model.predict(embeddings, batch_size=batch_size, verbose=0)
+    STATEMENTS_PREDICTED.inc(len(embeddings))
+    prediction_array = np.hstack(predictions)
+    return np.clip(scaler.inverse_transform(prediction_array), -1.0, 1.0).astype(np.float32)
+
+
+def correlations_from_array(row):
+    """
+    Преобразует строку массива корреляций в словарь {функция: значение}.
+
+    Args:
+        row (numpy.ndarray): Корреляции в порядке FUNCTIONS.
+
+    Returns:
+        dict: Словарь с корреляциями функций.
+    """
+    return {func: float(row[i]) for i, func in enumerate(FUNCTIONS)}
+
+
+def load_serving_stack(embedding_model_name, model_path, scaler_path, encoder_backend='sentence-transformers',
+                       encoder_dim=768, bundle_dir='', bundle_version=''):
+    """
+    Загружает модель эмбеддингов, нейронную сеть и скейлер для предсказаний.
+
+    Args:
+        embedding_model_name (str): Имя модели эмбеддингов.
+        model_path (str): Путь к сохранённой модели Keras.
+        scaler_path (str): Путь к сохранённому скейлеру.
+        encoder_backend (str, optional): Бэкенд кодировщика. Defaults to 'sentence-transformers'.
+        encoder_dim (int, optional): Размерность офлайн-кодировщика. Defaults to 768.
+        bundle_dir (str, optional): Каталог бандлов; если задан, модель и скейлер берутся из бандла. Defaults to ''.
+        bundle_version (str, optional): Версия бандла; пусто — активная. Defaults to ''.
+
+    Returns:
+        tuple: (embedding_model, model, scaler).
+    """
+    from .encoders import load_encoder
+
+    embedding_model = load_encoder(encoder_backend, embedding_model_name, encoder_dim)
+    model, scaler = load_model_and_scaler(model_path, scaler_path, bundle_dir, bundle_version,
+                                          encoder_name(encoder_backend, embedding_model_name, encoder_dim))
+    return embedding_model, model, scaler
+
+
+def load_model_and_scaler(model_path, scaler_path, bundle_dir='', bundle_version='', encoder=None):
+    """
+    Загружает нейронную сеть и скейлер: из бандла, если задан bundle_dir, иначе из Keras и joblib.
+
+    Args:
+        model_path (str): Путь к сохранённой модели Keras.
+        scaler_path (str): Путь к сохранённому скейлеру.
+        bundle_dir (str, optional): Каталог бандлов. Defaults to ''.
+        bundle_version (str, optional): Версия бандла; пусто — активная. Defaults to ''.
+        encoder (str, optional): Имя кодировщика, с которым должен совпадать бандл. Defaults to None.
+
+    Returns:
+        tuple: (model, scaler).
+    """
+    if bundle_dir:
+        from .bundle import load_bundle
+        return load_bundle(bundle_dir, bundle_version, encoder=encoder)
+
+    import joblib
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    scaler = joblib.load(scaler_path)
+    return model, scaler
+
+
+class LocalPredictor:
+    """
+    Предсказатель в текущем процессе.
+
+    Кодирование и прямой проход выполняются в отдельном потоке, чтобы не блокировать
+    цикл событий бота; один поток по умолчанию сериализует обращения к модели.
+    """
+
+    def __init__(self, embedding_model, model, scaler, executor=None, embedding_index=None):
+        self.embedding_model = embedding_model
+        self.model = model
+        self.scaler = scaler
+        self.embedding_index = embedding_index
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+
+    async def predict(self, statements):
+        """
+        Предсказывает корреляции для списка утверждений.
+
+        Args:
+            statements (list): Утверждения.
+
+        Returns:
+            numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)).
+        """
+        return await self._submit(predict_correlations_batch, statements, self.embedding_model, self.model,
+                                  self.scaler, embedding_index=self.embedding_index)
+
+    async def predict_uncertainty(self, statements, samples):
+        """
+        Предсказывает корреляции и samples стохастических проходов MC-dropout по одному кодированию.
+
+        Args:
+            statements (list): Утверждения.
+            samples (int): Число проходов.
+
+        Returns:
+            tuple: (корреляции формы (N, F), проходы формы (N, samples, F)).
+        """
+        from .uncertainty import predict_with_uncertainty
+
+        return await self._submit(predict_with_uncertainty, statements, self.embedding_model, self.model,
+                                  self.scaler, samples, embedding_index=self.embedding_index)
+
+    async def _submit(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+
+        def run():
+            # Время ожидания свободного потока инференса
+            record_stage('queue_wait', time.perf_counter() - submitted)
+            # Просроченный запрос не занимает кодировщик и модель
+            check_deadline('local')
+            return run_profiled(func, *args, **kwargs)
+
+        # Контекст копируется, как в asyncio.to_thread, чтобы contextvars были видны в потоке
+        call = functools.partial(contextvars.copy_context().run, run)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,314 @@
+# neural_network/model_selection.py
+"""
+Сравнение регрессионных «голов» поверх общих эмбеддингов.
+
+Эмбеддинги корпуса считаются один раз и кэшируются на диске, после чего каждая пара
+(голова, фолд) обучается в отдельном процессе пула. Процессы открывают кэш через
+memory-map, поэтому матрица эмбеддингов не копируется в каждый из них.
+
+Пример запуска из корня репозитория:
+    python -m neural_network.model_selection --folds 5 --jobs 4 --min-accuracy 80
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import MinMaxScaler
+
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    EMBEDDING_CACHE_DIR,
+    TALANOV_STATEMENTS_FILE,
+    USER_STATEMENTS_FILE,
+    FUNCTIONS
+)
+from .evaluation import correlations_to_array, evaluate_predictions
+from .embedding_cache import cached_encode
+from .encoders import ENCODER_BACKENDS, encoder_name, load_encoder
+from .utils import load_labeled_statements
+
+HEADS = ['mlp', 'random_forest', 'ridge', 'knn']
+
+# Сколько раз повторять предсказание одного утверждения при замере задержки
+SINGLE_LATENCY_REPEATS = 20
+
+
+def _build_head(head, params, input_dim):
+    """
+    Создаёт регрессор для заданной головы.
+
+    Args:
+        head (str): Имя головы из HEADS.
+        params (dict): Гиперпараметры запуска.
+        input_dim (int): Размерность эмбеддингов.
+
+    Returns:
+        object: Модель с методами fit/predict.
+    """
+    if head == 'mlp':
+        from .model import create_multi_output_model
+        return create_multi_output_model(input_dim, FUNCTIONS)
+    if head == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+        # RandomForestRegressor поддерживает несколько выходов нативно: один лес вместо двенадцати
+        return RandomForestRegressor(
+            n_estimators=params['rf_estimators'],
+            n_jobs=params['rf_jobs'],
+            random_state=42
+        )
+    if head == 'ridge':
+        from sklearn.linear_model import Ridge
+        return Ridge(alpha=params['ridge_alpha'])
+    if head == 'knn':
+        from sklearn.neighbors import KNeighborsRegressor
+        return KNeighborsRegressor(n_neighbors=params['knn_neighbors'], weights='distance')
+    raise ValueError(f"Неизвестная голова: {head}")
+
+
+def _fit(head, regressor, X, y, params):
+    if head == 'mlp':
+        y_list = [y[:, i].reshape(-1, 1) for i in range(y.shape[1])]
+        regressor.fit(X, y_list, epochs=params['mlp_epochs'], batch_size=32, verbose=0)
+    else:
+        regressor.fit(X, y)
+
+
+def _predict(head, regressor, X):
+    if head == 'mlp':
+        return np.hstack(regressor.predict(X, verbose=0))
+    return regressor.predict(X)
+
+
+def _model_size_bytes(head, regressor):
+    if head == 'mlp':
+        # Веса Keras хранятся в float32
+        return int(regressor.count_params() * 4)
+    return len(pickle.dumps(regressor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def evaluate_fold(head, fold, train_idx, test_idx, embeddings_path, labels, params):
+    """
+    Обучает и оценивает одну голову на одном фолде. Выполняется в процессе пула.
+
+    Args:
+        head (str): Имя головы.
+        fold (int): Номер фолда.
+        train_idx (numpy.ndarray): Индексы обучающей части.
+        test_idx (numpy.ndarray): Индексы тестовой части.
+        embeddings_path (str): Путь к кэшу эмбеддингов (.npy).
+        labels (numpy.ndarray): Истинные корреляции формы (N, F).
+        params (dict): Гиперпараметры запуска.
+
+    Returns:
+        dict: Метрики фолда.
+    """
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    X_train = np.asarray(embeddings[train_idx])
+    X_test = np.asarray(embeddings[test_idx])
+    y_train, y_test = labels[train_idx], labels[test_idx]
+
+    # Масштабирование меток, как в train_and_save_model
+    scaler = MinMaxScaler(feature_range=(-1, 1))
+    y_train_scaled = scaler.fit_transform(y_train)
+
+    regressor = _build_head(head, params, X_train.shape[1])
+
+    start = time.perf_counter()
+    _fit(head, regressor, X_train, y_train_scaled, params)
+    train_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted_scaled = _predict(head, regressor, X_test)
+    batch_latency = time.perf_counter() - start
+
+    # Бот предсказывает по одному утверждению, поэтому отдельно меряем задержку одиночного вызова
+    single = X_test[:1]
+    start = time.perf_counter()
+    for _ in range(SINGLE_LATENCY_REPEATS):
+        _predict(head, regressor, single)
+    single_latency = (time.perf_counter() - start) / SINGLE_LATENCY_REPEATS
+
+    predicted = np.clip(scaler.inverse_transform(predicted_scaled), -1.0, 1.0)
+    metrics = evaluate_predictions(y_test, predicted)
+
+    return {
+        'head': head,
+        'fold': fold,
+        'accuracy': metrics['accuracy'],
+        'mae': metrics['mae'],
+        'train_time_s': train_time,
+        'batch_latency_ms_per_statement': batch_latency / max(len(test_idx), 1) * 1000,
+        'single_latency_ms': single_latency * 1000,
+        'model_size_bytes': _model_size_bytes(head, regressor),
+    }
+
+
+def aggregate_results(fold_results):
+    """
+    Усредняет метрики по фолдам для каждой головы.
+
+    Args:
+        fold_results (list): Результаты evaluate_fold.
+
+    Returns:
+        list: Сводка по головам (среднее и стандартное отклонение метрик).
+    """
+    metric_names = ['accuracy', 'mae', 'train_time_s', 'batch_latency_ms_per_statement',
+                    'single_latency_ms', 'model_size_bytes']
+    summary = []
+    for head in sorted({result['head'] for result in fold_results}):
+        head_results = [result for result in fold_results if result['head'] == head]
+        row = {'head': head, 'folds': len(head_results)}
+        for name in metric_names:
+            values = np.array([result[name] for result in head_results], dtype=np.float64)
+            row[name] = float(values.mean())
+            row[f"{name}_std"] = float(values.std())
+        summary.append(row)
+    return summary
+
+
+def pick_cheapest(summary, min_accuracy):
+    """
+    Выбирает самую дешёвую голову, проходящую порог точности.
+
+    Дешевизна определяется задержкой одиночного предсказания, затем размером модели.
+
+    Args:
+        summary (list): Сводка aggregate_results.
+        min_accuracy (float): Минимальная допустимая точность в процентах.
+
+    Returns:
+        dict or None: Строка сводки выбранной головы или None.
+    """
+    eligible = [row for row in summary if row['accuracy'] >= min_accuracy]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda row: (row['single_latency_ms'], row['model_size_bytes']))
+
+
+def to_markdown(summary, choice=None):
+    """
+    Форматирует сводку в markdown таблицу.
+
+    Args:
+        summary (list): Сводка aggregate_results.
+        choice (dict, optional): Выбранная голова.
+
+    Returns:
+        str: Markdown таблица.
+    """
+    lines = [
+        "| Голова | Точность, % | MAE | Обучение, с | Батч, мс/утв. | Одиночное, мс | Размер, КБ |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for row in summary:
+        lines.append(
+            f"| {row['head']} "
+            f"| {row['accuracy']:.2f} ± {row['accuracy_std']:.2f} "
+            f"| {row['mae']:.4f} "
+            f"| {row['train_time_s']:.2f} "
+            f"| {row['batch_latency_ms_per_statement']:.3f} "
+            f"| {row['single_latency_ms']:.2f} "
+            f"| {row['model_size_bytes'] / 1024:.1f} |"
+        )
+    if choice is not None:
+        lines.append("")
+        lines.append(f"Самая дешёвая голова, прошедшая порог точности: **{choice['head']}**")
+    return "\n".join(lines) + "\n"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение регрессионных голов на кэшированных эмбеддингах.")
+    parser.add_argument('--heads', nargs='+', default=HEADS, choices=HEADS, help="Какие головы сравнивать.")
+    parser.add_argument('--folds', type=int, default=5, help="Количество фолдов кросс-валидации.")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Количество процессов пула.")
+    parser.add_argument('--data', nargs='+', default=[TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE],
+                        help="Файлы с размеченными утверждениями.")
+    parser.add_argument('--encoder-backend', default=ENCODER_BACKEND, choices=ENCODER_BACKENDS)
+    parser.add_argument('--embedding-model', default=EMBEDDING_MODEL_NAME, help="Модель эмбеддингов.")
+    parser.add_argument('--cache-dir', default=EMBEDDING_CACHE_DIR, help="Каталог кэша эмбеддингов.")
+    parser.add_argument('--mlp-epochs', type=int, default=50)
+    parser.add_argument('--rf-estimators', type=int, default=100)
+    parser.add_argument('--rf-jobs', type=int, default=1,
+                        help="n_jobs для RandomForest внутри одного процесса пула.")
+    parser.add_argument('--ridge-alpha', type=float, default=1.0)
+    parser.add_argument('--knn-neighbors', type=int, default=5)
+    parser.add_argument('--min-accuracy', type=float, default=0.0, help="Порог точности в процентах.")
+    parser.add_argument('--output', default='reports/model_selection',
+                        help="Префикс путей отчёта (.json и .md).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    statements, correlations = load_labeled_statements(*args.data)
+    if len(statements) < args.folds:
+        raise ValueError(f"Недостаточно утверждений ({len(statements)}) для {args.folds} фолдов.")
+    labels = correlations_to_array(correlations, FUNCTIONS)
+
+    name = encoder_name(args.encoder_backend, args.embedding_model, STUB_ENCODER_DIM)
+    embedding_model = load_encoder(args.encoder_backend, args.embedding_model, STUB_ENCODER_DIM)
+    _, embeddings_path = cached_encode(embedding_model, statements, name, args.cache_dir)
+    # Модель эмбеддингов больше не нужна, освобождаем память до запуска пула
+    del embedding_model
+
+    params = {
+        'mlp_epochs': args.mlp_epochs,
+        'rf_estimators': args.rf_estimators,
+        'rf_jobs': args.rf_jobs,
+        'ridge_alpha': args.ridge_alpha,
+        'knn_neighbors': args.knn_neighbors,
+    }
+    folds = list(KFold(n_splits=args.folds, shuffle=True, random_state=42).split(labels))
+
+    # spawn: дочерние процессы не наследуют потоки torch/TensorFlow родителя
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context) as executor:
+        futures = [
+            executor.submit(evaluate_fold, head, fold, train_idx, test_idx, embeddings_path, labels, params)
+            for head in args.heads
+            for fold, (train_idx, test_idx) in enumerate(folds)
+        ]
+        fold_results = [future.result() for future in futures]
+
+    summary = aggregate_results(fold_results)
+    choice = pick_cheapest(summary, args.min_accuracy)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    report = {
+        'embedding_model': name,
+        'statements': len(statements),
+        'folds': args.folds,
+        'params': params,
+        'min_accuracy': args.min_accuracy,
+        'choice': choice['head'] if choice else None,
+        'summary': summary,
+        'fold_results': fold_results,
+    }
+    with open(f"{args.output}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    markdown = to_markdown(summary, choice)
+    with open(f"{args.output}.md", 'w', encoding='utf-8') as f:
+        f.write(markdown)
+
+    print(markdown)
+    if choice is None:
+        print(f"Ни одна голова не достигла точности {args.min_accuracy:.2f}%.")
+
+
+if __name__ == '__main__':
+    main()
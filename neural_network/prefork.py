@@ -0,0 +1,340 @@
+# neural_network/prefork.py
+"""
+Пре-форк пул воркеров инференса.
+
+Мастер-процесс один раз загружает кодировщик, нейронную сеть, скейлер, банк вопросов
+и индекс их эмбеддингов (memory-map), замораживает сборщик мусора и делает fork N
+воркеров. Воркеры делят загруженные страницы copy-on-write и обслуживают общий
+слушающий сокет сервером из neural_network/server.py. Каждый воркер после прогрева
+сообщает мастеру время старта и RSS/PSS, чтобы по ним подбирать размер контейнера.
+
+До fork мастер не вызывает ни кодировщик, ни модель: библиотеки с пулами потоков
+(PyTorch, TensorFlow) плохо переносят fork после первых вычислений.
+
+Пример запуска из корня репозитория (без бота, только отчёт по памяти и пул):
+    python -m neural_network.prefork --workers 4
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import time
+
+from .protocol import parse_address
+
+DEFAULT_ADDRESS = 'unix:/tmp/socionics-inference.sock'
+
+
+def memory_usage():
+    """
+    Память текущего процесса по данным /proc (только Linux).
+
+    PSS делит общие страницы между процессами, которые их используют, поэтому сумма PSS
+    воркеров — честная оценка памяти всего пула, в отличие от суммы RSS.
+
+    Returns:
+        dict: rss_mb, pss_mb, shared_mb, private_mb (отсутствующие значения — None).
+    """
+    fields = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Shared_Clean': 'shared_mb', 'Shared_Dirty': 'shared_mb',
+              'Private_Clean': 'private_mb', 'Private_Dirty': 'private_mb'}
+    usage = {'rss_mb': None, 'pss_mb': None, 'shared_mb': None, 'private_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                key = fields.get(name)
+                if key:
+                    usage[key] = (usage[key] or 0.0) + int(rest.split()[0]) / 1024
+    except OSError:
+        # Старые ядра без smaps_rollup: хотя бы RSS
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        usage['rss_mb'] = int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return usage
+
+
+def listen(address):
+    """
+    Создаёт слушающий сокет, который унаследуют воркеры.
+
+    Args:
+        address (str): 'unix:/путь' или 'tcp://хост:порт'.
+
+    Returns:
+        socket.socket: Неблокирующий слушающий сокет.
+    """
+    parsed = parse_address(address)
+    if parsed[0] == 'unix':
+        if os.path.exists(parsed[1]):
+            os.remove(parsed[1])
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(parsed[1])
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((parsed[1], parsed[2]))
+    sock.listen(128)
+    sock.setblocking(False)
+    return sock
+
+
+class PreforkPool:
+    """Воркеры инференса, созданные fork от мастера с уже загруженными моделями."""
+
+    def __init__(self, embedding_model, model, scaler, embedding_index=None, workers=2, address=DEFAULT_ADDRESS,
+                 max_batch_size=64, warmup_statement="Я люблю порядок."):
+        """
+        Args:
+            embedding_model (SentenceTransformer): Модель для генерации эмбеддингов.
+            model (tensorflow.keras.Model): Загруженная модель нейронной сети.
+            scaler (MinMaxScaler): Скейлер для обратного преобразования предсказаний.
+            embedding_index (EmbeddingIndex, optional): Эмбеддинги банка вопросов. Defaults to None.
+            workers (int, optional): Количество воркеров. Defaults to 2.
+            address (str, optional): Адрес общего сокета. Defaults to DEFAULT_ADDRESS.
+            max_batch_size (int, optional): Максимальный батч сервера инференса. Defaults to 64.
+            warmup_statement (str, optional): Утверждение для прогрева воркера перед отчётом.
+        """
+        self.embedding_model = embedding_model
+        self.model = model
+        self.scaler = scaler
+        self.embedding_index = embedding_index
+        self.workers = workers
+        self.address = address
+        self.max_batch_size = max_batch_size
+        self.warmup_statement = warmup_statement
+        self.pids = []
+        self.reports = []
+        self._report_fds = []
+        self._sock = None
+
+    def _run_worker(self, report_fd, fork_time):
+        from .inference import LocalPredictor, predict_correlations_batch
+        from .server import InferenceServer
+
+        # Сигналы мастера (например, обработчики бота) воркеру не нужны
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        predict_correlations_batch([self.warmup_statement], self.embedding_model, self.model, self.scaler)
+        report = {'pid': os.getpid(), 'startup_s': time.perf_counter() - fork_time, **memory_usage()}
+        os.write(report_fd, (json.dumps(report) + '\n').encode('utf-8'))
+        os.close(report_fd)
+
+        predictor = LocalPredictor(self.embedding_model, self.model, self.scaler,
+                                   embedding_index=self.embedding_index)
+        server = InferenceServer(predictor, max_batch_size=self.max_batch_size)
+        asyncio.run(server.serve(sock=self._sock))
+
+    def start(self):
+        """Создаёт сокет и запускает воркеров. Вызывать до запуска потоков в мастере."""
+        self._sock = listen(self.address)
+        # Объекты, созданные до fork, больше не обходятся сборщиком мусора: иначе он трогает
+        # их заголовки и копирует общие страницы в каждый воркер
+        gc.collect()
+        gc.freeze()
+
+        for _ in range(self.workers):
+            read_fd, write_fd = os.pipe()
+            fork_time = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                for fd in self._report_fds + [read_fd]:
+                    os.close(fd)
+                exit_code = 0
+                try:
+                    self._run_worker(write_fd, fork_time)
+                except BaseException as e:
+                    logging.error(f"Воркер инференса {os.getpid()} завершился с ошибкой: {e!r}")
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            os.close(write_fd)
+            self.pids.append(pid)
+            self._report_fds.append(read_fd)
+        gc.unfreeze()
+        logging.info(f"Запущено {self.workers} воркеров инференса на {self.address}: {self.pids}.")
+
+    def collect_reports(self, timeout=120.0):
+        """
+        Ждёт отчёты воркеров о готовности.
+
+        Args:
+            timeout (float, optional): Общий таймаут ожидания в секундах. Defaults to 120.0.
+
+        Returns:
+            list: Отчёты воркеров (pid, startup_s, rss_mb, pss_mb, shared_mb, private_mb).
+        """
+        deadline = time.monotonic() + timeout
+        buffers = {fd: b'' for fd in self._report_fds}
+        while buffers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning(f"Не дождались отчёта от {len(buffers)} воркеров инференса.")
+                break
+            readable, _, _ = select.select(list(buffers), [], [], remaining)
+            for fd in readable:
+                chunk = os.read(fd, 4096)
+                if chunk:
+                    buffers[fd] += chunk
+                    continue
+                # Конец потока: воркер записал отчёт или упал до него
+                if buffers[fd].strip():
+                    self.reports.append(json.loads(buffers[fd].decode('utf-8')))
+                os.close(fd)
+                del buffers[fd]
+        for fd in buffers:
+            os.close(fd)
+        self._report_fds = []
+        return self.reports
+
+    def stop(self, timeout=10.0):
+        """Завершает воркеров и удаляет Unix-сокет."""
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        for pid in self.pids:
+            try:
+                while not os.waitpid(pid, os.WNOHANG)[0]:
+                    if time.monotonic() > deadline:
+                        os.kill(pid, signal.SIGKILL)
+                        os.waitpid(pid, 0)
+                        break
+                    time.sleep(0.05)
+            except ChildProcessError:
+                pass
+        self.pids = []
+        if self._sock is not None:
+            self._sock.close()
+            parsed = parse_address(self.address)
+            if parsed[0] == 'unix' and os.path.exists(parsed[1]):
+                os.remove(parsed[1])
+            self._sock = None
+
+
+def format_reports(reports, master_usage=None):
+    """
+    Форматирует отчёты воркеров в таблицу.
+
+    Args:
+        reports (list): Отчёты из PreforkPool.collect_reports.
+        master_usage (dict, optional): memory_usage() мастера после загрузки моделей.
+
+    Returns:
+        str: Таблица.
+    """
+    def mb(value):
+        return f"{value:.1f}" if value is not None else '—'
+
+    lines = [f"{'процесс':<14} {'старт, с':>9} {'RSS, МБ':>9} {'PSS, МБ':>9} {'общая, МБ':>10} {'своя, МБ':>9}"]
+    if master_usage:
+        lines.append(f"{'мастер':<14} {'':>9} {mb(master_usage['rss_mb']):>9} {mb(master_usage['pss_mb']):>9} "
+                     f"{mb(master_usage['shared_mb']):>10} {mb(master_usage['private_mb']):>9}")
+    for report in sorted(reports, key=lambda r: r['pid']):
+        lines.append(f"{'воркер ' + str(report['pid']):<14} {report['startup_s']:>9.2f} {mb(report['rss_mb']):>9} "
+                     f"{mb(report['pss_mb']):>9} {mb(report['shared_mb']):>10} {mb(report['private_mb']):>9}")
+    pss = [report['pss_mb'] for report in reports if report['pss_mb'] is not None]
+    if pss:
+        lines.append(f"Сумма PSS воркеров: {sum(pss):.1f} МБ")
+    return '\n'.join(lines)
+
+
+def load_prefork_state(encoder_backend, embedding_model_name, encoder_dim, model_path, scaler_path,
+                       question_bank, cache_dir, bundle_dir='', bundle_version=''):
+    """
+    Загружает в мастере всё, что делят воркеры.
+
+    Args:
+        encoder_backend (str): Бэкенд кодировщика.
+        embedding_model_name (str): Имя модели эмбеддингов.
+        encoder_dim (int): Размерность офлайн-кодировщика.
+        model_path (str): Путь к сохранённой модели Keras.
+        scaler_path (str): Путь к сохранённому скейлеру.
+        question_bank (QuestionBank): Банк вопросов.
+        cache_dir (str): Каталог кэша эмбеддингов.
+        bundle_dir (str, optional): Каталог бандлов модели. Defaults to ''.
+        bundle_version (str, optional): Версия бандла; пусто — активная. Defaults to ''.
+
+    Returns:
+        tuple: (embedding_model, model, scaler, embedding_index).
+    """
+    from .embedding_cache import load_embedding_index
+    from .inference import load_serving_stack
+
+    # Индекс строится (если нужно) в отдельном процессе до загрузки моделей в мастер
+    embedding_index = load_embedding_index(question_bank.statements, encoder_backend, embedding_model_name,
+                                           encoder_dim, cache_dir)
+    embedding_model, model, scaler = load_serving_stack(
+        embedding_model_name, model_path, scaler_path, encoder_backend, encoder_dim, bundle_dir, bundle_version
+    )
+    return embedding_model, model, scaler, embedding_index
+
+
+def parse_args(argv=None):
+    from config.settings import INFERENCE_SERVER_ADDRESS, INFERENCE_MAX_BATCH_SIZE, PREFORK_WORKERS
+
+    parser = argparse.ArgumentParser(description="Пре-форк пул воркеров инференса с отчётом по памяти.")
+    parser.add_argument('--workers', type=int, default=PREFORK_WORKERS or 2)
+    parser.add_argument('--address', default=INFERENCE_SERVER_ADDRESS or DEFAULT_ADDRESS)
+    parser.add_argument('--max-batch-size', type=int, default=INFERENCE_MAX_BATCH_SIZE)
+    parser.add_argument('--report-only', action='store_true', help="Остановить воркеров сразу после отчёта.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from config.settings import (
+        ENCODER_BACKEND,
+        EMBEDDING_MODEL_NAME,
+        STUB_ENCODER_DIM,
+        EMBEDDING_CACHE_DIR,
+        MODEL_PATH,
+        SCALER_PATH,
+        MODEL_BUNDLE_DIR,
+        MODEL_BUNDLE_VERSION,
+        TALANOV_STATEMENTS_FILE,
+        USER_STATEMENTS_FILE,
+        PREFORK_REPORT_TIMEOUT
+    )
+    from socionics.question_bank import QuestionBank
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    start = time.perf_counter()
+    question_bank = QuestionBank(TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE)
+    embedding_model, model, scaler, embedding_index = load_prefork_state(
+        ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM, MODEL_PATH, SCALER_PATH,
+        question_bank, EMBEDDING_CACHE_DIR, MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION
+    )
+    master_usage = memory_usage()
+    logging.info(f"Мастер загрузил модели за {time.perf_counter() - start:.2f} с.")
+
+    pool = PreforkPool(embedding_model, model, scaler, embedding_index, workers=args.workers,
+                       address=args.address, max_batch_size=args.max_batch_size)
+    pool.start()
+    try:
+        print(format_reports(pool.collect_reports(PREFORK_REPORT_TIMEOUT), master_usage))
+        if not args.report_only:
+            signals = {signal.SIGINT, signal.SIGTERM}
+            signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+            signal.sigwait(signals)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# neural_network/protocol.py
+"""
+Протокол обмена с сервером инференса.
+
+Кадр — 4 байта длины (big-endian) и тело в msgpack. Запрос:
+    {'id': int, 'op': 'predict', 'statements': [str, ...], 'timeout': float}   — timeout необязателен
+    {'id': int, 'op': 'ping'}
+Ответ:
+    {'id': int, 'shape': [N, F], 'data': bytes}   — корреляции float32 little-endian
+    {'id': int, 'ok': True, 'functions': [...]}   — ответ на ping
+    {'id': int, 'error': str}
+    {'id': int, 'error': str, 'expired': True}    — срок запроса истёк, запрос отброшен
+"""
+
+import struct
+
+import msgpack
+import numpy as np
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Нарушение формата кадра или ответа сервера."""
+
+
+def parse_address(address):
+    """
+    Разбирает адрес сервера инференса.
+
+    Args:
+        address (str): 'unix:/путь/к/сокету' или 'tcp://хост:порт'.
+
+    Returns:
+        tuple: ('unix', path) или ('tcp', host, port).
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        return 'tcp', host or '127.0.0.1', int(port)
+    raise ValueError(f"Неподдерживаемый адрес сервера инференса: {address}")
+
+
+def encode_frame(message):
+    body = msgpack.packb(message, use_bin_type=True)
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader):
+    """
+    Читает один кадр из потока.
+
+    Args:
+        reader (asyncio.StreamReader): Поток.
+
+    Returns:
+        dict: Декодированное сообщение.
+
+    Raises:
+        asyncio.IncompleteReadError: Соединение закрыто посреди кадра.
+        ProtocolError: Кадр слишком большой.
+    """
+    header = await reader.readexactly(HEADER.size)
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Слишком большой кадр: {length} байт.")
+    return msgpack.unpackb(await reader.readexactly(length), raw=False)
+
+
+def pack_array(array):
+    array = np.ascontiguousarray(array, dtype='<f4')
+    return {'shape': list(array.shape), 'data': array.tobytes()}
+
+
+def unpack_array(message):
+    return np.frombuffer(message['data'], dtype='<f4').reshape(message['shape'])
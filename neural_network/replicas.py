@@ -0,0 +1,248 @@
+# neural_network/replicas.py
+"""
+Пул реплик кодировщика и MLP с явным бюджетом потоков.
+
+TensorFlow, PyTorch (внутри sentence-transformers) и tokenizers по умолчанию создают
+каждый свой пул потоков по числу ядер, и под нагрузкой они вытесняют друг друга.
+Здесь каждая реплика — отдельный процесс со своим бюджетом: intra-op/inter-op потоки
+TensorFlow и PyTorch, OMP/MKL, выключенный параллелизм tokenizers и, по желанию,
+привязка к своим ядрам. Запросы уходят свободной реплике; интерфейс совпадает
+с LocalPredictor: await pool.predict(statements).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from monitoring.metrics import observe_stage
+from .deadlines import DeadlineExceeded, check_deadline
+from .inference import load_serving_stack, predict_correlations_batch
+
+
+def configure_threads(intra_op_threads=0, inter_op_threads=0, cpus=None):
+    """
+    Ограничивает пулы потоков библиотек в текущем процессе.
+
+    Вызывать до загрузки моделей: TensorFlow принимает настройки потоков только до
+    инициализации рантайма. Значение 0 оставляет умолчание библиотеки.
+
+    Args:
+        intra_op_threads (int, optional): Потоки внутри одной операции. Defaults to 0.
+        inter_op_threads (int, optional): Потоки для независимых операций. Defaults to 0.
+        cpus (list, optional): Номера ядер для привязки процесса (только Linux). Defaults to None.
+    """
+    # Токенизатор работает внутри уже распараллеленного кодировщика; свои потоки ему не нужны
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    if intra_op_threads > 0:
+        for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                     'TF_NUM_INTRAOP_THREADS'):
+            os.environ[name] = str(intra_op_threads)
+    if inter_op_threads > 0:
+        os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_op_threads)
+
+    try:
+        import torch
+        if intra_op_threads > 0:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads > 0:
+            torch.set_num_interop_threads(inter_op_threads)
+    except ImportError:
+        pass
+    except RuntimeError as e:
+        # set_num_interop_threads можно вызвать только до первой параллельной операции
+        logging.warning(f"Не удалось задать потоки PyTorch: {e}")
+
+    try:
+        import tensorflow as tf
+        if intra_op_threads > 0:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads > 0:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except ImportError:
+        pass
+    except RuntimeError as e:
+        logging.warning(f"Не удалось задать потоки TensorFlow: {e}")
+
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+
+def replica_cpus(index, threads):
+    """
+    Ядра для реплики при привязке: подряд идущие блоки по threads ядер.
+
+    Args:
+        index (int): Номер реплики.
+        threads (int): Ядер на реплику.
+
+    Returns:
+        list or None: Номера ядер или None, если привязка невозможна.
+    """
+    if threads <= 0 or not hasattr(os, 'sched_getaffinity'):
+        return None
+    available = sorted(os.sched_getaffinity(0))
+    start = (index * threads) % len(available)
+    return [available[(start + i) % len(available)] for i in range(threads)]
+
+
+def _replica_main(connection, loader, loader_args, intra_op_threads, inter_op_threads, cpus, batch_size):
+    try:
+        configure_threads(intra_op_threads, inter_op_threads, cpus)
+        embedding_model, model, scaler = loader(*loader_args)
+        # Прогрев: первый вызов строит граф и выделяет буферы
+        predict_correlations_batch(["Прогрев реплики."], embedding_model, model, scaler, batch_size=batch_size)
+    except Exception as e:
+        connection.send(('error', repr(e)))
+        return
+    connection.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            statements = connection.recv()
+        except EOFError:
+            break
+        if statements is None:
+            break
+        try:
+            result = predict_correlations_batch(statements, embedding_model, model, scaler, batch_size=batch_size)
+            connection.send(('ok', result))
+        except Exception as e:
+            connection.send(('error', repr(e)))
+
+
+class ReplicaPool:
+    """Пул процессов-реплик модели, каждая со своим бюджетом потоков."""
+
+    def __init__(self, replicas=2, intra_op_threads=1, inter_op_threads=1, pin_cpus=False, loader=None,
+                 loader_args=(), batch_size=64):
+        """
+        Args:
+            replicas (int, optional): Количество реплик. Defaults to 2.
+            intra_op_threads (int, optional): Потоки внутри операции на реплику (0 — умолчание). Defaults to 1.
+            inter_op_threads (int, optional): Потоки между операциями на реплику (0 — умолчание). Defaults to 1.
+            pin_cpus (bool, optional): Привязать каждую реплику к своим ядрам. Defaults to False.
+            loader (callable, optional): Функция уровня модуля, возвращающая (embedding_model, model, scaler);
+                по умолчанию load_serving_stack.
+            loader_args (tuple, optional): Аргументы loader.
+            batch_size (int, optional): Размер батча кодировщика и модели. Defaults to 64.
+        """
+        self.replicas = replicas
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.pin_cpus = pin_cpus
+        self.loader = loader or load_serving_stack
+        self.loader_args = tuple(loader_args)
+        self.batch_size = batch_size
+        self._processes = []
+        self._connections = []
+        self._free = None
+        self._loop = None
+        self._executor = None
+
+    def start(self, timeout=300.0):
+        """
+        Запускает реплики и ждёт их готовности.
+
+        Args:
+            timeout (float, optional): Таймаут загрузки одной реплики в секундах. Defaults to 300.0.
+
+        Returns:
+            float: Время запуска всех реплик в секундах.
+        """
+        start = time.perf_counter()
+        # spawn, а не fork: настройки потоков TensorFlow действуют только до инициализации рантайма
+        mp_context = multiprocessing.get_context('spawn')
+        for index in range(self.replicas):
+            parent_connection, child_connection = mp_context.Pipe()
+            cpus = replica_cpus(index, self.intra_op_threads) if self.pin_cpus else None
+            process = mp_context.Process(
+                target=_replica_main,
+                args=(child_connection, self.loader, self.loader_args, self.intra_op_threads,
+                      self.inter_op_threads, cpus, self.batch_size),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._processes.append(process)
+            self._connections.append(parent_connection)
+
+        for connection in self._connections:
+            try:
+                if not connection.poll(timeout):
+                    raise TimeoutError("таймаут загрузки")
+                status, payload = connection.recv()
+            except (EOFError, TimeoutError) as e:
+                status, payload = 'error', repr(e)
+            if status != 'ready':
+                self.close_sync()
+                raise RuntimeError(f"Реплика модели не загрузилась: {payload}")
+
+        self._executor = ThreadPoolExecutor(max_workers=self.replicas, thread_name_prefix='replica')
+        elapsed = time.perf_counter() - start
+        logging.info(f"Запущено {self.replicas} реплик модели (intra-op {self.intra_op_threads}, "
+                     f"inter-op {self.inter_op_threads}) за {elapsed:.2f} с.")
+        return elapsed
+
+    def _call(self, index, statements):
+        connection = self._connections[index]
+        connection.send(statements)
+        status, payload = connection.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Ошибка реплики {index}: {payload}")
+        return payload
+
+    async def predict(self, statements):
+        """
+        Предсказывает корреляции на первой свободной реплике.
+
+        Args:
+            statements (list): Утверждения.
+
+        Returns:
+            numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)).
+        """
+        loop = asyncio.get_running_loop()
+        if self._free is None or self._loop is not loop:
+            # Очередь создаётся в работающем цикле (на Python 3.8 она привязывается к циклу)
+            self._loop = loop
+            self._free = asyncio.Queue()
+            for index in range(self.replicas):
+                self._free.put_nowait(index)
+        free = self._free
+        with observe_stage('queue_wait'):
+            index = await free.get()
+        try:
+            check_deadline('replica')
+        except DeadlineExceeded:
+            free.put_nowait(index)
+            raise
+        future = self._executor.submit(self._call, index, list(statements))
+        # Реплика освобождается, только когда поток действительно дочитал ответ из канала,
+        # даже если ожидающий запрос отменили раньше
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(free.put_nowait, index))
+        return await asyncio.wrap_future(future)
+
+    def close_sync(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._processes = []
+        self._connections = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._free = None
+
+    async def close(self):
+        self.close_sync()
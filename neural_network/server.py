@@ -0,0 +1,239 @@
+# neural_network/server.py
+"""
+Отдельный процесс инференса.
+
+Сервер загружает кодировщик, нейронную сеть и скейлер один раз и принимает батчи
+утверждений по Unix-сокету или TCP (протокол описан в neural_network/protocol.py).
+Одновременные запросы от разных соединений объединяются в один батч до
+max_batch_size утверждений, поэтому несколько ботов могут делить один хост инференса,
+а один бот — работать с несколькими репликами.
+
+Пример запуска из корня репозитория:
+    python -m neural_network.server --address unix:/tmp/socionics-inference.sock
+    python -m neural_network.server --address tcp://0.0.0.0:8765
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+
+from config.settings import (
+    ENCODER_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    STUB_ENCODER_DIM,
+    MODEL_PATH,
+    SCALER_PATH,
+    MODEL_BUNDLE_DIR,
+    MODEL_BUNDLE_VERSION,
+    INFERENCE_SERVER_ADDRESS,
+    INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_REPLICAS,
+    INFERENCE_INTRA_OP_THREADS,
+    INFERENCE_INTER_OP_THREADS,
+    INFERENCE_PIN_CPUS,
+    FUNCTIONS
+)
+from monitoring.exporter import start_metrics_server
+from monitoring.metrics import record_stage
+from .deadlines import DeadlineExceeded, check_deadline
+from .inference import LocalPredictor, load_serving_stack
+from .replicas import ReplicaPool, configure_threads
+from .protocol import encode_frame, pack_array, parse_address, read_frame
+
+
+class InferenceServer:
+    """Сервер инференса с объединением одновременных запросов в батчи."""
+
+    def __init__(self, predictor, max_batch_size=64):
+        """
+        Args:
+            predictor (LocalPredictor): Предсказатель с асинхронным методом predict.
+            max_batch_size (int, optional): Максимум утверждений в одном проходе модели. Defaults to 64.
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self._pending = deque()
+        self._wakeup = None
+        self._slots = None
+        self._batcher = None
+
+    async def _batch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                # Пока все реплики заняты, запросы копятся в очереди и попадают в следующий батч
+                await self._slots.acquire()
+                batch = self._take_batch()
+                if batch:
+                    asyncio.ensure_future(self._run_batch(batch))
+                else:
+                    self._slots.release()
+
+    def _take_batch(self):
+        # Добираем ожидающие запросы, пока батч не заполнится; просроченные отбрасываются до кодирования
+        batch = []
+        size = 0
+        while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+            item = self._pending.popleft()
+            statements, future, _, deadline = item
+            if future.done():
+                continue
+            try:
+                check_deadline('server', deadline)
+            except DeadlineExceeded as e:
+                future.set_exception(e)
+                continue
+            batch.append(item)
+            size += len(statements)
+        return batch
+
+    async def _run_batch(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued, _ in batch:
+            record_stage('queue_wait', started - enqueued)
+        statements = [statement for item_statements, _, _, _ in batch for statement in item_statements]
+        try:
+            correlations = await self.predictor.predict(statements)
+        except Exception as e:
+            logging.error(f"Ошибка инференса для батча из {len(statements)} утверждений: {e}")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        offset = 0
+        for item_statements, future, _, _ in batch:
+            if not future.done():
+                future.set_result(correlations[offset:offset + len(item_statements)])
+            offset += len(item_statements)
+
+    async def predict(self, statements, timeout=None):
+        if not statements:
+            return await self.predictor.predict([])
+        future = asyncio.get_running_loop().create_future()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._pending.append((statements, future, time.perf_counter(), deadline))
+        self._wakeup.set()
+        return await future
+
+    async def _handle_request(self, message):
+        request_id = message.get('id')
+        op = message.get('op', 'predict')
+        if op == 'ping':
+            return {'id': request_id, 'ok': True, 'functions': FUNCTIONS}
+        if op != 'predict':
+            return {'id': request_id, 'error': f"Неизвестная операция: {op}"}
+        statements = message.get('statements')
+        if not isinstance(statements, list) or not all(isinstance(s, str) for s in statements):
+            return {'id': request_id, 'error': "Поле statements должно быть списком строк."}
+        timeout = message.get('timeout')
+        if timeout is not None and not isinstance(timeout, (int, float)):
+            return {'id': request_id, 'error': "Поле timeout должно быть числом секунд."}
+        try:
+            correlations = await self.predict(statements, timeout)
+        except DeadlineExceeded as e:
+            return {'id': request_id, 'error': str(e), 'expired': True}
+        except Exception as e:
+            return {'id': request_id, 'error': str(e)}
+        return {'id': request_id, **pack_array(correlations)}
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername') or 'unix'
+        try:
+            while True:
+                try:
+                    message = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                start = time.perf_counter()
+                response = await self._handle_request(message)
+                writer.write(encode_frame(response))
+                await writer.drain()
+                logging.debug(f"Запрос {message.get('id')} от {peer} обработан за "
+                              f"{(time.perf_counter() - start) * 1000:.1f} мс.")
+        except Exception as e:
+            logging.error(f"Ошибка соединения с {peer}: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self, address=None, sock=None):
+        """
+        Запускает сервер и обслуживает соединения до отмены.
+
+        Args:
+            address (str, optional): Адрес 'unix:...' или 'tcp://...'.
+            sock (socket.socket, optional): Уже открытый слушающий сокет (например, унаследованный после fork).
+        """
+        # Событие создаётся внутри работающего цикла (на Python 3.8 оно привязывается к циклу при создании)
+        self._wakeup = asyncio.Event()
+        # По одному батчу в работе на каждую реплику (у LocalPredictor она одна)
+        self._slots = asyncio.Semaphore(getattr(self.predictor, 'replicas', 1))
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        if sock is not None:
+            if sock.family == getattr(socket, 'AF_UNIX', None):
+                server = await asyncio.start_unix_server(self.handle_connection, sock=sock)
+            else:
+                server = await asyncio.start_server(self.handle_connection, sock=sock)
+        else:
+            parsed = parse_address(address)
+            if parsed[0] == 'unix':
+                if os.path.exists(parsed[1]):
+                    os.remove(parsed[1])
+                server = await asyncio.start_unix_server(self.handle_connection, path=parsed[1])
+            else:
+                server = await asyncio.start_server(self.handle_connection, host=parsed[1], port=parsed[2])
+        logging.info(f"Сервер инференса слушает {address or sock.getsockname()}.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._batcher.cancel()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер инференса корреляций соционических функций.")
+    parser.add_argument('--address', default=INFERENCE_SERVER_ADDRESS or 'unix:/tmp/socionics-inference.sock')
+    parser.add_argument('--max-batch-size', type=int, default=INFERENCE_MAX_BATCH_SIZE)
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--scaler-path', default=SCALER_PATH)
+    parser.add_argument('--bundle-dir', default=MODEL_BUNDLE_DIR,
+                        help="Каталог бандлов модели (вместо --model-path и --scaler-path).")
+    parser.add_argument('--bundle-version', default=MODEL_BUNDLE_VERSION, help="Версия бандла (пусто — активная).")
+    parser.add_argument('--replicas', type=int, default=INFERENCE_REPLICAS,
+                        help="Процессов-реплик модели (0 — модель в процессе сервера).")
+    parser.add_argument('--metrics-port', type=int, default=0, help="Порт HTTP /metrics (0 — выключено).")
+    parser.add_argument('--intra-op-threads', type=int, default=INFERENCE_INTRA_OP_THREADS)
+    parser.add_argument('--inter-op-threads', type=int, default=INFERENCE_INTER_OP_THREADS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    loader_args = (EMBEDDING_MODEL_NAME, args.model_path, args.scaler_path, ENCODER_BACKEND, STUB_ENCODER_DIM,
+                   args.bundle_dir, args.bundle_version)
+    if args.replicas > 0:
+        predictor = ReplicaPool(args.replicas, args.intra_op_threads, args.inter_op_threads, INFERENCE_PIN_CPUS,
+                                loader_args=loader_args, batch_size=args.max_batch_size)
+        predictor.start()
+    else:
+        configure_threads(args.intra_op_threads, args.inter_op_threads)
+        predictor = LocalPredictor(*load_serving_stack(*loader_args))
+    server = InferenceServer(predictor, max_batch_size=args.max_batch_size)
+    start_metrics_server(args.metrics_port)
+    try:
+        asyncio.run(server.serve(args.address))
+    except KeyboardInterrupt:
+        logging.info("Сервер инференса остановлен.")
+
+
+if __name__ == '__main__':
+    main()
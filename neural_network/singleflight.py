@@ -0,0 +1,174 @@
+# neural_network/singleflight.py
+"""
+Объединение одинаковых одновременных предсказаний.
+
+Если утверждение уже предсказывается другим запросом, новый запрос ждёт тот же
+future вместо собственного кодирования и прямого прохода. Ключ — нормализованное
+утверждение, версия модели и число проходов MC-dropout (0 — точечное
+предсказание). Future живёт только пока предсказание выполняется: это не кэш
+результатов.
+"""
+
+import asyncio
+import os
+
+import numpy as np
+
+from monitoring.metrics import record_cache
+from .deadlines import DeadlineExceeded, remaining_time
+
+
+def normalize_statement(statement):
+    """Нормализация, как при поиске известных утверждений: без регистра и лишних пробелов."""
+    return ' '.join(statement.split()).lower()
+
+
+def model_version(model_path):
+    """
+    Версия модели по файлу: время изменения и размер; пустая строка, если файла нет.
+
+    Args:
+        model_path (str): Путь к модели.
+
+    Returns:
+        str: Версия.
+    """
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return ''
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class SingleFlightPredictor:
+    """
+    Обёртка над любым предсказателем (LocalPredictor, InferenceClient, ReplicaPool).
+
+    Args:
+        predictor: Предсказатель с async predict(statements).
+        model_version (str, optional): Версия модели для ключа. Defaults to ''.
+    """
+
+    def __init__(self, predictor, model_version=''):
+        self.predictor = predictor
+        self.model_version = model_version
+        self._inflight = {}
+        # Стохастические проходы есть не у всех предсказателей: hasattr(predictor, 'predict_uncertainty')
+        # у обёртки должен отвечать так же, как у обёрнутого
+        if hasattr(predictor, 'predict_uncertainty'):
+            self.predict_uncertainty = self._predict_uncertainty
+
+    def __getattr__(self, name):
+        # close(), replicas и прочее — от обёрнутого предсказателя
+        return getattr(self.predictor, name)
+
+    async def predict(self, statements):
+        """
+        Предсказывает корреляции, присоединяясь к уже идущим предсказаниям тех же утверждений.
+
+        Args:
+            statements (list): Утверждения.
+
+        Returns:
+            numpy.ndarray: Корреляции формы (N, len(FUNCTIONS)).
+        """
+        if not statements:
+            return await self.predictor.predict(statements)
+        return np.stack(await self._single_flight(statements, 0, self.predictor.predict))
+
+    async def _predict_uncertainty(self, statements, samples):
+        """
+        predict_uncertainty обёрнутого предсказателя с объединением одинаковых запросов.
+
+        Ключ дополнительно содержит число проходов: запросы с разным samples не объединяются.
+
+        Args:
+            statements (list): Утверждения.
+            samples (int): Число проходов MC-dropout.
+
+        Returns:
+            tuple: (корреляции формы (N, F), проходы формы (N, samples, F)).
+        """
+        if not statements:
+            return await self.predictor.predict_uncertainty(statements, samples)
+
+        async def predict_rows(batch):
+            points, draws = await self.predictor.predict_uncertainty(batch, samples)
+            return list(zip(points, draws))
+
+        rows = await self._single_flight(statements, samples, predict_rows)
+        return np.stack([points for points, _ in rows]), np.stack([draws for _, draws in rows])
+
+    async def _single_flight(self, statements, samples, predict_rows):
+        """
+        Результаты по утверждениям: свои ведутся через predict_rows, чужие ожидаются.
+
+        Args:
+            statements (list): Утверждения.
+            samples (int): Число проходов MC-dropout (0 — точечное предсказание), часть ключа.
+            predict_rows (Callable): async-функция батча утверждений, возвращающая результаты по строкам.
+
+        Returns:
+            list: Результаты в порядке statements.
+        """
+        loop = asyncio.get_running_loop()
+        keys = [(normalize_statement(statement), self.model_version, samples) for statement in statements]
+        futures = []
+        owned = {}
+        for key in keys:
+            future = self._inflight.get(key)
+            record_cache('singleflight', future is not None)
+            if future is None:
+                future = self._inflight[key] = owned[key] = loop.create_future()
+            futures.append(future)
+
+        if owned:
+            await self._lead(statements, keys, owned, predict_rows)
+
+        rows = [None] * len(statements)
+        retry = []
+        for i, future in enumerate(futures):
+            try:
+                # shield: отмена этого запроса не должна отменять общий future
+                rows[i] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменили запрос, который вёл предсказание; предсказываем заново
+                retry.append(i)
+            except DeadlineExceeded:
+                # Истёк срок запроса, который вёл предсказание, а не этого
+                remaining = remaining_time()
+                if future in owned.values() or (remaining is not None and remaining <= 0):
+                    raise
+                retry.append(i)
+        if retry:
+            retried = await self._single_flight([statements[i] for i in retry], samples, predict_rows)
+            for i, row in zip(retry, retried):
+                rows[i] = row
+        return rows
+
+    async def _lead(self, statements, keys, owned, predict_rows):
+        first_index = {}
+        for i, key in enumerate(keys):
+            if key in owned:
+                first_index.setdefault(key, i)
+        try:
+            predictions = await predict_rows([statements[i] for i in first_index.values()])
+        except asyncio.CancelledError:
+            for future in owned.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in owned.values():
+                future.set_exception(e)
+                # Ошибку получит каждый ожидающий; без этого asyncio предупреждает о непрочитанной ошибке
+                future.exception()
+            raise
+        finally:
+            for key, future in owned.items():
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+        for key, row in zip(first_index, predictions):
+            owned[key].set_result(row)
@@ -0,0 +1,117 @@
+# neural_network/uncertainty.py
+"""
+Оценка неопределённости предсказаний (MC-dropout).
+
+Эмбеддинги каждого утверждения повторяются K раз, и вся матрица (N * K, D) проходит
+через MLP одним вызовом с включённым dropout: model(x, training=True) у Keras или
+predict_stochastic у бандла. Кодировщик работает один раз, а MLP на порядки дешевле
+кодировщика, поэтому итоговая стоимость близка к одному прямому проходу. По K
+проходам считаются разброс корреляций функций и уверенность в типе — доля проходов,
+в которых тип оказывается самым вероятным.
+"""
+
+import numpy as np
+
+from monitoring.metrics import observe_stage
+from socionics.calculations import calculate_traits_batch, predict_socionics_types_batch
+from .inference import FUNCTIONS, predict_from_embeddings
+
+
+def sample_predictions(embeddings, model, scaler, samples=16, seed=None):
+    """
+    K стохастических проходов MLP по каждому эмбеддингу одним батчем.
+
+    Args:
+        embeddings (numpy.ndarray): Эмбеддинги формы (N, D).
+        model: Модель Keras с Dropout или BundleModel.
+        scaler (MinMaxScaler): Скейлер для обратного преобразования предсказаний.
+        samples (int, optional): Число проходов K. Defaults to 16.
+        seed (int, optional): Зерно масок dropout (только для бандла). Defaults to None.
+
+    Returns:
+        numpy.ndarray: Корреляции формы (N, K, len(FUNCTIONS)) в диапазоне [-1, 1].
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    # Повторы одного утверждения идут подряд, поэтому результат сворачивается в (N, K, F) без перестановок
+    tiled = np.repeat(embeddings, samples, axis=0)
+    with observe_stage('predict_uncertainty'):
+        if hasattr(model, 'predict_stochastic'):
+            outputs = model.predict_stochastic(tiled, seed=seed)
+        else:
+            outputs = np.hstack([np.asarray(output) for output in model(tiled, training=True)])
+    draws = np.clip(scaler.inverse_transform(outputs), -1.0, 1.0).astype(np.float32)
+    return draws.reshape(len(embeddings), samples, len(FUNCTIONS))
+
+
+def predict_with_uncertainty(statements, embedding_model, model, scaler, samples=16, batch_size=64,
+                             embedding_index=None):
+    """
+    Точечное предсказание и стохастические проходы по одному кодированию утверждений.
+
+    Args:
+        statements (list): Утверждения.
+        embedding_model (SentenceTransformer): Модель для генерации эмбеддингов.
+        model: Модель Keras или BundleModel.
+        scaler (MinMaxScaler): Скейлер.
+        samples (int, optional): Число стохастических проходов. Defaults to 16.
+        batch_size (int, optional): Размер батча кодировщика и модели. Defaults to 64.
+        embedding_index (EmbeddingIndex, optional): Готовые эмбеддинги известных утверждений. Defaults to None.
+
+    Returns:
+        tuple: (корреляции формы (N, F), проходы формы (N, K, F)).
+    """
+    with observe_stage('encode'):
+        if embedding_index is not None:
+            embeddings = embedding_index.encode(embedding_model, statements, batch_size=batch_size)
+        else:
+            embeddings = embedding_model.encode(statements, batch_size=batch_size)
+    point = predict_from_embeddings(embeddings, model, scaler, batch_size=batch_size)
+    return point, sample_predictions(embeddings, model, scaler, samples)
+
+
+def summarize_uncertainty(draws, socionics_types):
+    """
+    Разброс корреляций и уверенность в типах по стохастическим проходам.
+
+    Args:
+        draws (numpy.ndarray): Проходы формы (N, K, len(FUNCTIONS)).
+        socionics_types (dict): Словарь соционических типов и их характеристик.
+
+    Returns:
+        list: Для каждого утверждения словарь {'std': {функция: σ}, 'type_confidence': {тип: доля проходов,
+            где тип самый вероятный}, 'type_std': {тип: σ вероятности в процентах}}.
+    """
+    n, samples, functions = draws.shape
+    std = draws.std(axis=1)
+    traits = calculate_traits_batch(draws.reshape(n * samples, functions))
+    names, probabilities = predict_socionics_types_batch(traits, socionics_types)
+    probabilities = probabilities.reshape(n, samples, len(names))
+
+    summaries = []
+    for i in range(n):
+        summary = {'std': {func: float(std[i, j]) for j, func in enumerate(FUNCTIONS)},
+                   'type_confidence': {}, 'type_std': {}}
+        if names:
+            # Проходы без положительных оценок типов (все нули) не голосуют
+            voted = probabilities[i].sum(axis=1) > 0
+            winners = np.bincount(probabilities[i][voted].argmax(axis=1), minlength=len(names))
+            shares = winners / max(int(voted.sum()), 1)
+            type_std = probabilities[i].std(axis=0)
+            summary['type_confidence'] = {name: float(shares[j]) for j, name in enumerate(names)}
+            summary['type_std'] = {name: float(type_std[j]) for j, name in enumerate(names)}
+        summaries.append(summary)
+    return summaries
+
+
+def aggregate_draws(weights, draws):
+    """
+    Объединяет проходы фрагментов одного описания с весами фрагментов.
+
+    Args:
+        weights (numpy.ndarray): Веса фрагментов формы (C,), сумма 1.
+        draws (numpy.ndarray): Проходы фрагментов формы (C, K, F).
+
+    Returns:
+        numpy.ndarray: Проходы описания формы (1, K, F).
+    """
+    return np.clip(np.einsum('c,ckf->kf', weights, draws), -1.0, 1.0)[None].astype(np.float32)
@@ -1,6 +1,8 @@
 # neural_network/utils.py
 
+import json
 import logging
+import os
 
 FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
 
@@ -55,3 +57,31 @@ def postprocess_predictions(predictions, scaler, functions):
     correlations = {func: max(-1.0, min(1.0, prediction_scaled[0][i])) for i, func in enumerate(functions)}
 
     return correlations
+
+
+def load_labeled_statements(*data_files):
+    """
+    Загружает размеченные утверждения из одного или нескольких JSON файлов.
+
+    Отсутствующие файлы пропускаются, записи без корреляций функций игнорируются.
+
+    Args:
+        *data_files (str): Пути к JSON файлам в формате talanovstatements.json.
+
+    Returns:
+        tuple: (список утверждений, список словарей корреляций функций).
+    """
+    statements = []
+    correlations = []
+    for data_file in data_files:
+        if not data_file or not os.path.exists(data_file):
+            logging.info(f"Файл {data_file} не найден. Пропускаем.")
+            continue
+        with open(data_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for entry in data:
+            if 'statement' in entry and 'function_correlation' in entry:
+                statements.append(entry['statement'])
+                correlations.append(entry['function_correlation'])
+        logging.info(f"Загружено {len(data)} утверждений из {data_file}.")
+    return statements, correlations
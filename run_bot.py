@@ -4,51 +4,106 @@ from neural_network.inference import predict_correlations
 from socionics.calculations import calculate_traits, predict_socionics_types, get_agree_disagree_types
 from socionics.data_processing import load_feedback_data
 from config.settings import MODEL_PATH, SCALER_PATH, TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE, FEEDBACK_DATA_FILE, FUNCTIONS, SOCIONICS_TYPES
-from sentence_transformers import SentenceTransformer
+from config.settings import ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM
+from config.settings import MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION
+from config.settings import INFERENCE_SERVER_ADDRESS, INFERENCE_CLIENT_POOL_SIZE, INFERENCE_TIMEOUT, INFERENCE_RETRIES
+from config.settings import INFERENCE_MAX_BATCH_SIZE, PREFORK_WORKERS, PREFORK_REPORT_TIMEOUT, EMBEDDING_CACHE_DIR
+from config.settings import INFERENCE_REPLICAS, INFERENCE_INTRA_OP_THREADS, INFERENCE_INTER_OP_THREADS, INFERENCE_PIN_CPUS
+from config.settings import METRICS_PORT, METRICS_HOST, SINGLEFLIGHT_ENABLED
+from config.settings import LOGGING_LEVEL, LOGGING_FORMAT, LOGGING_TEXT_FORMAT, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+from config.settings import LOG_ROTATE_WHEN, LOG_SAMPLE_RATE
+from monitoring.exporter import start_metrics_server
+from monitoring.log_setup import setup_logging
+from neural_network.bundle import read_manifest
+from neural_network.encoders import encoder_name, load_encoder
+from neural_network.inference import LocalPredictor, load_model_and_scaler
+from neural_network.client import InferenceClient
+from neural_network.singleflight import SingleFlightPredictor, model_version
+from neural_network.replicas import ReplicaPool, configure_threads
+from neural_network.prefork import DEFAULT_ADDRESS, PreforkPool, load_prefork_state, memory_usage, format_reports
+from socionics.question_bank import QuestionBank
 import tensorflow as tf
 import joblib
 import logging
 import os
-import tensorflow as tf
-
-
 
 
 def main():
-    # Настройка логирования (можно перенести в architecture.py)
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("logs/bot.logs"),
-            logging.StreamHandler()
-        ]
+    # Логи пишутся фоновым потоком через очередь, файл ротируется
+    setup_logging(
+        level=LOGGING_LEVEL,
+        log_format=LOGGING_FORMAT,
+        log_file=LOG_FILE,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        rotate_when=LOG_ROTATE_WHEN,
+        sample_rate=LOG_SAMPLE_RATE,
+        text_format=LOGGING_TEXT_FORMAT
     )
     logger = logging.getLogger(__name__)
     logger.info("Запуск бота...")
 
+    question_bank = QuestionBank(TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE)
+
+    if PREFORK_WORKERS > 0:
+        run_prefork(question_bank, logger)
+        return
+
+    start_metrics_server(METRICS_PORT, METRICS_HOST)
+
+    if INFERENCE_SERVER_ADDRESS:
+        # Модели загружены в отдельном процессе инференса (python -m neural_network.server)
+        application = setup_bot()
+        application.bot_data['question_bank'] = question_bank
+        application.bot_data['predictor'] = with_singleflight(InferenceClient(
+            INFERENCE_SERVER_ADDRESS,
+            pool_size=INFERENCE_CLIENT_POOL_SIZE,
+            timeout=INFERENCE_TIMEOUT,
+            retries=INFERENCE_RETRIES
+        ))
+        logger.info(f"Предсказания выполняются на сервере инференса {INFERENCE_SERVER_ADDRESS}.")
+        application.run_polling()
+        return
+
+    # Бюджет потоков задаётся до загрузки моделей: TensorFlow принимает его только до инициализации
+    configure_threads(INFERENCE_INTRA_OP_THREADS, INFERENCE_INTER_OP_THREADS)
+
+    if INFERENCE_REPLICAS > 0:
+        # Реплики загружают модель сами, каждая со своим бюджетом потоков; процесс бота модель не держит
+        if not MODEL_BUNDLE_DIR and not (os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH)):
+            # Обученная здесь модель сохраняется на диск для реплик и в процессе бота не остаётся
+            train_model(load_encoder(ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM), logger)
+        application = setup_bot()
+        application.bot_data['question_bank'] = question_bank
+        predictor = ReplicaPool(
+            INFERENCE_REPLICAS, INFERENCE_INTRA_OP_THREADS, INFERENCE_INTER_OP_THREADS, INFERENCE_PIN_CPUS,
+            loader_args=(EMBEDDING_MODEL_NAME, MODEL_PATH, SCALER_PATH, ENCODER_BACKEND, STUB_ENCODER_DIM,
+                         MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION),
+            batch_size=INFERENCE_MAX_BATCH_SIZE
+        )
+        predictor.start()
+        application.bot_data['predictor'] = with_singleflight(predictor)
+        application.run_polling()
+        return
+
     # Инициализация модели эмбеддингов
-    embedding_model = SentenceTransformer('DeepPavlov/rubert-base-cased-sentence')
+    embedding_model = load_encoder(ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM)
     logger.info("Модель эмбеддингов загружена.")
 
     # Проверка, существует ли сохранённая модель и скейлер
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
+    if MODEL_BUNDLE_DIR:
+        logger.info("Загрузка бандла модели...")
+        model, scaler = load_model_and_scaler(
+            MODEL_PATH, SCALER_PATH, MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION,
+            encoder_name(ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM)
+        )
+    elif os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
         logger.info("Загрузка сохранённой модели и скейлера...")
         model = tf.keras.models.load_model(MODEL_PATH)
         scaler = joblib.load(SCALER_PATH)
         logger.info("Модель и скейлер успешно загружены.")
     else:
-        logger.info("Сохранённая модель или скейлер не найдены. Обучение модели с нуля...")
-        from neural_network.training import train_and_save_model
-        model, scaler = train_and_save_model(
-            embedding_model=embedding_model,
-            talanov_data_file=TALANOV_STATEMENTS_FILE,
-            user_statements_file=USER_STATEMENTS_FILE,
-            model_path=MODEL_PATH,
-            scaler_path=SCALER_PATH,
-            functions=FUNCTIONS
-        )
-        logger.info("Модель обучена и сохранена.")
+        model, scaler = train_model(embedding_model, logger)
 
     # Инициализация бота
     application = setup_bot()
@@ -57,9 +112,99 @@ def main():
     application.bot_data['embedding_model'] = embedding_model
     application.bot_data['model'] = model
     application.bot_data['scaler'] = scaler
+    application.bot_data['question_bank'] = question_bank
+    application.bot_data['predictor'] = with_singleflight(LocalPredictor(embedding_model, model, scaler))
 
     # Запуск бота
     application.run_polling()
 
+
+def train_model(embedding_model, logger):
+    """
+    Обучает модель с нуля и сохраняет её и скейлер в MODEL_PATH и SCALER_PATH.
+
+    Args:
+        embedding_model: Модель эмбеддингов.
+        logger (logging.Logger): Логгер.
+
+    Returns:
+        tuple: (модель, скейлер).
+    """
+    logger.info("Сохранённая модель или скейлер не найдены. Обучение модели с нуля...")
+    from neural_network.training import train_and_save_model
+    model, scaler = train_and_save_model(
+        embedding_model=embedding_model,
+        talanov_data_file=TALANOV_STATEMENTS_FILE,
+        user_statements_file=USER_STATEMENTS_FILE,
+        model_path=MODEL_PATH,
+        scaler_path=SCALER_PATH,
+        functions=FUNCTIONS
+    )
+    logger.info("Модель обучена и сохранена.")
+    return model, scaler
+
+
+def with_singleflight(predictor):
+    """
+    Оборачивает предсказатель: одинаковые одновременные утверждения предсказываются один раз.
+
+    Args:
+        predictor: Предсказатель с async predict(statements).
+
+    Returns:
+        Предсказатель (обёрнутый, если SINGLEFLIGHT_ENABLED).
+    """
+    if not SINGLEFLIGHT_ENABLED:
+        return predictor
+    if MODEL_BUNDLE_DIR:
+        # Версия бандла определяется его содержимым
+        return SingleFlightPredictor(predictor, read_manifest(MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION)['content_hash'])
+    return SingleFlightPredictor(predictor, model_version(MODEL_PATH))
+
+
+def run_prefork(question_bank, logger):
+    """
+    Пре-форк режим: модели загружаются один раз, воркеры инференса делят их copy-on-write.
+
+    Args:
+        question_bank (QuestionBank): Банк вопросов.
+        logger (logging.Logger): Логгер.
+    """
+    if not MODEL_BUNDLE_DIR and not (os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH)):
+        raise RuntimeError("Пре-форк режим требует обученной модели и скейлера; запустите бот без PREFORK_WORKERS, "
+                           "чтобы обучить модель.")
+
+    embedding_model, model, scaler, embedding_index = load_prefork_state(
+        ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM, MODEL_PATH, SCALER_PATH,
+        question_bank, EMBEDDING_CACHE_DIR, MODEL_BUNDLE_DIR, MODEL_BUNDLE_VERSION
+    )
+    master_usage = memory_usage()
+    address = INFERENCE_SERVER_ADDRESS or DEFAULT_ADDRESS
+
+    # Fork до создания приложения: в мастере ещё нет цикла событий и потоков бота. Поток QueueListener
+    # уже запущен setup_logging, но воркер его не наследует: хук os.register_at_fork из
+    # monitoring/log_setup.py заменяет в дочернем процессе обработчик очереди консольным
+    pool = PreforkPool(embedding_model, model, scaler, embedding_index, workers=PREFORK_WORKERS,
+                       address=address, max_batch_size=INFERENCE_MAX_BATCH_SIZE)
+    pool.start()
+    try:
+        logger.info("Воркеры инференса готовы:\n" + format_reports(
+            pool.collect_reports(PREFORK_REPORT_TIMEOUT), master_usage))
+        # Поток экспортёра запускается после fork, чтобы воркеры не унаследовали его блокировки
+        start_metrics_server(METRICS_PORT, METRICS_HOST)
+
+        application = setup_bot()
+        application.bot_data['question_bank'] = question_bank
+        application.bot_data['predictor'] = with_singleflight(InferenceClient(
+            address,
+            pool_size=max(INFERENCE_CLIENT_POOL_SIZE, PREFORK_WORKERS),
+            timeout=INFERENCE_TIMEOUT,
+            retries=INFERENCE_RETRIES
+        ))
+        application.run_polling()
+    finally:
+        pool.stop()
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,151 @@
+# socionics/adaptive.py
+"""
+Адаптивный опросник: следующий вопрос выбирается по ожидаемому приросту информации.
+
+Опросник держит апостериорное распределение по социотипам. Ответ 1–5 на
+утверждение моделируется упорядоченным softmax от корреляции утверждения с типом
+(type_correlation в talanovstatements.json): чем сильнее утверждение связано с
+типом, тем вероятнее у этого типа крайние ответы «согласен» или «не согласен».
+Следующим задаётся утверждение с наибольшей взаимной информацией между ответом и
+типом при текущем распределении; опросник заканчивается, как только самый
+вероятный тип набирает заданную уверенность. Все вычисления векторные по матрице
+«утверждение × тип», модель для этого не нужна.
+"""
+
+import numpy as np
+
+# Ответы опросника и их знак: 1 — совершенно не согласен, 3 — не знаю, 5 — полностью согласен
+ANSWERS = np.arange(1, 6)
+ANSWER_SIGNS = ((ANSWERS - 3) / 2).astype(np.float32)
+
+
+def answer_likelihoods(type_correlations, sharpness=1.0):
+    """
+    Вероятности ответов 1–5 на каждое утверждение для каждого типа.
+
+    Args:
+        type_correlations (numpy.ndarray): Корреляции формы (N, число типов).
+        sharpness (float, optional): Насколько уверенно тип отвечает в сторону знака
+            корреляции. Defaults to 1.0.
+
+    Returns:
+        numpy.ndarray: Вероятности формы (N, число типов, 5).
+    """
+    scores = sharpness * np.asarray(type_correlations, dtype=np.float32)[..., None] * ANSWER_SIGNS
+    scores -= scores.max(axis=-1, keepdims=True)
+    likelihoods = np.exp(scores)
+    return likelihoods / likelihoods.sum(axis=-1, keepdims=True)
+
+
+def entropy(probabilities, axis=-1):
+    """
+    Энтропия распределений в натах.
+
+    Args:
+        probabilities (numpy.ndarray): Распределения вдоль оси axis.
+        axis (int, optional): Ось распределения. Defaults to -1.
+
+    Returns:
+        numpy.ndarray: Энтропии.
+    """
+    logs = np.log(probabilities, out=np.zeros_like(probabilities), where=probabilities > 0)
+    return -(probabilities * logs).sum(axis=axis)
+
+
+class AdaptiveQuestionnaire:
+    """
+    Выбор вопросов и апостериорные вероятности типов по матрице банка вопросов.
+
+    Args:
+        type_names (list): Имена типов в порядке столбцов матрицы.
+        question_ids (numpy.ndarray): Номера утверждений в банке вопросов (строки матрицы).
+        type_correlations (numpy.ndarray): Корреляции утверждений с типами формы (N, число типов).
+        sharpness (float, optional): См. answer_likelihoods. Defaults to 1.0.
+    """
+
+    def __init__(self, type_names, question_ids, type_correlations, sharpness=1.0):
+        self.type_names = list(type_names)
+        self.question_ids = question_ids
+        self._rows = {int(question_id): row for row, question_id in enumerate(question_ids)}
+        self._likelihoods = answer_likelihoods(type_correlations, sharpness)
+        # Энтропия ответа при известном типе не зависит от ответов пользователя
+        self._answer_entropy = entropy(self._likelihoods)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def posterior(self, question_ids, answers):
+        """
+        Апостериорные вероятности типов при равномерном априорном распределении.
+
+        Args:
+            question_ids (Sequence): Номера заданных вопросов.
+            answers (Sequence): Ответы 1–5 (0 — ответа нет); вопросы не из матрицы пропускаются.
+
+        Returns:
+            numpy.ndarray: Вероятности типов формы (число типов,).
+        """
+        pairs = [(self._rows[question_id], answer - 1) for question_id, answer in zip(question_ids, answers)
+                 if answer and question_id in self._rows]
+        log_posterior = np.zeros(len(self.type_names), dtype=np.float64)
+        if pairs:
+            rows, columns = zip(*pairs)
+            log_posterior += np.log(self._likelihoods[list(rows), :, list(columns)]).sum(axis=0)
+        posterior = np.exp(log_posterior - log_posterior.max())
+        return posterior / posterior.sum()
+
+    def information_gain(self, posterior):
+        """
+        Ожидаемый прирост информации о типе от ответа на каждое утверждение.
+
+        I(ответ; тип) = H(ответ) − Σ_t p(t)·H(ответ | t).
+
+        Args:
+            posterior (numpy.ndarray): Текущие вероятности типов.
+
+        Returns:
+            numpy.ndarray: Прирост в натах формы (N,).
+        """
+        predictive = np.einsum('sta,t->sa', self._likelihoods, posterior)
+        return entropy(predictive) - self._answer_entropy @ posterior
+
+    def next_question(self, question_ids, answers, max_questions, min_questions=1, confidence=1.0):
+        """
+        Следующий вопрос или None, если опросник пора заканчивать.
+
+        Args:
+            question_ids (Sequence): Номера уже заданных вопросов.
+            answers (Sequence): Ответы на них.
+            max_questions (int): Наибольшее число вопросов.
+            min_questions (int, optional): Сколько вопросов задать до досрочного завершения. Defaults to 1.
+            confidence (float, optional): Вероятность самого вероятного типа, при которой
+                опросник заканчивается досрочно. Defaults to 1.0.
+
+        Returns:
+            int or None: Номер утверждения в банке вопросов.
+        """
+        if len(question_ids) >= max_questions:
+            return None
+        posterior = self.posterior(question_ids, answers)
+        if len(question_ids) >= min_questions and posterior.max() >= confidence:
+            return None
+        gains = self.information_gain(posterior)
+        asked = [self._rows[question_id] for question_id in question_ids if question_id in self._rows]
+        gains[asked] = -np.inf
+        if not np.isfinite(gains).any():
+            return None
+        return int(self.question_ids[int(np.argmax(gains))])
+
+    def probabilities(self, question_ids, answers):
+        """
+        Вероятности типов в процентах, как у predict_socionics_types.
+
+        Args:
+            question_ids (Sequence): Номера заданных вопросов.
+            answers (Sequence): Ответы на них.
+
+        Returns:
+            dict: Имя типа -> вероятность в процентах.
+        """
+        posterior = self.posterior(question_ids, answers)
+        return {name: float(probability) * 100 for name, probability in zip(self.type_names, posterior)}
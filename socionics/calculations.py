@@ -2,8 +2,25 @@
 
 import logging
 
+import numpy as np
+
 FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
 
+# Признаки как разность сумм функций (положительные, отрицательные) — то же, что в calculate_traits
+TRAIT_FUNCTIONS = {
+    'Квестимность': (["БК", "ЧК"], ["БД", "ЧД"]),
+    'Интуиция': (["БИ", "ЧИ"], ["БС", "ЧС"]),
+    'Демократизм': (["БК", "ЧД"], ["ЧК", "БД"]),
+    'Веселость': (["ЧЭ", "БЛ"], ["БЭ", "ЧЛ"]),
+    'Логика': (["БЛ", "ЧЛ"], ["ЧЭ", "БЭ"]),
+    'Экстраверсия': ([func for func in FUNCTIONS if func.startswith('Ч')],
+                     [func for func in FUNCTIONS if func.startswith('Б')]),
+    'Иррациональность': (["ЧИ", "БИ", "БС", "ЧС"], ["ЧЭ", "БЭ", "БЛ", "ЧЛ"]),
+    'Рассудительность': (["ЧИ", "БС"], ["ЧС", "БИ"]),
+    'Статика': (["БЛ", "БЭ", "ЧИ", "ЧС"], ["ЧЛ", "ЧЭ", "БИ", "БС"]),
+}
+TRAITS = list(TRAIT_FUNCTIONS)
+
 def calculate_traits(correlations):
     """
     Вычисляет соционические признаки на основе корреляций функций.
@@ -177,3 +194,73 @@ def modify_coefficients_based_on_answer(correlations, answer):
         return None
 
     return modified_correlations
+
+
+def trait_matrix(functions=FUNCTIONS):
+    """
+    Матрица перехода от корреляций функций к признакам.
+
+    Args:
+        functions (list, optional): Порядок функций в столбцах корреляций. Defaults to FUNCTIONS.
+
+    Returns:
+        numpy.ndarray: Матрица формы (len(functions), len(TRAITS)) из 0 и ±1.
+    """
+    matrix = np.zeros((len(functions), len(TRAITS)), dtype=np.float32)
+    for column, (positive, negative) in enumerate(TRAIT_FUNCTIONS.values()):
+        for func in positive:
+            matrix[functions.index(func), column] += 1
+        for func in negative:
+            matrix[functions.index(func), column] -= 1
+    return matrix
+
+
+def calculate_traits_batch(correlations, functions=FUNCTIONS):
+    """
+    Векторная версия calculate_traits для массива корреляций.
+
+    Args:
+        correlations (numpy.ndarray): Корреляции формы (N, len(functions)).
+        functions (list, optional): Порядок функций в столбцах. Defaults to FUNCTIONS.
+
+    Returns:
+        numpy.ndarray: Признаки формы (N, len(TRAITS)) в порядке TRAITS.
+    """
+    return np.asarray(correlations, dtype=np.float32) @ trait_matrix(functions)
+
+
+def type_matrix(socionics_types):
+    """
+    Матрица весов признаков для каждого социотипа.
+
+    Args:
+        socionics_types (dict): Словарь соционических типов и их характеристик.
+
+    Returns:
+        tuple: (список имён типов, матрица формы (len(TRAITS), число типов)).
+    """
+    names = list(socionics_types)
+    matrix = np.zeros((len(TRAITS), len(names)), dtype=np.float32)
+    for column, name in enumerate(names):
+        for trait, alignment in socionics_types[name].items():
+            if trait in TRAIT_FUNCTIONS:
+                matrix[TRAITS.index(trait), column] = alignment
+    return names, matrix
+
+
+def predict_socionics_types_batch(traits, socionics_types):
+    """
+    Векторная версия predict_socionics_types.
+
+    Args:
+        traits (numpy.ndarray): Признаки формы (N, len(TRAITS)).
+        socionics_types (dict): Словарь соционических типов и их характеристик.
+
+    Returns:
+        tuple: (список имён типов, вероятности в процентах формы (N, число типов)).
+    """
+    names, matrix = type_matrix(socionics_types)
+    scores = np.maximum(np.asarray(traits, dtype=np.float32) @ matrix, 0)
+    totals = scores.sum(axis=1, keepdims=True)
+    probabilities = np.divide(scores * 100, totals, out=np.zeros_like(scores), where=totals > 0)
+    return names, probabilities
@@ -0,0 +1,236 @@
+# socionics/chat_export.py
+"""
+Чтение экспорта чата Telegram Desktop (result.json).
+
+Файл читается потоково: из верхнего объекта декодируются небольшие поля, а массив
+"messages" разбирается по одному сообщению через json.JSONDecoder.raw_decode, так что
+в памяти одновременно находятся только буфер чтения и текущее сообщение. Для каждого
+автора хранится случайная выборка его сообщений (reservoir sampling) ограниченного
+размера; общий объём сохранённого текста ограничен бюджетом символов.
+"""
+
+import json
+import logging
+import random
+import time
+
+# Части форматированного текста, которые не несут собственных слов автора
+SKIPPED_ENTITIES = {'link', 'mention', 'mention_name', 'email', 'phone', 'bot_command', 'code', 'pre', 'hashtag',
+                    'cashtag'}
+
+_WHITESPACE = ' \t\r\n'
+# Символы, которыми может продолжаться число JSON
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class ChatExportError(Exception):
+    """Файл не похож на экспорт одного чата или превышены ограничения разбора."""
+
+
+class _JsonStream:
+    """Буфер поверх текстового файла с инкрементальным raw_decode."""
+
+    def __init__(self, f, read_size, max_value_chars):
+        self.f = f
+        self.read_size = read_size
+        self.max_value_chars = max_value_chars
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        try:
+            chunk = self.f.read(self.read_size)
+        except UnicodeDecodeError as e:
+            raise ChatExportError("Файл не в кодировке UTF-8.") from e
+        if not chunk:
+            self.eof = True
+            return False
+        # Разобранная часть буфера отбрасывается, чтобы память не росла с размером файла
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ChatExportError(f"Ожидался символ {char!r} в позиции разбора, получен {self.peek()!r}.")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Число в конце буфера могло быть прочитано не полностью: «12» из «123», «9» из «9.75»
+                truncated = end == len(self.buffer) or (
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and self.buffer[end] in _NUMBER_CHARS)
+                if not truncated or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ChatExportError(f"Некорректный JSON: {e}") from e
+            if len(self.buffer) - self.pos > self.max_value_chars:
+                raise ChatExportError(f"Значение длиннее {self.max_value_chars} символов.")
+            self._fill()
+
+
+def iter_chat_messages(path, read_size=1 << 16, max_message_chars=1 << 20):
+    """
+    Потоково перебирает сообщения экспорта одного чата.
+
+    Args:
+        path (str): Путь к result.json.
+        read_size (int, optional): Сколько символов читается за раз. Defaults to 65536.
+        max_message_chars (int, optional): Максимальный размер одного сообщения в JSON. Defaults to 1048576.
+
+    Yields:
+        dict: Сообщение из массива "messages".
+
+    Raises:
+        ChatExportError: Файл не является экспортом одного чата, повреждён или не в кодировке UTF-8.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, read_size, max_message_chars)
+        stream.expect('{')
+        while True:
+            char = stream.peek()
+            if char == '}':
+                return
+            if char == ',':
+                stream.pos += 1
+                continue
+            key = stream.value()
+            stream.expect(':')
+            if key == 'chats':
+                raise ChatExportError("Это экспорт всего аккаунта; экспортируйте один чат.")
+            if key != 'messages':
+                stream.value()
+                continue
+            stream.expect('[')
+            while True:
+                char = stream.peek()
+                if char == ']':
+                    stream.pos += 1
+                    break
+                if char == ',':
+                    stream.pos += 1
+                    continue
+                if char == '':
+                    raise ChatExportError("Файл оборвался внутри массива сообщений.")
+                yield stream.value()
+
+
+def message_text(message):
+    """
+    Текст сообщения без ссылок, упоминаний, кода и прочих служебных частей.
+
+    Args:
+        message (dict): Сообщение экспорта.
+
+    Returns:
+        str: Текст.
+    """
+    text = message.get('text', '')
+    if isinstance(text, str):
+        return text
+    parts = []
+    for part in text:
+        if isinstance(part, str):
+            parts.append(part)
+        elif part.get('type') not in SKIPPED_ENTITIES:
+            parts.append(part.get('text', ''))
+    return ''.join(parts)
+
+
+class AuthorSample:
+    """Случайная выборка сообщений автора."""
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0
+        self.messages = []
+        self.chars = 0
+
+
+def sample_authors(messages, min_words=3, max_messages_per_author=500, max_message_chars=1000,
+                   max_total_chars=5_000_000, deadline=None, should_stop=None, seed=0):
+    """
+    Собирает выборки сообщений по авторам.
+
+    Учитываются обычные сообщения с автором, кроме пересланных и коротких. Если
+    сохранённый текст превышает max_total_chars, выборка автора с наименьшим числом
+    сообщений удаляется; его сообщения дальше только считаются.
+
+    Args:
+        messages (iterable): Сообщения экспорта.
+        min_words (int, optional): Минимум слов в сообщении. Defaults to 3.
+        max_messages_per_author (int, optional): Размер выборки автора. Defaults to 500.
+        max_message_chars (int, optional): Сообщение обрезается до стольких символов. Defaults to 1000.
+        max_total_chars (int, optional): Бюджет сохранённого текста. Defaults to 5000000.
+        deadline (float, optional): Срок по time.monotonic(). Defaults to None.
+        should_stop (callable, optional): Возвращает True, если разбор нужно прервать. Defaults to None.
+        seed (int, optional): Зерно выборки. Defaults to 0.
+
+    Returns:
+        dict: {from_id: AuthorSample}.
+
+    Raises:
+        ChatExportError: Истёк срок или разбор прерван.
+    """
+    rng = random.Random(seed)
+    authors = {}
+    evicted = set()
+    total_chars = 0
+    for i, message in enumerate(messages):
+        if i % 1000 == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                raise ChatExportError("Разбор файла не уложился в отведённое время.")
+            if should_stop is not None and should_stop():
+                raise ChatExportError("Разбор файла прерван.")
+        if message.get('type') != 'message' or 'forwarded_from' in message or not message.get('from_id'):
+            continue
+        text = ' '.join(message_text(message).split())[:max_message_chars]
+        if len(text.split()) < min_words:
+            continue
+
+        author_id = message['from_id']
+        sample = authors.get(author_id)
+        if sample is None:
+            sample = authors[author_id] = AuthorSample(message.get('from') or author_id)
+        sample.total += 1
+        if author_id in evicted:
+            continue
+
+        # Reservoir sampling: каждое сообщение автора попадает в выборку с равной вероятностью
+        if len(sample.messages) < max_messages_per_author:
+            slot = len(sample.messages)
+            sample.messages.append('')
+        else:
+            slot = rng.randrange(sample.total)
+            if slot >= max_messages_per_author:
+                continue
+        total_chars += len(text) - len(sample.messages[slot])
+        sample.chars += len(text) - len(sample.messages[slot])
+        sample.messages[slot] = text
+
+        while total_chars > max_total_chars:
+            smallest = min((key for key in authors if key not in evicted), key=lambda key: authors[key].total)
+            total_chars -= authors[smallest].chars
+            authors[smallest].messages = []
+            authors[smallest].chars = 0
+            evicted.add(smallest)
+    if evicted:
+        logging.info(f"Бюджет текста исчерпан: выборки {len(evicted)} авторов с наименьшим числом сообщений удалены.")
+    return authors
@@ -0,0 +1,315 @@
+# socionics/compaction.py
+"""
+Офлайн-сжатие данных: поиск почти одинаковых утверждений и слияние их меток.
+
+Все источники (утверждения Таланова, user_db.json, feedback_data.jsonl) читаются
+потоком. Для каждого утверждения строится MinHash по символьным шинглам
+нормализованного текста, а LSH по полосам сигнатуры даёт кандидатов за почти
+линейное время. Внутри корзины каждое утверждение сравнивается только с первым, так
+что большие корзины не дают квадратичного числа пар. Кандидаты подтверждаются оценкой
+сходства Жаккара и, по желанию, косинусным сходством эмбеддингов. Метки кластера
+сливаются по выбранной политике, результат пишется корпусом в формате user_db.json
+вместе с отчётом.
+
+Пример запуска из корня репозитория:
+    python -m socionics.compaction --output data/compacted_corpus.json --threshold 0.7 --policy priority
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+import warnings
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from config.settings import TALANOV_STATEMENTS_FILE, USER_STATEMENTS_FILE, FEEDBACK_DATA_FILE, FUNCTIONS
+
+# Источники в порядке приоритета для политики priority
+SOURCES = ('talanov', 'user', 'feedback')
+MERGE_POLICIES = ('priority', 'mean', 'median', 'latest')
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize_text(statement):
+    """Нижний регистр, без пунктуации, одиночные пробелы."""
+    return _NON_WORD.sub(' ', statement.lower()).strip()
+
+
+def shingles(text, size=5):
+    """
+    Хеши символьных шинглов текста.
+
+    Args:
+        text (str): Нормализованный текст.
+        size (int, optional): Длина шингла. Defaults to 5.
+
+    Returns:
+        numpy.ndarray: Уникальные 31-битные хеши шинглов (int64).
+    """
+    if len(text) <= size:
+        grams = {text}
+    else:
+        grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) & _MERSENNE_PRIME for gram in grams), dtype=np.int64)
+
+
+class MinHasher:
+    """
+    Сигнатуры MinHash на универсальных хеш-функциях (a·x + b) mod (2^31 − 1).
+
+    Args:
+        num_perm (int, optional): Длина сигнатуры. Defaults to 128.
+        seed (int, optional): Зерно генератора. Defaults to 1.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.int64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.int64)
+
+    def signature(self, hashes):
+        # a, x < 2^31, поэтому произведение помещается в int64
+        return ((self.a * hashes[None, :] + self.b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+
+def iter_records(talanov_file=TALANOV_STATEMENTS_FILE, user_statements_file=USER_STATEMENTS_FILE,
+                 feedback_data_file=FEEDBACK_DATA_FILE):
+    """
+    Потоково перебирает размеченные утверждения всех источников.
+
+    Yields:
+        tuple: (источник, исходная запись). Записи без statement или function_correlation пропускаются.
+    """
+    for source, path in (('talanov', talanov_file), ('user', user_statements_file)):
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                entries = json.load(f)
+            except json.JSONDecodeError as e:
+                logging.error(f"Ошибка декодирования JSON в {path}: {e}")
+                continue
+        for entry in entries:
+            if entry.get('statement') and entry.get('function_correlation'):
+                yield source, entry
+    if feedback_data_file and os.path.exists(feedback_data_file):
+        with open(feedback_data_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.error(f"Ошибка декодирования JSON: {e}")
+                    continue
+                if entry.get('statement') and entry.get('function_correlation'):
+                    yield 'feedback', entry
+
+
+def _correlation_vector(correlations):
+    return np.array([correlations.get(func, np.nan) for func in FUNCTIONS], dtype=np.float32)
+
+
+class _DisjointSet:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def merge_labels(vectors, sources, policy):
+    """
+    Сливает корреляции кластера.
+
+    Args:
+        vectors (numpy.ndarray): Корреляции формы (M, len(FUNCTIONS)), NaN — нет значения.
+        sources (list): Источник каждой строки.
+        policy (str): priority — среднее по источнику с наивысшим приоритетом; mean; median;
+            latest — последняя по порядку чтения запись.
+
+    Returns:
+        numpy.ndarray: Слитые корреляции (NaN, если значения нет ни у одной записи).
+    """
+    if policy == 'latest':
+        return vectors[-1]
+    if policy == 'priority':
+        best = min(SOURCES.index(source) for source in sources)
+        vectors = vectors[[SOURCES.index(source) == best for source in sources]]
+    with warnings.catch_warnings():
+        # Столбец из одних NaN — ожидаемый случай неполных меток
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if policy == 'median':
+            return np.nanmedian(vectors, axis=0)
+        return np.nanmean(vectors, axis=0)
+
+
+def compact(records, threshold=0.7, num_perm=128, bands=16, shingle_size=5, policy='priority',
+            embedding_model=None, min_cosine=0.9):
+    """
+    Находит почти одинаковые утверждения и сливает их.
+
+    Args:
+        records (iterable): Пары (источник, запись) из iter_records.
+        threshold (float, optional): Минимальная оценка сходства Жаккара. Defaults to 0.7.
+        num_perm (int, optional): Длина сигнатуры MinHash. Defaults to 128.
+        bands (int, optional): Число полос LSH (num_perm должно делиться на bands). Defaults to 16.
+        shingle_size (int, optional): Длина символьного шингла. Defaults to 5.
+        policy (str, optional): Политика слияния меток (MERGE_POLICIES). Defaults to 'priority'.
+        embedding_model (SentenceTransformer, optional): Кодировщик для подтверждения пар. Defaults to None.
+        min_cosine (float, optional): Минимальное косинусное сходство эмбеддингов. Defaults to 0.9.
+
+    Returns:
+        tuple: (список записей сжатого корпуса, отчёт dict).
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm={num_perm} должно делиться на bands={bands}.")
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Неизвестная политика слияния '{policy}'. Доступны: {', '.join(MERGE_POLICIES)}.")
+
+    start = time.perf_counter()
+    hasher = MinHasher(num_perm)
+    rows = num_perm // bands
+    entries, sources, vectors, signatures = [], [], [], []
+    buckets = {}
+    candidate_links = []
+    for index, (source, entry) in enumerate(records):
+        entries.append(entry)
+        sources.append(source)
+        vectors.append(_correlation_vector(entry['function_correlation']))
+        signature = hasher.signature(shingles(normalize_text(entry['statement']), shingle_size))
+        signatures.append(signature)
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            first = buckets.setdefault(key, index)
+            if first != index:
+                candidate_links.append((first, index))
+
+    total = len(entries)
+    signatures = np.array(signatures) if signatures else np.zeros((0, num_perm), dtype=np.uint32)
+    candidate_links = sorted(set(candidate_links))
+    links = [(first, second) for first, second in candidate_links
+             if np.mean(signatures[first] == signatures[second]) >= threshold]
+
+    rejected_by_embeddings = 0
+    if embedding_model is not None and links:
+        involved = sorted({index for link in links for index in link})
+        embeddings = embedding_model.encode([entries[i]['statement'] for i in involved], normalize_embeddings=True)
+        position = {index: i for i, index in enumerate(involved)}
+        confirmed = [(first, second) for first, second in links
+                     if float(np.dot(embeddings[position[first]], embeddings[position[second]])) >= min_cosine]
+        rejected_by_embeddings = len(links) - len(confirmed)
+        links = confirmed
+
+    clusters = _DisjointSet(total)
+    for first, second in links:
+        clusters.union(first, second)
+    members = defaultdict(list)
+    for index in range(total):
+        members[clusters.find(index)].append(index)
+
+    corpus = []
+    largest = []
+    spreads = []
+    for root, indices in members.items():
+        cluster_sources = [sources[i] for i in indices]
+        # Представитель — первая запись источника с наивысшим приоритетом
+        representative = min(indices, key=lambda i: (SOURCES.index(sources[i]), i))
+        merged = merge_labels(np.stack([vectors[i] for i in indices]), cluster_sources, policy)
+        entry = {key: value for key, value in entries[representative].items()
+                 if key not in ('timestamp', 'user_id', 'username', 'positive_feedback')}
+        entry['function_correlation'] = {func: round(float(value), 4)
+                                         for func, value in zip(FUNCTIONS, merged) if not np.isnan(value)}
+        if len(indices) > 1:
+            entry['merged_from'] = len(indices)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                spread = float(np.nanmax(np.nanstd(np.stack([vectors[i] for i in indices]), axis=0)))
+            spreads.append(spread)
+            largest.append((len(indices), spread, [entries[i]['statement'] for i in indices[:5]]))
+        corpus.append((representative, entry))
+    corpus = [entry for _, entry in sorted(corpus, key=lambda item: item[0])]
+
+    largest.sort(key=lambda item: -item[0])
+    report = {
+        'input': dict(Counter(sources)),
+        'records': total,
+        'output': len(corpus),
+        'removed': total - len(corpus),
+        'duplicate_clusters': len(spreads),
+        'candidate_pairs': len(candidate_links),
+        'confirmed_pairs': len(links),
+        'rejected_by_embeddings': rejected_by_embeddings,
+        'policy': policy,
+        'threshold': threshold,
+        'max_label_spread': max(spreads) if spreads else 0.0,
+        'largest_clusters': [{'size': size, 'label_spread': round(spread, 4), 'statements': statements}
+                             for size, spread, statements in largest[:20]],
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    return corpus, report
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Сжатие данных: слияние почти одинаковых утверждений.")
+    parser.add_argument('--talanov', default=TALANOV_STATEMENTS_FILE)
+    parser.add_argument('--user-statements', default=USER_STATEMENTS_FILE)
+    parser.add_argument('--feedback', default=FEEDBACK_DATA_FILE)
+    parser.add_argument('--output', default=os.path.join('data', 'compacted_corpus.json'),
+                        help="Сжатый корпус (формат user_db.json); отчёт пишется в <output>.report.json.")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Минимальная оценка сходства Жаккара.")
+    parser.add_argument('--num-perm', type=int, default=128)
+    parser.add_argument('--bands', type=int, default=16)
+    parser.add_argument('--shingle-size', type=int, default=5)
+    parser.add_argument('--policy', default='priority', choices=MERGE_POLICIES, help="Политика слияния меток.")
+    parser.add_argument('--confirm-embeddings', action='store_true',
+                        help="Подтверждать пары косинусным сходством эмбеддингов.")
+    parser.add_argument('--min-cosine', type=float, default=0.9)
+    args = parser.parse_args()
+
+    embedding_model = None
+    if args.confirm_embeddings:
+        from config.settings import ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM
+        from neural_network.encoders import load_encoder
+        embedding_model = load_encoder(ENCODER_BACKEND, EMBEDDING_MODEL_NAME, STUB_ENCODER_DIM)
+
+    corpus, report = compact(
+        iter_records(args.talanov, args.user_statements, args.feedback),
+        threshold=args.threshold,
+        num_perm=args.num_perm,
+        bands=args.bands,
+        shingle_size=args.shingle_size,
+        policy=args.policy,
+        embedding_model=embedding_model,
+        min_cosine=args.min_cosine
+    )
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=4)
+    with open(f"{args.output}.report.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logging.info(f"Записей: {report['records']} -> {report['output']} (удалено {report['removed']}, "
+                 f"кластеров дубликатов {report['duplicate_clusters']}) за {report['seconds']} с; "
+                 f"корпус в {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
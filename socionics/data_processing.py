@@ -3,14 +3,17 @@
 import json
 import os
 import logging
+import time
 from datetime import datetime
 
+from monitoring.metrics import PERSISTENCE_FLUSHES, record_stage
+
 FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
 
 
 def save_feedback(user_id, username, statement, corrected_correlations, positive_feedback,
                  feedback_data_file='data/feedback_data.jsonl',
-                 user_statements_file='data/user_db.json'):
+                 user_statements_file='data/user_db.json', store_statement=True):
     """
     Сохраняет обратную связь пользователя, включая новое утверждение и корреляции.
 
@@ -22,6 +25,8 @@ def save_feedback(user_id, username, statement, corrected_correlations, positive
         positive_feedback (bool): Флаг положительной обратной связи.
         feedback_data_file (str, optional): Путь к файлу обратной связи. Defaults to 'data/feedback_data.jsonl'.
         user_statements_file (str, optional): Путь к файлу пользовательских утверждений. Defaults to 'data/user_db.json'.
+        store_statement (bool, optional): Сохранить новое утверждение в user_statements_file; False — утверждение
+            ждёт проверки в очереди. Defaults to True.
     """
     # Преобразуем все значения корреляций в стандартные float
     corrected_correlations = {k: float(v) for k, v in corrected_correlations.items()}
@@ -34,35 +39,71 @@ def save_feedback(user_id, username, statement, corrected_correlations, positive
         "function_correlation": corrected_correlations,
         "positive_feedback": positive_feedback
     }
+    start = time.perf_counter()
     try:
         # Сохраняем обратную связь в feedback_data_file
         os.makedirs(os.path.dirname(feedback_data_file), exist_ok=True)
         with open(feedback_data_file, 'a', encoding='utf-8') as f:
             f.write(json.dumps(feedback_entry, ensure_ascii=False) + '\n')
+        PERSISTENCE_FLUSHES.inc(target='feedback')
         logging.info(f"Обратная связь от пользователя {username} сохранена в {feedback_data_file}.")
 
         # Если это новое утверждение, сохраняем его в user_statements_file
-        if not positive_feedback:
-            user_statements = []
-            if os.path.exists(user_statements_file):
-                with open(user_statements_file, 'r', encoding='utf-8') as f:
-                    try:
-                        user_statements = json.load(f)
-                    except json.JSONDecodeError:
-                        logging.error(f"Ошибка декодирования JSON в {user_statements_file}. Файл будет перезаписан.")
-                        user_statements = []
-
-            # Проверяем, есть ли уже такое утверждение
-            if not any(entry['statement'].strip().lower() == statement.strip().lower() for entry in user_statements):
-                user_statements.append({
-                    "statement": statement,
-                    "function_correlation": corrected_correlations
-                })
-                with open(user_statements_file, 'w', encoding='utf-8') as f:
-                    json.dump(user_statements, f, ensure_ascii=False, indent=4)
-                logging.info(f"Новое утверждение сохранено в {user_statements_file}.")
+        if not positive_feedback and store_statement:
+            append_user_statements([feedback_entry], user_statements_file)
     except Exception as e:
         logging.error(f"Не удалось сохранить обратную связь: {e}")
+    finally:
+        record_stage('persistence', time.perf_counter() - start)
+
+
+def append_user_statements(entries, user_statements_file='data/user_db.json'):
+    """
+    Добавляет утверждения в файл пользовательских утверждений одной записью на диск.
+
+    Утверждения, которые уже есть в файле (без учёта регистра и пробелов по краям), пропускаются.
+
+    Args:
+        entries (list): Словари с ключами 'statement' и 'function_correlation'.
+        user_statements_file (str, optional): Путь к файлу пользовательских утверждений. Defaults to 'data/user_db.json'.
+
+    Returns:
+        int: Сколько утверждений добавлено.
+    """
+    user_statements = []
+    if os.path.exists(user_statements_file):
+        with open(user_statements_file, 'r', encoding='utf-8') as f:
+            try:
+                user_statements = json.load(f)
+            except json.JSONDecodeError:
+                logging.error(f"Ошибка декодирования JSON в {user_statements_file}. Файл будет перезаписан.")
+                user_statements = []
+
+    known = {entry['statement'].strip().lower() for entry in user_statements}
+    added = 0
+    for entry in entries:
+        key = entry['statement'].strip().lower()
+        if key in known:
+            continue
+        known.add(key)
+        user_statements.append({
+            "statement": entry['statement'],
+            "function_correlation": {k: float(v) for k, v in entry['function_correlation'].items()}
+        })
+        added += 1
+    if not added:
+        return 0
+
+    directory = os.path.dirname(user_statements_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{user_statements_file}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(user_statements, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, user_statements_file)
+    PERSISTENCE_FLUSHES.inc(target='user_statements')
+    logging.info(f"Новых утверждений сохранено в {user_statements_file}: {added}.")
+    return added
 
 
 def load_feedback_data(feedback_data_file='data/feedback_data.jsonl'):
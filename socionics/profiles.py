@@ -0,0 +1,223 @@
+# socionics/profiles.py
+"""
+Накопительный профиль пользователя.
+
+Каждое проанализированное утверждение (свободный текст, /neurotype) добавляется в
+профиль за O(1): для пользователя хранятся строки фиксированного размера — суммы
+корреляций функций, суммы квадратов, накопленный вес и число утверждений. /profile
+превращает средние корреляции в признаки и вероятности типов без повторных
+предсказаний.
+
+Старые утверждения могут терять вес двумя способами:
+- затухание по времени: вклад уменьшается вдвое за half_life_days;
+- окно: накопленный вес ограничен window утверждениями, поэтому профиль отражает
+  примерно последние window утверждений (экспоненциальное скользящее среднее).
+
+Профили хранятся в одном файле .npz (массивы float64 по пользователям) и
+записываются на диск не чаще раза в flush_interval секунд и при остановке бота.
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+from monitoring.metrics import PERSISTENCE_FLUSHES, record_stage
+
+FUNCTIONS = ["ЧИ", "БИ", "ЧС", "БС", "БЛ", "ЧЛ", "БЭ", "ЧЭ", "БК", "ЧК", "БД", "ЧД"]
+
+SECONDS_PER_DAY = 86400.0
+
+
+class ProfileStore:
+    """
+    Профили пользователей в плотных массивах: строка на пользователя.
+
+    Args:
+        path (str): Файл .npz с профилями; пустая строка — только в памяти.
+        half_life_days (float, optional): Период полураспада вклада утверждения в днях (0 — без затухания).
+            Defaults to 0.
+        window (int, optional): Эффективное окно в утверждениях (0 — без окна). Defaults to 0.
+        flush_interval (float, optional): Минимальный интервал записи на диск в секундах. Defaults to 30.
+    """
+
+    def __init__(self, path, half_life_days=0.0, window=0, flush_interval=30.0):
+        self.path = path
+        self.half_life = half_life_days * SECONDS_PER_DAY
+        self.window = window
+        self.flush_interval = flush_interval
+        self._rows = {}
+        self._user_ids = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros((0, len(FUNCTIONS)), dtype=np.float64)
+        self._squares = np.zeros((0, len(FUNCTIONS)), dtype=np.float64)
+        self._weights = np.zeros(0, dtype=np.float64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._updated = np.zeros(0, dtype=np.float64)
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _load(self):
+        try:
+            with np.load(self.path) as data:
+                if list(data['functions']) != FUNCTIONS:
+                    logging.error(f"Порядок функций в {self.path} не совпадает с FUNCTIONS; профили не загружены.")
+                    return
+                self._user_ids = data['user_ids']
+                self._sums = data['sums']
+                self._squares = data['squares']
+                self._weights = data['weights']
+                self._counts = data['counts']
+                self._updated = data['updated']
+        except (OSError, KeyError, ValueError) as e:
+            logging.error(f"Не удалось загрузить профили из {self.path}: {e}")
+            return
+        self._rows = {int(user_id): row for row, user_id in enumerate(self._user_ids)}
+        logging.info(f"Загружено {len(self._rows)} профилей пользователей из {self.path}.")
+
+    def _row(self, user_id):
+        row = self._rows.get(user_id)
+        if row is not None:
+            return row
+        row = len(self._rows)
+        if row == len(self._user_ids):
+            # Массивы растут удвоением, чтобы добавление пользователя оставалось O(1) в среднем
+            capacity = max(16, 2 * row)
+            self._user_ids = np.resize(self._user_ids, capacity)
+            self._sums = np.resize(self._sums, (capacity, len(FUNCTIONS)))
+            self._squares = np.resize(self._squares, (capacity, len(FUNCTIONS)))
+            self._weights = np.resize(self._weights, capacity)
+            self._counts = np.resize(self._counts, capacity)
+            self._updated = np.resize(self._updated, capacity)
+        self._user_ids[row] = user_id
+        self._sums[row] = 0.0
+        self._squares[row] = 0.0
+        self._weights[row] = 0.0
+        self._counts[row] = 0
+        self._updated[row] = 0.0
+        self._rows[user_id] = row
+        return row
+
+    def _decay(self, row, now):
+        if self.half_life <= 0 or self._weights[row] == 0:
+            return
+        factor = 0.5 ** (max(now - self._updated[row], 0.0) / self.half_life)
+        self._sums[row] *= factor
+        self._squares[row] *= factor
+        self._weights[row] *= factor
+
+    def update(self, user_id, correlations, weight=1.0, now=None):
+        """
+        Добавляет корреляции утверждения в профиль пользователя.
+
+        Args:
+            user_id (int): ID пользователя.
+            correlations (dict): Корреляции функций.
+            weight (float, optional): Вес утверждения. Defaults to 1.0.
+            now (float, optional): Время по time.time(). Defaults to None (текущее).
+        """
+        now = time.time() if now is None else now
+        values = np.array([correlations.get(func, 0.0) for func in FUNCTIONS], dtype=np.float64)
+        row = self._row(user_id)
+        self._decay(row, now)
+        if self.window > 0 and self._weights[row] + weight > self.window:
+            # Старые утверждения уступают место новому: вес профиля не превышает окна
+            factor = max(self.window - weight, 0.0) / self._weights[row]
+            self._sums[row] *= factor
+            self._squares[row] *= factor
+            self._weights[row] *= factor
+        self._sums[row] += weight * values
+        self._squares[row] += weight * values * values
+        self._weights[row] += weight
+        self._counts[row] += 1
+        self._updated[row] = now
+        self._dirty = True
+        self.maybe_flush()
+
+    def summary(self, user_id):
+        """
+        Средние корреляции профиля и их разброс.
+
+        Args:
+            user_id (int): ID пользователя.
+
+        Returns:
+            dict or None: {'correlations', 'spread', 'count', 'weight', 'updated'} или None, если профиля нет.
+        """
+        row = self._rows.get(user_id)
+        if row is None or self._weights[row] <= 0:
+            return None
+        weight = self._weights[row]
+        mean = self._sums[row] / weight
+        spread = np.sqrt(np.maximum(self._squares[row] / weight - mean * mean, 0.0))
+        return {
+            'correlations': {func: float(mean[i]) for i, func in enumerate(FUNCTIONS)},
+            'spread': {func: float(spread[i]) for i, func in enumerate(FUNCTIONS)},
+            'count': int(self._counts[row]),
+            'weight': float(weight),
+            'updated': float(self._updated[row]),
+        }
+
+    def reset(self, user_id):
+        """
+        Удаляет профиль пользователя. Последняя строка массивов переносится на место удалённой.
+
+        Args:
+            user_id (int): ID пользователя.
+
+        Returns:
+            bool: Был ли профиль.
+        """
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return False
+        last = len(self._rows)
+        if row != last:
+            moved = int(self._user_ids[last])
+            for array in (self._user_ids, self._sums, self._squares, self._weights, self._counts, self._updated):
+                array[row] = array[last]
+            self._rows[moved] = row
+        self._dirty = True
+        self.maybe_flush()
+        return True
+
+    def maybe_flush(self):
+        """Записывает профили, если они изменились и с прошлой записи прошло flush_interval секунд."""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает изменённые профили на диск атомарно (через временный файл)."""
+        if not self._dirty or not self.path:
+            return
+        start = time.perf_counter()
+        size = len(self._rows)
+        temp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    functions=np.array(FUNCTIONS),
+                    user_ids=self._user_ids[:size],
+                    sums=self._sums[:size],
+                    squares=self._squares[:size],
+                    weights=self._weights[:size],
+                    counts=self._counts[:size],
+                    updated=self._updated[:size]
+                )
+            os.replace(temp_path, self.path)
+            PERSISTENCE_FLUSHES.inc(target='profiles')
+            self._dirty = False
+        except OSError as e:
+            logging.error(f"Не удалось сохранить профили в {self.path}: {e}")
+        finally:
+            self._last_flush = time.monotonic()
+            record_stage('persistence', time.perf_counter() - start)
@@ -0,0 +1,214 @@
+# socionics/question_bank.py
+
+import json
+import logging
+import os
+import random
+
+import numpy as np
+
+from socionics.calculations import FUNCTIONS, calculate_traits_batch, type_matrix
+
+
+class QuestionBank:
+    """
+    Утверждения для /oprosnik: утверждения Таланова и пользовательские утверждения.
+
+    Файлы читаются один раз и перечитываются только при изменении их mtime, поэтому
+    банк можно загрузить в мастер-процессе до fork и делить между воркерами.
+
+    У каждого утверждения есть целочисленный номер, который не меняется при
+    перечитывании файлов, пока процесс жив: новые утверждения получают следующие
+    номера, а номера удалённых не переиспользуются. Поэтому состояние опросника
+    хранит только номера вопросов.
+
+    Из type_correlation и function_correlation утверждений банк строит матрицу
+    «утверждение × тип» для адаптивного опросника (socionics/adaptive.py).
+    """
+
+    def __init__(self, *data_files):
+        """
+        Args:
+            *data_files (str): JSON-файлы со списками {'statement': ...}, например утверждения
+                Таланова и пользовательские утверждения. Отсутствующие файлы пропускаются.
+        """
+        self.files = list(data_files)
+        self._mtimes = None
+        self._statements = []
+        # Номер -> текст (None — утверждение удалено из файлов), текст -> номер и номера текущих утверждений
+        self._texts = []
+        self._ids = {}
+        self._active = []
+        # Корреляции утверждений с типами (type_correlation) и с функциями (function_correlation) по номерам
+        self._type_names = []
+        self._measured_rows = {}
+        self._function_rows = {}
+        self._type_correlations = None
+
+    def _current_mtimes(self):
+        return [os.path.getmtime(path) if os.path.exists(path) else None for path in self.files]
+
+    def _load(self):
+        entries = []
+        for path in self.files:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                try:
+                    entries.extend(json.load(f))
+                except json.JSONDecodeError:
+                    logging.error(f"Ошибка декодирования JSON в {path}.")
+        return entries
+
+    def _refresh(self):
+        mtimes = self._current_mtimes()
+        if mtimes == self._mtimes:
+            return
+        entries = self._load()
+        statements = [entry['statement'] for entry in entries]
+        active = []
+        seen = set()
+        for text in statements:
+            question_id = self._ids.get(text)
+            if question_id is None:
+                question_id = self._ids[text] = len(self._texts)
+                self._texts.append(text)
+            if question_id not in seen:
+                seen.add(question_id)
+                active.append(question_id)
+        for text, question_id in list(self._ids.items()):
+            if question_id not in seen:
+                self._texts[question_id] = None
+                del self._ids[text]
+        self._statements = statements
+        self._active = active
+        self._index_correlations(entries)
+        self._mtimes = mtimes
+        logging.info(f"Банк вопросов загружен: {len(self._statements)} утверждений.")
+
+    def _index_correlations(self, entries):
+        self._type_names = []
+        self._measured_rows = {}
+        self._function_rows = {}
+        for entry in entries:
+            question_id = self._ids[entry['statement']]
+            correlations = entry.get('type_correlation')
+            if correlations:
+                if not self._type_names:
+                    self._type_names = list(correlations)
+                # Утверждения без корреляции хотя бы с одним типом в матрицу не попадают
+                if all(name in correlations for name in self._type_names):
+                    self._measured_rows.setdefault(question_id, [correlations[name] for name in self._type_names])
+            if entry.get('function_correlation'):
+                self._function_rows.setdefault(
+                    question_id, [entry['function_correlation'].get(func, 0.0) for func in FUNCTIONS])
+        self._type_correlations = None
+
+    def untyped_count(self, socionics_types=None):
+        """
+        Число утверждений с function_correlation, для которых нет строки в матрице типов.
+
+        Больше нуля, например, когда нет словаря типов и корреляции с типами не выводятся.
+
+        Args:
+            socionics_types (dict, optional): SOCIONICS_TYPES. Defaults to None.
+
+        Returns:
+            int: Число утверждений.
+        """
+        question_ids = set(self.type_correlations(socionics_types)[1].tolist())
+        return sum(1 for question_id in self._function_rows if question_id not in question_ids)
+
+    def type_correlations(self, socionics_types=None):
+        """
+        Матрица корреляций утверждений с социотипами.
+
+        Корреляции с типами из type_correlation измерены Талановым. Если передан
+        словарь типов, для остальных утверждений они выводятся из function_correlation
+        тем же путём, что и результаты опросника (функции → признаки → типы), и
+        нормируются к масштабу измеренных.
+
+        Кортеж пересоздаётся только при перечитывании файлов, поэтому по нему можно
+        кэшировать производные от матрицы величины.
+
+        Args:
+            socionics_types (dict, optional): SOCIONICS_TYPES. Defaults to None.
+
+        Returns:
+            tuple: (список имён типов, номера утверждений формы (N,),
+                матрица float32 формы (N, число типов)).
+        """
+        self._refresh()
+        if self._type_correlations is not None and self._type_correlations[0] is socionics_types:
+            return self._type_correlations[1]
+
+        type_names = self._type_names or list(socionics_types or [])
+        rows = dict(self._measured_rows)
+        derived = [question_id for question_id in self._function_rows if question_id not in rows]
+        if derived and type_names and socionics_types and all(name in socionics_types for name in type_names):
+            traits = calculate_traits_batch([self._function_rows[question_id] for question_id in derived])
+            names, matrix = type_matrix({name: socionics_types[name] for name in type_names})
+            scores = traits @ matrix
+            # Важны различия между типами: центрируем по типам и приводим к RMS измеренных корреляций
+            scores -= scores.mean(axis=1, keepdims=True)
+            measured = np.array(list(self._measured_rows.values()), dtype=np.float32)
+            scale = np.sqrt(np.mean(measured ** 2)) if measured.size else 1.0
+            rms = np.sqrt(np.mean(scores ** 2))
+            if rms > 0:
+                scores *= scale / rms
+            rows.update(zip(derived, scores.tolist()))
+
+        result = (type_names, np.fromiter(rows.keys(), dtype=np.int32, count=len(rows)),
+                  np.array(list(rows.values()), dtype=np.float32).reshape(len(rows), len(type_names)))
+        self._type_correlations = (socionics_types, result)
+        return result
+
+    @property
+    def statements(self):
+        """list: Все утверждения банка; файлы перечитываются, если изменились."""
+        self._refresh()
+        return self._statements
+
+    def __len__(self):
+        self._refresh()
+        return len(self._active)
+
+    def text(self, question_id):
+        """
+        Текст утверждения по номеру.
+
+        Args:
+            question_id (int): Номер утверждения.
+
+        Returns:
+            str or None: Текст или None, если утверждение удалено из банка.
+        """
+        self._refresh()
+        if 0 <= question_id < len(self._texts):
+            return self._texts[question_id]
+        return None
+
+    def sample_ids(self, count):
+        """
+        Выбирает номера случайных утверждений без повторов.
+
+        Args:
+            count (int): Желаемое количество; ограничивается размером банка.
+
+        Returns:
+            list: Номера утверждений.
+        """
+        self._refresh()
+        return random.sample(self._active, min(count, len(self._active)))
+
+    def sample(self, count):
+        """
+        Выбирает случайные утверждения без повторов.
+
+        Args:
+            count (int): Желаемое количество; ограничивается размером банка.
+
+        Returns:
+            list: Утверждения.
+        """
+        return [self._texts[question_id] for question_id in self.sample_ids(count)]
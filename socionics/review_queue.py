@@ -0,0 +1,165 @@
+# socionics/review_queue.py
+"""
+Очередь утверждений /add на проверку разработчиком.
+
+Утверждение с корреляциями от пользователя не попадает в user_db.json сразу, а
+ждёт решения разработчика. Очередь хранится в памяти (по возрастанию номера) и в
+файле JSONL: новое утверждение дописывается одной строкой, а после решения файл
+переписывается атомарно без рассмотренных утверждений (первой строкой — счётчик
+номеров, чтобы номера не повторялись). Одобренные утверждения записываются в
+хранилище пользовательских утверждений одним пакетом.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from monitoring.metrics import PERSISTENCE_FLUSHES, record_stage
+from socionics.data_processing import append_user_statements
+
+
+class ReviewQueue:
+    """
+    Ожидающие проверки утверждения.
+
+    Args:
+        path (str): Файл очереди .jsonl; пустая строка — только в памяти.
+        user_statements_file (str): Хранилище одобренных утверждений (user_db.json).
+    """
+
+    def __init__(self, path, user_statements_file):
+        self.path = path
+        self.user_statements_file = user_statements_file
+        self._entries = {}
+        self._next_id = 1
+        # Номер последнего утверждения, попавшего в дайджест
+        self.last_digested = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.error(f"Ошибка декодирования JSON в {self.path}: {e}")
+                    continue
+                if 'next_id' in entry:
+                    self._next_id = max(self._next_id, entry['next_id'])
+                    continue
+                self._entries[entry['id']] = entry
+                self._next_id = max(self._next_id, entry['id'] + 1)
+        logging.info(f"В очереди на проверку {len(self._entries)} утверждений из {self.path}.")
+
+    def add(self, user_id, username, statement, correlations):
+        """
+        Добавляет утверждение в очередь и дописывает его в файл.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+            username (str): Имя пользователя.
+            statement (str): Утверждение.
+            correlations (dict): Корреляции функций.
+
+        Returns:
+            int: Номер утверждения в очереди.
+        """
+        entry = {
+            'id': self._next_id,
+            'timestamp': datetime.utcnow().isoformat(),
+            'user_id': user_id,
+            'username': username,
+            'statement': statement,
+            'function_correlation': {k: float(v) for k, v in correlations.items()},
+        }
+        self._next_id += 1
+        self._entries[entry['id']] = entry
+        if self.path:
+            start = time.perf_counter()
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                PERSISTENCE_FLUSHES.inc(target='review_queue')
+            except OSError as e:
+                logging.error(f"Не удалось записать утверждение в очередь {self.path}: {e}")
+            finally:
+                record_stage('persistence', time.perf_counter() - start)
+        return entry['id']
+
+    def page(self, offset, limit):
+        """
+        Страница ожидающих утверждений по возрастанию номера.
+
+        Args:
+            offset (int): Сколько утверждений пропустить.
+            limit (int): Размер страницы.
+
+        Returns:
+            list: Записи очереди.
+        """
+        ids = sorted(self._entries)[offset:offset + limit]
+        return [self._entries[entry_id] for entry_id in ids]
+
+    def entries(self):
+        """Все ожидающие утверждения по возрастанию номера."""
+        return [self._entries[entry_id] for entry_id in sorted(self._entries)]
+
+    def new_since_digest(self):
+        """Сколько утверждений поступило после последнего дайджеста."""
+        return sum(1 for entry_id in self._entries if entry_id > self.last_digested)
+
+    def mark_digested(self):
+        """Отмечает все текущие утверждения как показанные в дайджесте."""
+        self.last_digested = self._next_id - 1
+
+    def resolve(self, ids, approve):
+        """
+        Одобряет или отклоняет утверждения пакетом.
+
+        Одобренные записываются в user_statements_file одной записью на диск, после
+        чего файл очереди переписывается без рассмотренных утверждений.
+
+        Args:
+            ids (iterable): Номера утверждений; уже рассмотренные пропускаются.
+            approve (bool): True — одобрить, False — отклонить.
+
+        Returns:
+            int: Сколько утверждений рассмотрено.
+        """
+        resolved = [self._entries[entry_id] for entry_id in sorted(set(ids)) if entry_id in self._entries]
+        if not resolved:
+            return 0
+        if approve:
+            append_user_statements(resolved, self.user_statements_file)
+        for entry in resolved:
+            del self._entries[entry['id']]
+        self._rewrite()
+        logging.info(f"{'Одобрено' if approve else 'Отклонено'} утверждений из очереди: {len(resolved)}.")
+        return len(resolved)
+
+    def _rewrite(self):
+        if not self.path:
+            return
+        start = time.perf_counter()
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                # Счётчик номеров сохраняется, чтобы кнопки старых дайджестов не указали на новые утверждения
+                f.write(json.dumps({'next_id': self._next_id}) + '\n')
+                for entry in self.entries():
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(temp_path, self.path)
+            PERSISTENCE_FLUSHES.inc(target='review_queue')
+        except OSError as e:
+            logging.error(f"Не удалось переписать очередь {self.path}: {e}")
+        finally:
+            record_stage('persistence', time.perf_counter() - start)
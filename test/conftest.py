@@ -0,0 +1,10 @@
+# test/conftest.py
+# Тесты запускаются из корня репозитория: python -m pytest test
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# config/settings.py приводит DEVELOPER_CHAT_ID к int при импорте
+os.environ.setdefault('DEVELOPER_CHAT_ID', '0')
@@ -0,0 +1,112 @@
+# test/test_adaptive.py
+
+import json
+import os
+
+import numpy as np
+
+from socionics.adaptive import AdaptiveQuestionnaire, answer_likelihoods
+from socionics.question_bank import QuestionBank
+
+TYPES = ['A', 'B', 'C']
+# Утверждение 10 отличает A от остальных, 11 — B от C, 12 ни с чем не связано
+CORRELATIONS = np.array([[2.0, -1.0, -1.0], [0.0, 2.0, -2.0], [0.0, 0.0, 0.0]], dtype=np.float32)
+
+
+def make_questionnaire(sharpness=1.0):
+    return AdaptiveQuestionnaire(TYPES, np.array([10, 11, 12], dtype=np.int32), CORRELATIONS, sharpness)
+
+
+def test_likelihoods_are_distributions_skewed_by_correlation():
+    likelihoods = answer_likelihoods(CORRELATIONS)
+    assert likelihoods.shape == (3, 3, 5)
+    assert np.allclose(likelihoods.sum(axis=-1), 1)
+    # Положительная корреляция — вероятнее «полностью согласен», нулевая — все ответы равновероятны
+    assert likelihoods[0, 0].argmax() == 4
+    assert likelihoods[0, 1].argmax() == 0
+    assert np.allclose(likelihoods[2], 0.2)
+
+
+def test_posterior_uniform_without_answers_and_moves_towards_agreeing_type():
+    questionnaire = make_questionnaire()
+    assert np.allclose(questionnaire.posterior([], []), 1 / 3)
+    posterior = questionnaire.posterior([10], [5])
+    assert posterior.argmax() == 0 and np.isclose(posterior.sum(), 1)
+    # Неотвеченные вопросы и номера не из матрицы не учитываются
+    assert np.allclose(questionnaire.posterior([10, 99], [0, 5]), 1 / 3)
+
+
+def test_information_gain_prefers_discriminating_statements():
+    questionnaire = make_questionnaire()
+    gains = questionnaire.information_gain(questionnaire.posterior([], []))
+    assert np.all(gains >= -1e-6)
+    assert np.isclose(gains[2], 0, atol=1e-6)
+    # Когда A исключён, полезно только утверждение, отличающее B от C
+    gains = questionnaire.information_gain(np.array([0.0, 0.5, 0.5]))
+    assert gains.argmax() == 1
+
+
+def test_next_question_skips_asked_and_stops():
+    questionnaire = make_questionnaire(sharpness=3.0)
+    first = questionnaire.next_question([], [], max_questions=3)
+    assert first in (10, 11)
+    second = questionnaire.next_question([first], [1], max_questions=3)
+    assert second is not None and second != first
+    assert questionnaire.next_question([10], [5], max_questions=1) is None
+    # Уверенность достигнута, но минимальное число вопросов ещё не задано
+    assert questionnaire.next_question([10], [5], max_questions=3, min_questions=2, confidence=0.5) is not None
+    assert questionnaire.next_question([10, 11], [5, 3], max_questions=3, min_questions=2, confidence=0.5) is None
+    # Все утверждения заданы
+    assert questionnaire.next_question([10, 11, 12], [5, 5, 3], max_questions=5) is None
+
+
+def test_probabilities_are_percentages_by_type():
+    probabilities = make_questionnaire().probabilities([10], [5])
+    assert list(probabilities) == TYPES
+    assert np.isclose(sum(probabilities.values()), 100)
+
+
+def _write(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False)
+
+
+def _entry(statement, first, measured=True):
+    entry = {'statement': statement, 'function_correlation': {'БЛ': first, 'ЧЭ': -first}}
+    if measured:
+        entry['type_correlation'] = {'A': first, 'B': -first}
+    return entry
+
+
+def test_type_correlations_keep_ids_across_reloads(tmp_path):
+    path = str(tmp_path / 'statements.json')
+    _write(path, [_entry('один', 1.0), _entry('два', -1.0), _entry('три', 0.5, measured=False)])
+    bank = QuestionBank(path)
+    names, ids, matrix = bank.type_correlations()
+    assert names == ['A', 'B']
+    rows = {bank.text(int(question_id)): row.tolist() for question_id, row in zip(ids, matrix)}
+    assert rows == {'один': [1.0, -1.0], 'два': [-1.0, 1.0]}
+    # Для «три» корреляции с типами не выведены без словаря типов
+    assert bank.untyped_count() == 1
+    assert bank.type_correlations() is bank.type_correlations()
+    id_two = int(ids[[bank.text(int(question_id)) for question_id in ids].index('два')])
+
+    _write(path, [_entry('два', -1.0), _entry('четыре', 2.0)])
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    names, ids, matrix = bank.type_correlations()
+    assert bank.text(id_two) == 'два'
+    assert id_two in ids.tolist()
+    assert sorted(bank.text(int(question_id)) for question_id in ids) == ['два', 'четыре']
+    assert bank.untyped_count() == 0
+
+
+def test_type_correlations_derived_from_function_correlations(tmp_path):
+    path = str(tmp_path / 'statements.json')
+    _write(path, [_entry('один', 1.0), _entry('три', 0.5, measured=False)])
+    socionics_types = {'A': {'Логика': 1.0}, 'B': {'Логика': -1.0}}
+    bank = QuestionBank(path)
+    names, ids, matrix = bank.type_correlations(socionics_types)
+    assert len(ids) == 2 and bank.untyped_count(socionics_types) == 0
+    derived = matrix[[bank.text(int(question_id)) for question_id in ids].index('три')]
+    # Центрировано по типам: логичному A утверждение ближе, чем B
+    assert np.isclose(derived.sum(), 0) and derived[0] > 0 > derived[1]
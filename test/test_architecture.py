@@ -0,0 +1,116 @@
+# test/test_architecture.py
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+# Пакет bot при импорте загружает архитектуру модели
+pytest.importorskip('tensorflow')
+
+from telegram import Chat, Message, MessageEntity, Update, User  # noqa: E402
+from telegram.ext import ConversationHandler  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+from bot import architecture  # noqa: E402
+
+USER = User(id=42, first_name='Тест', is_bot=False, username='tester')
+CHAT = Chat(id=42, type=Chat.PRIVATE)
+
+
+def make_update(application, update_id, text):
+    entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text.split()[0]))] if text.startswith('/') else None
+    message = Message(update_id, datetime.now(timezone.utc), CHAT, from_user=USER, text=text, entities=entities)
+    # CommandHandler сверяет имя бота в команде
+    message.set_bot(application.bot)
+    return Update(update_id, message=message)
+
+
+class FakeRequest(BaseRequest):
+    """Отвечает на запросы Bot API без сети и запоминает отправленные тексты."""
+
+    def __init__(self):
+        self.sent = []
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        endpoint = url.rsplit('/', 1)[-1]
+        if endpoint == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bot', 'username': 'socionics_test_bot'}
+        else:
+            parameters = request_data.parameters if request_data else {}
+            self.sent.append(parameters.get('text'))
+            result = {'message_id': len(self.sent), 'date': 0, 'chat': {'id': CHAT.id, 'type': 'private'},
+                      'text': parameters.get('text')}
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
+
+
+@pytest.fixture
+def application(monkeypatch, tmp_path):
+    monkeypatch.setattr(architecture, 'USER_PROFILES_FILE', str(tmp_path / 'user_profiles.npz'))
+    monkeypatch.setattr(architecture, 'REVIEW_QUEUE_ENABLED', False)
+    monkeypatch.setattr(architecture, 'install_signal_toggle', lambda profiler: None)
+    request = FakeRequest()
+    monkeypatch.setattr(architecture, 'InstrumentedRequest', lambda: request)
+    application = architecture.setup_bot()
+    application.bot_data['replies'] = request.sent
+    return application
+
+
+def conversation(application, command):
+    for handler in application.handlers[0]:
+        if isinstance(handler, ConversationHandler) and any(
+                command in entry.commands for entry in handler.entry_points):
+            return handler
+    raise AssertionError(f"Нет диалога /{command}")
+
+
+def test_cancel_ends_active_conversation(application):
+    add_conversation = conversation(application, 'add')
+    cancelled = []
+    application.bot_data['user_work'].cancel = lambda user_id, reason: cancelled.append((user_id, reason))
+
+    async def run():
+        await application.initialize()
+        if application.job_queue is not None:
+            await application.job_queue.start()
+        try:
+            await application.process_update(make_update(application, 1, '/add'))
+            assert add_conversation.check_update(make_update(application, 2, 'Утверждение'))
+            # Без JobQueue (python-telegram-bot без [job-queue]) таймауты не планируются
+            assert add_conversation.timeout_jobs or application.job_queue is None
+            await application.process_update(make_update(application, 3, '/cancel'))
+            # Вместе с диалогом снимается и его таймаут
+            assert not add_conversation.timeout_jobs
+        finally:
+            if application.job_queue is not None:
+                await application.job_queue.stop()
+            await application.shutdown()
+
+    asyncio.run(run())
+    # Диалог завершён: следующее сообщение уже не относится к нему
+    assert add_conversation.check_update(make_update(application, 4, 'Утверждение')) is None
+    assert cancelled == [(USER.id, 'cancel')]
+    assert application.bot_data['replies'][-1].startswith("❌ Действие отменено")
+
+
+def test_cancel_outside_conversation_is_handled_globally(application):
+    async def run():
+        await application.initialize()
+        try:
+            await application.process_update(make_update(application, 1, '/cancel'))
+        finally:
+            await application.shutdown()
+
+    asyncio.run(run())
+    assert application.bot_data['replies'] == ["❌ Действие отменено. Вы можете начать сначала."]
@@ -0,0 +1,111 @@
+# test/test_bulk_scoring.py
+
+import json
+
+import numpy as np
+import pytest
+
+from neural_network import bulk_scoring
+from neural_network.bulk_scoring import score_file
+from neural_network.bundle import BundleModel, BundleScaler
+from neural_network.encoders import HashingEncoder
+from socionics.calculations import FUNCTIONS
+
+DIM = 16
+SOCIONICS_TYPES = {
+    'ИЛЭ': {'Интуиция': 1, 'Логика': 1, 'Экстраверсия': 1},
+    'СЭИ': {'Интуиция': -1, 'Логика': -1, 'Экстраверсия': -1},
+    'ЛСИ': {'Логика': 1, 'Статика': 1},
+}
+
+
+def stub_stack(dim, seed):
+    """Стек без TensorFlow и скачивания модели; функция модуля, чтобы загрузчик сериализовался pickle."""
+    rng = np.random.RandomState(seed)
+    layers = [
+        (rng.normal(size=(dim, 8)).astype(np.float32), rng.normal(size=8).astype(np.float32), 'relu'),
+        (rng.normal(size=(8, len(FUNCTIONS))).astype(np.float32), np.zeros(len(FUNCTIONS), np.float32), 'linear'),
+    ]
+    scaler = BundleScaler(np.full(len(FUNCTIONS), 0.5), np.full(len(FUNCTIONS), 0.25))
+    return HashingEncoder(dim), BundleModel(layers), scaler
+
+
+def write_input(tmp_path, rows=23):
+    path = tmp_path / 'survey.jsonl'
+    lines = []
+    for i in range(rows):
+        # Пустые строки и строки без поля оцениваются нулями, но номер строки сохраняется
+        if i % 7 == 3:
+            lines.append('')
+        elif i % 5 == 4:
+            lines.append(json.dumps(f"Утверждение строкой {i}", ensure_ascii=False))
+        else:
+            lines.append(json.dumps({'statement': f"Мне нравится порядок номер {i}"}, ensure_ascii=False))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def score(input_path, output_path, **kwargs):
+    return score_file(input_path, output_path, workers=0, chunk_size=5, loader=stub_stack, loader_args=(DIM, 0),
+                      socionics_types=SOCIONICS_TYPES, **kwargs)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after_first_chunk(monkeypatch):
+    """Прерывает запуск после записи второго фрагмента, но до его контрольной точки."""
+    save = bulk_scoring._save_checkpoint
+    calls = []
+
+    def save_checkpoint(path, state):
+        calls.append(state)
+        if len(calls) == 2:
+            raise Interrupted()
+        save(path, state)
+
+    monkeypatch.setattr(bulk_scoring, '_save_checkpoint', save_checkpoint)
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.npy'])
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch, suffix):
+    input_path = write_input(tmp_path)
+    reference = str(tmp_path / f"reference{suffix}")
+    assert score(input_path, reference) == 23
+
+    output = str(tmp_path / f"scores{suffix}")
+    with monkeypatch.context() as patch:
+        interrupt_after_first_chunk(patch)
+        with pytest.raises(Interrupted):
+            score(input_path, output)
+    with open(f"{output}.checkpoint.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)['rows_done'] == 5
+
+    # Продолжение оценивает только оставшиеся строки
+    assert score(input_path, output, resume=True) == 18
+    if suffix == '.jsonl':
+        # Строки второго фрагмента, записанные до прерывания, обрезаны и не повторяются
+        with open(reference, 'rb') as expected, open(output, 'rb') as actual:
+            assert actual.read() == expected.read()
+        with open(output, 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        assert [row['index'] for row in rows] == list(range(23))
+        assert len(rows[0]['top_types']) == 3
+    else:
+        expected, actual = np.load(reference), np.load(output)
+        assert actual.shape == (23, len(FUNCTIONS) + 9 + len(SOCIONICS_TYPES))
+        np.testing.assert_array_equal(actual, expected)
+        assert np.all(actual[3] == 0) and np.any(actual[0] != 0)
+        with open(f"{output}.columns.json", 'r', encoding='utf-8') as f:
+            assert json.load(f)[-len(SOCIONICS_TYPES):] == list(SOCIONICS_TYPES)
+
+
+def test_resume_rejects_checkpoint_of_other_input(tmp_path):
+    input_path = write_input(tmp_path)
+    output = str(tmp_path / 'scores.jsonl')
+    score(input_path, output)
+    other = tmp_path / 'other.jsonl'
+    other.write_text(json.dumps({'statement': "Другое утверждение"}, ensure_ascii=False) + '\n', encoding='utf-8')
+    with pytest.raises(ValueError, match="другому входному файлу"):
+        score(str(other), output, resume=True)
@@ -0,0 +1,126 @@
+# test/test_bundle.py
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from neural_network import bundle
+from neural_network.bundle import (MANIFEST_FILE, WEIGHTS_FILE, BundleError, activate_version, check_compatible,
+                                   export_bundle, load_bundle, read_manifest)
+from neural_network.inference import FUNCTIONS
+
+INPUT_DIM = 8
+
+
+def fitted_scaler(seed=0):
+    targets = np.random.RandomState(seed).uniform(-0.5, 0.8, size=(50, len(FUNCTIONS)))
+    return MinMaxScaler(feature_range=(-1, 1)).fit(targets)
+
+
+def mlp_layers(seed=0):
+    rng = np.random.RandomState(seed)
+    return [
+        {'kernel': rng.normal(size=(INPUT_DIM, 16)), 'bias': rng.normal(size=16), 'activation': 'relu',
+         'dropout': 0.3},
+        {'kernel': rng.normal(size=(16, len(FUNCTIONS))), 'bias': rng.normal(size=len(FUNCTIONS)),
+         'activation': 'linear', 'dropout': 0.0},
+    ]
+
+
+@pytest.fixture
+def exported(monkeypatch, tmp_path):
+    """Бандл из готовых слоёв: проверки загрузки не зависят от TensorFlow."""
+    layers = mlp_layers()
+    monkeypatch.setattr(bundle, 'keras_layers', lambda model, functions: layers)
+    path = export_bundle(None, fitted_scaler(), str(tmp_path), encoder='hashing-8', version='v1')
+    return path, layers
+
+
+def test_load_matches_exported_layers(exported):
+    path, layers = exported
+    model, scaler = load_bundle(path, encoder='hashing-8', embedding_dim=INPUT_DIM)
+    x = np.random.RandomState(1).normal(size=(5, INPUT_DIM)).astype(np.float32)
+    hidden = np.maximum(x @ layers[0]['kernel'] + layers[0]['bias'], 0)
+    expected = hidden @ layers[1]['kernel'] + layers[1]['bias']
+    outputs = model.predict(x)
+    assert len(outputs) == len(FUNCTIONS) and outputs[0].shape == (5, 1)
+    assert np.allclose(np.hstack(outputs), expected, atol=1e-4)
+    assert model.version == 'v1' and model.input_dim == INPUT_DIM
+    assert np.allclose(scaler.inverse_transform(expected), fitted_scaler().inverse_transform(expected))
+    # Стохастический проход с dropout отличается от детерминированного
+    assert not np.allclose(model.predict_stochastic(x, seed=0), expected, atol=1e-4)
+
+
+def test_active_version_is_resolved_from_root(exported, tmp_path):
+    with pytest.raises(BundleError):
+        load_bundle(str(tmp_path))
+    activate_version(str(tmp_path), 'v1')
+    assert load_bundle(str(tmp_path))[0].version == 'v1'
+    with pytest.raises(BundleError):
+        activate_version(str(tmp_path), 'v2')
+
+
+def test_tampered_weights_are_rejected(exported):
+    path, _ = exported
+    weights_path = os.path.join(path, WEIGHTS_FILE)
+    with open(weights_path, 'r+b') as f:
+        first = f.read(1)
+        f.seek(0)
+        f.write(bytes([first[0] ^ 0xFF]))
+    with pytest.raises(BundleError):
+        load_bundle(path)
+    # Без проверки контрольных сумм повреждение не обнаруживается
+    load_bundle(path, verify=False)
+
+
+def test_tampered_manifest_is_rejected(exported):
+    path, _ = exported
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['scaler']['min'][0] += 0.5
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    with pytest.raises(BundleError):
+        load_bundle(path)
+
+
+def test_incompatible_encoder_dimension_and_functions_are_rejected(exported):
+    path, _ = exported
+    with pytest.raises(BundleError):
+        load_bundle(path, encoder='sentence-transformers:other')
+    with pytest.raises(BundleError):
+        load_bundle(path, embedding_dim=INPUT_DIM * 2)
+    with pytest.raises(BundleError):
+        check_compatible(read_manifest(path), functions=list(reversed(FUNCTIONS)))
+
+
+def test_existing_version_is_not_overwritten(exported, tmp_path):
+    with pytest.raises(BundleError):
+        export_bundle(None, fitted_scaler(), str(tmp_path), encoder='hashing-8', version='v1')
+    export_bundle(None, fitted_scaler(1), str(tmp_path), encoder='hashing-8', version='v1', overwrite=True)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.staging')]
+
+
+def test_keras_round_trip_orders_heads_by_functions(tmp_path):
+    pytest.importorskip('tensorflow')
+    from neural_network.model import create_multi_output_model
+
+    # Головы в обратном порядке: бандл всё равно выдаёт столбцы в порядке FUNCTIONS
+    heads = list(reversed(FUNCTIONS))
+    model = create_multi_output_model(INPUT_DIM, heads)
+    scaler = fitted_scaler()
+    path = export_bundle(model, scaler, str(tmp_path), encoder='hashing-8')
+    bundle_model, bundle_scaler = load_bundle(path, encoder='hashing-8', embedding_dim=INPUT_DIM)
+
+    x = np.random.RandomState(2).normal(size=(6, INPUT_DIM)).astype(np.float32)
+    by_head = dict(zip(heads, model.predict(x, verbose=0)))
+    expected = np.hstack([by_head[func] for func in FUNCTIONS])
+    actual = np.hstack(bundle_model.predict(x))
+    assert np.allclose(actual, expected, atol=1e-5)
+    assert np.allclose(bundle_scaler.inverse_transform(actual), scaler.inverse_transform(expected), atol=1e-5)
+    assert [layer[2] for layer in bundle_model.layers] == ['relu', 'relu', 'linear']
+    assert bundle_model.dropout == [0.3, 0.3, 0.0]
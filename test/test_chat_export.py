@@ -0,0 +1,172 @@
+# test/test_chat_export.py
+
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from socionics.chat_export import ChatExportError, iter_chat_messages, message_text, sample_authors
+
+
+def write_export(tmp_path, export, name='result.json'):
+    path = tmp_path / name
+    path.write_text(json.dumps(export, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def chat_message(message_id, author, text, **fields):
+    return dict({'id': message_id, 'type': 'message', 'from': author, 'from_id': f"user{author}", 'text': text},
+                **fields)
+
+
+EXPORT = {
+    'name': "Чат",
+    'type': 'personal_chat',
+    'id': 1234567890123,
+    'messages': [
+        chat_message(1, 'A', "Первое сообщение с несколькими словами"),
+        {'id': 2, 'type': 'service', 'action': 'pin_message', 'message_id': 98765432109, 'duration': 12.75},
+        chat_message(3, 'B', ["Смотри ", {'type': 'link', 'text': 'https://example.com'}, " интересно"]),
+    ],
+    'after': {'nested': [1.25, -3e-7, 10000000000]},
+}
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7, 1 << 16])
+def test_values_split_across_reads(tmp_path, read_size):
+    path = write_export(tmp_path, EXPORT)
+    assert list(iter_chat_messages(path, read_size=read_size)) == EXPORT['messages']
+
+
+def test_number_at_buffer_end_is_not_truncated(tmp_path):
+    path = tmp_path / 'result.json'
+    path.write_text('{"messages": [12345678, 9.75e-3, -0.5]}', encoding='utf-8')
+    # Буфер заканчивается посреди числа: «1234» из «12345678» или «9» из «9.75e-3» не принимаются
+    for read_size in range(1, 40):
+        assert list(iter_chat_messages(str(path), read_size=read_size)) == [12345678, 9.75e-3, -0.5]
+
+
+def test_oversized_message_is_rejected(tmp_path):
+    path = write_export(tmp_path, {'messages': [chat_message(1, 'A', "слово " * 200)]})
+    with pytest.raises(ChatExportError):
+        list(iter_chat_messages(path, read_size=64, max_message_chars=500))
+
+
+def test_account_export_and_broken_files_are_rejected(tmp_path):
+    account = write_export(tmp_path, {'about': "...", 'chats': {'list': []}}, 'account.json')
+    with pytest.raises(ChatExportError, match="экспорт всего аккаунта"):
+        list(iter_chat_messages(account))
+
+    truncated = tmp_path / 'truncated.json'
+    truncated.write_text(json.dumps(EXPORT)[:-60], encoding='utf-8')
+    with pytest.raises(ChatExportError):
+        list(iter_chat_messages(str(truncated), read_size=16))
+
+    not_json = tmp_path / 'not_json.json'
+    not_json.write_text('[1, 2, 3]', encoding='utf-8')
+    with pytest.raises(ChatExportError):
+        list(iter_chat_messages(str(not_json)))
+
+    cp1251 = tmp_path / 'cp1251.json'
+    cp1251.write_bytes(json.dumps({'messages': ["Привет"]}, ensure_ascii=False).encode('cp1251'))
+    with pytest.raises(ChatExportError, match="UTF-8"):
+        list(iter_chat_messages(str(cp1251)))
+
+
+def test_message_text_skips_links_and_code():
+    assert message_text(EXPORT['messages'][2]) == "Смотри  интересно"
+    assert message_text({'text': [{'type': 'bold', 'text': "важно"}, {'type': 'code', 'text': "x = 1"}]}) == "важно"
+
+
+def test_sample_authors_filters_and_caps_per_author():
+    messages = [chat_message(i, 'A', f"сообщение номер {i} автора A") for i in range(100)]
+    messages += [
+        chat_message(100, 'B', "пересланное сообщение автора B", forwarded_from="C"),
+        chat_message(101, 'B', "коротко"),
+        {'id': 102, 'type': 'service', 'from_id': 'userB', 'text': "служебное сообщение без автора"},
+        chat_message(103, 'B', "обычное сообщение автора B"),
+    ]
+    authors = sample_authors(messages, max_messages_per_author=10)
+    assert sorted(authors) == ['userA', 'userB']
+    assert authors['userA'].total == 100 and len(authors['userA'].messages) == 10
+    assert len(set(authors['userA'].messages)) == 10
+    assert set(authors['userA'].messages) <= {message['text'] for message in messages[:100]}
+    # Выборка не только из первых сообщений и воспроизводима при том же зерне
+    assert authors['userA'].messages != [message['text'] for message in messages[:10]]
+    assert authors['userA'].messages == sample_authors(messages, max_messages_per_author=10)['userA'].messages
+    assert authors['userB'].total == 1 and authors['userB'].messages == ["обычное сообщение автора B"]
+    assert authors['userA'].chars == sum(len(text) for text in authors['userA'].messages)
+
+
+def test_budget_evicts_author_with_fewest_messages():
+    messages = []
+    for i in range(30):
+        messages.append(chat_message(i, 'A', f"длинное сообщение номер {i} от автора A"))
+        if i % 10 == 0:
+            messages.append(chat_message(100 + i, 'B', f"сообщение номер {i} от автора B"))
+    authors = sample_authors(messages, max_messages_per_author=20, max_total_chars=700)
+    # Выборка B удалена, но его сообщения продолжают считаться
+    assert authors['userB'].messages == [] and authors['userB'].chars == 0
+    assert authors['userB'].total == 3
+    assert authors['userA'].total == 30
+    assert authors['userA'].chars <= 700
+
+
+def test_deadline_and_stop_abort_sampling():
+    messages = [chat_message(i, 'A', "сообщение из нескольких слов") for i in range(10)]
+    with pytest.raises(ChatExportError):
+        sample_authors(messages, deadline=0.0)
+    with pytest.raises(ChatExportError):
+        sample_authors(messages, should_stop=lambda: True)
+
+
+class FakeMessage:
+    def __init__(self, document):
+        self.document = document
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        return SimpleNamespace(edit_text=self.reply_text)
+
+
+def receive(document):
+    pytest.importorskip('tensorflow')
+    from telegram.ext import ConversationHandler
+    from bot.chat_export import chat_export_receive
+
+    message = FakeMessage(document)
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=message)
+    context = SimpleNamespace(bot_data={})
+    state = asyncio.run(chat_export_receive(update, context))
+    assert state == ConversationHandler.END
+    assert context.bot_data['chat_export_jobs'] == 0
+    return message.replies
+
+
+def test_download_failure_ends_conversation():
+    from telegram.error import NetworkError
+
+    async def get_file():
+        raise NetworkError("соединение разорвано")
+
+    document = SimpleNamespace(file_name='result.json', file_size=100, get_file=get_file)
+    assert receive(document)[-1].startswith("❗️ Не удалось скачать файл")
+
+
+def test_non_utf8_upload_ends_conversation():
+    downloaded = []
+
+    async def download_to_drive(path):
+        downloaded.append(path)
+        with open(path, 'wb') as f:
+            f.write(json.dumps({'messages': ["Привет"]}, ensure_ascii=False).encode('cp1251'))
+
+    async def get_file():
+        return SimpleNamespace(download_to_drive=download_to_drive)
+
+    document = SimpleNamespace(file_name='result.json', file_size=100, get_file=get_file)
+    assert receive(document)[-1].startswith("❗️ Не удалось разобрать файл")
+    assert not os.path.exists(downloaded[0])
@@ -0,0 +1,56 @@
+# test/test_chunking.py
+
+import numpy as np
+import pytest
+
+from neural_network.chunking import aggregate_chunk_correlations, chunk_text, chunk_weights, length_sorted
+
+
+def words(start, count):
+    return ' '.join(f"w{i}" for i in range(start, start + count))
+
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("  Короткое описание.  ") == ["Короткое описание."]
+    assert chunk_text("   ") == []
+
+
+def test_sentences_are_packed_whole():
+    text = f"{words(0, 4)}. {words(4, 4)}. {words(8, 4)}."
+    chunks = chunk_text(text, max_words=8)
+    assert chunks == [f"{words(0, 4)}. {words(4, 4)}.", f"{words(8, 4)}."]
+
+
+def test_long_sentence_splits_into_overlapping_windows():
+    chunks = chunk_text(words(0, 20), max_words=8, overlap=2)
+    assert [chunk.split() for chunk in chunks] == [
+        words(0, 8).split(), words(6, 8).split(), words(12, 8).split()]
+    assert all(len(chunk.split()) <= 8 for chunk in chunks)
+
+
+def test_max_chunks_keeps_evenly_spread_chunks():
+    text = ' '.join(f"{words(i * 4, 4)}." for i in range(11))
+    chunks = chunk_text(text, max_words=4, max_chunks=3)
+    assert [chunk.split()[0] for chunk in chunks] == ['w0', 'w20', 'w40']
+
+
+def test_length_sorted_restores_original_order():
+    chunks = ["ccc", "a", "bb", "dddd", "e"]
+    ordered, restore = length_sorted(chunks)
+    assert ordered == ["a", "e", "bb", "ccc", "dddd"]
+    # Результаты кодирования отсортированных фрагментов возвращаются в исходный порядок
+    encoded = np.array([len(chunk) for chunk in ordered])
+    assert [ordered[i] for i in restore] == chunks
+    assert list(encoded[restore]) == [len(chunk) for chunk in chunks]
+
+
+def test_weights_and_aggregation():
+    chunks = [words(0, 1), words(0, 3)]
+    correlations = np.array([[1.0, 0.0], [0.0, -1.0]], dtype=np.float32)
+    assert np.allclose(chunk_weights(chunks, correlations, 'mean'), [0.5, 0.5])
+    assert np.allclose(chunk_weights(chunks, correlations, 'length'), [0.25, 0.75])
+    assert np.allclose(aggregate_chunk_correlations(chunks, correlations), [0.25, -0.75])
+    # Нулевые корреляции во всех фрагментах — равные веса
+    assert np.allclose(chunk_weights(chunks, np.zeros((2, 2)), 'confidence'), [0.5, 0.5])
+    with pytest.raises(ValueError):
+        chunk_weights(chunks, correlations, 'unknown')
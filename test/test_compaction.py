@@ -0,0 +1,65 @@
+# test/test_compaction.py
+
+import numpy as np
+
+from socionics.compaction import MinHasher, compact, normalize_text, shingles
+
+STATEMENT = "Я люблю заранее планировать свой день и придерживаться расписания"
+
+
+def record(source, statement, **correlations):
+    return source, {'statement': statement, 'function_correlation': correlations, 'user_id': 1}
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(256)
+    first = shingles(normalize_text(STATEMENT))
+    second = shingles(normalize_text(STATEMENT + " всегда"))
+    jaccard = len(np.intersect1d(first, second)) / len(np.union1d(first, second))
+    estimate = np.mean(hasher.signature(first) == hasher.signature(second))
+    assert abs(estimate - jaccard) < 0.1
+    # Нормализация убирает регистр и пунктуацию
+    assert np.array_equal(hasher.signature(shingles(normalize_text(STATEMENT.upper() + "!!!"))),
+                          hasher.signature(first))
+
+
+def test_near_duplicates_cluster_and_distinct_statements_stay():
+    records = [
+        record('user', STATEMENT + ".", БЛ=0.2),
+        record('talanov', STATEMENT, БЛ=0.6),
+        record('feedback', STATEMENT.lower() + "!", БЛ=1.0),
+        record('user', "Мне трудно усидеть на месте, когда вокруг что-то происходит", ЧС=0.5),
+    ]
+    corpus, report = compact(records)
+    assert report['records'] == 4 and report['output'] == 2
+    assert report['duplicate_clusters'] == 1 and report['removed'] == 2
+    assert [entry['statement'] for entry in corpus][1] == records[3][1]['statement']
+
+
+def test_representative_is_first_entry_of_highest_priority_source():
+    records = [
+        record('feedback', STATEMENT + "!", БЛ=1.0),
+        record('user', STATEMENT + ".", БЛ=0.2),
+        record('user', STATEMENT, БЛ=0.4),
+    ]
+    corpus, _ = compact(records, policy='priority')
+    assert len(corpus) == 1
+    entry = corpus[0]
+    assert entry['statement'] == STATEMENT + "."
+    assert entry['merged_from'] == 3
+    # priority усредняет только записи лучшего источника, служебные поля не переносятся
+    assert entry['function_correlation'] == {'БЛ': 0.3}
+    assert 'user_id' not in entry
+
+
+def test_merge_policies():
+    records = [
+        record('user', STATEMENT, БЛ=0.0),
+        record('feedback', STATEMENT + ".", БЛ=0.3, ЧС=0.5),
+        record('feedback', STATEMENT + "!", БЛ=0.9),
+    ]
+    labels = {policy: compact(records, policy=policy)[0][0]['function_correlation']
+              for policy in ('mean', 'median', 'latest')}
+    assert labels['mean'] == {'БЛ': 0.4, 'ЧС': 0.5}
+    assert labels['median'] == {'БЛ': 0.3, 'ЧС': 0.5}
+    assert labels['latest'] == {'БЛ': 0.9}
@@ -0,0 +1,74 @@
+# test/test_conversation_state.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+# Пакет bot при импорте загружает архитектуру модели
+pytest.importorskip('tensorflow')
+
+from bot import conversation_state  # noqa: E402
+from bot.conversation_state import LAST_ACTIVE_KEY, OprosnikState, sweep_user_data  # noqa: E402
+
+
+class FakeQuestionBank:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def text(self, question_id):
+        return self.texts.get(question_id)
+
+
+class FakeApplication:
+    def __init__(self, user_data, user_work=None):
+        self.user_data = user_data
+        self.bot_data = {'user_work': user_work}
+
+    def drop_user_data(self, user_id):
+        del self.user_data[user_id]
+
+
+class FakeUserWork:
+    def __init__(self, busy):
+        self.busy = busy
+
+    def pending(self, user_id):
+        return user_id in self.busy
+
+
+def test_oprosnik_state_round_trip():
+    state = OprosnikState([7, 3, 9])
+    assert len(state) == 3 and list(state.answers) == [0, 0, 0]
+    state.answers[0] = 5
+    state.answers[2] = 1
+    state.add_question(4)
+    state.answers[3] = 2
+    assert list(state.question_ids) == [7, 3, 9, 4]
+    # Неотвеченные вопросы и вопросы, пропавшие из банка, не возвращаются
+    bank = FakeQuestionBank({7: "Первое", 3: "Второе", 4: "Четвёртое"})
+    assert state.answered(bank) == [("Первое", 5), ("Четвёртое", 2)]
+
+
+def test_adaptive_state_starts_empty():
+    state = OprosnikState([], adaptive=True)
+    state.add_question(11)
+    assert state.adaptive and list(state.question_ids) == [11] and list(state.answers) == [0]
+
+
+def test_sweep_drops_idle_and_empty_user_data(monkeypatch):
+    monkeypatch.setattr(conversation_state, 'USER_DATA_IDLE_TTL', 60)
+    monkeypatch.setattr(conversation_state.time, 'monotonic', lambda: 1000.0)
+    user_data = {
+        1: {'oprosnik': OprosnikState([1]), LAST_ACTIVE_KEY: 990.0},
+        2: {'oprosnik': OprosnikState([1]), LAST_ACTIVE_KEY: 100.0},
+        3: {LAST_ACTIVE_KEY: 999.0},
+        4: {'oprosnik': OprosnikState([1])},
+        5: {'oprosnik': OprosnikState([1]), LAST_ACTIVE_KEY: 100.0},
+    }
+    context = SimpleNamespace(application=FakeApplication(user_data, FakeUserWork({5})))
+    asyncio.run(sweep_user_data(context))
+    # 2 неактивен, у 3 нет состояния, у 5 ещё идёт предсказание
+    assert sorted(user_data) == [1, 4, 5]
+    # Запись без отметки получает её при проходе и доживает до следующего
+    assert user_data[4][LAST_ACTIVE_KEY] == 1000.0
@@ -0,0 +1,212 @@
+# test/test_delivery.py
+
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+# Пакет bot при импорте загружает архитектуру модели
+pytest.importorskip('tensorflow')
+
+from bot import delivery  # noqa: E402
+from bot.delivery import BULK, COALESCE, FloodLimiter  # noqa: E402
+from monitoring.metrics import DELIVERY_PENDING  # noqa: E402
+
+
+class FakeBot:
+    """Обратный вызов Bot API: записывает запросы и по заданию отвечает RetryAfter."""
+
+    def __init__(self, retry_after=None):
+        self.calls = []
+        # Текст -> сколько раз ответить RetryAfter
+        self.retry_after = dict(retry_after or {})
+        self.in_flight = set()
+        self.overlaps = 0
+
+    async def post(self, endpoint, data, **kwargs):
+        chat_id, text = data.get('chat_id'), data.get('text')
+        self.calls.append((chat_id, text))
+        if chat_id in self.in_flight:
+            self.overlaps += 1
+        self.in_flight.add(chat_id)
+        try:
+            await asyncio.sleep(0.001)
+            if self.retry_after.get(text, 0) > 0:
+                self.retry_after[text] -= 1
+                raise RetryAfter(timedelta(seconds=0))
+            return {'chat_id': chat_id, 'text': text, 'call': len(self.calls)}
+        finally:
+            self.in_flight.discard(chat_id)
+
+
+def send(limiter, bot, chat_id, text, rate_limit_args=None, endpoint='sendMessage'):
+    data = {'chat_id': chat_id, 'text': text}
+    return asyncio.ensure_future(
+        limiter.process_request(bot.post, (endpoint, data), {}, endpoint, data, rate_limit_args))
+
+
+def run(scenario, **limits):
+    """Запускает scenario(limiter) с быстрыми лимитами и проверяет, что очередь пуста."""
+    pending = DELIVERY_PENDING.value()
+
+    async def main():
+        limiter = FloodLimiter(**dict(dict(global_rate=1000, chat_rate=1000, chat_burst=100, group_rate=1000),
+                                      **limits))
+        await limiter.initialize()
+        try:
+            return await scenario(limiter)
+        finally:
+            await limiter.shutdown()
+
+    result = asyncio.run(main())
+    assert DELIVERY_PENDING.value() == pending
+    return result
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    # Повторы после RetryAfter без случайной добавки, чтобы тесты не ждали секундами
+    monkeypatch.setattr(delivery, 'random', SimpleNamespace(uniform=lambda low, high: 0.0))
+
+
+def test_interactive_requests_overtake_bulk():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        sends = [send(limiter, bot, chat_id, f"дайджест {chat_id}", BULK) for chat_id in (1, 2, 3)]
+        sends += [send(limiter, bot, chat_id, f"ответ {chat_id}") for chat_id in (4, 5)]
+        await asyncio.gather(*sends)
+
+    run(scenario)
+    assert [chat_id for chat_id, _ in bot.calls] == [4, 5, 1, 2, 3]
+
+
+def test_messages_of_one_chat_are_sent_in_order_one_at_a_time():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        sends = [send(limiter, bot, 7, str(i), BULK if i % 2 else None) for i in range(6)]
+        sends += [send(limiter, bot, 8, str(i)) for i in range(3)]
+        return await asyncio.gather(*sends)
+
+    results = run(scenario)
+    assert [text for chat_id, text in bot.calls if chat_id == 7] == [str(i) for i in range(6)]
+    assert bot.overlaps == 0
+    # Каждый отправитель получает ответ на своё сообщение
+    assert [result['text'] for result in results[:6]] == [str(i) for i in range(6)]
+
+
+def test_retry_after_requeues_at_front_of_chat():
+    bot = FakeBot(retry_after={'a': 2})
+
+    async def scenario(limiter):
+        return await asyncio.gather(send(limiter, bot, 1, 'a'), send(limiter, bot, 1, 'b'))
+
+    first, second = run(scenario, max_retries=3)
+    assert bot.calls == [(1, 'a'), (1, 'a'), (1, 'a'), (1, 'b')]
+    assert first['text'] == 'a' and second['text'] == 'b'
+
+
+def test_gives_up_after_max_retries():
+    bot = FakeBot(retry_after={'a': 10})
+
+    async def scenario(limiter):
+        return await asyncio.gather(send(limiter, bot, 1, 'a'), send(limiter, bot, 1, 'b'), return_exceptions=True)
+
+    failed, sent = run(scenario, max_retries=2)
+    assert isinstance(failed, RetryAfter)
+    assert bot.calls == [(1, 'a')] * 3 + [(1, 'b')]
+    assert sent['text'] == 'b'
+
+
+def test_requests_without_chat_bypass_queue_and_retry():
+    bot = FakeBot(retry_after={None: 1})
+
+    async def scenario(limiter):
+        data = {'callback_query_id': '1'}
+        return await limiter.process_request(bot.post, ('answerCallbackQuery', data), {}, 'answerCallbackQuery',
+                                             data, None)
+
+    assert run(scenario, max_retries=1)['call'] == 2
+
+
+def test_coalescing_is_opt_in():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        plain = [send(limiter, bot, 1, f"обычное {i}") for i in range(3)]
+        await asyncio.gather(*plain)
+        merged = [send(limiter, bot, 1, f"ошибка {i}", COALESCE) for i in range(3)]
+        return await asyncio.gather(*merged)
+
+    results = run(scenario)
+    assert bot.calls[:3] == [(1, f"обычное {i}") for i in range(3)]
+    assert bot.calls[3:] == [(1, "ошибка 0\n\nошибка 1\n\nошибка 2")]
+    # Все склеенные отправители получают один и тот же ответ
+    assert results[0] is results[1] is results[2]
+
+
+def test_coalesce_only_merges_with_coalescing_neighbours():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        await asyncio.gather(
+            send(limiter, bot, 1, "a", COALESCE),
+            send(limiter, bot, 1, "b"),
+            send(limiter, bot, 1, "c", COALESCE),
+            send(limiter, bot, 1, "d", COALESCE),
+            send(limiter, bot, 2, "e", COALESCE),
+        )
+
+    run(scenario)
+    assert [text for chat_id, text in bot.calls if chat_id == 1] == ["a", "b", "c\n\nd"]
+    assert (2, "e") in bot.calls
+
+
+def test_other_errors_reach_only_their_sender():
+    class FailingBot(FakeBot):
+        async def post(self, endpoint, data, **kwargs):
+            if data['text'] == 'bad':
+                self.calls.append((data['chat_id'], data['text']))
+                raise BadRequest("Message is too long")
+            return await super().post(endpoint, data, **kwargs)
+
+    bot = FailingBot()
+
+    async def scenario(limiter):
+        return await asyncio.gather(send(limiter, bot, 1, 'bad'), send(limiter, bot, 1, 'good'),
+                                    return_exceptions=True)
+
+    failed, sent = run(scenario)
+    assert isinstance(failed, BadRequest) and sent['text'] == 'good'
+
+
+def test_cancelled_sender_is_skipped():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        first = send(limiter, bot, 1, 'first')
+        cancelled = send(limiter, bot, 1, 'cancelled')
+        last = send(limiter, bot, 1, 'last')
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+
+    run(scenario)
+    assert bot.calls == [(1, 'first'), (1, 'last')]
+
+
+def test_chat_rate_spaces_messages():
+    bot = FakeBot()
+
+    async def scenario(limiter):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*[send(limiter, bot, 1, str(i)) for i in range(3)])
+        return loop.time() - start
+
+    # Одно сообщение сразу, следующие — по одному в 0.05 с
+    elapsed = run(scenario, chat_rate=20, chat_burst=1)
+    assert elapsed >= 0.09
@@ -0,0 +1,44 @@
+# test/test_log_setup.py
+
+import logging
+
+import pytest
+
+from monitoring import log_setup
+from monitoring.log_setup import JsonFormatter, setup_logging
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    """Записывает хуки atexit и fork вместо регистрации и восстанавливает корневой логгер."""
+    registered = {'atexit': [], 'fork': []}
+    monkeypatch.setattr(log_setup, '_hooks_registered', False)
+    monkeypatch.setattr(log_setup.atexit, 'register', registered['atexit'].append)
+    monkeypatch.setattr(log_setup.os, 'register_at_fork',
+                        lambda after_in_child: registered['fork'].append(after_in_child), raising=False)
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield registered
+    if log_setup._listener is not None:
+        log_setup._listener.stop()
+    monkeypatch.setattr(log_setup, '_listener', None)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_repeated_setup_registers_hooks_once(hooks):
+    first = setup_logging(log_file='')
+    second = setup_logging(log_format='json', log_file='')
+    assert len(hooks['atexit']) == 1 and len(hooks['fork']) == 1
+    assert first is not second and log_setup._listener is second
+
+    # Дочерний процесс пишет в консоль в формате последней настройки
+    second.stop()
+    hooks['fork'][0]()
+    handlers = logging.getLogger().handlers
+    assert log_setup._listener is None
+    assert len(handlers) == 1 and type(handlers[0]) is logging.StreamHandler
+    assert isinstance(handlers[0].formatter, JsonFormatter)
@@ -0,0 +1,119 @@
+# test/test_profiles.py
+
+import numpy as np
+import pytest
+
+from socionics.profiles import FUNCTIONS, SECONDS_PER_DAY, ProfileStore
+
+
+def correlation(value, func='БЛ'):
+    return {func: value}
+
+
+def test_update_and_summary():
+    store = ProfileStore('')
+    assert store.summary(1) is None
+    store.update(1, {'БЛ': 0.8, 'ЧЭ': -0.2}, now=10.0)
+    store.update(1, {'БЛ': 0.4}, now=20.0)
+    summary = store.summary(1)
+    assert summary['count'] == 2 and summary['weight'] == 2.0 and summary['updated'] == 20.0
+    assert summary['correlations']['БЛ'] == pytest.approx(0.6)
+    assert summary['correlations']['ЧЭ'] == pytest.approx(-0.1)
+    assert summary['spread']['БЛ'] == pytest.approx(0.2)
+    assert summary['correlations']['ЧИ'] == 0.0 and list(summary['correlations']) == FUNCTIONS
+
+
+def test_window_caps_weight_like_moving_average():
+    store = ProfileStore('', window=2)
+    store.update(1, correlation(1.0), now=0.0)
+    store.update(1, correlation(0.0), now=0.0)
+    assert store.summary(1)['correlations']['БЛ'] == pytest.approx(0.5)
+    # Третье утверждение: старые сжимаются до веса window - 1, новое получает вес 1
+    store.update(1, correlation(1.0), now=0.0)
+    summary = store.summary(1)
+    assert summary['weight'] == pytest.approx(2.0) and summary['count'] == 3
+    assert summary['correlations']['БЛ'] == pytest.approx(0.75)
+    for _ in range(50):
+        store.update(1, correlation(-1.0), now=0.0)
+    assert store.summary(1)['weight'] == pytest.approx(2.0)
+    assert store.summary(1)['correlations']['БЛ'] == pytest.approx(-1.0, abs=1e-9)
+
+
+def test_half_life_decay():
+    store = ProfileStore('', half_life_days=1)
+    store.update(1, correlation(1.0), now=0.0)
+    store.update(1, correlation(0.0), now=SECONDS_PER_DAY)
+    summary = store.summary(1)
+    # Первое утверждение за день потеряло половину веса
+    assert summary['weight'] == pytest.approx(1.5)
+    assert summary['correlations']['БЛ'] == pytest.approx(1 / 3)
+    store.update(1, correlation(0.0), now=3 * SECONDS_PER_DAY)
+    assert store.summary(1)['weight'] == pytest.approx(1.5 / 4 + 1)
+
+
+def test_reset_moves_last_row_into_gap():
+    store = ProfileStore('')
+    for user_id in (1, 2, 3):
+        store.update(user_id, correlation(user_id / 10), now=float(user_id))
+    assert store.reset(2) and not store.reset(2)
+    assert len(store) == 2 and store.summary(2) is None
+    assert store.summary(1)['correlations']['БЛ'] == pytest.approx(0.1)
+    assert store.summary(3)['correlations']['БЛ'] == pytest.approx(0.3)
+    assert store.summary(3)['updated'] == 3.0
+    # Новый пользователь занимает освободившуюся строку с чистыми суммами
+    store.update(4, correlation(0.4), now=4.0)
+    assert store.summary(4)['count'] == 1
+    assert store.summary(4)['correlations']['БЛ'] == pytest.approx(0.4)
+    assert store.reset(4) and store.reset(1) and store.reset(3) and len(store) == 0
+
+
+def test_growth_keeps_existing_rows():
+    store = ProfileStore('')
+    for user_id in range(40):
+        store.update(user_id, correlation(user_id / 100), now=1.0)
+        store.update(user_id, correlation(user_id / 100, 'ЧИ'), now=2.0)
+    assert len(store) == 40
+    for user_id in range(40):
+        summary = store.summary(user_id)
+        assert summary['count'] == 2
+        assert summary['correlations']['БЛ'] == pytest.approx(user_id / 200)
+        assert summary['correlations']['ЧИ'] == pytest.approx(user_id / 200)
+
+
+def test_flush_and_reload(tmp_path):
+    path = str(tmp_path / 'profiles' / 'user_profiles.npz')
+    store = ProfileStore(path, flush_interval=3600)
+    for user_id in range(20):
+        store.update(user_id, {'БЛ': 0.5, 'ЧС': user_id / 20}, now=100.0 + user_id)
+    store.reset(5)
+    # До flush_interval файл не пишется
+    assert not (tmp_path / 'profiles').exists()
+    store.flush()
+
+    reloaded = ProfileStore(path)
+    assert len(reloaded) == 19 and reloaded.summary(5) is None
+    for user_id in range(20):
+        assert reloaded.summary(user_id) == store.summary(user_id)
+    # После загрузки массивы продолжают расти
+    reloaded.update(100, correlation(0.9), now=200.0)
+    reloaded.update(19, correlation(0.5), now=200.0)
+    assert reloaded.summary(100)['count'] == 1 and reloaded.summary(19)['count'] == 2
+
+
+def test_flush_interval_zero_writes_on_update(tmp_path):
+    path = str(tmp_path / 'user_profiles.npz')
+    store = ProfileStore(path, flush_interval=0)
+    store.update(1, correlation(0.3), now=1.0)
+    assert ProfileStore(path).summary(1) == store.summary(1)
+
+
+def test_reload_rejects_other_function_order(tmp_path):
+    path = str(tmp_path / 'user_profiles.npz')
+    store = ProfileStore(path)
+    store.update(1, correlation(0.3), now=1.0)
+    store.flush()
+    with np.load(path) as data:
+        arrays = dict(data)
+    arrays['functions'] = np.array(list(reversed(FUNCTIONS)))
+    np.savez(path, **arrays)
+    assert len(ProfileStore(path)) == 0
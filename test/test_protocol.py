@@ -0,0 +1,62 @@
+# test/test_protocol.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from neural_network.protocol import (HEADER, MAX_FRAME_SIZE, ProtocolError, encode_frame, pack_array,
+                                     parse_address, read_frame, unpack_array)
+
+
+def read_frames(data, chunk_size, count):
+    """Подаёт байты в поток кусками по chunk_size и читает count кадров."""
+    async def run():
+        reader = asyncio.StreamReader()
+
+        async def feed():
+            for start in range(0, len(data), chunk_size):
+                reader.feed_data(data[start:start + chunk_size])
+                await asyncio.sleep(0)
+            reader.feed_eof()
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            return [await read_frame(reader) for _ in range(count)]
+        finally:
+            await feeder
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+def test_frames_survive_partial_reads(chunk_size):
+    correlations = np.arange(6, dtype=np.float32).reshape(2, 3)
+    messages = [
+        {'id': 1, 'op': 'predict', 'statements': ["Первое", "Второе"], 'timeout': 1.5},
+        dict(id=2, **pack_array(correlations)),
+        {'id': 3, 'error': "срок истёк", 'expired': True},
+    ]
+    data = b''.join(encode_frame(message) for message in messages)
+    frames = read_frames(data, chunk_size, len(messages))
+    assert frames[0] == messages[0] and frames[2] == messages[2]
+    assert np.array_equal(unpack_array(frames[1]), correlations)
+
+
+def test_connection_closed_mid_frame():
+    data = encode_frame({'id': 1, 'op': 'ping'})
+    with pytest.raises(asyncio.IncompleteReadError):
+        read_frames(data[:-2], 2, 1)
+
+
+def test_oversized_frame_is_rejected():
+    with pytest.raises(ProtocolError):
+        read_frames(HEADER.pack(MAX_FRAME_SIZE + 1), 4, 1)
+
+
+def test_parse_address():
+    assert parse_address('unix:/tmp/inference.sock') == ('unix', '/tmp/inference.sock')
+    assert parse_address('tcp://10.0.0.2:8500') == ('tcp', '10.0.0.2', 8500)
+    assert parse_address('tcp://:8500') == ('tcp', '127.0.0.1', 8500)
+    with pytest.raises(ValueError):
+        parse_address('http://localhost:8500')
@@ -0,0 +1,72 @@
+# test/test_review_queue.py
+
+import json
+
+from socionics.data_processing import save_feedback
+from socionics.review_queue import ReviewQueue
+
+
+def make_queue(tmp_path):
+    return ReviewQueue(str(tmp_path / 'review_queue.jsonl'), str(tmp_path / 'user_db.json'))
+
+
+def fill(queue, count):
+    return [queue.add(1, 'user', f"Утверждение {i}", {'БЛ': 0.1 * i}) for i in range(count)]
+
+
+def read_user_db(tmp_path):
+    with open(tmp_path / 'user_db.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_ids_survive_reload_and_rewrite(tmp_path):
+    queue = make_queue(tmp_path)
+    assert fill(queue, 3) == [1, 2, 3]
+    assert [entry['id'] for entry in make_queue(tmp_path).entries()] == [1, 2, 3]
+
+    # После перезаписи без последнего утверждения номер 3 не выдаётся повторно
+    assert queue.resolve([3], approve=False) == 1
+    reloaded = make_queue(tmp_path)
+    assert [entry['id'] for entry in reloaded.entries()] == [1, 2]
+    assert reloaded.add(1, 'user', "Новое утверждение", {'БЛ': 0.5}) == 4
+
+    queue.resolve([1, 2], approve=False)
+    assert len(make_queue(tmp_path)) == 0
+    assert make_queue(tmp_path).add(1, 'user', "Ещё одно", {}) == 4
+
+
+def test_approve_writes_batch_and_skips_resolved_ids(tmp_path):
+    queue = make_queue(tmp_path)
+    fill(queue, 4)
+    assert queue.resolve([3, 1, 1, 99], approve=True) == 2
+    assert [entry['statement'] for entry in read_user_db(tmp_path)] == ["Утверждение 0", "Утверждение 2"]
+    assert [entry['id'] for entry in queue.entries()] == [2, 4]
+
+    # Уже рассмотренные номера пропускаются, отклонённые в хранилище не попадают
+    assert queue.resolve([1, 3], approve=True) == 0
+    assert queue.resolve([2], approve=False) == 1
+    assert len(read_user_db(tmp_path)) == 2
+    assert [entry['id'] for entry in make_queue(tmp_path).entries()] == [4]
+
+
+def test_page_and_digest_counters(tmp_path):
+    queue = make_queue(tmp_path)
+    fill(queue, 5)
+    assert [entry['id'] for entry in queue.page(1, 2)] == [2, 3]
+    assert queue.new_since_digest() == 5
+    queue.mark_digested()
+    fill(queue, 2)
+    assert queue.new_since_digest() == 2
+
+
+def test_feedback_keeps_statement_for_review(tmp_path):
+    feedback_file = str(tmp_path / 'feedback_data.jsonl')
+    user_db = str(tmp_path / 'user_db.json')
+    save_feedback(1, 'user', "На проверке", {'БЛ': 0.5}, False, feedback_file, user_db, store_statement=False)
+    # Обратная связь записана, а утверждение ждёт одобрения
+    with open(feedback_file, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)['statement'] for line in f] == ["На проверке"]
+    assert not (tmp_path / 'user_db.json').exists()
+
+    save_feedback(1, 'user', "Без проверки", {'БЛ': 0.5}, False, feedback_file, user_db)
+    assert [entry['statement'] for entry in read_user_db(tmp_path)] == ["Без проверки"]
@@ -0,0 +1,154 @@
+# test/test_singleflight.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from neural_network.deadlines import DeadlineExceeded, deadline_scope
+from neural_network.singleflight import SingleFlightPredictor
+
+
+class FakePredictor:
+    """Предсказатель, который ждёт release перед ответом и считает вызовы."""
+
+    def __init__(self, errors=()):
+        self.calls = []
+        self.release = asyncio.Event()
+        # Исключения для очередных вызовов predict (None — успешный ответ)
+        self.errors = list(errors)
+
+    async def predict(self, statements):
+        self.calls.append(('predict', list(statements)))
+        await self.release.wait()
+        error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        return np.array([[float(len(statement))] for statement in statements])
+
+    async def predict_uncertainty(self, statements, samples):
+        self.calls.append(('predict_uncertainty', list(statements), samples))
+        await self.release.wait()
+        points = np.array([[float(len(statement))] for statement in statements])
+        return points, np.repeat(points[:, None, :], samples, axis=1)
+
+
+class PointPredictor:
+    """Предсказатель без стохастических проходов, как InferenceClient."""
+
+    async def predict(self, statements):
+        return np.zeros((len(statements), 1))
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_uncertainty_available_only_if_wrapped_predictor_has_it():
+    assert hasattr(SingleFlightPredictor(FakePredictor()), 'predict_uncertainty')
+    assert not hasattr(SingleFlightPredictor(PointPredictor()), 'predict_uncertainty')
+
+
+def test_uncertainty_requests_are_coalesced_per_samples():
+    async def scenario():
+        inner = FakePredictor()
+        predictor = SingleFlightPredictor(inner, model_version='v1')
+        same = [asyncio.ensure_future(predictor.predict_uncertainty(['Текст'], 4)) for _ in range(3)]
+        other_samples = asyncio.ensure_future(predictor.predict_uncertainty([' текст '], 8))
+        point = asyncio.ensure_future(predictor.predict(['текст']))
+        await _settle()
+        inner.release.set()
+        results = await asyncio.gather(*same)
+        await asyncio.gather(other_samples, point)
+        return inner.calls, results, other_samples.result(), point.result()
+
+    calls, results, other_samples, point = asyncio.run(scenario())
+    assert sorted(call[0] for call in calls) == ['predict', 'predict_uncertainty', 'predict_uncertainty']
+    for points, draws in results:
+        assert points.shape == (1, 1) and draws.shape == (1, 4, 1)
+    assert other_samples[1].shape == (1, 8, 1)
+    assert point.shape == (1, 1)
+
+
+def test_concurrent_identical_statements_share_one_inner_call():
+    async def scenario():
+        inner = FakePredictor()
+        predictor = SingleFlightPredictor(inner)
+        tasks = [asyncio.ensure_future(predictor.predict(['Утверждение', ' утверждение  '])) for _ in range(5)]
+        await _settle()
+        inner.release.set()
+        return inner.calls, await asyncio.gather(*tasks), predictor._inflight
+
+    calls, results, inflight = asyncio.run(scenario())
+    assert calls == [('predict', ['Утверждение'])]
+    for result in results:
+        assert result.tolist() == [[11.0], [11.0]]
+    assert not inflight
+
+
+def test_follower_retries_when_leader_is_cancelled():
+    async def scenario():
+        inner = FakePredictor()
+        predictor = SingleFlightPredictor(inner)
+        leader = asyncio.ensure_future(predictor.predict(['текст']))
+        await _settle()
+        follower = asyncio.ensure_future(predictor.predict(['текст']))
+        await _settle()
+        leader.cancel()
+        await _settle()
+        inner.release.set()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return inner.calls, result
+
+    calls, result = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert result.tolist() == [[5.0]]
+
+
+def test_follower_retries_after_leader_deadline_unless_own_deadline_passed():
+    async def with_deadline(seconds, predictor):
+        with deadline_scope(seconds):
+            return await predictor.predict(['текст'])
+
+    async def scenario():
+        inner = FakePredictor(errors=[DeadlineExceeded("срок ведущего запроса истёк")])
+        predictor = SingleFlightPredictor(inner)
+        leader = asyncio.ensure_future(predictor.predict(['текст']))
+        await _settle()
+        follower = asyncio.ensure_future(predictor.predict(['текст']))
+        late_follower = asyncio.ensure_future(with_deadline(0.01, predictor))
+        await asyncio.sleep(0.02)
+        inner.release.set()
+        results = await asyncio.gather(leader, follower, late_follower, return_exceptions=True)
+        return inner.calls, results
+
+    calls, (leader, follower, late_follower) = asyncio.run(scenario())
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower.tolist() == [[5.0]]
+    assert isinstance(late_follower, DeadlineExceeded)
+    # Повторяет только последователь, у которого срок не истёк
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('waiters', [1, 3])
+def test_leader_error_reaches_every_waiter_and_is_marked_retrieved(waiters):
+    async def scenario():
+        inner = FakePredictor(errors=[ValueError("модель упала")])
+        predictor = SingleFlightPredictor(inner)
+        tasks = [asyncio.ensure_future(predictor.predict(['текст'])) for _ in range(waiters)]
+        await _settle()
+        shared = list(predictor._inflight.values())
+        inner.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return inner.calls, results, shared, predictor._inflight
+
+    calls, results, shared, inflight = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    # _log_traceback снят — при сборке future asyncio не напишет «Future exception was never retrieved»
+    assert len(shared) == 1 and not shared[0]._log_traceback
+    assert isinstance(shared[0].exception(), ValueError)
+    assert not inflight